@@ -0,0 +1,134 @@
+# admission.py - Admission control and degradation tiers for the scoring endpoints under overload
+
+import os
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+import metrics
+
+# Degradation tiers, cheapest last
+FULL = 'full'
+NO_COLLABORATIVE = 'no_collaborative'
+CACHED_USER = 'cached_user'
+TRENDING = 'trending'
+TIERS = (FULL, NO_COLLABORATIVE, CACHED_USER, TRENDING)
+
+# Response header naming the tier a /personalized answer was produced at
+TIER_HEADER = 'X-Degradation-Tier'
+
+ADMISSIONS = metrics.REGISTRY.counter(
+    'recommender_admission_total', 'Scoring requests by the tier they were served at, or rejected',
+    ('endpoint', 'tier'))
+ADMISSION_INFLIGHT = metrics.REGISTRY.gauge(
+    'recommender_admission_inflight', 'Admitted scoring requests not yet answered')
+ADMISSION_PRESSURE = metrics.REGISTRY.gauge(
+    'recommender_admission_pressure', 'Load relative to the budget (in-flight share or recent latency, 1 = at budget)')
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def default_max_inflight() -> int:
+    """Scoring requests served at once before new ones get a 503 (ML_MAX_INFLIGHT, default 64, 0 = no limit)"""
+    return int(_env_float('ML_MAX_INFLIGHT', 64))
+
+
+def default_latency_budget() -> float:
+    """Mean recent scoring latency treated as full load (ML_LATENCY_BUDGET_MS, default 1000, 0 = ignore latency)"""
+    return _env_float('ML_LATENCY_BUDGET_MS', 1000) / 1000.0
+
+
+def default_stale_age() -> float:
+    """Oldest cached list a degraded request may be served (ML_DEGRADED_MAX_AGE seconds, default 300)"""
+    return _env_float('ML_DEGRADED_MAX_AGE', 300.0)
+
+
+class Overloaded(Exception):
+    """The in-flight limit is reached; the request is rejected instead of queued"""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Recommendation service overloaded, retry shortly")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """One admitted request: the tier it is served at (callers may step it down) and its start time"""
+
+    __slots__ = ('endpoint', 'tier', 'started')
+
+    def __init__(self, endpoint: str, tier: str):
+        self.endpoint = endpoint
+        self.tier = tier
+        self.started = time.perf_counter()
+
+
+class AdmissionController:
+    """
+    Tracks in-flight scoring requests and their recent latency.
+
+    Pressure is the larger of the in-flight share of `max_inflight` and the
+    mean latency of requests answered in the last `window` seconds over
+    `latency_budget`. Degradable requests are served at the tier for that
+    pressure: full below 0.5, no collaborative scoring below 0.75, the user's
+    cached list below 1.0, the cached trending list above. Once `max_inflight`
+    requests are in flight, new ones are rejected straight away.
+
+    Used from the event loop only, so the counters need no lock.
+    """
+
+    thresholds: Tuple[float, ...] = (0.5, 0.75, 1.0)
+
+    def __init__(self, max_inflight: Optional[int] = None, latency_budget: Optional[float] = None,
+                 stale_age: Optional[float] = None, window: float = 10.0):
+        self.max_inflight = default_max_inflight() if max_inflight is None else max_inflight
+        self.latency_budget = default_latency_budget() if latency_budget is None else latency_budget
+        self.stale_age = default_stale_age() if stale_age is None else stale_age
+        self.window = window
+        self.inflight = 0
+        self._recent: deque = deque()  # (finished at, seconds) within the window
+        self._recent_total = 0.0
+
+    def _expire(self, now: float):
+        while self._recent and now - self._recent[0][0] > self.window:
+            self._recent_total -= self._recent.popleft()[1]
+        if not self._recent:
+            self._recent_total = 0.0  # no float drift left behind
+
+    def recent_latency(self) -> float:
+        """Mean seconds of the requests answered within the window (0 when none)"""
+        self._expire(time.perf_counter())
+        return self._recent_total / len(self._recent) if self._recent else 0.0
+
+    def pressure(self, extra: int = 0) -> float:
+        share = (self.inflight + extra) / self.max_inflight if self.max_inflight else 0.0
+        slowness = self.recent_latency() / self.latency_budget if self.latency_budget else 0.0
+        return max(share, slowness)
+
+    def tier(self, extra: int = 0) -> str:
+        pressure = self.pressure(extra)
+        return TIERS[sum(pressure >= threshold for threshold in self.thresholds)]
+
+    def enter(self, endpoint: str, degradable: bool = True) -> Ticket:
+        """Admit one request (raises Overloaded at the in-flight limit)"""
+        if self.max_inflight and self.inflight >= self.max_inflight:
+            ADMISSIONS.inc(endpoint=endpoint, tier='rejected')
+            raise Overloaded()
+        ticket = Ticket(endpoint, self.tier(extra=1) if degradable else FULL)
+        self.inflight += 1
+        ADMISSION_INFLIGHT.set(self.inflight)
+        ADMISSION_PRESSURE.set(self.pressure())
+        return ticket
+
+    def leave(self, ticket: Ticket):
+        now = time.perf_counter()
+        self.inflight -= 1
+        self._recent.append((now, now - ticket.started))
+        self._recent_total += now - ticket.started
+        self._expire(now)
+        ADMISSION_INFLIGHT.set(self.inflight)
+        ADMISSIONS.inc(endpoint=ticket.endpoint, tier=ticket.tier)
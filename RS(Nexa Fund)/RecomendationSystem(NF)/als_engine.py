@@ -0,0 +1,175 @@
+# als_engine.py - Implicit-feedback ALS (Hu, Koren & Volinsky) with a batched conjugate-gradient solver
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+from scipy import sparse
+
+
+def default_collab_engine() -> str:
+    """Collaborative engine (ML_COLLAB_ENGINE env var): 'nmf' (default) or 'als'"""
+    return 'als' if os.getenv('ML_COLLAB_ENGINE', 'nmf').lower() == 'als' else 'nmf'
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def default_als_epsilon() -> float:
+    """Amount scale of the log confidence over raw contribution amounts (ML_ALS_EPSILON env var, default 10)"""
+    return _env_float('ML_ALS_EPSILON', 10.0)
+
+
+class ImplicitALS:
+    """
+    Weighted matrix factorization for implicit feedback.
+
+    Every observed interaction r_ui > 0 is a positive preference with confidence
+    c_ui = 1 + alpha * r_ui, or c_ui = 1 + alpha * log(1 + r_ui / epsilon) when
+    epsilon is set (for raw amounts); unobserved cells are preference 0 with
+    confidence 1 (instead of the hard zeros NMF fits). Each half-step solves the regularized
+    least-squares systems of all users (or items) at once with a few conjugate
+    gradient iterations, warm-started from the previous factors, so an
+    iteration costs O(nnz * k + (n + m) * k^2) and never densifies the matrix.
+
+    Exposes the parts of the sklearn NMF interface the recommender uses:
+    `components_` (k × m item factors), `transform` (fold-in of user rows),
+    `fit_transform`, `n_components_` and `n_iter_`.
+    """
+
+    def __init__(self, n_components: int = 10, alpha: Optional[float] = None,
+                 regularization: Optional[float] = None, iterations: Optional[int] = None,
+                 cg_steps: int = 3, n_workers: int = 1, random_state: int = 42,
+                 epsilon: Optional[float] = None):
+        self.n_components = n_components
+        self.alpha = _env_float('ML_ALS_ALPHA', 40.0) if alpha is None else alpha
+        self.epsilon = epsilon
+        self.regularization = _env_float('ML_ALS_REGULARIZATION', 0.1) if regularization is None else regularization
+        self.iterations = int(_env_float('ML_ALS_ITERATIONS', 15)) if iterations is None else iterations
+        self.cg_steps = cg_steps
+        self.n_workers = max(1, n_workers)
+        self.random_state = random_state
+        self.components_ = None
+        self.n_components_ = n_components
+        self.n_features_in_ = None
+        self.n_iter_ = 0
+
+    # ------------------------------------------------------------------
+    # Fitting
+    # ------------------------------------------------------------------
+
+    def _confidence(self, X) -> sparse.csr_matrix:
+        """CSR matrix of confidences c_ui over the observed cells (X may be dense or sparse)"""
+        # A copy: X may be the caller's live (or memory-mapped) sparse matrix
+        matrix = sparse.csr_matrix(X, dtype=np.float64, copy=True)
+        matrix.eliminate_zeros()
+        strength = matrix.data if self.epsilon is None else np.log1p(matrix.data / self.epsilon)
+        matrix.data = 1.0 + self.alpha * strength
+        return matrix
+
+    def fit_transform(self, X, user_factors: Optional[np.ndarray] = None,
+                      item_factors: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Fit on a (users × items) interaction matrix; returns the user factors.
+
+        user_factors / item_factors warm-start the solve (e.g. a periodic refit).
+        """
+        Cui = self._confidence(X)
+        Ciu = Cui.T.tocsr()
+        n_users, n_items = Cui.shape
+        k = self.n_components_ = min(self.n_components, n_users, n_items)
+        rng = np.random.default_rng(self.random_state)
+
+        U = np.array(user_factors, dtype=np.float64) if user_factors is not None \
+            else rng.normal(0, 0.01, size=(n_users, k))
+        V = np.array(item_factors, dtype=np.float64) if item_factors is not None \
+            else rng.normal(0, 0.01, size=(n_items, k))
+
+        for _ in range(self.iterations):
+            U = self._solve(Cui, V, U, self.cg_steps)
+            V = self._solve(Ciu, U, V, self.cg_steps)
+
+        self.components_ = V.T.copy()
+        self.n_features_in_ = n_items
+        self.n_iter_ = self.iterations
+        return U
+
+    def fit(self, X, **kwargs):
+        self.fit_transform(X, **kwargs)
+        return self
+
+    def transform(self, X) -> np.ndarray:
+        """Fold user rows into factor space against the fitted item factors"""
+        Cui = self._confidence(X)
+        if Cui.shape[1] != self.components_.shape[1]:
+            raise ValueError(f"X has {Cui.shape[1]} features, but ImplicitALS is expecting "
+                             f"{self.components_.shape[1]} features")
+        V = self.components_.T
+        # k CG steps solve each k × k system exactly
+        return self._solve(Cui, V, np.zeros((Cui.shape[0], V.shape[1])), max(self.cg_steps, V.shape[1]))
+
+    def fold_in_items(self, columns, user_factors: np.ndarray) -> np.ndarray:
+        """Factors for item columns (given as rows: items × users) against fixed user factors"""
+        Ciu = self._confidence(columns)
+        U = np.asarray(user_factors, dtype=np.float64)
+        return self._solve(Ciu, U, np.zeros((Ciu.shape[0], U.shape[1])), max(self.cg_steps, U.shape[1]))
+
+    def inverse_transform(self, W: np.ndarray) -> np.ndarray:
+        return W @ self.components_
+
+    # ------------------------------------------------------------------
+    # Batched conjugate gradient
+    # ------------------------------------------------------------------
+
+    def _solve(self, C: sparse.csr_matrix, Y: np.ndarray, X: np.ndarray, steps: int) -> np.ndarray:
+        """
+        Solve (YᵀY + λI + Yᵀ(C_u - I)Y) x_u = Yᵀ C_u p_u for every row u of C,
+        chunking rows across threads (the sparse/dense products release the GIL).
+        """
+        YtY = Y.T @ Y + self.regularization * np.eye(Y.shape[1])
+        n_rows = C.shape[0]
+        if self.n_workers == 1 or n_rows < 2 * self.n_workers:
+            return self._cg_block(C, Y, YtY, X, steps)
+
+        bounds = np.linspace(0, n_rows, self.n_workers + 1, dtype=int)
+        with ThreadPoolExecutor(max_workers=self.n_workers) as pool:
+            parts = pool.map(lambda b: self._cg_block(C[b[0]:b[1]], Y, YtY, X[b[0]:b[1]], steps),
+                             zip(bounds[:-1], bounds[1:]))
+            return np.vstack(list(parts))
+
+    @staticmethod
+    def _cg_block(C: sparse.csr_matrix, Y: np.ndarray, YtY: np.ndarray, X: np.ndarray, steps: int) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        rows = np.repeat(np.arange(C.shape[0]), np.diff(C.indptr))
+        cols = C.indices
+        extra = C.data - 1.0  # c_ui - 1 on observed cells
+        Y_obs = Y[cols]
+
+        def matvec(P):
+            # (YᵀY + λI) p_u + Σ_i (c_ui - 1) (y_i · p_u) y_i, for all rows at once
+            weights = extra * np.einsum('ij,ij->i', P[rows], Y_obs)
+            sparse_part = sparse.csr_matrix((weights, cols, C.indptr), shape=C.shape) @ Y
+            return P @ YtY + sparse_part
+
+        b = C @ Y  # Σ_i c_ui y_i  (preference 1 on observed cells)
+        r = b - matvec(X)
+        p = r.copy()
+        rs = np.einsum('ij,ij->i', r, r)
+        for _ in range(steps):
+            active = rs > 1e-20
+            if not active.any():
+                break
+            Ap = matvec(p)
+            denom = np.einsum('ij,ij->i', p, Ap)
+            step = np.where(active & (denom > 0), rs / np.where(denom > 0, denom, 1.0), 0.0)
+            X += step[:, None] * p
+            r -= step[:, None] * Ap
+            rs_new = np.einsum('ij,ij->i', r, r)
+            p = r + np.where(active, rs_new / np.where(rs > 0, rs, 1.0), 0.0)[:, None] * p
+            rs = rs_new
+        return X
@@ -0,0 +1,297 @@
+# backend_guard.py - Circuit breaker, deadline budgets and client-side rate limiting for backend export calls
+
+import contextlib
+import email.utils
+import os
+import re
+import threading
+import time
+from typing import Mapping, Optional, Tuple
+
+import requests
+
+import metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+BREAKER_STATE = metrics.REGISTRY.gauge(
+    'recommender_breaker_state', 'Circuit breaker state (0 closed, 1 open, 2 half-open)', ('breaker',))
+BREAKER_TRANSITIONS = metrics.REGISTRY.counter(
+    'recommender_breaker_transitions_total', 'Circuit breaker state changes', ('breaker', 'state'))
+REQUEST_FETCHES = metrics.REGISTRY.counter(
+    'recommender_request_fetch_total', 'Request-path backend fetches by outcome (fresh or a fallback reason)',
+    ('endpoint', 'outcome'))
+RATE_LIMIT_WAIT_SECONDS = metrics.REGISTRY.counter(
+    'recommender_rate_limit_wait_seconds_total', 'Time spent waiting for the client-side backend rate limiter')
+RATE_LIMIT_REJECTIONS = metrics.REGISTRY.counter(
+    'recommender_rate_limit_rejections_total', 'Backend calls not started because the rate limiter wait exceeded the budget')
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def default_breaker_failures() -> int:
+    """Consecutive failures that open the breaker (ML_BREAKER_FAILURES, default 5)"""
+    return max(1, int(_env_float('ML_BREAKER_FAILURES', 5)))
+
+
+def default_breaker_reset() -> float:
+    """Seconds an open breaker waits before letting a probe through (ML_BREAKER_RESET_SECONDS, default 30)"""
+    return _env_float('ML_BREAKER_RESET_SECONDS', 30.0)
+
+
+def default_fetch_budget() -> float:
+    """Seconds a request may spend fetching fresh campaigns before serving cached ones (ML_FETCH_BUDGET_MS, default 800)"""
+    return _env_float('ML_FETCH_BUDGET_MS', 800) / 1000.0
+
+
+def default_rate_limit() -> Optional[Tuple[int, float]]:
+    """
+    Client-side backend request limit as (requests, window seconds) from ML_BACKEND_RATE_LIMIT
+    ("100/900" = the backend's production default of 100 requests per 15 minutes). Unset: the
+    limit is learned from the backend's RateLimit-Policy header.
+    """
+    value = os.getenv('ML_BACKEND_RATE_LIMIT', '')
+    try:
+        limit, window = value.split('/')
+        return (int(limit), float(window)) if int(limit) > 0 and float(window) > 0 else None
+    except ValueError:
+        return None
+
+
+class BackendUnavailable(Exception):
+    """Raised instead of calling the backend while the breaker is open"""
+
+
+class DeadlineExceeded(Exception):
+    """The request's fetch budget ran out before the backend call could start"""
+
+
+class RateLimited(Exception):
+    """The rate limiter would make the call wait longer than the caller allows"""
+
+    def __init__(self, wait: float):
+        super().__init__(f"Backend rate limit: next call allowed in {wait:.1f}s")
+        self.wait = wait
+
+
+def is_backend_failure(exc: BaseException) -> bool:
+    """Errors that say the backend is down or overloaded: connection errors, timeouts, 5xx answers"""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    status_code = getattr(exc, 'status_code', None)
+    return status_code is not None and status_code >= 500
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls go through; `failure_threshold` consecutive failures open it.
+    open: calls fail fast with BackendUnavailable for `reset_timeout` seconds.
+    half-open: one probe call goes through; success closes the breaker,
+    failure opens it again. 4xx answers count as success (the backend is up).
+    """
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None,
+                 reset_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = default_breaker_failures() if failure_threshold is None else failure_threshold
+        self.reset_timeout = default_breaker_reset() if reset_timeout is None else reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(_STATE_VALUES[CLOSED], breaker=name)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            self.state = state
+            BREAKER_STATE.set(_STATE_VALUES[state], breaker=self.name)
+            BREAKER_TRANSITIONS.inc(breaker=self.name, state=state)
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now (does not claim the half-open probe)"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not (self.state == HALF_OPEN and self._probing)
+
+    def allow(self) -> bool:
+        """Claim permission for one call"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    @contextlib.contextmanager
+    def guard(self):
+        """Run the block as one backend call: fail fast when open, record the outcome otherwise"""
+        if not self.allow():
+            raise BackendUnavailable(f"Backend circuit '{self.name}' is open")
+        try:
+            yield
+        except BaseException as e:
+            if is_backend_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+
+
+class Deadline:
+    """Time budget shared by everything one request does against the backend"""
+
+    __slots__ = ('expires_at',)
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Socket timeout for the next call: what is left of the budget, at most `cap` (raises when spent)"""
+        remaining = self.remaining()
+        if remaining <= 0.0:
+            raise DeadlineExceeded("Fetch budget exhausted")
+        return remaining if cap is None else min(remaining, cap)
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Retry-After header as seconds (delta-seconds or an HTTP date), None when absent or malformed"""
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_POLICY_WINDOW = re.compile(r'^\s*(\d+)\s*;\s*w\s*=\s*(\d+)')
+
+
+class TokenBucket:
+    """
+    Client-side limiter for backend requests: `limit` requests per `window`
+    seconds, refilled continuously, bursting up to `limit`.
+
+    Without a configured limit the bucket is unlimited until the backend
+    advertises one: observe() reads the RateLimit-Policy / -Remaining / -Reset
+    headers that express-rate-limit sends, so the client converges on the
+    backend's actual limit. pause() holds every caller back after a 429's
+    Retry-After.
+    """
+
+    def __init__(self, limit: Optional[int] = None, window: Optional[float] = None):
+        self.fixed = limit is not None
+        self.capacity = 0.0
+        self.rate = None  # tokens per second; None = unlimited
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+        if limit is not None:
+            self.configure(limit, window)
+
+    def configure(self, limit: int, window: float):
+        """Set the limit; a bucket that was unlimited starts full"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = float(limit) if self.rate is None else min(self.tokens, float(limit))
+            self.capacity = float(limit)
+            self.rate = limit / window
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, max_wait: Optional[float] = None) -> float:
+        """Take one request slot, sleeping until it is available; returns the time waited"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self.blocked_until - now)
+            if self.rate is not None and self.tokens < 1.0:
+                wait = max(wait, (1.0 - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                RATE_LIMIT_REJECTIONS.inc()
+                raise RateLimited(wait)
+            if self.rate is not None:
+                self.tokens -= 1.0  # may go negative: a reservation the refill pays back
+        if wait > 0:
+            RATE_LIMIT_WAIT_SECONDS.inc(wait)
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """Hold all callers back for `seconds` (a 429's Retry-After)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def observe(self, headers: Mapping[str, str]):
+        """Follow the backend's advertised limit and remaining quota"""
+        policy = _POLICY_WINDOW.match(headers.get('RateLimit-Policy') or '')
+        if policy and not self.fixed:
+            limit, window = int(policy.group(1)), float(policy.group(2))
+            if limit > 0 and window > 0 and (self.rate is None or self.capacity != limit
+                                             or abs(self.rate - limit / window) > 1e-12):
+                self.configure(limit, window)
+        try:
+            remaining = int(headers.get('RateLimit-Remaining'))
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.rate is not None:
+                self.tokens = min(self.tokens, float(remaining))
+            if remaining <= 0:
+                try:
+                    reset = float(headers.get('RateLimit-Reset'))
+                except (TypeError, ValueError):
+                    return
+                self.blocked_until = max(self.blocked_until, time.monotonic() + reset)
+
+
+# One breaker for the backend export endpoints, shared by model builds and request-path fetches
+BACKEND = CircuitBreaker('backend')
+
+# Client-side request budget for the same endpoints, matched to the backend's rate limit
+BACKEND_RATE_LIMIT = TokenBucket(*(default_rate_limit() or (None, None)))
@@ -0,0 +1,101 @@
+# bench_admission.py - /personalized under an arrival-rate spike: no admission control vs in-flight limit + degradation tiers
+
+import sys
+import os
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from collections import Counter
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from fastapi import HTTPException, Response
+
+import fastapi_app_db
+from admission import TIER_HEADER, AdmissionController
+from backend_guard import CircuitBreaker
+from export_loader import ConditionalExport
+from ml_recommender_db import DatabaseMLRecommender
+from recommendation_cache import RecommendationCache
+from synthetic_data import load_into
+
+
+async def spike(users, rate, seconds):
+    """Open-loop arrivals: `rate` requests per second for `seconds`, each for the next user"""
+    async def one(user_id):
+        response = Response()
+        start = time.perf_counter()
+        try:
+            await fastapi_app_db.get_personalized_recommendations(
+                fastapi_app_db.PersonalizedRequest(user_id=user_id, top_n=20), response)
+            return time.perf_counter() - start, response.headers[TIER_HEADER]
+        except HTTPException as e:
+            return time.perf_counter() - start, 'rejected' if e.status_code == 503 else 'error'
+
+    tasks = []
+    for i in range(int(rate * seconds)):
+        tasks.append(asyncio.ensure_future(one(users[i % len(users)])))
+        await asyncio.sleep(1.0 / rate)
+    return await asyncio.gather(*tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/personalized latency and tiers during a traffic spike")
+    parser.add_argument('--donors', type=int, default=2000)
+    parser.add_argument('--campaigns', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=400, help="arrivals per second")
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--warm', type=float, default=0.5, help="share of users with a cached (expired) list")
+    args = parser.parse_args()
+
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=args.donors, n_campaigns=args.campaigns)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    fastapi_app_db.recommender = recommender
+    fastapi_app_db.weighted_recommender = fastapi_app_db.WeightedRecommender(recommender)
+    breaker = CircuitBreaker('bench-admission', failure_threshold=1, reset_timeout=3600)
+    breaker.record_failure()
+    fastapi_app_db.fresh_campaigns_export = ConditionalExport('campaigns', breaker=breaker)
+    users = [str(user_id) for user_id in recommender.donor_df['id']]
+    arrivals = list(np.random.default_rng(0).permutation(users))
+
+    print("=" * 72)
+    print(f"/personalized spike: {args.rate:.0f} req/s for {args.seconds:.0f} s, {args.campaigns:,} campaigns, "
+          f"{args.warm:.0%} of users with a stale list")
+    print("=" * 72)
+    modes = (
+        ('no admission control', AdmissionController(max_inflight=0, latency_budget=0)),
+        ('limit 64 + tiers', AdmissionController(max_inflight=64, latency_budget=1.0)),
+    )
+    for label, controller in modes:
+        # Earlier traffic left lists that have since expired
+        fastapi_app_db.results_cache = RecommendationCache(ttl=0.2)
+        fastapi_app_db.admission = AdmissionController(max_inflight=0, latency_budget=0)
+        warm = users[:int(len(users) * args.warm)]
+
+        async def prefill():
+            await fastapi_app_db.get_trending_campaigns(top_n=20)
+            for start in range(0, len(warm), 32):
+                await asyncio.gather(*[fastapi_app_db.get_personalized_recommendations(
+                    fastapi_app_db.PersonalizedRequest(user_id=user_id, top_n=20)) for user_id in warm[start:start + 32]])
+        asyncio.run(prefill())
+        time.sleep(0.25)
+
+        fastapi_app_db.admission = controller
+        start = time.perf_counter()
+        results = asyncio.run(spike(arrivals, args.rate, args.seconds))
+        wall = time.perf_counter() - start
+        served = np.array([seconds for seconds, tier in results if tier not in ('rejected', 'error')]) * 1000
+        tiers = Counter(tier for _, tier in results)
+        print(f"   {label}")
+        print(f"      served p50 {np.percentile(served, 50):8.1f} ms   p99 {np.percentile(served, 99):8.1f} ms"
+              f"   drained in {wall:5.2f} s")
+        print("      " + "   ".join(f"{tier} {count}" for tier, count in sorted(tiers.items())))
+
+
+if __name__ == "__main__":
+    main()
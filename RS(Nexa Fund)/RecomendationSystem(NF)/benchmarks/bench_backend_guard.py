@@ -0,0 +1,91 @@
+# bench_backend_guard.py - /trending latency against a slow backend: plain 5 s timeout vs fetch budget + circuit breaker
+
+import sys
+import os
+import argparse
+import contextlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import fastapi_app_db
+from backend_guard import CircuitBreaker, default_fetch_budget
+from export_loader import ConditionalExport
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(self.server.body)))
+            self.end_headers()
+            self.wfile.write(self.server.body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def run(client, requests_count):
+    latencies = []
+    for _ in range(requests_count):
+        fastapi_app_db.results_cache.clear()
+        start = time.perf_counter()
+        client.post('/trending', params={'top_n': 10})
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request latency while the backend is slow")
+    parser.add_argument('--delay', type=float, default=2.0, help="backend response delay (s)")
+    parser.add_argument('--requests', type=int, default=8)
+    parser.add_argument('--campaigns', type=int, default=2000)
+    args = parser.parse_args()
+
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=200, n_campaigns=args.campaigns)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    fastapi_app_db.recommender = recommender
+    fastapi_app_db.weighted_recommender = fastapi_app_db.WeightedRecommender(recommender)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    server.daemon_threads = True
+    server.delay = args.delay
+    server.body = json.dumps({'campaigns': []}).encode()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['BACKEND_API_URL'] = f"http://127.0.0.1:{server.server_address[1]}/api"
+    client = TestClient(fastapi_app_db.app)
+
+    print("=" * 72)
+    print(f"/trending with a backend answering in {args.delay:.1f}s ({args.requests} sequential requests)")
+    print("=" * 72)
+    modes = (
+        ('5 s timeout, no breaker', 5.0, CircuitBreaker('bench-off', failure_threshold=10 ** 9)),
+        (f'{default_fetch_budget() * 1000:.0f} ms budget + breaker', default_fetch_budget(),
+         CircuitBreaker('bench-on', failure_threshold=3, reset_timeout=60)),
+    )
+    for label, budget, breaker in modes:
+        fastapi_app_db.FETCH_BUDGET = budget
+        fastapi_app_db.fresh_campaigns_export = ConditionalExport('campaigns', breaker=breaker)
+        ms = run(client, args.requests)
+        print(f"   {label:28s} p50 {np.percentile(ms, 50):8.1f} ms   max {ms.max():8.1f} ms   "
+              f"total {ms.sum() / 1000:6.2f} s   (breaker {breaker.state})")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench_candidates.py - Two-stage (retrieve → score) vs full personalized scoring: latency and recall
+
+import sys
+import os
+import argparse
+import contextlib
+import io
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from candidate_generation import SOURCES, CandidateStage
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import CATEGORIES, WORDS, load_into
+from weighted_recommender import WeightedRecommender
+
+
+def build(n_donors, n_campaigns, n_interactions):
+    recommender = load_into(DatabaseMLRecommender(), n_donors, n_campaigns, n_interactions)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.build_item_neighbors()
+        recommender.fit_collaborative()
+    return recommender
+
+
+def random_preferences(rng):
+    return {
+        'interests': list(rng.choice(CATEGORIES, size=rng.integers(1, 3), replace=False)),
+        'interestKeywords': list(rng.choice(WORDS, size=rng.integers(0, 4), replace=False)),
+        'fundingPreference': rng.choice(['small', 'medium', 'large', 'any']),
+        'riskTolerance': rng.choice(['low', 'medium', 'high']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Candidate retrieval vs full scoring")
+    parser.add_argument('--donors', type=int, default=2000)
+    parser.add_argument('--campaigns', type=int, default=5000)
+    parser.add_argument('--interactions', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument('--top-n', type=int, default=20)
+    parser.add_argument('--candidates', type=int, nargs='+', default=[150, 300, 600])
+    args = parser.parse_args()
+
+    recommender = build(args.donors, args.campaigns, args.interactions)
+    campaigns = recommender.campaign_df.to_dict('records')
+    rng = np.random.default_rng(0)
+    users = [(recommender.donor_df['id'].iloc[rng.integers(args.donors)], random_preferences(rng))
+             for _ in range(args.requests)]
+
+    weighted = WeightedRecommender(recommender)
+    start = time.perf_counter()
+    full = [weighted.get_personalized_recommendations(u, p, campaigns, args.top_n, use_candidates=False)
+            for u, p in users]
+    full_ms = (time.perf_counter() - start) * 1000 / len(users)
+
+    print("=" * 72)
+    print(f"Personalized scoring: {args.campaigns} campaigns, {args.requests} requests, top {args.top_n}")
+    print("=" * 72)
+    print(f"   full scoring        {full_ms:8.2f} ms/request")
+
+    for limit in args.candidates:
+        weighted.candidates = CandidateStage(recommender, weighted.compute_trending_score, limit=limit)
+        generator = weighted.candidates.generator()  # index build is per catalog, not per request
+        start = time.perf_counter()
+        staged = [weighted.get_personalized_recommendations(u, p, campaigns, args.top_n) for u, p in users]
+        staged_ms = (time.perf_counter() - start) * 1000 / len(users)
+
+        ids = recommender.campaign_df['id'].to_numpy()
+        source_hits = {name: 0 for name in SOURCES}
+        hits, scored, total = 0, 0, 0
+        for (user_id, prefs), expected, actual in zip(users, full, staged):
+            expected_ids = {r['id'] for r in expected}
+            sources = generator.generate(user_id, prefs)
+            for name, rows in sources.items():
+                source_hits[name] += len(expected_ids & set(ids[rows]))
+            scored += len(np.unique(np.concatenate(list(sources.values()))))
+            hits += len(expected_ids & {r['id'] for r in actual})
+            total += len(expected_ids)
+
+        print(f"\n🔧 ML_CANDIDATES={limit}: {staged_ms:8.2f} ms/request "
+              f"({full_ms / staged_ms:.1f}x), {scored / len(users):.0f} candidates scored")
+        print(f"   recall@{args.top_n} vs full scoring: {hits / total:.3f}")
+        print("   per-source recall: " + ", ".join(f"{name} {source_hits[name] / total:.2f}" for name in SOURCES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# bench_catalog_memory.py - Catalog memory per 100k campaigns and row access: exported frames vs compact store
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_store import CatalogRows, memory_bytes, slim_frame
+from synthetic_data import make_catalog
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exported pandas frames vs the compact catalog store")
+    parser.add_argument('--campaigns', type=int, default=100_000)
+    parser.add_argument('--donors', type=int, default=100_000)
+    args = parser.parse_args()
+
+    donors, campaigns, _ = make_catalog(n_donors=args.donors, n_campaigns=args.campaigns)
+    per_100k = 100_000 / args.campaigns
+
+    print("=" * 72)
+    print(f"Catalog memory: {args.campaigns:,} campaigns, {args.donors:,} donors")
+    print("=" * 72)
+    for label, frame in (('campaigns', campaigns), ('donors', donors)):
+        slim, seconds = timed(lambda: slim_frame(frame))
+        before, after = memory_bytes(frame), memory_bytes(slim)
+        scale = 100_000 / len(frame)
+        print(f"   {label:9s} {before * scale / 1e6:7.1f} MB → {after * scale / 1e6:6.1f} MB per 100k rows "
+              f"({1 - after / before:.0%} saved, compacted in {seconds:.2f}s)")
+
+    slim = slim_frame(campaigns)
+    print("\n   largest campaign columns after compaction (MB per 100k):")
+    usage = slim.memory_usage(deep=True, index=False).sort_values(ascending=False)
+    for name, size in usage.head(6).items():
+        print(f"      {name:22s} {size * per_100k / 1e6:6.1f}   ({slim[name].dtype})")
+
+    # What a request without fresh campaigns used to build vs now
+    _, records = timed(lambda: campaigns.to_dict('records'))
+    rows, views = timed(lambda: CatalogRows(slim))
+    _, scan = timed(lambda: sum(1 for row in rows if row.get('status') == 'ACTIVE'))
+    print(f"\n   to_dict('records')      {records * 1000:8.1f} ms")
+    print(f"   CatalogRows             {views * 1000:8.1f} ms   (+{scan * 1000:.1f} ms to read every row's status)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bench_conditional_exports.py - Refresh and per-request campaign fetch cost: unconditional vs conditional export requests
+
+import sys
+import os
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from export_loader import EXPORT_BYTES_AVOIDED, ConditionalExport
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import make_catalog
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """Serves fixed export bodies with an ETag and answers a matching If-None-Match with 304 (like Express)"""
+
+    def do_GET(self):
+        body, etag = self.server.bodies[self.path.split('?')[0].rsplit('/', 1)[-1]]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conditional export fetching against a local stub backend")
+    parser.add_argument('--donors', type=int, default=2000)
+    parser.add_argument('--campaigns', type=int, default=5000)
+    parser.add_argument('--interactions', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ExportHandler)
+    server.bodies = {}
+    for name, frame in zip(('donors', 'campaigns', 'interactions'),
+                           make_catalog(args.donors, args.campaigns, args.interactions)):
+        body = json.dumps({name: json.loads(frame.to_json(orient='records'))}).encode()
+        server.bodies[name] = (body, '"' + hashlib.md5(body).hexdigest() + '"')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api"
+
+    print("=" * 72)
+    print(f"Conditional exports: {args.donors:,} donors, {args.campaigns:,} campaigns, "
+          f"{args.interactions:,} interactions")
+    print("=" * 72)
+    with contextlib.redirect_stdout(io.StringIO()):
+        serving = DatabaseMLRecommender(backend_url=url)
+        _, full = timed(serving.build_model)
+        _, skipped = timed(lambda: DatabaseMLRecommender(backend_url=url).build_model(serving.export_versions))
+    transferred = sum(len(body) for body, _ in server.bodies.values())
+    print(f"   /refresh, full rebuild              {full * 1000:9.1f} ms   ({transferred / 1e6:.1f} MB transferred)")
+    print(f"   /refresh, exports unchanged (304)   {skipped * 1000:9.1f} ms   (0 MB transferred)")
+
+    endpoint = f"{url}/recommender/export/campaigns"
+    _, plain = timed(lambda: requests.get(endpoint, timeout=5).json()['campaigns'], args.repeat)
+    export = ConditionalExport('campaigns')
+    export.get(url)
+    avoided = EXPORT_BYTES_AVOIDED.value(endpoint='campaigns')
+    _, conditional = timed(lambda: export.get(url), args.repeat)
+    print(f"\n   per-request campaigns, GET + parse  {plain * 1000:9.2f} ms")
+    print(f"   per-request campaigns, 304 reuse    {conditional * 1000:9.2f} ms   "
+          f"({(EXPORT_BYTES_AVOIDED.value(endpoint='campaigns') - avoided) / args.repeat / 1e6:.1f} MB avoided per request)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bench_embedding_precision.py - Memory and top-k agreement of float32 / int8 embedding storage versus float64
+
+import sys
+import os
+import argparse
+import contextlib
+import io
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from embedding_storage import row_norms
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+
+
+def build(precision, args):
+    recommender = load_into(DatabaseMLRecommender(build_workers=args.workers, embedding_mode=args.mode,
+                                                  embedding_precision=precision),
+                            n_donors=args.donors, n_campaigns=args.campaigns, n_interactions=args.interactions)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    return recommender
+
+
+def stored_bytes(recommender):
+    arrays = [recommender.donor_embeddings, recommender.campaign_embeddings,
+              recommender.user_factor_matrix, recommender.nmf_model.components_]
+    return sum(a.nbytes for a in arrays if a is not None)
+
+
+def content_top_k(recommender, donors, k):
+    """Top-k campaigns by cosine similarity per donor, as get_recommendations scores them"""
+    norms = row_norms(recommender.campaign_embeddings)
+    start = time.perf_counter()
+    top = []
+    for donor in donors:
+        scores = (recommender.campaign_embeddings @ recommender.donor_embeddings[donor]) / np.where(norms == 0, 1, norms)
+        top.append(np.argsort(-scores, kind='stable')[:k])
+    return top, (time.perf_counter() - start) / len(donors)
+
+
+def factor_top_k(recommender, k):
+    scores = recommender.user_factor_matrix @ recommender.nmf_model.components_
+    return np.argsort(-scores, axis=1, kind='stable')[:, :k]
+
+
+def agreement(a, b):
+    return float(np.mean([len(set(x) & set(y)) / len(x) for x, y in zip(a, b)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="float64 vs float32 vs int8 embedding storage")
+    parser.add_argument('--donors', type=int, default=2000)
+    parser.add_argument('--campaigns', type=int, default=5000)
+    parser.add_argument('--interactions', type=int, default=20000)
+    parser.add_argument('--mode', choices=['tfidf', 'hashing'], default='hashing')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"Embedding storage: {args.donors} donors, {args.campaigns} campaigns, {args.mode} embeddings")
+    print("=" * 72)
+    donors = np.random.default_rng(0).choice(args.donors, size=min(args.queries, args.donors), replace=False)
+    reference = build('float64', args)
+    reference_bytes = stored_bytes(reference)
+    reference_content, reference_latency = content_top_k(reference, donors, args.k)
+    reference_factors = factor_top_k(reference, args.k)
+    print(f"   float64  {reference_bytes / 1e6:8.1f} MB   query {reference_latency * 1000:6.2f} ms")
+
+    for precision in ('float32', 'int8'):
+        recommender = build(precision, args)
+        size = stored_bytes(recommender)
+        content, latency = content_top_k(recommender, donors, args.k)
+        print(f"   {precision:8s} {size / 1e6:8.1f} MB ({1 - size / reference_bytes:5.1%} saved)   "
+              f"query {latency * 1000:6.2f} ms   "
+              f"top-{args.k} agreement: content {agreement(content, reference_content):.3f}, "
+              f"collaborative {agreement(factor_top_k(recommender, args.k), reference_factors):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench_embeddings.py - Build time, incremental embedding and ranking agreement of the TF-IDF and hashing modes
+
+import sys
+import os
+import argparse
+import contextlib
+import io
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from embed_utils_tfidf import HashingTfidfVectorizer
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import make_catalog
+
+
+def build(mode, catalog, workers):
+    """Recommender with embeddings built in `mode`; returns (recommender, seconds)"""
+    recommender = DatabaseMLRecommender(build_workers=workers, embedding_mode=mode)
+    recommender.donor_df, recommender.campaign_df = catalog[0].copy(), catalog[1].copy()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+    return recommender, time.perf_counter() - start
+
+
+def top_k(queries, items, k, exclude_self=False):
+    scores = queries @ items.T
+    if exclude_self:
+        np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1, kind='stable')[:, :k]
+
+
+def overlap(a, b):
+    """Mean share of top-k rows two rankings agree on"""
+    return float(np.mean([len(set(x) & set(y)) / len(x) for x, y in zip(a, b)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TF-IDF vs hashing embeddings: build time and ranking agreement")
+    parser.add_argument('--donors', type=int, default=2000)
+    parser.add_argument('--campaigns', type=int, default=5000)
+    parser.add_argument('--new-campaigns', type=int, default=200)
+    parser.add_argument('--hash-texts', type=int, default=200_000, help="texts for the chunked hashing timing")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.donors, args.campaigns + args.new_campaigns)
+    base = (catalog[0], catalog[1].iloc[:args.campaigns].reset_index(drop=True))
+    new_campaigns = catalog[1].iloc[args.campaigns:].to_dict('records')
+
+    print("=" * 72)
+    print(f"Embeddings: {args.donors} donors, {args.campaigns} campaigns, {args.workers} workers")
+    print("=" * 72)
+    built = {}
+    for mode in ('tfidf', 'hashing'):
+        recommender, seconds = build(mode, base, args.workers)
+        built[mode] = recommender
+        print(f"   {mode:8s} full build {seconds * 1000:8.1f} ms   "
+              f"dims {recommender.campaign_embeddings.shape[1]}")
+
+    tfidf, hashing = built['tfidf'], built['hashing']
+    campaigns_agree = overlap(top_k(tfidf.campaign_embeddings, tfidf.campaign_embeddings, args.k, True),
+                              top_k(hashing.campaign_embeddings, hashing.campaign_embeddings, args.k, True))
+    donors_agree = overlap(top_k(tfidf.donor_embeddings, tfidf.campaign_embeddings, args.k),
+                           top_k(hashing.donor_embeddings, hashing.campaign_embeddings, args.k))
+    print(f"\n   top-{args.k} agreement hashing vs TF-IDF: campaign→campaign {campaigns_agree:.3f}, "
+          f"donor→campaign {donors_agree:.3f}")
+
+    # New campaigns: hashing embeds only the new rows, TF-IDF refits over everything
+    start = time.perf_counter()
+    hashing.fold_in_campaigns(new_campaigns)
+    fold_in = time.perf_counter() - start
+    _, rebuild = build('tfidf', catalog, args.workers)
+    print(f"\n🔧 {len(new_campaigns)} new campaigns: hashing fold-in {fold_in * 1000:.1f} ms "
+          f"vs TF-IDF rebuild {rebuild * 1000:.1f} ms")
+
+    texts = (base[1]['title'] + ' ' + base[1]['description']).tolist()
+    texts = (texts * (args.hash_texts // len(texts) + 1))[:args.hash_texts]
+    for workers in sorted({1, args.workers}):
+        vectorizer = HashingTfidfVectorizer(max_workers=workers)
+        start = time.perf_counter()
+        vectorizer.partial_fit(texts)
+        print(f"   hashing {len(texts)} texts with {workers} worker(s): {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
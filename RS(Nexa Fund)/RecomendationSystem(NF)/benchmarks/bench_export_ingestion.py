@@ -0,0 +1,75 @@
+# bench_export_ingestion.py - Parse time and peak memory of export payload ingestion
+
+import sys
+import os
+import argparse
+import json
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from export_codec import decode_export, encode_export
+from export_loader import CHUNK_SIZE, parse_export_stream
+from synthetic_data import make_catalog
+
+
+def chunked(body):
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+
+def json_full(body):
+    """Previous path: response.json() then DataFrame from the list of dicts"""
+    return pd.DataFrame(json.loads(body)['campaigns'])
+
+
+def json_streaming(body):
+    buffer, _ = parse_export_stream(chunked(body), 'campaigns')
+    return buffer.to_dataframe()
+
+
+def compact(body):
+    frame, _ = decode_export(body)
+    return frame
+
+
+def measure(fn, body):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = fn(body)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export ingestion benchmark")
+    parser.add_argument('--campaigns', type=int, default=20000)
+    args = parser.parse_args()
+
+    _, campaigns, _ = make_catalog(n_donors=10, n_campaigns=args.campaigns)
+    rows = json.loads(campaigns.to_json(orient='records'))
+    body = json.dumps({'campaigns': rows, 'count': len(rows)}).encode()
+    npz = encode_export(rows, 'campaigns', {'count': len(rows)}, compress=False)
+    npz_deflated = encode_export(rows, 'campaigns', {'count': len(rows)}, compress=True)
+
+    print("=" * 60)
+    print(f"Campaign export: {args.campaigns} rows")
+    print("=" * 60)
+    cases = [
+        ('json + DataFrame', json_full, body),
+        ('streaming columnar', json_streaming, body),
+        ('compact npz', compact, npz),
+        ('compact npz deflated', compact, npz_deflated),
+    ]
+    for name, fn, payload in cases:
+        df, elapsed, peak = measure(fn, payload)
+        print(f"   • {name:<22} {len(payload) / 1e6:7.2f} MB   {elapsed * 1000:9.1f} ms   "
+              f"peak {peak / 1e6:8.1f} MB   rows {len(df)}")
+
+
+if __name__ == "__main__":
+    main()
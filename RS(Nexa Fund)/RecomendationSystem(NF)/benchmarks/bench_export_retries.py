@@ -0,0 +1,110 @@
+# bench_export_retries.py - Export loads under rate limiting and concurrency: restart-all retries vs per-endpoint retries + coalescing
+
+import sys
+import os
+import argparse
+import contextlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export_loader import ExportHTTPError, ExportLoader
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import make_catalog
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        endpoint = self.path.split('?')[0].rsplit('/', 1)[-1]
+        with self.server.lock:
+            script = self.server.script.get(endpoint) or []
+            status, headers = script.pop(0) if script else (200, {})
+        body = self.server.bodies[endpoint] if status == 200 else b'{"ok":false}'
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.sent += len(body)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def legacy_load(url):
+    """The previous loop: any 429 sleeps 2/4/8 s and restarts all three fetches"""
+    loader, delay = ExportLoader(url, retries=0), 2
+    for _ in range(3):
+        try:
+            return [loader.fetch(name) for name in ('donors', 'campaigns', 'interactions')]
+        except ExportHTTPError:
+            time.sleep(delay)
+            delay *= 2
+
+
+def measure(server, fn):
+    server.requests = server.sent = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    return time.perf_counter() - start, server.requests, server.sent / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export loads with a rate-limited endpoint and concurrent callers")
+    parser.add_argument('--donors', type=int, default=5000)
+    parser.add_argument('--campaigns', type=int, default=10000)
+    parser.add_argument('--interactions', type=int, default=20000)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--callers', type=int, default=4)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.bodies = {name: json.dumps({name: json.loads(frame.to_json(orient='records'))}).encode()
+                     for name, frame in zip(('donors', 'campaigns', 'interactions'),
+                                            make_catalog(args.donors, args.campaigns, args.interactions))}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api"
+
+    print("=" * 72)
+    print(f"Export loads: {args.donors:,} donors, {args.campaigns:,} campaigns, {args.interactions:,} interactions")
+    print("=" * 72)
+    print(f"   interactions answers 429 (Retry-After: {args.retry_after}) once:")
+    rate_limited = lambda: {'interactions': [(429, {'Retry-After': str(args.retry_after)})]}
+    for label, fn in (('restart all three (old)', lambda: legacy_load(url)),
+                      ('per-endpoint retry', lambda: DatabaseMLRecommender(backend_url=url)._fetch_exports())):
+        server.script = rate_limited()
+        seconds, requests_made, mb = measure(server, fn)
+        print(f"      {label:26s} {seconds:6.2f} s   {requests_made} requests   {mb:6.1f} MB")
+
+    print(f"\n   {args.callers} loads starting together (startup, /refresh, ...):")
+    server.script = {}
+    for label, coalesce in (('independent', False), ('coalesced', True)):
+        def run_all():
+            barrier = threading.Barrier(args.callers)
+
+            def load():
+                recommender = DatabaseMLRecommender(backend_url=url)
+                barrier.wait()
+                recommender._fetch_exports() if coalesce else recommender._load_exports(None)
+            threads = [threading.Thread(target=load) for _ in range(args.callers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        seconds, requests_made, mb = measure(server, run_all)
+        print(f"      {label:26s} {seconds:6.2f} s   {requests_made} requests   {mb:6.1f} MB")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_listing.py - /campaigns listing cost: per-call iterrows walk vs pre-encoded cached pages
+
+import sys
+import os
+import argparse
+import json
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import listing_cache
+from listing_cache import ListingCache
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+
+
+def legacy_campaigns(df):
+    """The previous endpoint body: iterrows + safe() per field, then JSON encoding of everything"""
+    def safe(val, default):
+        if isinstance(val, (list, dict)):
+            return val  # the old helper raised on list values (pd.isna of a list is an array)
+        if pd.isna(val) or (isinstance(val, float) and np.isnan(val)):
+            return default
+        return val
+    campaigns = []
+    for _, row in df.iterrows():
+        campaigns.append({name: safe(row.get(name, default), default)
+                          for name, default in listing_cache.LISTING_FIELDS['campaigns'].items()})
+    return json.dumps({"campaigns": campaigns, "count": len(campaigns), "data_source": "PostgreSQL Database"},
+                      default=lambda v: v.item()).encode()
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call DataFrame walk vs cached, pre-encoded listing pages")
+    parser.add_argument('--campaigns', type=int, default=20_000)
+    parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=10, n_campaigns=args.campaigns)
+    recommender.campaign_df = recommender.campaign_df.drop(columns=['_count'])
+    cache = ListingCache()
+    fields = cache.parse_fields('campaigns', None)
+
+    print("=" * 72)
+    print(f"/campaigns listing: {args.campaigns:,} campaigns (encoder: {'orjson' if listing_cache.orjson else 'json'})")
+    print("=" * 72)
+    body, legacy = timed(lambda: legacy_campaigns(recommender.campaign_df))
+    print(f"   iterrows walk per call        {legacy * 1000:9.1f} ms   ({len(body) / 1e6:.1f} MB)")
+    page, first = timed(lambda: cache.page(recommender, 'campaigns', fields, 0, None))
+    print(f"   first call (encode catalog)   {first * 1000:9.1f} ms   ({len(page.body) / 1e6:.1f} MB)")
+    _, hit = timed(lambda: cache.cached(recommender, 'campaigns', fields, 0, None), repeat=1000)
+    print(f"   repeated call (cached bytes)  {hit * 1e6:9.1f} µs")
+    cursor, pages = 0, 0
+    start = time.perf_counter()
+    while cursor is not None:
+        result = json.loads(cache.page(recommender, 'campaigns', fields, cursor, args.limit).body)
+        cursor = None if result['next_cursor'] is None else int(result['next_cursor'])
+        pages += 1
+    print(f"   {pages} pages of {args.limit} (first pass)   {(time.perf_counter() - start) / pages * 1000:9.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# bench_model_build.py - Per-stage timings of the model build on a synthetic catalog
+
+import sys
+import os
+import argparse
+import contextlib
+import io
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from build_pipeline import BuildPipeline
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+
+
+def run(n_donors, n_campaigns, n_interactions, workers):
+    recommender = load_into(DatabaseMLRecommender(build_workers=workers),
+                            n_donors, n_campaigns, n_interactions)
+    pipeline = BuildPipeline(max_workers=workers)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings(pipeline)
+        with pipeline.stage('interaction_matrix'):
+            recommender.create_interaction_matrix()
+        with pipeline.stage('fit_nmf'):
+            recommender.fit_nmf()
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model build stage timings")
+    parser.add_argument('--donors', type=int, default=5000)
+    parser.add_argument('--campaigns', type=int, default=2000)
+    parser.add_argument('--interactions', type=int, default=0,
+                        help='0 = content-based synthetic interactions')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Model build: {args.donors} donors × {args.campaigns} campaigns, "
+          f"{args.interactions} interactions")
+    print("=" * 60)
+    for workers in args.workers:
+        print(f"\n🔧 workers={workers}")
+        run(args.donors, args.campaigns, args.interactions, workers).report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# bench_request_coalescing.py - Bursts of identical /personalized and /trending requests: independent scoring vs single-flight
+
+import sys
+import os
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import fastapi_app_db
+from backend_guard import CircuitBreaker
+from export_loader import ConditionalExport
+from ml_recommender_db import DatabaseMLRecommender
+from recommendation_cache import ScoringFlights
+from synthetic_data import load_into
+
+
+class NoCoalescing:
+    """Every request computes its own list (the behaviour before scoring flights)"""
+
+    async def do(self, kind, key, compute):
+        return await compute()
+
+
+async def burst(make_request, size):
+    async def timed():
+        start = time.perf_counter()
+        await make_request()
+        return time.perf_counter() - start
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[timed() for _ in range(size)])
+    return time.perf_counter() - start, np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of a burst of identical recommendation requests")
+    parser.add_argument('--donors', type=int, default=2000)
+    parser.add_argument('--campaigns', type=int, default=5000)
+    parser.add_argument('--burst', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=args.donors, n_campaigns=args.campaigns)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    fastapi_app_db.recommender = recommender
+    fastapi_app_db.weighted_recommender = fastapi_app_db.WeightedRecommender(recommender)
+    # Score the model's campaigns: isolates scoring from backend fetch time
+    breaker = CircuitBreaker('bench-coalescing', failure_threshold=1, reset_timeout=3600)
+    breaker.record_failure()
+    fastapi_app_db.fresh_campaigns_export = ConditionalExport('campaigns', breaker=breaker)
+
+    user_id = str(recommender.donor_df.iloc[0]['id'])
+    endpoints = (
+        ('/trending', lambda: fastapi_app_db.get_trending_campaigns(top_n=20)),
+        ('/personalized', lambda: fastapi_app_db.get_personalized_recommendations(
+            fastapi_app_db.PersonalizedRequest(user_id=user_id, top_n=20))),
+    )
+
+    print("=" * 72)
+    print(f"Bursts of {args.burst} identical requests, {args.campaigns:,} campaigns, empty result cache")
+    print("=" * 72)
+    for name, make_request in endpoints:
+        print(f"   {name}")
+        for label, flights in (('independent', NoCoalescing()), ('single-flight', ScoringFlights())):
+            fastapi_app_db.scoring_flights = flights
+            walls, latencies = [], []
+            for _ in range(args.rounds):
+                fastapi_app_db.results_cache.clear()
+                wall, ms = asyncio.run(burst(make_request, args.burst))
+                walls.append(wall)
+                latencies.append(ms)
+            ms = np.concatenate(latencies)
+            print(f"      {label:14s} burst {np.median(walls) * 1000:8.1f} ms   p50 {np.percentile(ms, 50):8.1f} ms"
+                  f"   p99 {np.percentile(ms, 99):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench_warmup.py - Time to the first useful /trending answer after a deploy: blocking startup vs trending-only warm-up
+
+import sys
+import os
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import fastapi_app_db
+from synthetic_data import make_catalog
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.server.bodies[self.path.split('?')[0].rsplit('/', 1)[-1]]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first /trending answer and to a full model after startup")
+    parser.add_argument('--donors', type=int, default=5000)
+    parser.add_argument('--campaigns', type=int, default=10000)
+    parser.add_argument('--interactions', type=int, default=50000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ExportHandler)
+    server.daemon_threads = True
+    server.bodies = {name: json.dumps({name: json.loads(frame.to_json(orient='records'))}).encode()
+                     for name, frame in zip(('donors', 'campaigns', 'interactions'),
+                                            make_catalog(args.donors, args.campaigns, args.interactions))}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['BACKEND_API_URL'] = f"http://127.0.0.1:{server.server_address[1]}/api"
+    client = TestClient(fastapi_app_db.app)
+
+    # The warm-up runs on its own loop, as the startup task does beside the server's request handling
+    start = time.perf_counter()
+    warm_up = threading.Thread(target=lambda: asyncio.run(fastapi_app_db._warm_up()))
+    with contextlib.redirect_stdout(io.StringIO()):
+        warm_up.start()
+        while client.post('/trending', params={'top_n': 20}).status_code != 200:
+            time.sleep(0.005)
+        first_trending = time.perf_counter() - start
+        warm_up.join()
+    ready = time.perf_counter() - start
+
+    print("=" * 72)
+    print(f"Startup against {args.donors:,} donors, {args.campaigns:,} campaigns, {args.interactions:,} interactions")
+    print("=" * 72)
+    print(f"   blocking startup (old)     first /trending {ready:6.2f} s   (the full build)")
+    print(f"   trending-only warm-up      first /trending {first_trending:6.2f} s   full model at {ready:6.2f} s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# build_pipeline.py - Staged, multi-core model build helpers
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Below this many donor x campaign cells the process pool costs more than it saves
+PARALLEL_MIN_CELLS = 2_000_000
+
+
+def default_workers() -> int:
+    """Number of build workers (ML_BUILD_WORKERS env var, defaults to CPU count)"""
+    try:
+        return max(1, int(os.getenv('ML_BUILD_WORKERS', '0')) or (os.cpu_count() or 1))
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+class BuildPipeline:
+    """
+    Records per-stage wall-clock timings for a model build and runs
+    independent stages concurrently.
+
+    Usage:
+        pipeline = BuildPipeline()
+        with pipeline.stage("fetch"):
+            ...
+        results = pipeline.run_concurrent({"donors": fn_a, "campaigns": fn_b})
+        pipeline.report()
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or default_workers()
+        self.timings: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def run_concurrent(self, stages: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """Run independent stages on a thread pool; each stage is timed separately"""
+        def timed(name, fn):
+            with self.stage(name):
+                return fn()
+
+        if len(stages) <= 1 or self.max_workers <= 1:
+            return {name: timed(name, fn) for name, fn in stages.items()}
+
+        with ThreadPoolExecutor(max_workers=min(len(stages), self.max_workers)) as pool:
+            futures = {name: pool.submit(timed, name, fn) for name, fn in stages.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def total(self) -> float:
+        return time.perf_counter() - self._started
+
+    def report(self):
+        """Print the per-stage timing report"""
+        print("⏱️  Model build timings:")
+        for name, seconds in self.timings.items():
+            print(f"   • {name:<24} {seconds * 1000:9.1f} ms")
+        print(f"   • {'total (wall clock)':<24} {self.total() * 1000:9.1f} ms")
+
+    def as_dict(self) -> Dict[str, float]:
+        """Timings in milliseconds, suitable for JSON responses"""
+        timings = {name: round(seconds * 1000, 2) for name, seconds in self.timings.items()}
+        timings['total'] = round(self.total() * 1000, 2)
+        return timings
+
+
+# ---------------------------------------------------------------------------
+# Shared-memory arrays for process-pool workers
+# ---------------------------------------------------------------------------
+
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+
+def _publish(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, ArraySpec]:
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(spec: ArraySpec) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    name, shape, dtype = spec
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+# ---------------------------------------------------------------------------
+# Data-parallel top-k similarity
+# ---------------------------------------------------------------------------
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # float32 embeddings stay float32; integer inputs are promoted
+    dtype = np.result_type(matrix.dtype, np.float32)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix, dtype=dtype), where=norms != 0)
+
+
+def top_k_chunk(donors: np.ndarray, campaigns: np.ndarray, k: int,
+                donor_groups: Optional[np.ndarray] = None,
+                group_boosts: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k campaigns by cosine similarity (plus optional rule boost) for a block of donors.
+
+    Args:
+        donors: (n, d) donor embeddings for this chunk
+        campaigns: (m, d) campaign embeddings
+        k: Number of campaigns to keep per donor
+        donor_groups: (n,) rule group per donor, -1 for no group
+        group_boosts: (n_groups, m) additive boost per group and campaign
+
+    Returns:
+        (indices, scores), both of shape (n, min(k, m)); ties keep campaign order
+    """
+    scores = _unit_rows(donors) @ _unit_rows(campaigns).T
+    if donor_groups is not None and group_boosts is not None and len(group_boosts):
+        grouped = donor_groups >= 0
+        scores[grouped] += group_boosts[donor_groups[grouped]]
+
+    k = min(k, scores.shape[1])
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    return order, np.take_along_axis(scores, order, axis=1)
+
+
+def _top_k_worker(args):
+    donor_spec, campaign_spec, start, stop, k, donor_groups, group_boosts = args
+    donor_shm, donors = _attach(donor_spec)
+    campaign_shm, campaigns = _attach(campaign_spec)
+    try:
+        return start, top_k_chunk(donors[start:stop], campaigns, k, donor_groups, group_boosts)
+    finally:
+        del donors, campaigns
+        donor_shm.close()
+        campaign_shm.close()
+
+
+def parallel_top_k(donor_embeddings: np.ndarray, campaign_embeddings: np.ndarray, k: int,
+                   donor_groups: Optional[np.ndarray] = None,
+                   group_boosts: Optional[np.ndarray] = None,
+                   max_workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-donor top-k campaigns, chunked across a process pool for large catalogs.
+
+    The embedding matrices are placed in shared memory once so workers read
+    them without pickling; only the small per-chunk results travel back.
+    Small inputs are computed in-process.
+    """
+    # Quantized (int8) embeddings are dequantized once for the build
+    donor_embeddings, campaign_embeddings = np.asarray(donor_embeddings), np.asarray(campaign_embeddings)
+    n_donors, n_campaigns = len(donor_embeddings), len(campaign_embeddings)
+    max_workers = max_workers or default_workers()
+
+    if max_workers <= 1 or n_donors * n_campaigns < PARALLEL_MIN_CELLS or n_donors < 2:
+        return top_k_chunk(donor_embeddings, campaign_embeddings, k, donor_groups, group_boosts)
+
+    chunk = -(-n_donors // (max_workers * 4))
+    bounds: List[Tuple[int, int]] = [(s, min(s + chunk, n_donors)) for s in range(0, n_donors, chunk)]
+
+    donor_shm, donor_spec = _publish(donor_embeddings)
+    campaign_shm, campaign_spec = _publish(campaign_embeddings)
+    try:
+        k_eff = min(k, n_campaigns)
+        indices = np.empty((n_donors, k_eff), dtype=np.int64)
+        scores = np.empty((n_donors, k_eff), dtype=np.result_type(donor_embeddings.dtype, np.float32))
+        jobs = [
+            (donor_spec, campaign_spec, start, stop, k,
+             donor_groups[start:stop] if donor_groups is not None else None, group_boosts)
+            for start, stop in bounds
+        ]
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+            for start, (chunk_idx, chunk_scores) in pool.map(_top_k_worker, jobs):
+                indices[start:start + len(chunk_idx)] = chunk_idx
+                scores[start:start + len(chunk_scores)] = chunk_scores
+        return indices, scores
+    finally:
+        for shm in (donor_shm, campaign_shm):
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,274 @@
+# candidate_generation.py - Cheap multi-source candidate retrieval ahead of full weighted scoring
+
+import copy
+import os
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from catalog_store import CatalogRows
+
+TOKEN_PATTERN = re.compile(r'\b\w+\b')
+
+SOURCES = ('category', 'keyword', 'neighbors', 'collaborative', 'trending')
+
+
+def default_candidate_limit() -> int:
+    """Candidates scored per personalized request (ML_CANDIDATES env var, default 300, 0 = score everything)"""
+    try:
+        return max(0, int(os.getenv('ML_CANDIDATES', '300')))
+    except ValueError:
+        return 300
+
+
+def _tokens(text: str) -> set:
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def category_related(interest: str, category: str) -> bool:
+    """Any category the interest-match score can give credit to (substring either way or a shared word)"""
+    interest = interest.replace('-', ' ').replace('_', ' ')
+    category = category.replace('-', ' ').replace('_', ' ')
+    if not interest or not category:
+        return False
+    return interest in category or category in interest or bool(set(interest.split()) & set(category.split()))
+
+
+def _active_and_target(df: pd.DataFrame):
+    """ACTIVE flag and numeric targetAmount per row"""
+    empty = pd.Series([None] * len(df), index=df.index, dtype=object)
+    active = (df.get('status', empty) == 'ACTIVE').to_numpy(dtype=bool)
+    target_amount = pd.to_numeric(df.get('targetAmount', empty), errors='coerce').fillna(0).to_numpy(dtype=float)
+    return active, target_amount
+
+
+def _postings(rows: CatalogRows, positions: np.ndarray, offset: int = 0):
+    """Category, token and title+description token postings of rows[positions], as catalog rows + offset"""
+    by_category: Dict[str, List[int]] = {}
+    by_token: Dict[str, List[int]] = {}
+    by_summary_token: Dict[str, List[int]] = {}
+    for position in positions:
+        campaign, row = rows[position], int(position) + offset
+        by_category.setdefault(str(campaign.get('category', '')).lower().strip(), []).append(row)
+        summary = f"{campaign.get('title', '')} {campaign.get('description', '')}"
+        for token in _tokens(f"{summary} {campaign.get('story', '')}"):
+            by_token.setdefault(token, []).append(row)
+        for token in _tokens(summary):
+            by_summary_token.setdefault(token, []).append(row)
+    return tuple({k: np.asarray(v, dtype=np.int64) for k, v in postings.items()}
+                 for postings in (by_category, by_token, by_summary_token))
+
+
+class CandidateGenerator:
+    """
+    Inverted indexes over one catalog snapshot of a DatabaseMLRecommender.
+
+    Sources, each capped at per_source:
+      - category:      postings of categories related to the user's interests
+      - keyword:       postings of interest/keyword tokens in title, description and story
+      - neighbors:     co-contribution neighbors of campaigns the donor already backs
+      - collaborative: top campaigns by the donor's collaborative (NMF/ALS) prediction
+      - trending:      the trending leaderboard
+
+    Postings are cut by a per-request relevance prior computed from the same
+    postings with array adds (category, keyword and word-overlap hits, funding
+    fit, trending), so the cap keeps the campaigns full scoring would rank first.
+    """
+
+    def __init__(self, ml_recommender, trending_score: Callable[[Dict], float], per_source: int = 100):
+        self.ml_recommender = ml_recommender
+        self.trending_score = trending_score
+        self.per_source = per_source
+        df = ml_recommender.campaign_df
+        self.n_campaigns = len(df)
+        self.active, self.target_amount = _active_and_target(df)
+        (self.category_postings, self.token_postings,
+         # Title + description only, the text the content-similarity score compares against
+         self.summary_postings) = _postings(CatalogRows(df), np.flatnonzero(self.active))
+        self.trending = np.zeros(self.n_campaigns)
+        self._priors_lock = threading.Lock()
+        self.update_priors()
+
+    def extended(self) -> 'CandidateGenerator':
+        """
+        Copy that also indexes the campaigns folded in since this one was built. Only the
+        new rows are tokenized; postings of tokens they don't contain are shared.
+        """
+        df = self.ml_recommender.campaign_df
+        start = self.n_campaigns
+        active, target_amount = _active_and_target(df.iloc[start:])
+        grown = copy.copy(self)
+        grown.n_campaigns = len(df)
+        grown.active = np.concatenate([self.active, active])
+        grown.target_amount = np.concatenate([self.target_amount, target_amount])
+        added = _postings(CatalogRows(df.iloc[start:]), np.flatnonzero(active), offset=start)
+        for name, new_postings in zip(('category_postings', 'token_postings', 'summary_postings'), added):
+            merged = dict(getattr(self, name))
+            for key, rows in new_postings.items():
+                merged[key] = np.concatenate([merged[key], rows]) if key in merged else rows
+            setattr(grown, name, merged)
+        grown.trending = np.concatenate([self.trending, np.zeros(len(df) - start)])
+        grown._priors_lock = threading.Lock()
+        grown.update_priors(range(start, len(df)))
+        return grown
+
+    def update_priors(self, rows: Optional[Iterable[int]] = None):
+        """
+        Recompute the trending leaderboard (contribution counts and amounts change between builds).
+        With `rows` only those campaigns are re-scored, as after contribution events; the
+        arrays are replaced, not written in place, so concurrent generate() calls see either.
+        """
+        with self._priors_lock:
+            catalog = CatalogRows(self.ml_recommender.campaign_df)
+            if rows is None:
+                rows, trending = np.flatnonzero(self.active), np.zeros(self.n_campaigns)
+            else:
+                rows = [r for r in rows if 0 <= r < self.n_campaigns and self.active[r]]
+                trending = self.trending.copy()
+            for row in rows:
+                trending[row] = self.trending_score(catalog[row])
+            order = np.argsort(-np.where(self.active, trending, -1.0), kind='stable')
+            self.trending = trending
+            self.leaderboard = order[self.active[order]]
+
+    def _hits(self, postings: Dict[str, np.ndarray], tokens) -> np.ndarray:
+        """Number of `tokens` each campaign contains"""
+        hits = np.zeros(self.n_campaigns)
+        for token in tokens:
+            rows = postings.get(token)
+            if rows is not None:
+                hits[rows] += 1
+        return hits
+
+    def _capped(self, rows: np.ndarray, prior: np.ndarray) -> np.ndarray:
+        """Distinct rows, highest prior first, at most per_source"""
+        rows = np.unique(rows)
+        if len(rows) > self.per_source:
+            rows = rows[np.argpartition(-prior[rows], self.per_source - 1)[:self.per_source]]
+        return rows[np.argsort(-prior[rows], kind='stable')]
+
+    def generate(self, user_id: str, user_preferences: Optional[Dict]) -> Dict[str, np.ndarray]:
+        """Candidate campaign rows per source"""
+        preferences = user_preferences or {}
+        interests = [i.lower().strip() for i in preferences.get('interests') or []]
+        keywords = [k.lower() for k in preferences.get('interestKeywords') or []]
+        empty = np.empty(0, dtype=np.int64)
+        sources = {name: empty for name in SOURCES}
+        prior = self.trending.copy()
+
+        if interests:
+            category_match = np.zeros(self.n_campaigns)
+            related = []
+            for category, rows in self.category_postings.items():
+                if category in interests:
+                    category_match[rows] = 1.0
+                elif any(category_related(interest, category) for interest in interests):
+                    category_match[rows] = 0.8
+                else:
+                    continue
+                related.append(rows)
+            keyword_tokens = [_tokens(k) for k in keywords]
+            keyword_match = self._hits(self.token_postings, [next(iter(t)) for t in keyword_tokens if len(t) == 1])
+            query_words = set().union(*(_tokens(text) for text in interests + keywords))
+            content_match = self._hits(self.summary_postings, query_words) / max(1, len(query_words))
+            target = self.target_amount
+            funding = {'small': target <= 5000, 'medium': (target > 5000) & (target <= 20000),
+                       'large': target > 20000}.get(preferences.get('fundingPreference', 'medium'), True)
+            # Largest terms of the weighted score with preferences: interest 60%, content 30%, trending 5%
+            prior = (0.6 * (0.5 * category_match + 0.3 * keyword_match / max(1, len(keywords)) + 0.066 * funding)
+                     + 0.3 * content_match + 0.05 * self.trending)
+            if related:
+                sources['category'] = self._capped(np.concatenate(related), prior)
+
+        query_tokens = set()
+        for text in interests + keywords:
+            query_tokens |= _tokens(text)
+        postings = [self.token_postings[t] for t in query_tokens if t in self.token_postings]
+        if postings:
+            sources['keyword'] = self._capped(np.concatenate(postings), prior)
+
+        recommender = self.ml_recommender
+        donor_idx = recommender.donor_index.get(user_id)
+        if donor_idx is not None and recommender.user_item_matrix is not None:
+            backed = np.flatnonzero(np.asarray(recommender.user_item_matrix[donor_idx]) > 0)
+            neighbor_idx = recommender.item_neighbor_idx
+            if neighbor_idx is not None:
+                backed = backed[backed < len(neighbor_idx)]
+                neighbors = np.asarray(neighbor_idx[backed]).ravel()
+                sources['neighbors'] = self._capped(neighbors[(neighbors >= 0) & (neighbors < self.n_campaigns)], prior)
+
+            if recommender.nmf_model is not None:
+                predictions = (recommender.user_factors_for(donor_idx) @ recommender.nmf_model.components_).ravel()
+                predictions = np.where(self.active, predictions[:self.n_campaigns], 0.0)
+                k = min(self.per_source, len(predictions))
+                top = np.argpartition(-predictions, k - 1)[:k] if k else empty
+                sources['collaborative'] = top[predictions[top] > 0]
+
+        sources['trending'] = self.leaderboard[:self.per_source]
+        return sources
+
+
+class CandidateStage:
+    """
+    Owns the CandidateGenerator of a WeightedRecommender. It is built before the
+    model is swapped in (WeightedRecommender.prime) and extended with folded-in
+    campaigns by the fold-in itself, so requests only look it up. Contribution
+    events re-score only the campaigns they name (campaigns_changed); the full
+    trending recompute runs off the request path (refresh_priors, from the
+    periodic refit loop).
+    """
+
+    def __init__(self, ml_recommender, trending_score: Callable[[Dict], float], limit: Optional[int] = None):
+        self.ml_recommender = ml_recommender
+        self.trending_score = trending_score
+        self.limit = default_candidate_limit() if limit is None else limit
+        self._generator = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def generator(self) -> CandidateGenerator:
+        r = self.ml_recommender
+        catalog = (id(r.campaign_df), len(r.campaign_df))
+        with self._lock:
+            if self._generator is not None and self._key != catalog and catalog[1] > self._generator.n_campaigns:
+                # Campaigns were folded in: index just those
+                self._generator = self._generator.extended()
+            elif self._generator is None or self._key != catalog:
+                self._generator = CandidateGenerator(r, self.trending_score, per_source=max(1, self.limit // 3))
+            self._key = catalog
+            return self._generator
+
+    def campaigns_changed(self, campaign_ids: Iterable[str]):
+        """Re-score the trending prior of campaigns whose counters changed"""
+        index = self.ml_recommender.campaign_index
+        rows = [index[c] for c in campaign_ids if c in index]
+        generator = self._generator
+        if generator is not None and rows:
+            generator.update_priors(rows)
+
+    def refresh_priors(self):
+        """Re-score every campaign (urgency drifts with the clock)"""
+        generator = self._generator
+        if generator is not None:
+            generator.update_priors()
+
+    def select(self, user_id: str, user_preferences: Optional[Dict], campaigns: List[Dict]) -> List[Dict]:
+        """
+        Restrict `campaigns` to the deduplicated candidates. Campaigns the model has
+        not indexed yet are always kept; small lists are returned unchanged.
+        """
+        if not self.limit or len(campaigns) <= self.limit:
+            return campaigns
+        generator = self.generator()
+        ids = self.ml_recommender.campaign_df['id'].to_numpy()
+        rows = np.concatenate(list(generator.generate(user_id, user_preferences).values()))
+        wanted = set(ids[np.unique(rows)])
+        if isinstance(campaigns, CatalogRows) and campaigns.positions is None \
+                and campaigns.frame is self.ml_recommender.campaign_df:
+            # Row views of the model's own catalog: select positions without touching every row
+            return campaigns.subset(np.flatnonzero(pd.Index(ids).isin(wanted)))
+        index = self.ml_recommender.campaign_index
+        return [c for c in campaigns if c.get('id') in wanted or c.get('id') not in index]
@@ -0,0 +1,446 @@
+# catalog_store.py - Compact in-memory donor/campaign catalog: categorical codes, packed text and row views
+
+import os
+from collections.abc import Mapping, Sequence
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray, ExtensionDtype, register_extension_dtype, take
+
+# Low-cardinality text stored as pandas categoricals (int8 codes + one copy of each value)
+CATEGORICAL_COLUMNS = ('category', 'status', 'role')
+
+# Free text, URLs and timestamps stored as PackedText (one UTF-8 buffer + offsets, repeats interned)
+PACKED_TEXT_COLUMNS = ('title', 'description', 'story', 'imageUrl', 'name', 'bio', 'email', 'walletAddress',
+                       'startDate', 'endDate', 'createdAt', 'updatedAt')
+
+# Nested count objects flattened to int32 "<col>.<field>" columns (the export codec's naming)
+NESTED_COLUMNS = ('_count',)
+CONTRIBUTIONS_COLUMN = '_count.contributions'
+
+
+def default_slim_catalog() -> bool:
+    """Compact the exported frames after loading (ML_SLIM_CATALOG env var, '0' keeps them as exported)"""
+    return os.getenv('ML_SLIM_CATALOG', '1').lower() not in ('0', 'false', 'no')
+
+
+def _is_na(value) -> bool:
+    return value is None or value is pd.NA or (isinstance(value, float) and value != value)
+
+
+# ---------------------------------------------------------------------------
+# Packed text column
+# ---------------------------------------------------------------------------
+
+@register_extension_dtype
+class PackedTextDtype(ExtensionDtype):
+    """pandas dtype of PackedText columns; values read back as str, missing as NaN"""
+
+    name = 'packed_text'
+    type = str
+    kind = 'O'
+    na_value = np.nan
+
+    @classmethod
+    def construct_array_type(cls):
+        return PackedText
+
+    def _get_common_dtype(self, dtypes):
+        # Appended export rows (str / object columns) are packed instead of widening to object
+        if all(isinstance(d, (PackedTextDtype, pd.StringDtype)) or d == object for d in dtypes):
+            return self
+        return None
+
+
+class PackedText(ExtensionArray):
+    """
+    Read-mostly text column: every distinct value is stored once as UTF-8 in a
+    shared buffer and rows hold (start, end) offsets into it, so a row costs 16
+    bytes plus its text instead of a Python str object and a pointer. Values
+    are decoded on access; slices and takes share the buffer.
+    """
+
+    _dtype = PackedTextDtype()
+
+    def __init__(self, data: bytes, starts: np.ndarray, ends: np.ndarray):
+        self._data = data  # bytes, or a uint8 array memory-mapped from a model bundle
+        self._starts = starts  # int64, -1 for missing values
+        self._ends = ends
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        if isinstance(scalars, cls):
+            return scalars.copy() if copy else scalars
+        if isinstance(scalars, (np.ndarray, pd.Series, pd.Index, ExtensionArray)):
+            values = np.asarray(scalars, dtype=object)
+        else:
+            values = np.empty(len(scalars), dtype=object)
+            values[:] = list(scalars)
+        # Distinct values are hashed once and encoded once; rows point at their value
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        encoded = [str(u).encode('utf-8') for u in uniques]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        unique_ends = np.cumsum(lengths)
+        unique_starts = unique_ends - lengths
+        missing = codes < 0
+        starts = np.where(missing, -1, unique_starts[codes] if len(encoded) else -1)
+        ends = np.where(missing, -1, unique_ends[codes] if len(encoded) else -1)
+        return cls(b''.join(encoded), starts.astype(np.int64), ends.astype(np.int64))
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return cls._from_sequence(values)
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._data) + self._starts.nbytes + self._ends.nbytes
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _value(self, i: int):
+        start = self._starts[i]
+        if start < 0:
+            return np.nan
+        return bytes(self._data[start:self._ends[i]]).decode('utf-8')
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return self._value(item)
+        if not isinstance(item, slice):
+            item = pd.api.indexers.check_array_indexer(self, item)
+        return type(self)(self._data, self._starts[item], self._ends[item])
+
+    def __iter__(self):
+        data = self._data
+        for start, end in zip(self._starts.tolist(), self._ends.tolist()):
+            yield np.nan if start < 0 else bytes(data[start:end]).decode('utf-8')
+
+    def __setitem__(self, key, value):
+        # Rare (text edits in place): re-pack the column
+        values = np.asarray(self, dtype=object)
+        values[key] = value
+        packed = self._from_sequence(values)
+        self._data, self._starts, self._ends = packed._data, packed._starts, packed._ends
+
+    def __array__(self, dtype=None, copy=None):
+        values = np.empty(len(self), dtype=object)
+        values[:] = list(self)
+        return values if dtype is None or dtype == object else values.astype(dtype)
+
+    def __eq__(self, other):
+        if isinstance(other, (pd.Series, pd.Index, pd.DataFrame)):
+            return NotImplemented
+        values = np.asarray(self, dtype=object)
+        if isinstance(other, str):
+            return values == other
+        return values == np.asarray(other, dtype=object)
+
+    def isna(self) -> np.ndarray:
+        return self._starts < 0
+
+    def take(self, indices, allow_fill=False, fill_value=None):
+        if allow_fill and not _is_na(fill_value):
+            values = take(np.asarray(self, dtype=object), indices, allow_fill=True, fill_value=fill_value)
+            return self._from_sequence(values)
+        starts = take(self._starts, indices, allow_fill=allow_fill, fill_value=-1)
+        ends = take(self._ends, indices, allow_fill=allow_fill, fill_value=-1)
+        return type(self)(self._data, starts, ends)
+
+    def copy(self):
+        return type(self)(self._data, self._starts.copy(), self._ends.copy())
+
+    def fillna(self, value, limit=None, copy=True):
+        missing = self.isna()
+        if not missing.any() or _is_na(value):
+            return self.copy() if copy else self
+        if limit is not None:
+            missing &= np.cumsum(missing) <= limit
+        raw = str(value).encode('utf-8')
+        filled = self.copy()
+        filled._data = bytes(self._data) + raw
+        filled._starts[missing] = len(self._data)
+        filled._ends[missing] = len(self._data) + len(raw)
+        return filled
+
+    def astype(self, dtype, copy=True):
+        if isinstance(pd.api.types.pandas_dtype(dtype), PackedTextDtype):
+            return self.copy() if copy else self
+        return super().astype(dtype, copy=copy)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        to_concat = list(to_concat)
+        shifts = np.cumsum([0] + [len(a._data) for a in to_concat[:-1]])
+        starts = [np.where(a._starts < 0, -1, a._starts + shift) for a, shift in zip(to_concat, shifts)]
+        ends = [np.where(a._ends < 0, -1, a._ends + shift) for a, shift in zip(to_concat, shifts)]
+        return cls(b''.join(a._data for a in to_concat),
+                   np.concatenate(starts) if starts else np.empty(0, dtype=np.int64),
+                   np.concatenate(ends) if ends else np.empty(0, dtype=np.int64))
+
+    def _values_for_factorize(self):
+        return np.asarray(self, dtype=object), np.nan
+
+
+# ---------------------------------------------------------------------------
+# Frame compaction
+# ---------------------------------------------------------------------------
+
+def _flatten_nested(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """Replace a column of {field: count} objects by int32 "<name>.<field>" columns"""
+    values = df[name].tolist()
+    fields = pd.DataFrame([v if isinstance(v, dict) else {} for v in values], index=df.index)
+    flat = {f'{name}.{field}': pd.to_numeric(fields[field], errors='coerce').fillna(0).astype(np.int32)
+            for field in fields.columns}
+    position = df.columns.get_loc(name)
+    df = df.drop(columns=[name])
+    for offset, (column, series) in enumerate(flat.items()):
+        df.insert(position + offset, column, series)
+    return df
+
+
+def slim_frame(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """
+    Compact copy of an exported donor/campaign frame (see the *_COLUMNS constants).
+    Integer columns are downcast; amounts stay float64 so cents survive large totals.
+    Compacting an already compact frame is a no-op.
+    """
+    if df is None:
+        return None
+    df = df.copy(deep=False)
+    for name in NESTED_COLUMNS:
+        if name in df.columns and df[name].dtype == object:
+            df = _flatten_nested(df, name)
+    for name in df.columns:
+        column = df[name]
+        if name in CATEGORICAL_COLUMNS and not isinstance(column.dtype, pd.CategoricalDtype):
+            df[name] = column.astype('category')
+        elif name in PACKED_TEXT_COLUMNS and not isinstance(column.dtype, PackedTextDtype):
+            if pd.api.types.infer_dtype(column, skipna=True) in ('string', 'empty'):
+                df[name] = pd.Series(PackedText._from_sequence(column), index=df.index)
+        elif (pd.api.types.is_integer_dtype(column.dtype) and not pd.api.types.is_bool_dtype(column.dtype)
+              and str(name).partition('.')[0] not in NESTED_COLUMNS):
+            # Counts stay int32: contribution events increment them in place
+            df[name] = pd.to_numeric(column, downcast='integer')
+    return df
+
+
+def append_rows(frame: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    pd.concat of a compact frame and new export rows that stays compact: new rows are
+    packed on their own and categoricals share their categories, so the existing rows
+    are never re-encoded.
+    """
+    new_df = slim_frame(new_df)
+    frame = frame.copy(deep=False)
+    for name in frame.columns.intersection(new_df.columns):
+        old, new = frame[name], new_df[name]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            values = new.astype(object).where(new.notna(), None)
+            missing = [v for v in pd.unique(values.dropna()) if v not in old.cat.categories]
+            if missing:
+                frame[name] = old = old.cat.add_categories(missing)
+            new_df[name] = pd.Categorical(values, categories=old.cat.categories)
+    combined = pd.concat([frame, new_df], ignore_index=True)
+    for name in combined.columns:
+        old_dtype = frame[name].dtype if name in frame.columns else None
+        if name.split('.', 1)[0] in NESTED_COLUMNS and old_dtype is not None:
+            combined[name] = combined[name].fillna(0).astype(old_dtype)
+        elif name in CATEGORICAL_COLUMNS and not isinstance(combined[name].dtype, pd.CategoricalDtype):
+            combined[name] = combined[name].astype('category')
+    return combined
+
+
+def contribution_counts(df: pd.DataFrame) -> np.ndarray:
+    """Contribution count per row, from either the flattened or the exported `_count` layout"""
+    if CONTRIBUTIONS_COLUMN in df.columns:
+        return df[CONTRIBUTIONS_COLUMN].fillna(0).to_numpy(dtype=np.int64)
+    if '_count' in df.columns:
+        return np.array([c.get('contributions', 0) or 0 if isinstance(c, dict) else 0 for c in df['_count']],
+                        dtype=np.int64)
+    return np.zeros(len(df), dtype=np.int64)
+
+
+def memory_bytes(df: Optional[pd.DataFrame]) -> int:
+    """Deep memory use of a frame (packed text counts its shared buffer once)"""
+    return 0 if df is None else int(df.memory_usage(deep=True).sum())
+
+
+# ---------------------------------------------------------------------------
+# Column arrays (model bundle storage)
+# ---------------------------------------------------------------------------
+
+def _fixed_width(values: np.ndarray):
+    """Text values (a categorical's few categories) as a fixed-width str array, or None if any is not a str"""
+    if not all(isinstance(v, str) for v in values):
+        return None
+    return values.astype(str) if len(values) else np.zeros(0, dtype='<U1')
+
+
+def column_arrays(df: pd.DataFrame) -> Tuple[Optional[List[Tuple[str, str, str]]], Dict[str, np.ndarray], Dict]:
+    """
+    Split a frame into plain NumPy arrays for .npy storage: numbers and booleans as they
+    are, categoricals as codes + categories, and text as a UTF-8 buffer plus offsets
+    (other text columns are packed the way PackedText is). Columns of anything else (lists,
+    dicts, nullable extension types) come back as leftovers for the caller to pickle.
+
+    Returns: (layout, arrays, leftovers); layout holds (column, kind, dtype) in frame
+    order and arrays are keyed "<position>.<part>". layout is None (nothing split) for
+    frames without the positional RangeIndex the catalogs use.
+    """
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        return None, {}, {}
+    layout, arrays, leftovers = [], {}, {}
+    for position, name in enumerate(df.columns):
+        column, kind = df[name], 'pickled'
+        dtype = column.dtype
+        packed = None
+        if isinstance(dtype, PackedTextDtype):
+            packed = column.array
+        elif pd.api.types.is_string_dtype(dtype):
+            values = column.to_numpy(dtype=object)
+            if all(isinstance(v, str) or _is_na(v) for v in values):
+                packed = PackedText._from_sequence(values)
+        if packed is not None:
+            arrays[f'{position}.data'] = np.frombuffer(packed._data, dtype=np.uint8)
+            arrays[f'{position}.starts'], arrays[f'{position}.ends'] = packed._starts, packed._ends
+            kind = 'packed'
+        elif isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories.to_numpy()
+            if categories.dtype == object:
+                categories = _fixed_width(categories)
+            if categories is not None:
+                arrays[f'{position}.codes'] = column.cat.codes.to_numpy()
+                arrays[f'{position}.categories'] = categories
+                kind = 'ordered' if dtype.ordered else 'category'
+        elif isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+            arrays[f'{position}.values'] = column.to_numpy()
+            kind = 'values'
+        if kind == 'pickled':
+            leftovers[name] = column
+        layout.append((name, kind, str(dtype)))
+    return layout, arrays, leftovers
+
+
+def frame_from_arrays(layout: List[Tuple[str, str, str]], load: Callable[[str], np.ndarray],
+                      leftovers: Dict) -> pd.DataFrame:
+    """
+    Frame back from column_arrays output, `load(key)` returning each (memory-mapped) array.
+    Numbers, codes and text keep the mapped arrays: text columns come back as PackedText.
+    """
+    columns = {}
+    for position, (name, kind, dtype) in enumerate(layout):
+        if kind == 'packed':
+            columns[name] = PackedText(load(f'{position}.data'), load(f'{position}.starts'), load(f'{position}.ends'))
+        elif kind in ('category', 'ordered'):
+            categories = load(f'{position}.categories')
+            categories = categories.astype(object) if categories.dtype.kind == 'U' else categories
+            columns[name] = pd.Categorical.from_codes(load(f'{position}.codes'), categories=categories,
+                                                      ordered=kind == 'ordered')
+        elif kind == 'values':
+            columns[name] = load(f'{position}.values')
+        else:
+            columns[name] = leftovers[name]
+    return pd.DataFrame(columns, copy=False)
+
+
+# ---------------------------------------------------------------------------
+# Row views
+# ---------------------------------------------------------------------------
+
+def _reader(series: pd.Series):
+    """Row position -> Python value (what to_dict('records') would hold)"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        lookup = series.cat.categories.to_numpy(dtype=object)
+        return lambda i: lookup[codes[i]] if codes[i] >= 0 else np.nan
+    if isinstance(dtype, PackedTextDtype):
+        return series.array._value
+    values = series.to_numpy()
+    if values.dtype == object:
+        return values.__getitem__
+    return lambda i: values[i].item()
+
+
+class CatalogRows(Sequence):
+    """
+    Lazy dict-like rows over a catalog frame, in place of frame.to_dict('records').
+
+    Building it only collects column readers; a row's values are read (and text
+    decoded) when a scorer asks for them. Flattened nested columns read back as
+    dicts, so row['_count']['contributions'] works on either layout.
+    """
+
+    def __init__(self, frame: pd.DataFrame, positions: Optional[np.ndarray] = None):
+        self.frame = frame
+        self.positions = positions  # frame rows in view order, None for all rows
+        self._readers = {}
+        nested: Dict[str, Dict[str, object]] = {}
+        for name in frame.columns:
+            parent, _, field = str(name).partition('.')
+            if parent in NESTED_COLUMNS and field:
+                nested.setdefault(parent, {})[field] = _reader(frame[name])
+                self._readers.setdefault(parent, None)
+            else:
+                self._readers[name] = _reader(frame[name])
+        for parent, fields in nested.items():
+            self._readers[parent] = lambda i, fields=fields: {f: read(i) for f, read in fields.items()}
+
+    def __len__(self) -> int:
+        return len(self.frame) if self.positions is None else len(self.positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.subset(np.arange(len(self))[i])
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return RowView(self._readers, int(i if self.positions is None else self.positions[i]))
+
+    def subset(self, indices: Iterable[int]) -> 'CatalogRows':
+        """Rows at the given positions of this view (readers are shared)"""
+        indices = np.asarray(indices, dtype=np.int64)
+        rows = CatalogRows.__new__(CatalogRows)
+        rows.frame, rows._readers = self.frame, self._readers
+        rows.positions = indices if self.positions is None else self.positions[indices]
+        return rows
+
+
+class RowView(Mapping):
+    """One catalog row; .copy() materializes a plain dict (e.g. to add scores)"""
+
+    __slots__ = ('_readers', 'row')
+
+    def __init__(self, readers: Dict[str, object], row: int):
+        self._readers = readers
+        self.row = row
+
+    def __getitem__(self, key):
+        return self._readers[key](self.row)
+
+    def get(self, key, default=None):
+        read = self._readers.get(key)
+        return default if read is None else read(self.row)
+
+    def __contains__(self, key) -> bool:
+        return key in self._readers
+
+    def __iter__(self):
+        return iter(self._readers)
+
+    def __len__(self) -> int:
+        return len(self._readers)
+
+    def copy(self) -> Dict:
+        return {key: read(self.row) for key, read in self._readers.items()}
+
+    def __repr__(self) -> str:
+        return f"RowView({self.copy()!r})"
+
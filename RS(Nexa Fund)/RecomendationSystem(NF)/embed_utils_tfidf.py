@@ -1,11 +1,15 @@
 # embed_utils_tfidf.py
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import MinMaxScaler
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
 
-scaler = MinMaxScaler()
+# Below this many texts the process pool costs more than hashing in-process
+PARALLEL_MIN_TEXTS = 20_000
 
 def compute_tfidf_embeddings(df, text_fields, numeric_fields, fit_vectorizer=None):
     """
@@ -19,10 +23,11 @@ def compute_tfidf_embeddings(df, text_fields, numeric_fields, fit_vectorizer=Non
         np.ndarray: Normalized hybrid embeddings (TF-IDF + numeric)
         TfidfVectorizer: The fitted vectorizer (for reuse)
     """
-    # Combine text fields
-    text_input = df[text_fields].fillna("").agg(" ".join, axis=1).tolist()
+    # Combine text fields once; the same documents are used for fit and transform
+    text_input = join_text_fields(df, text_fields)
     
-    if fit_vectorizer is None:
+    vectorizer = fit_vectorizer
+    if vectorizer is None:
         # Use better TF-IDF parameters for semantic meaning
         vectorizer = TfidfVectorizer(
             max_features=2000,  # More features for better differentiation
@@ -32,28 +37,105 @@ def compute_tfidf_embeddings(df, text_fields, numeric_fields, fit_vectorizer=Non
             max_df=0.95,  # Remove very common terms
             sublinear_tf=True  # Use sublinear scaling for better balance
         )
-        tfidf_matrix = vectorizer.fit_transform(text_input)
-    else:
-        vectorizer = fit_vectorizer
-        tfidf_matrix = vectorizer.transform(text_input)
-    
-    tfidf_array = tfidf_matrix.toarray()
-    
-    # Scale numeric fields
-    if numeric_fields:
-        # Coerce errors to NaN, then fill with 0
-        numeric_data = df[numeric_fields].apply(pd.to_numeric, errors='coerce').fillna(0).astype(float)
-        numeric_scaled = scaler.fit_transform(numeric_data)
-    else:
-        numeric_scaled = np.zeros((len(df), 1))
+        vectorizer.fit(text_input)
     
-    # Concatenate TF-IDF and numeric features
-    combined = np.hstack((tfidf_array, numeric_scaled))
-    
-    # Normalize
-    norms = np.linalg.norm(combined, axis=1, keepdims=True)
-    norms = np.where(norms == 0, 1, norms)
-    return combined / norms, vectorizer
+    pipeline = EmbeddingPipeline.fit(df, text_fields, numeric_fields, vectorizer)
+    return pipeline.transform(df, text_input), vectorizer
+
+def join_text_fields(df, text_fields):
+    """
+    One text per row: the text fields joined with spaces (missing fields are empty).
+    Columns are concatenated as whole object arrays instead of joining row by row.
+    """
+    text_fields = list(text_fields)
+    if not text_fields:
+        return [""] * len(df)
+    columns = df.reindex(columns=text_fields).fillna("").astype(str)
+    joined = columns.iloc[:, 0].to_numpy(dtype=object)
+    for i in range(1, len(text_fields)):
+        joined = joined + " " + columns.iloc[:, i].to_numpy(dtype=object)
+    return joined.tolist()
+
+def numeric_matrix(df, numeric_fields):
+    """Numeric fields as floats, non-numeric and missing values as 0"""
+    return df.reindex(columns=numeric_fields).apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float)
+
+class EmbeddingPipeline:
+    """
+    Fitted transformers for one entity type (donors or campaigns): the text
+    vectorizer plus the numeric columns' min/max from the fit frame.
+
+    Immutable after fit - transform() only reads, so any number of threads or
+    processes can embed row batches concurrently, a single new row is scaled
+    against the fit-time range instead of against itself, and the object
+    pickles with the model bundle. Changes (a hashing vectorizer counting new
+    documents) produce a new pipeline via with_documents / with_vectorizer.
+    """
+
+    def __init__(self, text_fields, numeric_fields, vectorizer, numeric_min, numeric_max):
+        self._text_fields = tuple(text_fields)
+        self._numeric_fields = tuple(numeric_fields)
+        self._vectorizer = vectorizer
+        self._numeric_min = np.array(numeric_min, dtype=float)
+        self._numeric_span = np.array(numeric_max, dtype=float) - self._numeric_min
+        self._numeric_span[self._numeric_span == 0] = 1
+        for array in (self._numeric_min, self._numeric_span):
+            array.setflags(write=False)
+
+    @classmethod
+    def fit(cls, df, text_fields, numeric_fields, vectorizer):
+        """Pipeline over a fitted (possibly shared) text vectorizer and df's numeric ranges"""
+        numeric = numeric_matrix(df, numeric_fields)
+        low = numeric.min(axis=0) if len(numeric) else np.zeros(len(numeric_fields))
+        high = numeric.max(axis=0) if len(numeric) else np.zeros(len(numeric_fields))
+        return cls(text_fields, numeric_fields, vectorizer, low, high)
+
+    @property
+    def vectorizer(self):
+        return self._vectorizer
+
+    @property
+    def text_fields(self):
+        return list(self._text_fields)
+
+    @property
+    def numeric_fields(self):
+        return list(self._numeric_fields)
+
+    def transform(self, df, texts=None):
+        """
+        Normalized hybrid embeddings (text + scaled numeric) of any batch of rows;
+        `texts` is df's already assembled text (join_text_fields), if available
+        """
+        if texts is None:
+            texts = join_text_fields(df, self._text_fields)
+        tfidf_array = self._vectorizer.transform(texts).toarray()
+        if self._numeric_fields:
+            numeric_scaled = (numeric_matrix(df, self._numeric_fields) - self._numeric_min) / self._numeric_span
+        else:
+            numeric_scaled = np.zeros((len(df), 1))
+        combined = np.hstack((tfidf_array, numeric_scaled))
+        norms = np.linalg.norm(combined, axis=1, keepdims=True)
+        norms = np.where(norms == 0, 1, norms)
+        return combined / norms
+
+    def with_vectorizer(self, vectorizer):
+        """Same numeric ranges over another text vectorizer"""
+        if vectorizer is self._vectorizer:
+            return self
+        pipeline = EmbeddingPipeline.__new__(EmbeddingPipeline)
+        pipeline.__dict__.update(self.__dict__)
+        pipeline._vectorizer = vectorizer
+        return pipeline
+
+    def with_documents(self, df):
+        """
+        Pipeline whose document frequencies include df's text (hashing mode);
+        a fitted TF-IDF vocabulary is fixed, so the pipeline is returned as is
+        """
+        if isinstance(self._vectorizer, HashingTfidfVectorizer):
+            return self.with_vectorizer(self._vectorizer.with_documents(join_text_fields(df, self._text_fields)))
+        return self
 
 # Helper functions for new donor and campaign schemas
 
@@ -72,4 +154,85 @@ def campaign_text_fields():
 
 def campaign_numeric_fields():
     # Use 'targetAmount', 'currentAmount', 'escrowAmount', 'releasedAmount', 'riskScore' as numeric fields
-    return ["targetAmount", "currentAmount", "escrowAmount", "releasedAmount", "riskScore"]
\ No newline at end of file
+    return ["targetAmount", "currentAmount", "escrowAmount", "releasedAmount", "riskScore"]
+
+# Embedding modes
+
+def default_embedding_mode():
+    """Text embedding mode (ML_EMBEDDING_MODE env var: 'tfidf' (default) or 'hashing')"""
+    return 'hashing' if os.getenv('ML_EMBEDDING_MODE', 'tfidf').lower() == 'hashing' else 'tfidf'
+
+def default_hash_features():
+    """Hashed text dimensions (ML_HASH_FEATURES env var, default 1024)"""
+    try:
+        return max(2, int(os.getenv('ML_HASH_FEATURES', '1024')))
+    except ValueError:
+        return 1024
+
+def make_text_vectorizer(mode=None, max_workers=None):
+    """Unfitted shared text vectorizer for an embedding mode"""
+    if (mode or default_embedding_mode()) == 'hashing':
+        return HashingTfidfVectorizer(max_workers=max_workers)
+    return TfidfVectorizer(max_features=1000, stop_words='english')
+
+def _term_counts(args):
+    texts, n_features = args
+    hasher = HashingVectorizer(n_features=n_features, stop_words='english', alternate_sign=False, norm=None)
+    return hasher.transform(texts).tocsr()
+
+class HashingTfidfVectorizer:
+    """
+    TF-IDF over hashed terms instead of a fitted vocabulary.
+
+    Terms are hashed into a fixed number of columns, so embedding a text needs no
+    vocabulary and a new campaign never changes the columns of existing rows.
+    Document frequencies are counted incrementally (partial_fit), and large text
+    lists are hashed in chunks on a process pool. Weighting matches
+    TfidfVectorizer: raw counts × smooth idf, L2-normalized rows.
+    """
+
+    def __init__(self, n_features=None, max_workers=None):
+        self.n_features = n_features or default_hash_features()
+        self.max_workers = max_workers or 1
+        self.document_frequency = np.zeros(self.n_features, dtype=np.int64)
+        self.n_documents = 0
+
+    def term_counts(self, texts):
+        """(n_texts, n_features) sparse raw term counts"""
+        texts = list(texts)
+        if self.max_workers <= 1 or len(texts) < PARALLEL_MIN_TEXTS:
+            return _term_counts((texts, self.n_features))
+        chunk = -(-len(texts) // (self.max_workers * 4))
+        jobs = [(texts[start:start + chunk], self.n_features) for start in range(0, len(texts), chunk)]
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+            return sparse.vstack(list(pool.map(_term_counts, jobs)), format='csr')
+
+    def partial_fit(self, texts):
+        """Add texts to the document frequencies (while fitting; see with_documents afterwards)"""
+        counts = self.term_counts(texts)
+        self.document_frequency += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_documents += counts.shape[0]
+        return self
+
+    def fit(self, texts):
+        self.document_frequency = np.zeros(self.n_features, dtype=np.int64)
+        self.n_documents = 0
+        return self.partial_fit(texts)
+
+    def with_documents(self, texts):
+        """A copy whose document frequencies also count `texts`; this vectorizer is unchanged"""
+        vectorizer = HashingTfidfVectorizer(self.n_features, self.max_workers)
+        vectorizer.document_frequency = self.document_frequency.copy()
+        vectorizer.n_documents = self.n_documents
+        return vectorizer.partial_fit(texts)
+
+    @property
+    def idf_(self):
+        return np.log((1 + self.n_documents) / (1 + self.document_frequency)) + 1
+
+    def transform(self, texts):
+        """(n_texts, n_features) sparse TF-IDF rows with the current document frequencies"""
+        tfidf = self.term_counts(texts).multiply(self.idf_).tocsr()
+        norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1))).ravel()
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms) @ tfidf
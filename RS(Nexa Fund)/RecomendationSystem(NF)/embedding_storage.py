@@ -0,0 +1,116 @@
+# embedding_storage.py - Storage precision of embeddings and factor matrices (float64 / float32 / int8)
+
+import os
+from typing import Optional
+
+import numpy as np
+
+PRECISIONS = ('float64', 'float32', 'int8')
+
+# Rows dequantized per block in QuantizedRows products (bounds the float32 temporary)
+DEQUANTIZE_BLOCK_ROWS = 4096
+
+
+def default_embedding_precision() -> str:
+    """Embedding storage precision (ML_EMBEDDING_PRECISION env var: float32 (default), float64 or int8)"""
+    precision = os.getenv('ML_EMBEDDING_PRECISION', 'float32').lower()
+    return precision if precision in PRECISIONS else 'float32'
+
+
+def factor_dtype(precision: str):
+    """Factor matrices stay floating point: float64 only when asked for, float32 otherwise"""
+    return np.float64 if precision == 'float64' else np.float32
+
+
+class QuantizedRows:
+    """
+    A read-mostly 2-D float matrix stored as int8 codes with one float32 scale per row
+    (row ≈ codes[i] * scales[i]), 1/8 of the float64 size.
+
+    Row reads and `@` products dequantize on the fly, block by block, so callers
+    use it like the float array it replaces; np.asarray() gives the full
+    dequantized float32 matrix for code that needs one.
+    """
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray):
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def quantize(cls, matrix) -> 'QuantizedRows':
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        scales = (np.abs(matrix).max(axis=1) / 127).astype(np.float32) if matrix.shape[1] else \
+            np.zeros(len(matrix), dtype=np.float32)
+        safe = np.where(scales == 0, 1, scales)
+        codes = np.rint(matrix / safe[:, None]).clip(-127, 127).astype(np.int8)
+        return cls(codes, scales)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, key):
+        rows, cols = (key if isinstance(key, tuple) else (key, slice(None)))
+        scales = self.scales[rows]
+        codes = self.codes[rows]
+        if np.ndim(scales) == 0:
+            return codes[cols].astype(np.float32) * scales
+        return codes[:, cols].astype(np.float32) * scales[:, None]
+
+    def __setitem__(self, rows, values):
+        quantized = QuantizedRows.quantize(values)
+        if np.ndim(self.scales[rows]) == 0:  # a single row
+            self.codes[rows], self.scales[rows] = quantized.codes[0], quantized.scales[0]
+        else:
+            self.codes[rows], self.scales[rows] = quantized.codes, quantized.scales
+
+    def __matmul__(self, other):
+        other = np.asarray(other, dtype=np.float32)
+        out = np.empty((len(self),) + other.shape[1:], dtype=np.float32)
+        for start in range(0, len(self), DEQUANTIZE_BLOCK_ROWS):
+            stop = start + DEQUANTIZE_BLOCK_ROWS
+            block = self.codes[start:stop].astype(np.float32) @ other
+            scales = self.scales[start:stop]
+            out[start:stop] = block * (scales if block.ndim == 1 else scales[:, None])
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.codes.astype(np.float32) * self.scales[:, None]
+        return dense if dtype is None else dense.astype(dtype)
+
+    def row_norms(self) -> np.ndarray:
+        return np.linalg.norm(self.codes.astype(np.float32), axis=1) * self.scales
+
+
+def store_rows(matrix, precision: Optional[str] = None):
+    """An embedding matrix in the storage precision (QuantizedRows for 'int8')"""
+    precision = precision or default_embedding_precision()
+    if matrix is None:
+        return None
+    if precision == 'int8':
+        return matrix if isinstance(matrix, QuantizedRows) else QuantizedRows.quantize(matrix)
+    return np.asarray(matrix, dtype=factor_dtype(precision))
+
+
+def row_norms(matrix) -> np.ndarray:
+    """L2 norm of every row of an ndarray or QuantizedRows"""
+    if isinstance(matrix, QuantizedRows):
+        return matrix.row_norms()
+    return np.linalg.norm(matrix, axis=1)
@@ -0,0 +1,179 @@
+# executors.py - Worker pools that keep CPU-bound scoring off the FastAPI event loop
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import metrics
+
+QUEUE_DEPTH = metrics.REGISTRY.gauge(
+    'recommender_executor_queue_depth', 'Jobs waiting for a free pool worker', ('pool',))
+INFLIGHT = metrics.REGISTRY.gauge(
+    'recommender_executor_inflight', 'Jobs submitted to a pool and not yet finished', ('pool',))
+WAIT_SECONDS = metrics.REGISTRY.histogram(
+    'recommender_executor_wait_seconds', 'Time a job waited in the pool queue', ('pool',))
+RUN_SECONDS = metrics.REGISTRY.histogram(
+    'recommender_executor_run_seconds', 'Time a job spent running in the pool', ('pool',))
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def interactive_workers() -> int:
+    """Threads serving request-path scoring (ML_INTERACTIVE_WORKERS, default min(4, cpu count))"""
+    return max(1, _env_int('ML_INTERACTIVE_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+def batch_workers() -> int:
+    """Threads for refresh/retraining jobs (ML_BATCH_WORKERS, default 1)"""
+    return max(1, _env_int('ML_BATCH_WORKERS', 1))
+
+
+def scoring_processes() -> int:
+    """Processes for pure-Python personalized scoring (ML_SCORING_PROCESSES, default 0 = use threads)"""
+    return _env_int('ML_SCORING_PROCESSES', 0)
+
+
+def _timed_call(fn: Callable, args, kwargs):
+    """Runs inside the worker; reports the wall-clock start so the caller can derive queue wait"""
+    started = time.time()
+    return started, fn(*args, **kwargs)
+
+
+class WorkerPool:
+    """
+    A named thread or process pool with queue-depth and wait-time metrics.
+
+    Thread pools suit NumPy/sklearn work that releases the GIL; process pools
+    suit pure-Python loops. Jobs for a process pool must be picklable
+    top-level functions.
+    """
+
+    def __init__(self, name: str, max_workers: int, kind: str = 'thread'):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.inflight = 0
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix=f"ml-{self.name}")
+            return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) in the pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        if self.kind == 'process':
+            call = (_timed_call, fn, args, kwargs)
+        else:
+            # Carry the request context (sampled trace) into the worker thread
+            call = (contextvars.copy_context().run, _timed_call, fn, args, kwargs)
+
+        submitted = time.time()
+        self._track(+1)
+        started = None
+        try:
+            started, result = await loop.run_in_executor(self.executor(), *call)
+            return result
+        finally:
+            finished = time.time()
+            self._track(-1)
+            if started is not None:
+                WAIT_SECONDS.observe(max(0.0, started - submitted), pool=self.name)
+                RUN_SECONDS.observe(max(0.0, finished - started), pool=self.name)
+
+    def queue_depth(self) -> int:
+        return max(0, self.inflight - self.max_workers)
+
+    def _track(self, delta: int):
+        with self._lock:
+            self.inflight += delta
+            INFLIGHT.set(self.inflight, pool=self.name)
+            QUEUE_DEPTH.set(self.queue_depth(), pool=self.name)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Separate pools so a refresh can never occupy the threads serving requests
+INTERACTIVE = WorkerPool('interactive', interactive_workers())
+BATCH = WorkerPool('batch', batch_workers())
+SCORING = WorkerPool('scoring', scoring_processes(), kind='process') if scoring_processes() else None
+
+
+def shutdown_pools():
+    for pool in (INTERACTIVE, BATCH, SCORING):
+        if pool is not None:
+            pool.shutdown()
+
+
+# ---------------------------------------------------------------------------
+# Process-pool scoring against a published model bundle
+# ---------------------------------------------------------------------------
+
+_process_models: Dict[str, object] = {}
+
+
+def _weighted_for(bundle_dir: str, version: str):
+    """WeightedRecommender attached to a bundle version, cached per worker process"""
+    key = f"{bundle_dir}:{version}"
+    weighted = _process_models.get(key)
+    if weighted is None:
+        from ml_recommender_db import DatabaseMLRecommender
+        from model_bundle import attach_bundle
+        from weighted_recommender import WeightedRecommender
+
+        recommender = DatabaseMLRecommender(n_components=10)
+        attach_bundle(recommender, bundle_dir, version)
+        weighted = WeightedRecommender(recommender).prime()
+        _process_models.clear()  # keep only the version being served
+        _process_models[key] = weighted
+    return weighted
+
+
+def _prime_in_process(bundle_dir: str, version: str):
+    _weighted_for(bundle_dir, version)
+
+
+def prime_scoring_workers(bundle_dir: str, version: str):
+    """
+    Attach and index a new bundle version in the scoring processes ahead of their first
+    request: one job per process, fire-and-forget (a busy process primes on its next job)
+    """
+    if SCORING is None or not version:
+        return []
+    return [SCORING.executor().submit(_prime_in_process, bundle_dir, version) for _ in range(SCORING.max_workers)]
+
+
+def personalized_in_process(bundle_dir: str, version: str, user_id: str, user_preferences: Optional[Dict],
+                            campaigns, top_n: int, use_collaborative: bool = True, use_candidates: bool = True):
+    """
+    Process-pool job: personalized recommendations from the memory-mapped bundle.
+    Callers that ran candidate selection already pass only the kept rows with use_candidates=False.
+    
+    Returns: (recommendations, stage timings) - the timings are recorded in this process's
+    registry, which nothing scrapes, so the caller replays them with metrics.replay_stages
+    """
+    with metrics.collected_stages() as stages:
+        recommendations = _weighted_for(bundle_dir, version).get_personalized_recommendations(
+            user_id=user_id, user_preferences=user_preferences, campaigns=campaigns, top_n=top_n,
+            use_candidates=use_candidates, use_collaborative=use_collaborative)
+    return recommendations, stages
@@ -0,0 +1,200 @@
+# export_codec.py - Compact columnar wire format for the recommender export endpoints
+"""
+Format (media type application/x-nexa-npz): a NumPy .npz archive holding
+
+  __schema__          uint8 JSON: {"version", "array_key", "rows", "meta", "columns": [...]}
+  <col>               numeric values (float64 / int64 / bool) for kind "number" / "bool"
+  <col>.codes         int32 dictionary codes (-1 = null) for kind "category"
+  <col>.categories    UTF-8 buffer + <col>.category_offsets for the dictionary
+  <col>.data          UTF-8 bytes of all values for kind "text" / "json"
+  <col>.offsets       int64 end offset of each value in <col>.data
+  <col>.null          bool null mask (only when the column has nulls)
+
+Nested objects (campaign `_count`) are flattened to "<col>.<field>" number columns
+and rebuilt on decode; lists are stored as kind "json". Every array is a plain
+little-endian .npy member.
+
+Only the Python side exists: encode_export() and the CLI below convert a JSON
+export. The Node backend (backend/src/controllers/recommender.controller.ts)
+has no encoder and always answers JSON, so the loader's content negotiation
+stays inactive until one is implemented there against this schema.
+"""
+
+import io
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MEDIA_TYPE = 'application/x-nexa-npz'
+FORMAT_VERSION = 1
+
+# Text columns with at most this share of distinct values are dictionary-encoded
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _is_null(value) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _encode_strings(values: List[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [('' if v is None else v).encode('utf-8') for v in values]
+    offsets = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    starts = np.concatenate(([0], offsets[:-1])) if len(offsets) else offsets
+    return [raw[s:e].decode('utf-8') for s, e in zip(starts.tolist(), offsets.tolist())]
+
+
+def _column_kind(values: List[Any]) -> str:
+    present = [v for v in values if not _is_null(v)]
+    if not present:
+        return 'text'
+    if all(isinstance(v, bool) for v in present):
+        return 'bool'
+    if all(isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool) for v in present):
+        return 'number'
+    if all(isinstance(v, dict) for v in present):
+        return 'object'
+    if all(isinstance(v, str) for v in present):
+        distinct = len(set(present))
+        return 'category' if distinct <= max(1, CATEGORY_MAX_RATIO * len(values)) else 'text'
+    return 'json'
+
+
+def encode_export(records, array_key: str, meta: Optional[Dict[str, Any]] = None,
+                  compress: bool = True) -> bytes:
+    """
+    Encode export rows (list of dicts or DataFrame) into the compact format.
+
+    Args:
+        records: Rows as returned by the JSON export (list of dicts) or a DataFrame
+        array_key: Payload key ('donors', 'campaigns', 'interactions')
+        meta: Extra top-level fields (count, nextCursor, ...)
+        compress: Deflate the archive members (smaller payload, slower decode)
+    """
+    if isinstance(records, pd.DataFrame):
+        frame = records
+    else:
+        frame = pd.DataFrame(list(records))
+    n_rows = len(frame)
+    arrays: Dict[str, np.ndarray] = {}
+    columns = []
+
+    def add_column(name, values):
+        kind = _column_kind(values)
+        nulls = np.array([_is_null(v) for v in values], dtype=bool)
+        spec = {'name': name, 'kind': kind, 'nullable': bool(nulls.any())}
+
+        if kind == 'object':
+            fields = sorted({k for v in values if isinstance(v, dict) for k in v})
+            spec['fields'] = fields
+            columns.append(spec)
+            if spec['nullable']:
+                arrays[f'{name}.null'] = nulls
+            for field in fields:
+                add_column(f'{name}.{field}', [v.get(field) if isinstance(v, dict) else None for v in values])
+            return
+
+        if kind == 'number':
+            numbers = np.array([np.nan if n else v for v, n in zip(values, nulls)], dtype=np.float64)
+            integral = not nulls.any() and np.all(np.mod(numbers, 1) == 0) and \
+                all(isinstance(v, (int, np.integer)) for v in values)
+            arrays[name] = numbers.astype(np.int64) if integral else numbers
+        elif kind == 'bool':
+            arrays[name] = np.array([bool(v) if not n else False for v, n in zip(values, nulls)], dtype=bool)
+        elif kind == 'category':
+            categories = sorted({v for v in values if not _is_null(v)})
+            lookup = {c: i for i, c in enumerate(categories)}
+            arrays[f'{name}.codes'] = np.array([-1 if n else lookup[v] for v, n in zip(values, nulls)],
+                                               dtype=np.int32)
+            arrays[f'{name}.categories'], arrays[f'{name}.category_offsets'] = _encode_strings(categories)
+        else:
+            if kind == 'json':
+                values = [None if n else json.dumps(v, separators=(',', ':')) for v, n in zip(values, nulls)]
+            arrays[f'{name}.data'], arrays[f'{name}.offsets'] = _encode_strings(
+                [None if n else v for v, n in zip(values, nulls)])
+
+        if spec['nullable'] and kind != 'category':
+            arrays[f'{name}.null'] = nulls
+        columns.append(spec)
+
+    for name in frame.columns:
+        add_column(str(name), frame[name].tolist())
+
+    schema = {'version': FORMAT_VERSION, 'array_key': array_key, 'rows': n_rows,
+              'meta': meta or {}, 'columns': columns}
+    arrays['__schema__'] = np.frombuffer(json.dumps(schema).encode('utf-8'), dtype=np.uint8)
+
+    out = io.BytesIO()
+    (np.savez_compressed if compress else np.savez)(out, **arrays)
+    return out.getvalue()
+
+
+def decode_export(payload: bytes) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Decode a compact export payload into (DataFrame, meta)"""
+    with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+        schema = json.loads(archive['__schema__'].tobytes().decode('utf-8'))
+        if schema.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported export format version: {schema.get('version')}")
+        n_rows = schema['rows']
+        specs = {spec['name']: spec for spec in schema['columns']}
+        decoded: Dict[str, Any] = {}
+
+        def column(name):
+            spec = specs[name]
+            kind = spec['kind']
+            nulls = archive[f'{name}.null'] if spec['nullable'] and kind != 'category' else None
+
+            if kind == 'object':
+                fields = {}
+                for field in spec['fields']:
+                    field_values = column(f'{name}.{field}')
+                    fields[field] = field_values.tolist() if isinstance(field_values, np.ndarray) else field_values
+                values = [{field: field_values[i] for field, field_values in fields.items()}
+                          for i in range(n_rows)]
+            elif kind == 'number':
+                values = archive[name]
+                if nulls is not None:
+                    values = values.astype(object)
+                    values[nulls] = None
+                    return values.tolist()
+                return values
+            elif kind == 'bool':
+                values = archive[name]
+                if nulls is None:
+                    return values
+                values = values.tolist()
+            elif kind == 'category':
+                categories = _decode_strings(archive[f'{name}.categories'], archive[f'{name}.category_offsets'])
+                lookup = categories + [None]
+                values = [lookup[c] for c in archive[f'{name}.codes'].tolist()]
+            else:
+                values = _decode_strings(archive[f'{name}.data'], archive[f'{name}.offsets'])
+                if kind == 'json':
+                    values = [json.loads(v) if v else None for v in values]
+
+            if nulls is not None:
+                values = [None if null else v for v, null in zip(values, nulls.tolist())]
+            return values
+
+        for name, spec in specs.items():
+            if '.' in name and name.rsplit('.', 1)[0] in specs:
+                continue  # nested field, rebuilt with its parent
+            decoded[name] = column(name)
+
+    return pd.DataFrame(decoded, index=pd.RangeIndex(n_rows)), schema.get('meta', {})
+
+
+if __name__ == "__main__":
+    # Convert a JSON export into the compact format:
+    #   python export_codec.py campaigns < campaigns.json > campaigns.npz
+    key = sys.argv[1] if len(sys.argv) > 1 else 'campaigns'
+    payload = json.load(sys.stdin)
+    meta = {k: v for k, v in payload.items() if k != key}
+    sys.stdout.buffer.write(encode_export(payload.get(key, []), key, meta))
@@ -0,0 +1,657 @@
+# export_loader.py - Streaming ingestion of the backend recommender export endpoints
+
+import codecs
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+
+import metrics
+from backend_guard import BACKEND, BACKEND_RATE_LIMIT, CircuitBreaker, Deadline, TokenBucket, retry_after_seconds
+from export_codec import MEDIA_TYPE, decode_export
+
+CHUNK_SIZE = 64 * 1024
+INITIAL_CAPACITY = 1024
+
+# Export endpoint name -> JSON array key in the payload
+EXPORT_KEYS = {
+    'donors': 'donors',
+    'campaigns': 'campaigns',
+    'interactions': 'interactions',
+}
+
+_WHITESPACE = ' \t\n\r'
+
+# Answers worth retrying after a pause: rate limited or a temporarily unavailable backend
+RETRY_STATUSES = (429, 502, 503, 504)
+
+EXPORTS_NOT_MODIFIED = metrics.REGISTRY.counter(
+    'recommender_export_not_modified_total', 'Export fetches found unchanged', ('endpoint', 'check'))
+EXPORT_BYTES_AVOIDED = metrics.REGISTRY.counter(
+    'recommender_export_bytes_avoided_total', 'Export body bytes not transferred or not parsed', ('endpoint',))
+REBUILDS_AVOIDED = metrics.REGISTRY.counter(
+    'recommender_rebuilds_avoided_total', 'Model refreshes skipped because no export changed')
+EXPORT_RETRIES = metrics.REGISTRY.counter(
+    'recommender_export_retries_total', 'Export page requests retried', ('endpoint', 'reason'))
+LOADS_COALESCED = metrics.REGISTRY.counter(
+    'recommender_export_loads_coalesced_total', 'Export loads that joined one already in flight')
+
+
+def default_page_size() -> int:
+    """Rows requested per export page (ML_EXPORT_PAGE_SIZE env var, 0 disables paging)"""
+    try:
+        return max(0, int(os.getenv('ML_EXPORT_PAGE_SIZE', '5000')))
+    except ValueError:
+        return 5000
+
+
+def default_export_timeout() -> float:
+    """Seconds to wait for the backend to connect or send the next chunk (ML_EXPORT_TIMEOUT env var, default 30)"""
+    try:
+        return max(0.1, float(os.getenv('ML_EXPORT_TIMEOUT', '30')))
+    except ValueError:
+        return 30.0
+
+
+def default_export_retries() -> int:
+    """Retries per export page request after 429/5xx answers or connection failures (ML_EXPORT_RETRIES, default 2)"""
+    try:
+        return max(0, int(os.getenv('ML_EXPORT_RETRIES', '2')))
+    except ValueError:
+        return 2
+
+
+def default_export_format() -> str:
+    """Wire format preference (ML_EXPORT_FORMAT env var): 'auto' negotiates the compact format, 'json' never asks for it"""
+    return 'json' if os.getenv('ML_EXPORT_FORMAT', 'auto').lower() == 'json' else 'auto'
+
+
+class ExportHTTPError(Exception):
+    """Non-200 response from an export endpoint"""
+
+    def __init__(self, endpoint: str, status_code: int, response=None):
+        super().__init__(f"Failed to fetch {endpoint}: {status_code}")
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.response = response
+
+
+# ---------------------------------------------------------------------------
+# Validators
+# ---------------------------------------------------------------------------
+
+class ExportVersion:
+    """
+    Validators of one export as last transferred: the ETag / Last-Modified
+    response headers and a digest of the body bytes.
+    """
+
+    __slots__ = ('etag', 'last_modified', 'digest', 'nbytes')
+
+    def __init__(self, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                 digest: Optional[str] = None, nbytes: int = 0):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.nbytes = nbytes
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def same_content(self, other: Optional['ExportVersion']) -> bool:
+        return other is not None and self.digest is not None and self.digest == other.digest
+
+    def __repr__(self) -> str:
+        return f"ExportVersion(etag={self.etag!r}, digest={self.digest!r}, nbytes={self.nbytes})"
+
+
+class _BodyDigest:
+    """Running digest and byte count over every page of one export"""
+
+    def __init__(self):
+        self._hash = hashlib.blake2b(digest_size=16)
+        self.nbytes = 0
+
+    def update(self, data: bytes) -> bytes:
+        self._hash.update(data)
+        self.nbytes += len(data)
+        return data
+
+    def feed(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            yield self.update(chunk)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Columnar buffers
+# ---------------------------------------------------------------------------
+
+class _Column:
+    """
+    Growable column: preallocated float64/bool arrays for numeric JSON values,
+    a plain list for strings and nested values.
+    """
+
+    def __init__(self, capacity: int, fill_rows: int):
+        self.capacity = max(capacity, fill_rows + 1)
+        self.kind = None  # None until the first non-null value, then float/bool/object
+        self.values = None
+        self.size = 0
+        self.integral = True  # numeric column holding only JSON integers
+        self.pending = fill_rows  # nulls seen before the first value
+
+    def _start(self, value):
+        if isinstance(value, bool) and not self.pending:
+            self.kind, self.values = 'bool', np.empty(self.capacity, dtype=np.bool_)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            self.kind, self.values = 'float', np.empty(self.capacity, dtype=np.float64)
+            self.values[:self.pending] = np.nan
+            self.integral = not self.pending
+        else:
+            self.kind, self.values = 'object', [None] * self.pending
+        self.size = self.pending
+
+    def _to_object(self):
+        values = self.values[:self.size]
+        if self.kind == 'float':
+            # Restore the Python values (ints, None) when falling back to object
+            self.values = [None if np.isnan(v) else (int(v) if self.integral else float(v)) for v in values]
+        else:
+            self.values = values.tolist()
+        self.kind = 'object'
+
+    def append(self, value):
+        kind = self.kind
+        if kind == 'object':
+            self.values.append(value)
+            self.size += 1
+            return
+        if kind is None:
+            if value is None:
+                self.pending += 1
+                self.capacity = max(self.capacity, self.pending + 1)
+                return
+            self._start(value)
+            if self.kind == 'object':
+                self.append(value)
+                return
+        elif kind == 'float':
+            if value is None or isinstance(value, float):
+                self.integral = False
+            elif not isinstance(value, int) or isinstance(value, bool):
+                self._to_object()
+                self.append(value)
+                return
+        elif not isinstance(value, bool):
+            self._to_object()
+            self.append(value)
+            return
+
+        if self.size == self.capacity:
+            self.capacity *= 2
+            grown = np.empty(self.capacity, dtype=self.values.dtype)
+            grown[:self.size] = self.values[:self.size]
+            self.values = grown
+        self.values[self.size] = np.nan if value is None else value
+        self.size += 1
+
+    def finish(self, n_rows: int):
+        if self.kind is None:
+            return [None] * n_rows
+        while self.size < n_rows:
+            self.append(None)
+        if self.kind == 'object':
+            return self.values
+        values = self.values[:n_rows]
+        return values.astype(np.int64) if self.kind == 'float' and self.integral else values
+
+
+class ColumnarBuffer:
+    """
+    Append-only column store for JSON row objects.
+
+    Rows are decoded one at a time and their values written straight into
+    per-column buffers, so the full payload never exists as a list of dicts.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.capacity = capacity
+        self.columns: Dict[str, _Column] = {}
+        self.n_rows = 0
+
+    def append(self, row: Dict[str, Any]):
+        columns = self.columns
+        for key, value in row.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = _Column(self.capacity, self.n_rows)
+            column.append(value)
+        self.n_rows += 1
+        if len(row) != len(columns):
+            # Pad columns missing from this row
+            for key, column in columns.items():
+                if key not in row:
+                    column.append(None)
+
+    def to_dataframe(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if columns is not None and self.n_rows == 0:
+            return pd.DataFrame(columns=columns)
+        return pd.DataFrame({key: column.finish(self.n_rows) for key, column in self.columns.items()})
+
+
+# ---------------------------------------------------------------------------
+# Incremental JSON parsing
+# ---------------------------------------------------------------------------
+
+class _StreamText:
+    """Text buffer over an iterable of byte chunks"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        """Pull the next chunk; returns False at end of stream"""
+        if self.eof:
+            return False
+        # Drop the consumed prefix so memory stays bounded by the chunk size
+        if self.pos > CHUNK_SIZE:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.buf += self._decoder.decode(chunk)
+                return True
+        self.buf += self._decoder.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of stream)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed export payload: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def value(self, decoder: json.JSONDecoder):
+        """Decode one complete JSON value starting at the cursor"""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                # A value ending exactly at the buffer edge (e.g. a number) may continue
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.more()
+
+
+def iter_json_array(chunks: Iterable[bytes], array_key: str,
+                    meta: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """
+    Yield the elements of `payload[array_key]` from a streamed JSON object.
+
+    Other top-level keys (count, nextCursor, ...) are decoded and stored in `meta`.
+    """
+    decoder = json.JSONDecoder()
+    stream = _StreamText(chunks)
+    meta = meta if meta is not None else {}
+
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value(decoder)
+        stream.expect(':')
+        if key == array_key and stream.peek() == '[':
+            stream.pos += 1
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value(decoder)
+                    separator = stream.peek()
+                    stream.pos += 1
+                    if separator == ']':
+                        break
+                    if separator != ',':
+                        raise ValueError(f"Malformed export payload in '{array_key}' array")
+        else:
+            meta[key] = stream.value(decoder)
+
+        separator = stream.peek()
+        stream.pos += 1
+        if separator == '}':
+            return
+        if separator != ',':
+            raise ValueError("Malformed export payload")
+
+
+def parse_export_stream(chunks: Iterable[bytes], array_key: str,
+                        buffer: Optional[ColumnarBuffer] = None) -> Tuple[ColumnarBuffer, Dict[str, Any]]:
+    """Stream one export payload into a columnar buffer; returns (buffer, meta)"""
+    buffer = buffer or ColumnarBuffer()
+    meta: Dict[str, Any] = {}
+    for row in iter_json_array(chunks, array_key, meta):
+        buffer.append(row)
+    return buffer, meta
+
+
+# ---------------------------------------------------------------------------
+# HTTP loader
+# ---------------------------------------------------------------------------
+
+class ExportLoader:
+    """
+    Fetches the backend export endpoints page by page and streams each
+    response into columnar buffers.
+
+    Paged protocol: the loader sends `?limit=<page_size>[&cursor=<c>]` and keeps
+    following `nextCursor` from the response until it is absent. Backends that
+    don't page simply return everything with no `nextCursor`.
+
+    Content negotiation: with export_format='auto' the request prefers the
+    compact columnar format (export_codec.MEDIA_TYPE) and falls back to JSON
+    when the backend answers with JSON (the Node backend currently always does).
+
+    Conditional fetches: every fetch records an ExportVersion in self.versions.
+    Passing the version from a previous fetch as `known` sends its validators
+    (If-None-Match / If-Modified-Since); a 304 returns None without transferring
+    or parsing anything. Header validators are only kept for single-page
+    exports, since a page's ETag says nothing about the pages after it; paged
+    exports fall back to comparing body digests (see unchanged()).
+
+    Every fetch runs through the backend circuit breaker (backend_guard.BACKEND
+    unless another is given): while it is open, fetch() raises BackendUnavailable
+    without touching the network.
+
+    Retries: each page request takes a slot from the client-side rate limiter
+    (backend_guard.BACKEND_RATE_LIMIT) and is retried on its own after a 429/5xx
+    answer or a connection failure, waiting Retry-After when the backend sends
+    it and exponential backoff otherwise. Pages already received are kept.
+    """
+
+    def __init__(self, backend_url: str, page_size: Optional[int] = None,
+                 timeout: Optional[float] = None, session: Optional[requests.Session] = None,
+                 export_format: Optional[str] = None, breaker: Optional[CircuitBreaker] = None,
+                 retries: Optional[int] = None, backoff: float = 2.0,
+                 rate_limiter: Optional[TokenBucket] = None):
+        self.backend_url = backend_url
+        self.page_size = default_page_size() if page_size is None else page_size
+        self.timeout = default_export_timeout() if timeout is None else timeout
+        self.breaker = breaker or BACKEND
+        self.retries = default_export_retries() if retries is None else retries
+        self.backoff = backoff  # first retry delay without Retry-After; doubles per attempt
+        self.rate_limiter = rate_limiter or BACKEND_RATE_LIMIT
+        self.session = session or requests.Session()
+        self.export_format = export_format or default_export_format()
+        self.versions: Dict[str, ExportVersion] = {}
+        self.not_modified = set()  # endpoints answered 304 by the last fetch
+
+    def headers(self) -> Dict[str, str]:
+        if self.export_format == 'auto':
+            return {'Accept': f'{MEDIA_TYPE}, application/json;q=0.9'}
+        return {'Accept': 'application/json'}
+
+    def url(self, endpoint: str) -> str:
+        return f"{self.backend_url}/recommender/export/{endpoint}"
+
+    def request(self, endpoint: str, params: Optional[Dict], headers: Dict[str, str]):
+        """One page request, rate limited and retried before any of its body is read"""
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(self.url(endpoint), params=params, headers=headers,
+                                            stream=True, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.retries:
+                    raise
+                reason, delay = type(e).__name__, None
+            else:
+                self.rate_limiter.observe(response.headers)
+                delay = retry_after_seconds(response.headers)
+                if response.status_code == 429 and delay is not None:
+                    # Every caller sharing the limiter waits out the backend's Retry-After
+                    self.rate_limiter.pause(delay)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                response.close()
+                reason = str(response.status_code)
+            delay = self.backoff * 2 ** attempt if delay is None else delay
+            EXPORT_RETRIES.inc(endpoint=endpoint, reason=reason)
+            print(f"⚠️  {endpoint} export: {reason}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.retries})")
+            time.sleep(delay)
+
+    def unchanged(self, endpoint: str, known: Optional[ExportVersion]) -> bool:
+        """Whether the last fetch of `endpoint` found the same export as `known` (304 or equal digest)"""
+        if endpoint in self.not_modified:
+            return True
+        version = self.versions.get(endpoint)
+        if version is None or known is None:
+            return version is known
+        return version.same_content(known)
+
+    def fetch(self, endpoint: str, columns: Optional[List[str]] = None,
+              known: Optional[ExportVersion] = None) -> Optional[pd.DataFrame]:
+        """Fetch every page of an export endpoint into one DataFrame (None when `known` is still current)"""
+        with self.breaker.guard():
+            return self._fetch(endpoint, columns, known)
+
+    def _fetch(self, endpoint: str, columns: Optional[List[str]], known: Optional[ExportVersion]):
+        array_key = EXPORT_KEYS[endpoint]
+        buffer = ColumnarBuffer(capacity=self.page_size or INITIAL_CAPACITY)
+        pages: List[pd.DataFrame] = []
+        cursor = None
+        seen_cursors = set()
+        digest = _BodyDigest()
+        validators = {}
+        self.versions.pop(endpoint, None)
+        self.not_modified.discard(endpoint)
+
+        while True:
+            params = {}
+            if self.page_size:
+                params['limit'] = self.page_size
+            if cursor is not None:
+                params['cursor'] = cursor
+            headers = self.headers()
+            if known is not None and cursor is None:
+                headers.update(known.conditional_headers())
+
+            with self.request(endpoint, params or None, headers) as response:
+                if response.status_code == 304 and known is not None and cursor is None:
+                    self.versions[endpoint] = known
+                    self.not_modified.add(endpoint)
+                    EXPORTS_NOT_MODIFIED.inc(endpoint=endpoint, check='validator')
+                    EXPORT_BYTES_AVOIDED.inc(known.nbytes, endpoint=endpoint)
+                    return None
+                if response.status_code != 200:
+                    raise ExportHTTPError(endpoint, response.status_code, response)
+                if cursor is None:
+                    validators = {'etag': response.headers.get('ETag'),
+                                  'last_modified': response.headers.get('Last-Modified')}
+                content_type = response.headers.get('Content-Type', '')
+                if content_type.startswith(MEDIA_TYPE):
+                    if buffer.n_rows:
+                        pages.append(buffer.to_dataframe())
+                        buffer = ColumnarBuffer(capacity=self.page_size or INITIAL_CAPACITY)
+                    page, meta = decode_export(digest.update(response.content))
+                    pages.append(page)
+                else:
+                    _, meta = parse_export_stream(digest.feed(response.iter_content(CHUNK_SIZE)), array_key, buffer)
+
+            cursor = meta.get('nextCursor')
+            if not cursor or cursor in seen_cursors:
+                break
+            seen_cursors.add(cursor)
+
+        if seen_cursors:
+            validators = {}
+        version = self.versions[endpoint] = ExportVersion(digest=digest.hexdigest(), nbytes=digest.nbytes,
+                                                          **validators)
+        if version.same_content(known):
+            EXPORTS_NOT_MODIFIED.inc(endpoint=endpoint, check='digest')
+
+        if not pages:
+            return buffer.to_dataframe(columns)
+        if buffer.n_rows:
+            pages.append(buffer.to_dataframe())
+        frame = pages[0] if len(pages) == 1 else pd.concat(pages, ignore_index=True)
+        if columns is not None and frame.empty:
+            return pd.DataFrame(columns=columns)
+        return frame
+
+
+def _request_stage(endpoint: Optional[str], name: str):
+    return metrics.stage(endpoint, name) if endpoint else contextlib.nullcontext()
+
+
+class ConditionalExport:
+    """
+    Latest rows of one export endpoint for per-request use.
+
+    Each call sends the validators of the previous response; a 304 returns the
+    rows parsed last time without transferring or decoding anything, and a 200
+    whose body digest matches the previous one returns those same rows (the
+    body is decoded as it streams in, so it is never held whole). Callers must
+    not mutate the returned rows, they are shared between requests. Calls go
+    through the backend circuit breaker and rate limiter like ExportLoader's,
+    but are never retried: the caller falls back to cached data instead.
+    """
+
+    def __init__(self, endpoint: str, timeout: Optional[float] = 5,
+                 session: Optional[requests.Session] = None, breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[TokenBucket] = None):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.breaker = breaker or BACKEND
+        self.rate_limiter = rate_limiter or BACKEND_RATE_LIMIT
+        self._state: Tuple[Optional[ExportVersion], Optional[List[Dict[str, Any]]]] = (None, None)
+
+    def get(self, backend_url: str, deadline: Optional[Deadline] = None,
+            stage_endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Rows of the export (raises ExportHTTPError on a non-200/304 answer,
+        BackendUnavailable while the breaker is open, RateLimited when the
+        limiter's wait would overrun `deadline`, DeadlineExceeded when it is spent).
+        With `stage_endpoint` the request and the streamed JSON decode of its
+        body are timed as that endpoint's fetch and parse request stages.
+        """
+        self.rate_limiter.acquire(None if deadline is None else deadline.remaining())
+        timeout = self.timeout if deadline is None else deadline.timeout(self.timeout)
+        with self.breaker.guard():
+            return self._get(backend_url, timeout, stage_endpoint)
+
+    def _get(self, backend_url: str, timeout: Optional[float],
+             stage_endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        version, rows = self._state
+        headers = version.conditional_headers() if rows is not None else {}
+        with _request_stage(stage_endpoint, 'fetch'):
+            response = self.session.get(f"{backend_url}/recommender/export/{self.endpoint}",
+                                        headers=headers, stream=True, timeout=timeout)
+        with response:
+            self.rate_limiter.observe(response.headers)
+            if response.status_code == 429 and retry_after_seconds(response.headers) is not None:
+                self.rate_limiter.pause(retry_after_seconds(response.headers))
+            if response.status_code == 304 and rows is not None:
+                EXPORTS_NOT_MODIFIED.inc(endpoint=self.endpoint, check='validator')
+                EXPORT_BYTES_AVOIDED.inc(version.nbytes, endpoint=self.endpoint)
+                return rows
+            if response.status_code != 200:
+                raise ExportHTTPError(self.endpoint, response.status_code, response)
+
+            # Decoded while the body streams in, never buffered whole
+            digest = _BodyDigest()
+            with _request_stage(stage_endpoint, 'parse'):
+                fresh_rows = list(iter_json_array(digest.feed(response.iter_content(CHUNK_SIZE)),
+                                                  EXPORT_KEYS[self.endpoint]))
+        fresh = ExportVersion(response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                              digest.hexdigest(), digest.nbytes)
+        if rows is not None and fresh.same_content(version):
+            # Same body without validators: keep the previous rows so callers see them unchanged
+            EXPORTS_NOT_MODIFIED.inc(endpoint=self.endpoint, check='digest')
+        else:
+            rows = fresh_rows
+        self._state = (fresh, rows)
+        return rows
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, callers arriving while it runs wait and share its result (or
+    exception). Nothing is cached once the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, '_Flight'] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(result, shared): shared is True for callers that joined a call already in flight"""
+        with self._lock:
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = _Flight()
+        if not leader:
+            LOADS_COALESCED.inc()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            flight.done.set()
+        return flight.result, False
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Model-build export loads, coalesced per backend and known export versions
+EXPORT_LOADS = SingleFlight()
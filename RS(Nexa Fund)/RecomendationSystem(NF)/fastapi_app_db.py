@@ -1,16 +1,34 @@
 # fastapi_app_db.py - FastAPI server using real database data
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 import uvicorn
 import pandas as pd
 import numpy as np
 import requests
 from ml_recommender_db import DatabaseMLRecommender
-from weighted_recommender import WeightedRecommender
+from weighted_recommender import TrendingOnlyRecommender, WeightedRecommender
+from model_bundle import attach_bundle, current_version, publish_bundle, RefreshLock
+import metrics
+import executors
+from recommendation_cache import RecommendationCache, ScoringFlights
+from listing_cache import ListingCache, etag_matches
+from export_loader import ConditionalExport
+from backend_guard import (REQUEST_FETCHES, BackendUnavailable, Deadline, DeadlineExceeded, RateLimited,
+                           default_fetch_budget)
+from admission import (CACHED_USER, FULL, NO_COLLABORATIVE, TIER_HEADER, TRENDING, AdmissionController,
+                       Overloaded)
+import asyncio
+import contextlib
+import json
 import os
+import shutil
+import tempfile
+import threading
+import time
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -32,6 +50,155 @@ app.add_middleware(
 recommender = None
 weighted_recommender = None
 
+# Readiness phases: starting (nothing to serve yet) → warming_up (trending-only from the
+# campaigns export while the full model builds) → ready; failed when the startup build failed
+STARTING, WARMING_UP, READY, FAILED = 'starting', 'warming_up', 'ready', 'failed'
+startup_phase = STARTING
+trending_only = None
+_warmup_task = None
+
+# Served /personalized and /trending lists; contribution events drop the affected entries
+results_cache = RecommendationCache()
+
+# Concurrent cache-missing /personalized and /trending requests with equal parameters share one computation
+scoring_flights = ScoringFlights()
+
+# Pre-encoded /donors and /campaigns pages for the current model version
+listing_cache = ListingCache()
+
+# Per-request campaign rows, re-downloaded and re-parsed only when the backend export changed
+fresh_campaigns_export = ConditionalExport('campaigns', timeout=5)
+
+# Time a request may spend fetching fresh campaigns before it scores the model's cached ones
+FETCH_BUDGET = default_fetch_budget()
+
+# In-flight limit and load-based degradation tiers for /personalized (and the limit for /trending)
+admission = AdmissionController()
+
+# Warm-start collaborative (NMF/ALS) refit covering folded-in donors, campaigns and contributions (0 disables)
+REFIT_INTERVAL = float(os.getenv('ML_REFIT_INTERVAL', '600'))
+_refit_task = None
+
+# Seconds from the first event after a publish to the republish that brings the
+# scoring process pool up to date again (one republish covers all events meanwhile)
+REPUBLISH_DELAY = float(os.getenv('ML_REPUBLISH_DELAY', '2'))
+_republish_task = None
+_publish_lock = threading.Lock()
+
+# Multi-worker serving: when ML_BUNDLE_DIR is set (see run_server_db.py --workers),
+# workers attach the memory-mapped model bundle instead of training themselves
+BUNDLE_DIR = os.getenv('ML_BUNDLE_DIR')
+BUNDLE_CHECK_INTERVAL = 1.0  # seconds between checks for a newer bundle
+_bundle_checked_at = 0.0
+
+# Process-pool scoring (ML_SCORING_PROCESSES) reads the model from a bundle; a
+# single-worker server publishes its own private one after each build
+SCORING_BUNDLE_DIR = BUNDLE_DIR or os.path.join(tempfile.gettempdir(), f"nexa_ml_scoring_{os.getpid()}")
+
+def _attach_current_bundle():
+    """Attach this worker to the currently published model bundle (indexes built before the swap)"""
+    global recommender, weighted_recommender
+    backend_url = os.getenv('BACKEND_API_URL', 'http://localhost:5050/api')
+    attached = DatabaseMLRecommender(n_components=10, backend_url=backend_url)
+    version = attach_bundle(attached, BUNDLE_DIR)
+    weighted = WeightedRecommender(attached).prime()
+    recommender, weighted_recommender = attached, weighted
+    results_cache.clear()
+    executors.prime_scoring_workers(SCORING_BUNDLE_DIR, version)
+    print(f"📦 Worker {os.getpid()} attached model bundle {version}")
+
+_attach_task = None
+
+async def _follow_bundle(version):
+    try:
+        await executors.BATCH.run(_attach_current_bundle)
+    except Exception as e:
+        print(f"⚠️  Could not attach model bundle {version}: {e}")
+
+@app.middleware("http")
+async def follow_model_bundle(request: Request, call_next):
+    """
+    Switch to a newer model bundle once another worker has published it. The attach
+    runs in the batch pool; requests keep the current model until it is swapped in.
+    """
+    global _bundle_checked_at, _attach_task
+    attaching = _attach_task is not None and not _attach_task.done()
+    if BUNDLE_DIR and not attaching and time.monotonic() - _bundle_checked_at > BUNDLE_CHECK_INTERVAL:
+        _bundle_checked_at = time.monotonic()
+        version = current_version(BUNDLE_DIR)
+        if version and (recommender is None or recommender.bundle_version != version):
+            _attach_task = asyncio.create_task(_follow_bundle(version))
+    return await call_next(request)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-request latency histogram plus a sampled per-stage trace"""
+    if not metrics.ENABLED:
+        return await call_next(request)
+    token = metrics.start_trace(f"{request.method} {request.url.path}")
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so path parameters don't explode the series count
+        route = request.scope.get('route')
+        path = getattr(route, 'path', None) or 'unmatched'
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                        method=request.method, path=path, status=str(status))
+        metrics.finish_trace(token)
+
+def _fetch_fresh_campaigns(endpoint, deadline):
+    """(fresh campaign rows or None to fall back to cached data, fetch outcome)"""
+    backend_url = os.getenv('BACKEND_API_URL', 'http://localhost:5050/api')
+    try:
+        # Conditional request: unchanged exports reuse the rows parsed last time (no parse stage)
+        return fresh_campaigns_export.get(backend_url, deadline, stage_endpoint=endpoint), 'fresh'
+    except BackendUnavailable:
+        return None, 'breaker_open'
+    except DeadlineExceeded:
+        return None, 'deadline'
+    except RateLimited:
+        # The client-side limiter would wait past the budget: no call was made
+        return None, 'rate_limited'
+    except requests.Timeout:
+        return None, 'timeout'
+    except Exception:
+        # Backend unavailable
+        return None, 'error'
+
+async def _fresh_campaigns(endpoint):
+    """
+    Fresh campaign rows within the request's fetch budget, or None to score the
+    model's cached campaigns. An open breaker skips the fetch without a pool hop;
+    a fetch still running when the budget ends is left to finish in the background.
+    """
+    if not fresh_campaigns_export.breaker.available():
+        REQUEST_FETCHES.inc(endpoint=endpoint, outcome='breaker_open')
+        return None
+    deadline = Deadline(FETCH_BUDGET)
+    try:
+        # Shielded so the pool's in-flight accounting follows the thread, not this request
+        rows, outcome = await asyncio.wait_for(
+            asyncio.shield(executors.INTERACTIVE.run(_fetch_fresh_campaigns, endpoint, deadline)),
+            deadline.remaining())
+    except asyncio.TimeoutError:
+        rows, outcome = None, 'deadline'
+    REQUEST_FETCHES.inc(endpoint=endpoint, outcome=outcome)
+    return rows
+
+def _format_recommendations(recommendations):
+    return [{
+        'campaign_id': rec['id'],
+        'title': rec['title'],
+        'category': rec.get('category', 'Unknown'),
+        'recommendationScore': rec['recommendationScore'],
+        'badge': rec['badge'],
+        'scores': rec['scores']
+    } for rec in recommendations]
+
 # Pydantic models for API requests/responses
 class RecommendationRequest(BaseModel):
     donor_id: str
@@ -55,6 +222,15 @@ class SimilarDonorResponse(BaseModel):
     isVerified: bool
     similarity_score: float
 
+class SimilarCampaignResponse(BaseModel):
+    campaign_id: str
+    title: str
+    category: str
+    similarity_score: float
+
+def readiness_phase():
+    return READY if weighted_recommender is not None else startup_phase
+
 class SystemStatusResponse(BaseModel):
     status: str
     message: str
@@ -62,37 +238,147 @@ class SystemStatusResponse(BaseModel):
     campaign_count: int
     model_components: int
     data_source: str
+    build_timings: Dict[str, float] = {}
+    bundle_version: Optional[str] = None
+    backend_breaker: Optional[str] = None
+    degradation_tier: Optional[str] = None
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the ML recommender on startup using database data"""
-    global recommender, weighted_recommender
+    """
+    Start serving right away: the model is built by a background warm-up task,
+    with /trending answered from the campaigns export until it is ready
+    """
+    global _refit_task, _warmup_task
+    if REFIT_INTERVAL > 0:
+        _refit_task = asyncio.create_task(_periodic_refit())
+    
+    if BUNDLE_DIR:
+        try:
+            _attach_current_bundle()
+            return
+        except Exception as e:
+            print(f"❌ Error attaching model bundle: {e}")
+    
+    # Bundle workers never train: they only warm up trending-only until a bundle is published
+    _warmup_task = asyncio.create_task(_warm_up(build=not BUNDLE_DIR))
+
+async def _warm_up(build=True):
+    """Fetch campaigns for trending-only serving, then build the full model in the batch pool"""
+    global trending_only, startup_phase
+    backend_url = os.getenv('BACKEND_API_URL', 'http://localhost:5050/api')
+    print("🚀 Initializing Database ML Recommendation System...")
+    print(f"📡 Backend API URL: {backend_url}")
+    
     try:
-        print("🚀 Initializing Database ML Recommendation System...")
-        
-        # Get backend URL from environment or use default
-        backend_url = os.getenv('BACKEND_API_URL', 'http://localhost:5050/api')
-        print(f"📡 Backend API URL: {backend_url}")
-        
-        recommender = DatabaseMLRecommender(n_components=10, backend_url=backend_url)
-        
-        if recommender.load_data_from_backend():
-            recommender.create_interaction_matrix(sparsity=0.7)
-            recommender.fit_nmf()
-            
-            # Initialize weighted recommender
-            weighted_recommender = WeightedRecommender(recommender)
-            print("✅ Weighted Recommendation Engine initialized!")
-            
+        # One export fetch; the per-request fetch reuses its rows until the export changes
+        rows = await executors.BATCH.run(fresh_campaigns_export.get, backend_url)
+        trending_only = TrendingOnlyRecommender(rows)
+        startup_phase = WARMING_UP
+        print(f"⚡ Serving trending campaigns from {len(rows)} campaigns while the model builds")
+    except Exception as e:
+        print(f"⚠️  Could not fetch campaigns for trending-only serving: {e}")
+    
+    if not build:
+        return
+    try:
+        # Staged build: fetch → embeddings → interaction matrix → NMF
+        if await executors.BATCH.run(_build_initial_model, backend_url):
             print("✅ Database ML Recommendation System initialized successfully!")
-        else:
+        elif weighted_recommender is None:
+            startup_phase = FAILED
             print("❌ Failed to initialize Database ML Recommendation System")
-            recommender = None
-            weighted_recommender = None
     except Exception as e:
+        startup_phase = FAILED
         print(f"❌ Error during initialization: {e}")
-        recommender = None
-        weighted_recommender = None
+
+def _build_initial_model(backend_url):
+    """Build the first model; a /refresh that finished first keeps its (newer) model"""
+    global recommender, weighted_recommender, trending_only
+    built = DatabaseMLRecommender(n_components=10, backend_url=backend_url)
+    if not built.build_model():
+        return False
+    if weighted_recommender is not None:
+        return True
+    _publish_for_scoring(built)
+    recommender, weighted_recommender = built, WeightedRecommender(built).prime()
+    trending_only = None
+    results_cache.clear()
+    print("✅ Weighted Recommendation Engine initialized!")
+    return True
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in (_refit_task, _warmup_task, _republish_task):
+        if task is not None:
+            task.cancel()
+    executors.shutdown_pools()
+    if executors.SCORING is not None and not BUNDLE_DIR:
+        shutil.rmtree(SCORING_BUNDLE_DIR, ignore_errors=True)
+
+async def _periodic_refit():
+    """Refit the collaborative model in the batch pool whenever anything was folded in since the last fit"""
+    while True:
+        await asyncio.sleep(REFIT_INTERVAL)
+        await _refit_pending()
+        if weighted_recommender is not None:
+            # Full trending recompute for candidate retrieval, kept off the request path
+            await executors.BATCH.run(weighted_recommender.candidates.refresh_priors)
+
+async def _refit_pending():
+    """One refit pass; the refitted model is republished so process-pool scoring catches up"""
+    current = recommender
+    if current is None or not current.pending_updates:
+        return False
+    try:
+        if not await executors.BATCH.run(current.refit_collaborative):
+            return False
+        if current is recommender:
+            await executors.BATCH.run(_publish_for_scoring, current)
+        results_cache.clear()
+        return True
+    except Exception as e:
+        print(f"⚠️  Periodic collaborative refit failed: {e}")
+        return False
+
+def _publish_for_scoring(built):
+    """
+    Publish a model for the scoring process pool (single-worker mode only).
+    
+    The bundle is written without holding the model's update lock, so events keep
+    being applied meanwhile. It is stamped with the revision it started from: anything
+    applied during the write leaves it stale (scored in-thread) until the next republish.
+    """
+    if executors.SCORING is None or BUNDLE_DIR:
+        return
+    with _publish_lock:
+        with built._update_lock:
+            revision = built.revision
+        version = publish_bundle(built, SCORING_BUNDLE_DIR)
+        with built._update_lock:
+            built.bundle_version = version
+            built.published_revision = revision
+    executors.prime_scoring_workers(SCORING_BUNDLE_DIR, version)
+
+def _schedule_republish():
+    """Republish for the scoring pool REPUBLISH_DELAY seconds after a change, unless one is already due"""
+    global _republish_task
+    if executors.SCORING is None or BUNDLE_DIR or (_republish_task is not None and not _republish_task.done()):
+        return
+    _republish_task = asyncio.create_task(_republish_soon())
+
+async def _republish_soon():
+    """Republish in the batch pool until the bundle holds the current revision"""
+    while True:
+        await asyncio.sleep(REPUBLISH_DELAY)
+        current = recommender
+        if current is None or current.revision == current.published_revision:
+            return
+        try:
+            await executors.BATCH.run(_publish_for_scoring, current)
+        except Exception as e:
+            print(f"⚠️  Republishing the model for process-pool scoring failed: {e}")
+            return
 
 @app.get("/", response_model=dict)
 async def root():
@@ -112,9 +398,24 @@ async def root():
 
 @app.get("/status", response_model=SystemStatusResponse)
 async def get_system_status():
-    """Get system status and statistics"""
+    """Get system status and statistics; `status` is the readiness phase"""
     if recommender is None:
-        raise HTTPException(status_code=503, detail="ML recommender not initialized")
+        phase = readiness_phase()
+        messages = {
+            STARTING: "Loading data, nothing to serve yet",
+            WARMING_UP: "Serving trending campaigns while the model builds",
+            FAILED: "Model build failed; POST /refresh to retry",
+        }
+        return SystemStatusResponse(
+            status=phase,
+            message=messages[phase] + (" (trending only)" if phase == FAILED and trending_only else ""),
+            donor_count=0,
+            campaign_count=len(trending_only.campaigns) if trending_only is not None else 0,
+            model_components=0,
+            data_source="PostgreSQL Database",
+            backend_breaker=fresh_campaigns_export.breaker.state,
+            degradation_tier=admission.tier()
+        )
     
     return SystemStatusResponse(
         status="ready",
@@ -122,7 +423,11 @@ async def get_system_status():
         donor_count=len(recommender.donor_df) if recommender.donor_df is not None else 0,
         campaign_count=len(recommender.campaign_df) if recommender.campaign_df is not None else 0,
         model_components=recommender.nmf_model.n_components_ if recommender.nmf_model is not None else 0,
-        data_source="PostgreSQL Database"
+        data_source="PostgreSQL Database",
+        build_timings=recommender.build_timings,
+        bundle_version=recommender.bundle_version,
+        backend_breaker=fresh_campaigns_export.breaker.state,
+        degradation_tier=admission.tier()
     )
 
 @app.post("/recommendations", response_model=List[RecommendationResponse])
@@ -132,7 +437,8 @@ async def get_recommendations(request: RecommendationRequest):
         raise HTTPException(status_code=503, detail="ML recommender not initialized")
     
     try:
-        recommendations_df = recommender.get_recommendations(
+        recommendations_df = await executors.INTERACTIVE.run(
+            recommender.get_recommendations,
             request.donor_id, 
             top_k=request.top_k
         )
@@ -162,7 +468,8 @@ async def get_similar_donors(request: SimilarDonorsRequest):
         raise HTTPException(status_code=503, detail="ML recommender not initialized")
     
     try:
-        similar_donors_df = recommender.get_similar_donors(
+        similar_donors_df = await executors.INTERACTIVE.run(
+            recommender.get_similar_donors,
             request.donor_id, 
             n_neighbors=request.n_neighbors
         )
@@ -185,67 +492,64 @@ async def get_similar_donors(request: SimilarDonorsRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting similar donors: {str(e)}")
 
+@app.get("/similar-campaigns/{campaign_id}", response_model=List[SimilarCampaignResponse])
+async def get_similar_campaigns(campaign_id: str, top_n: int = 10):
+    """
+    Campaigns most often funded by the same backers ("backers also funded")
+    
+    Served from the co-contribution neighbor lists precomputed at build time.
+    """
+    if recommender is None:
+        raise HTTPException(status_code=503, detail="ML recommender not initialized")
+    
+    similar = recommender.similar_campaigns(campaign_id, top_n=top_n)
+    if similar is None:
+        raise HTTPException(status_code=404, detail=f"Unknown campaign: {campaign_id}")
+    return similar
+
+async def _listing_response(kind, request: Request, cursor, limit, fields):
+    """Cached, pre-encoded listing page; 304 when the client's ETag is current"""
+    try:
+        projection = listing_cache.parse_fields(kind, fields)
+        offset = listing_cache.parse_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    page = listing_cache.cached(recommender, kind, projection, offset, limit)
+    if page is None:
+        # Encoding a new catalog version walks every row once; keep it off the event loop
+        page = await executors.INTERACTIVE.run(listing_cache.page, recommender, kind, projection, offset, limit)
+    headers = {'ETag': page.etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), page.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=page.body, media_type='application/json', headers=headers)
+
 @app.get("/donors")
-async def get_donors():
-    """Get all donors from database"""
+async def get_donors(request: Request, cursor: Optional[str] = None, limit: Optional[int] = None,
+                     fields: Optional[str] = None):
+    """
+    Get donors from database
+    
+    Pagination: pass `limit`, then the returned `next_cursor` as `cursor` (null on the last page).
+    `fields` is a comma-separated projection. Responses carry an ETag; send it back in
+    If-None-Match to get 304 Not Modified while the model's catalog is unchanged.
+    """
     if recommender is None or recommender.donor_df is None:
         raise HTTPException(status_code=503, detail="ML recommender not initialized")
-    
-    donors = []
-    for _, row in recommender.donor_df.iterrows():
-        donors.append({
-            "id": row['id'],
-            "walletAddress": row['walletAddress'],
-            "email": row['email'],
-            "name": row['name'],
-            "bio": row['bio'],
-            "isVerified": bool(row['isVerified']),
-            "role": row['role'],
-            "status": row['status'],
-            "createdAt": row['createdAt'],
-            "updatedAt": row['updatedAt']
-        })
-    
-    return {"donors": donors, "count": len(donors), "data_source": "PostgreSQL Database"}
+    return await _listing_response('donors', request, cursor, limit, fields)
 
 @app.get("/campaigns")
-async def get_campaigns():
-    """Get all campaigns from database"""
+async def get_campaigns(request: Request, cursor: Optional[str] = None, limit: Optional[int] = None,
+                        fields: Optional[str] = None):
+    """Get campaigns from database (pagination, projection and ETags as for /donors)"""
     if recommender is None or recommender.campaign_df is None:
         raise HTTPException(status_code=503, detail="ML recommender not initialized")
     
     try:
-        campaigns = []
-        for _, row in recommender.campaign_df.iterrows():
-            def safe(val, default):
-                if pd.isna(val) or (isinstance(val, float) and np.isnan(val)):
-                    return default
-                return val
-            
-            campaigns.append({
-                "id": safe(row.get('id', ''), ''),
-                "title": safe(row.get('title', ''), ''),
-                "description": safe(row.get('description', ''), ''),
-                "story": safe(row.get('story', ''), ''),
-                "additionalMedia": safe(row.get('additionalMedia', ''), ''),
-                "imageUrl": safe(row.get('imageUrl', ''), ''),
-                "targetAmount": safe(row.get('targetAmount', 0), 0),
-                "currentAmount": safe(row.get('currentAmount', 0), 0),
-                "escrowAmount": safe(row.get('escrowAmount', 0), 0),
-                "releasedAmount": safe(row.get('releasedAmount', 0), 0),
-                "category": safe(row.get('category', ''), ''),
-                "status": safe(row.get('status', ''), ''),
-                "riskScore": safe(row.get('riskScore', 0), 0),
-                "isFraudulent": safe(row.get('isFraudulent', False), False),
-                "requiresMilestones": safe(row.get('requiresMilestones', False), False),
-                "startDate": safe(row.get('startDate', ''), ''),
-                "endDate": safe(row.get('endDate', ''), ''),
-                "createdAt": safe(row.get('createdAt', ''), ''),
-                "updatedAt": safe(row.get('updatedAt', ''), '')
-            })
-        
-        return {"campaigns": campaigns, "count": len(campaigns), "data_source": "PostgreSQL Database"}
-        
+        return await _listing_response('campaigns', request, cursor, limit, fields)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"/campaigns endpoint error: {e}")
         raise HTTPException(status_code=500, detail=f"/campaigns error: {e}")
@@ -375,7 +679,7 @@ async def test_recommendations():
         raise HTTPException(status_code=500, detail=f"Test failed: {str(e)}")
 
 @app.post("/refresh")
-async def refresh_data():
+async def refresh_data(force: bool = False):
     """
     Refresh data from database and retrain all models
     
@@ -383,49 +687,95 @@ async def refresh_data():
     1. Collaborative Filtering: Retrains NMF model with latest contributions
     2. Content Similarity: Rebuilds TF-IDF embeddings with latest campaign/user data
     3. Trending Scores: Uses fresh campaign data with current contribution counts
+    
+    The exports are fetched conditionally against the serving model's validators;
+    when none changed the rebuild is skipped ("unchanged"). force=true always rebuilds.
     """
-    global recommender, weighted_recommender
     try:
         print("🔄 Refreshing data from database...")
         
         # Get backend URL from environment
         backend_url = os.getenv('BACKEND_API_URL', 'http://localhost:5050/api')
         
-        if recommender is None:
-            recommender = DatabaseMLRecommender(n_components=10, backend_url=backend_url)
-        
-        # Load fresh data from database
-        if recommender.load_data_from_backend():
-            # Retrain collaborative filtering (NMF)
-            recommender.create_interaction_matrix(sparsity=0.7)
-            recommender.fit_nmf()
-            
-            # Reinitialize weighted recommender with updated models
-            weighted_recommender = WeightedRecommender(recommender)
-            
-            print("✅ Data refreshed and all models retrained successfully!")
-            print(f"   • {len(recommender.donor_df)} users loaded")
-            print(f"   • {len(recommender.campaign_df)} campaigns loaded")
-            print(f"   • {len(recommender.interactions_df)} interactions loaded")
-            print(f"   • NMF model retrained")
-            print(f"   • TF-IDF embeddings updated")
-            
-            return {
-                "message": "Data refreshed successfully",
-                "status": "success",
-                "stats": {
-                    "users": len(recommender.donor_df),
-                    "campaigns": len(recommender.campaign_df),
-                    "interactions": len(recommender.interactions_df)
-                }
-            }
-        else:
-            return {"message": "Failed to refresh data", "status": "error"}
+        # Retraining runs in the batch pool so it never occupies the interactive threads
+        if BUNDLE_DIR:
+            return await executors.BATCH.run(_refresh_bundle, backend_url, force)
+        return await executors.BATCH.run(_refresh_local, backend_url, force)
             
     except Exception as e:
         print(f"❌ Error refreshing data: {e}")
         return {"message": f"Error refreshing data: {str(e)}", "status": "error"}
 
+def _known_versions(force):
+    """Export validators of the serving model, or None to fetch (and rebuild) unconditionally"""
+    if force or recommender is None:
+        return None
+    return recommender.export_versions
+
+def _unchanged_response(fresh):
+    print("✅ Backend data unchanged, keeping the current model")
+    return {"message": "Data unchanged since the last refresh", "status": "unchanged",
+            "build_timings": fresh.build_timings}
+
+def _refresh_local(backend_url, force=False):
+    """Single-worker refresh: build a new model while the old one keeps serving, then swap"""
+    global recommender, weighted_recommender
+    fresh = DatabaseMLRecommender(n_components=10, backend_url=backend_url)
+    
+    # Load fresh data and rebuild embeddings + NMF as a staged pipeline
+    if fresh.build_model(_known_versions(force), recommender):
+        _publish_for_scoring(fresh)
+        # Swap in the retrained recommender and its weighted scorer together
+        recommender, weighted_recommender = fresh, WeightedRecommender(fresh).prime()
+        results_cache.clear()
+        
+        print("✅ Data refreshed and all models retrained successfully!")
+        print(f"   • {len(fresh.donor_df)} users loaded")
+        print(f"   • {len(fresh.campaign_df)} campaigns loaded")
+        print(f"   • {len(fresh.interactions_df)} interactions loaded")
+        print(f"   • NMF model retrained")
+        print(f"   • TF-IDF embeddings updated")
+        
+        return {
+            "message": "Data refreshed successfully",
+            "status": "success",
+            "stats": {
+                "users": len(fresh.donor_df),
+                "campaigns": len(fresh.campaign_df),
+                "interactions": len(fresh.interactions_df)
+            },
+            "build_timings": fresh.build_timings
+        }
+    if fresh.exports_unchanged:
+        return _unchanged_response(fresh)
+    return {"message": "Failed to refresh data", "status": "error"}
+
+def _refresh_bundle(backend_url, force=False):
+    """Multi-worker refresh: one worker retrains and publishes, the others re-attach"""
+    with RefreshLock(BUNDLE_DIR) as acquired:
+        if not acquired:
+            return {"message": "Refresh already in progress in another worker", "status": "busy"}
+        
+        fresh = DatabaseMLRecommender(n_components=10, backend_url=backend_url)
+        if not fresh.build_model(_known_versions(force), recommender):
+            if fresh.exports_unchanged:
+                return _unchanged_response(fresh)
+            return {"message": "Failed to refresh data", "status": "error"}
+        
+        version = publish_bundle(fresh, BUNDLE_DIR)
+        _attach_current_bundle()
+        return {
+            "message": "Data refreshed successfully",
+            "status": "success",
+            "bundle_version": version,
+            "stats": {
+                "users": len(fresh.donor_df),
+                "campaigns": len(fresh.campaign_df),
+                "interactions": len(fresh.interactions_df)
+            },
+            "build_timings": fresh.build_timings
+        }
+
 @app.get("/debug-model")
 async def debug_model():
     """Debug endpoint to check interaction matrix and NMF model"""
@@ -608,8 +958,54 @@ class PersonalizedResponse(BaseModel):
     badge: str
     scores: Dict[str, float]
 
+def _select_candidates(weighted, user_id, user_preferences, campaigns):
+    with metrics.stage('personalized', 'candidates'):
+        return weighted.candidates.select(user_id, user_preferences, campaigns)
+
+async def _score_personalized(user_id, user_preferences, campaigns, top_n, use_collaborative=True):
+    """
+    Personalized scoring in the scoring process pool when enabled, else the interactive threads.
+    Events and fold-ins since the bundle was published are only in this process's model,
+    so those requests stay on the threads until the republish REPUBLISH_DELAY seconds later.
+    """
+    current, weighted = recommender, weighted_recommender
+    # The version is read after the check: a publish sets it before the revision it holds
+    if (executors.SCORING is not None and current.revision == current.published_revision
+            and (version := current.bundle_version)):
+        use_candidates = True
+        if campaigns is not None:
+            # Same revision as the bundle, so the same candidates: only those rows are pickled to the worker
+            campaigns = await executors.INTERACTIVE.run(_select_candidates, weighted, user_id, user_preferences,
+                                                        campaigns)
+            use_candidates = False
+        recommendations, stages = await executors.SCORING.run(
+            executors.personalized_in_process, SCORING_BUNDLE_DIR, version, user_id, user_preferences,
+            campaigns, top_n, use_collaborative, use_candidates)
+        metrics.replay_stages(stages)
+        return recommendations
+    return await executors.INTERACTIVE.run(
+        weighted.get_personalized_recommendations,
+        user_id=user_id,
+        user_preferences=user_preferences,
+        campaigns=campaigns,
+        top_n=top_n,
+        use_collaborative=use_collaborative
+    )
+
+@contextlib.contextmanager
+def _admitted(endpoint, degradable=True):
+    """Admission for one scoring request: a fast 503 at the in-flight limit instead of a slow answer"""
+    try:
+        ticket = admission.enter(endpoint, degradable)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={'Retry-After': str(e.retry_after)})
+    try:
+        yield ticket
+    finally:
+        admission.leave(ticket)
+
 @app.post("/personalized", response_model=List[PersonalizedResponse])
-async def get_personalized_recommendations(request: PersonalizedRequest):
+async def get_personalized_recommendations(request: PersonalizedRequest, response: Response = None):
     """
     Get personalized campaign recommendations using multi-algorithm weighted scoring
     
@@ -622,49 +1018,79 @@ async def get_personalized_recommendations(request: PersonalizedRequest):
     Returns campaigns with scores, sorted by relevance
     
     Note: Uses fresh campaign data from database for accurate trending scores
+    
+    Under load the answer degrades in tiers, named in the X-Degradation-Tier header:
+    full → no_collaborative (collaborative score skipped) → cached_user (the user's
+    last served list) → trending (the last trending list). At ML_MAX_INFLIGHT
+    requests in flight new ones get a 503 with Retry-After. While the model is
+    still warming up every answer is the trending tier.
     """
-    if weighted_recommender is None:
+    if weighted_recommender is None and trending_only is None:
         raise HTTPException(status_code=503, detail="Weighted recommender not initialized")
     
-    try:
-        # Fetch fresh campaign data from backend for accurate trending scores
-        backend_url = os.getenv('BACKEND_API_URL', 'http://localhost:5050/api')
+    cache_key = (request.user_id, json.dumps(request.user_preferences, sort_keys=True, default=str), request.top_n)
+    cached = results_cache.get('personalized', cache_key)
+    if cached is not None:
+        if response is not None:
+            response.headers[TIER_HEADER] = FULL
+        return cached
+    
+    with _admitted('personalized') as ticket:
+        if weighted_recommender is None:
+            ticket.tier = TRENDING  # warm-up: only trending scores exist yet
         try:
-            campaigns_response = requests.get(f"{backend_url}/recommender/export/campaigns", timeout=5)
-            if campaigns_response.status_code == 200:
-                campaigns_data = campaigns_response.json()
-                fresh_campaigns = campaigns_data.get('campaigns', [])
-            else:
-                # Fallback to cached data
-                fresh_campaigns = None
-        except:
-            # Fallback to cached data if backend unavailable
-            fresh_campaigns = None
-        
-        # Get recommendations with fresh campaign data
-        recommendations = weighted_recommender.get_personalized_recommendations(
-            user_id=request.user_id,
-            user_preferences=request.user_preferences,
-            campaigns=fresh_campaigns,
-            top_n=request.top_n
-        )
-        
-        # Format response
-        formatted_recs = []
-        for rec in recommendations:
-            formatted_recs.append({
-                'campaign_id': rec['id'],
-                'title': rec['title'],
-                'category': rec.get('category', 'Unknown'),
-                'recommendationScore': rec['recommendationScore'],
-                'badge': rec['badge'],
-                'scores': rec['scores']
-            })
-        
-        return formatted_recs
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+            recommendations = await _serve_personalized(request, cache_key, ticket)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+        if response is not None:
+            response.headers[TIER_HEADER] = ticket.tier
+        return recommendations
+
+async def _serve_personalized(request, cache_key, ticket):
+    """/personalized at the ticket's tier, stepping down when the cached list a tier needs is missing"""
+    generation = results_cache.generation
+    if ticket.tier in (FULL, NO_COLLABORATIVE):
+        # Identical requests already being scored share that result instead of scoring again;
+        # the cache generation keeps requests that arrive after an invalidation off stale work
+        collaborative = ticket.tier == FULL
+        return await scoring_flights.do(
+            'personalized', (cache_key, generation, collaborative),
+            lambda: _compute_personalized(request, cache_key, generation, collaborative))
+    
+    if ticket.tier == CACHED_USER:
+        stale = results_cache.latest('personalized', user_id=request.user_id, max_age=admission.stale_age)
+        if stale is not None:
+            return stale[:request.top_n]
+        ticket.tier = TRENDING
+    stale = results_cache.latest('trending', max_age=admission.stale_age)
+    if stale is not None:
+        return stale[:request.top_n]
+    return await scoring_flights.do(
+        'trending', (request.top_n, generation), lambda: _compute_trending(request.top_n, generation))
+
+async def _compute_personalized(request, cache_key, generation, collaborative=True):
+    # Fetch fresh campaign data from backend for accurate trending scores
+    # (falls back to cached data when the backend is unavailable or slower than FETCH_BUDGET)
+    fresh_campaigns = await _fresh_campaigns('personalized')
+    
+    # Get recommendations with fresh campaign data
+    recommendations = await _score_personalized(
+        user_id=request.user_id,
+        user_preferences=request.user_preferences,
+        campaigns=fresh_campaigns,
+        top_n=request.top_n,
+        use_collaborative=collaborative
+    )
+    
+    # Format response
+    with metrics.stage('personalized', 'serialize'):
+        formatted_recs = _format_recommendations(recommendations)
+    
+    # Degraded lists are not cached: they would outlive the overload
+    if collaborative:
+        results_cache.put('personalized', cache_key, formatted_recs, user_id=request.user_id,
+                          campaign_ids=[rec['campaign_id'] for rec in formatted_recs], generation=generation)
+    return formatted_recs
 
 @app.post("/trending", response_model=List[PersonalizedResponse])
 async def get_trending_campaigns(top_n: int = 20):
@@ -673,47 +1099,142 @@ async def get_trending_campaigns(top_n: int = 20):
     Uses only trending score based on recent activity
     
     Note: Fetches fresh campaign data for accurate real-time trending scores
+    (during warm-up, scored from the campaigns export alone)
     """
-    if weighted_recommender is None:
+    if weighted_recommender is None and trending_only is None:
         raise HTTPException(status_code=503, detail="Weighted recommender not initialized")
     
-    try:
-        # Fetch fresh campaign data from backend for accurate trending scores
-        backend_url = os.getenv('BACKEND_API_URL', 'http://localhost:5050/api')
+    cached = results_cache.get('trending', top_n)
+    if cached is not None:
+        return cached
+    
+    with _admitted('trending', degradable=False):
         try:
-            campaigns_response = requests.get(f"{backend_url}/recommender/export/campaigns", timeout=5)
-            if campaigns_response.status_code == 200:
-                campaigns_data = campaigns_response.json()
-                fresh_campaigns = campaigns_data.get('campaigns', [])
-            else:
-                # Fallback to cached data
-                fresh_campaigns = None
-        except:
-            # Fallback to cached data if backend unavailable
-            fresh_campaigns = None
-        
-        # Get trending campaigns with fresh data
-        recommendations = weighted_recommender.get_non_personalized_recommendations(
-            campaigns=fresh_campaigns,
-            top_n=top_n
-        )
-        
-        # Format response
-        formatted_recs = []
-        for rec in recommendations:
-            formatted_recs.append({
-                'campaign_id': rec['id'],
-                'title': rec['title'],
-                'category': rec.get('category', 'Unknown'),
-                'recommendationScore': rec['recommendationScore'],
-                'badge': rec['badge'],
-                'scores': rec['scores']
-            })
-        
-        return formatted_recs
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating trending campaigns: {str(e)}")
+            generation = results_cache.generation
+            return await scoring_flights.do(
+                'trending', (top_n, generation), lambda: _compute_trending(top_n, generation))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating trending campaigns: {str(e)}")
+
+async def _compute_trending(top_n, generation):
+    # Fetch fresh campaign data from backend for accurate trending scores
+    fresh_campaigns = await _fresh_campaigns('trending')
+    
+    # Get trending campaigns with fresh data (the warm-up rows when there is no model yet)
+    scorer = weighted_recommender or trending_only
+    recommendations = await executors.INTERACTIVE.run(
+        scorer.get_non_personalized_recommendations,
+        campaigns=fresh_campaigns,
+        top_n=top_n
+    )
+    
+    # Format response
+    with metrics.stage('trending', 'serialize'):
+        formatted_recs = _format_recommendations(recommendations)
+    
+    results_cache.put('trending', top_n, formatted_recs, generation=generation)
+    return formatted_recs
+
+class ContributionEvent(BaseModel):
+    """A contribution recorded by the backend"""
+    userId: str
+    campaignId: str
+    amount: float = 0.0
+
+class ContributionEventBatch(BaseModel):
+    events: List[ContributionEvent]
+
+def _apply_contributions(model, weighted, events):
+    """Apply events to the model, then re-rank only the campaigns they named in the trending prior"""
+    applied = model.apply_contributions(events)
+    weighted.candidates.campaigns_changed(applied['campaigns'])
+    return applied
+
+@app.post("/events/contribution")
+async def ingest_contribution_events(payload: Union[ContributionEventBatch, ContributionEvent]):
+    """
+    Apply contribution events (one event or {"events": [...]}) without a refresh
+    
+    Updates the campaign's contribution count and currentAmount, the donor's
+    interaction row and NMF factors, then drops only the cached lists they affect.
+    In multi-worker mode only the receiving worker is updated until the next refresh.
+    """
+    if recommender is None:
+        raise HTTPException(status_code=503, detail="ML recommender not initialized")
+    
+    events = payload.events if isinstance(payload, ContributionEventBatch) else [payload]
+    start = time.perf_counter()
+    applied = await executors.INTERACTIVE.run(
+        _apply_contributions, recommender, weighted_recommender, [event.model_dump() for event in events])
+    invalidated = results_cache.invalidate(applied['users'], applied['campaigns'], kinds=['trending'])
+    _schedule_republish()
+    
+    return {
+        "status": "success",
+        "received": len(events),
+        "applied": len(events) - applied['unknown'],
+        "unknown": applied['unknown'],
+        "invalidated": invalidated,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+
+class DonorRows(BaseModel):
+    donors: List[Dict]
+
+class CampaignRows(BaseModel):
+    campaigns: List[Dict]
+
+@app.post("/events/donors")
+async def ingest_new_donors(payload: DonorRows):
+    """
+    Fold in donors created after the last build (rows as in the donors export)
+    
+    They get embeddings and an empty interaction row right away; collaborative
+    factors follow from their contributions without a refresh.
+    """
+    if recommender is None:
+        raise HTTPException(status_code=503, detail="ML recommender not initialized")
+    added = await executors.INTERACTIVE.run(recommender.fold_in_donors, payload.donors)
+    if added:
+        _schedule_republish()
+    return {"status": "success", "received": len(payload.donors), "added": len(added)}
+
+def _fold_in_campaigns(model, weighted, campaigns):
+    """Fold campaigns in, then index them for candidate retrieval before any request needs them"""
+    added = model.fold_in_campaigns(campaigns)
+    if added:
+        weighted.prime()
+    return added
+
+@app.post("/events/campaigns")
+async def ingest_new_campaigns(payload: CampaignRows):
+    """Fold in campaigns created after the last build (rows as in the campaigns export)"""
+    if recommender is None:
+        raise HTTPException(status_code=503, detail="ML recommender not initialized")
+    added = await executors.INTERACTIVE.run(_fold_in_campaigns, recommender, weighted_recommender, payload.campaigns)
+    if added:
+        # A new campaign can enter any cached list
+        results_cache.clear()
+        _schedule_republish()
+    return {"status": "success", "received": len(payload.campaigns), "added": len(added)}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics: request latency, per-stage request-path latency
+    (fetch, parse, candidates, score_*, top_k, serialize) and model build stage timings
+    """
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug-traces")
+async def debug_traces(limit: int = 20):
+    """Most recent sampled request traces (enable with ML_TRACE_SAMPLE_RATE)"""
+    traces = list(metrics.RECENT_TRACES)[-limit:] if limit > 0 else []
+    return {
+        "sample_rate": metrics.TRACE_SAMPLE_RATE,
+        "count": len(traces),
+        "traces": traces
+    }
 
 @app.get("/algorithm-info")
 async def get_algorithm_info():
@@ -734,12 +1255,14 @@ async def get_algorithm_info():
             "collaborative_filtering": {
                 "weight": "30%",
                 "description": "Predicts user-campaign affinity using NMF matrix factorization",
-                "technique": "Non-negative Matrix Factorization (NMF)"
+                "technique": "Non-negative Matrix Factorization (NMF)" if recommender is None
+                or recommender.collab_engine == 'nmf' else "Implicit-feedback ALS (conjugate gradient)"
             },
             "content_similarity": {
                 "weight": "20%",
                 "description": "Compares campaign text to user profile using TF-IDF",
-                "technique": "Cosine Similarity on TF-IDF vectors"
+                "technique": "Cosine Similarity on TF-IDF vectors" if recommender is None
+                or recommender.embedding_mode == 'tfidf' else "Cosine Similarity on hashed TF-IDF vectors"
             },
             "trending_boost": {
                 "weight": "10%",
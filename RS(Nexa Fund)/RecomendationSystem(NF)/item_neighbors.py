@@ -0,0 +1,55 @@
+# item_neighbors.py - Campaign × campaign co-contribution neighbors ("backers also funded")
+
+import os
+from typing import Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+def default_item_neighbors() -> int:
+    """Neighbors kept per campaign (ML_ITEM_NEIGHBORS env var, default 20)"""
+    try:
+        return max(1, int(os.getenv('ML_ITEM_NEIGHBORS', '20')))
+    except ValueError:
+        return 20
+
+
+def co_contribution_neighbors(donor_rows: np.ndarray, campaign_rows: np.ndarray,
+                              n_donors: int, n_campaigns: int,
+                              top_m: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-M co-contribution neighbors of every campaign.
+
+    Builds the binary donor × campaign matrix X of (donor_rows[i], campaign_rows[i])
+    contributions and the sparse co-occurrence XᵀX, scored by cosine similarity
+    co(i, j) / sqrt(backers(i) · backers(j)) so popular campaigns do not dominate.
+
+    Returns:
+        (neighbor_idx, neighbor_scores): n_campaigns × top_m arrays, best first,
+        padded with -1 / 0.0 where a campaign has fewer co-funded campaigns
+    """
+    neighbor_idx = np.full((n_campaigns, top_m), -1, dtype=np.int32)
+    neighbor_scores = np.zeros((n_campaigns, top_m), dtype=np.float32)
+    if len(donor_rows) == 0 or n_campaigns == 0:
+        return neighbor_idx, neighbor_scores
+
+    X = sparse.csr_matrix((np.ones(len(donor_rows), dtype=np.float64), (donor_rows, campaign_rows)),
+                          shape=(n_donors, n_campaigns))
+    X.data[:] = 1.0  # repeat contributions to a campaign count once
+    co = (X.T @ X).tocoo()
+
+    off_diagonal = co.row != co.col
+    rows, cols, counts = co.row[off_diagonal], co.col[off_diagonal], co.data[off_diagonal]
+    backers = np.asarray(X.sum(axis=0)).ravel()
+    scores = counts / np.sqrt(backers[rows] * backers[cols])
+
+    # Rank within each campaign row: sort by (row, -score), then keep the first top_m
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    starts = np.searchsorted(rows, np.arange(n_campaigns))
+    rank = np.arange(len(rows)) - starts[rows]
+    keep = rank < top_m
+    neighbor_idx[rows[keep], rank[keep]] = cols[keep]
+    neighbor_scores[rows[keep], rank[keep]] = scores[keep]
+    return neighbor_idx, neighbor_scores
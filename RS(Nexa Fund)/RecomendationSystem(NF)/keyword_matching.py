@@ -0,0 +1,202 @@
+# keyword_matching.py - Match a request's interestKeywords against every campaign's text in one pass
+
+import copy
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from catalog_store import CatalogRows
+from rule_matcher import KeywordMatcher, join_texts
+
+TOKEN_PATTERN = re.compile(r'\w+')
+TEXT_FIELDS = ('title', 'description', 'story')
+
+
+def _text_fields(campaign: Dict) -> Tuple:
+    return campaign.get('title', ''), campaign.get('description', ''), campaign.get('story', '')
+
+
+def default_matcher_cache_size() -> int:
+    """Compiled keyword sets kept (ML_KEYWORD_MATCHER_CACHE env var, default 256)"""
+    try:
+        return max(1, int(os.getenv('ML_KEYWORD_MATCHER_CACHE', '256')))
+    except ValueError:
+        return 256
+
+
+@lru_cache(maxsize=default_matcher_cache_size())
+def compiled_keywords(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """One matcher per distinct keyword list; every list entry is its own group"""
+    return KeywordMatcher([[keyword] for keyword in keywords])
+
+
+def campaign_text(campaign: Dict) -> str:
+    """The lower-cased text interest keywords are matched against"""
+    return f"{campaign.get('title', '')} {campaign.get('description', '')} {campaign.get('story', '')}".lower()
+
+
+def _empty_keywords(keywords: Tuple[str, ...]) -> int:
+    # An empty keyword is a substring of every text
+    return sum(1 for k in keywords if not k)
+
+
+class CampaignTextBuffer:
+    """Lower-cased title/description/story of a list of campaigns joined into one scan buffer"""
+
+    def __init__(self, campaigns: Sequence[Dict]):
+        self.buffer, self.starts = join_texts(
+            [campaign_text(c).replace(KeywordMatcher.SEPARATOR, ' ') for c in campaigns])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def keyword_counts(self, keywords: List[str]) -> np.ndarray:
+        """
+        Number of `keywords` entries contained in each campaign's text, identical to
+        counting `keyword in campaign_text` per keyword (duplicates count twice)
+        """
+        keywords = tuple(k.lower() for k in keywords)
+        counts = np.zeros(len(self), dtype=np.int64)
+        if not keywords or not len(self):
+            return counts
+        counts += compiled_keywords(keywords).scan(self.buffer, self.starts).sum(axis=1)
+        return counts + _empty_keywords(keywords)
+
+
+class CampaignKeywordIndex:
+    """
+    Token index over one catalog snapshot, built once and shared by all requests.
+
+    A keyword made only of word characters is contained in a text exactly when
+    it is a substring of one of the text's word tokens, so such keywords are
+    matched against the (small) vocabulary instead of every campaign's text and
+    mapped to campaigns with one sparse token × campaign product. Keywords with
+    spaces or punctuation, and campaigns whose text differs from the snapshot
+    (e.g. edited since the build), fall back to a CampaignTextBuffer scan.
+    """
+
+    def __init__(self, campaigns: Sequence[Dict]):
+        self._rows = {}
+        self._fields = []
+        self._vocabulary: Dict[str, int] = {}
+        self.n_campaigns = 0
+        self.incidence = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self._add(campaigns)
+
+    def _add(self, campaigns: Sequence[Dict]):
+        """Tokenize `campaigns` as rows after the current ones and grow the incidence matrix"""
+        start = self.n_campaigns
+        vocabulary = self._vocabulary
+        token_ids, campaign_rows = [], []
+        for row, campaign in enumerate(campaigns, start=start):
+            self._rows.setdefault(campaign.get('id'), row)
+            self._fields.append(_text_fields(campaign))
+            for token in set(TOKEN_PATTERN.findall(campaign_text(campaign))):
+                token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                campaign_rows.append(row - start)
+        self.n_campaigns = len(self._fields)
+        # (n_campaigns, n_tokens) incidence of tokens in campaign texts; existing rows
+        # only get wider, new tokens never occur in them
+        previous = self.incidence
+        widened = sparse.csr_matrix((previous.data, previous.indices, previous.indptr),
+                                    shape=(start, len(vocabulary)))
+        added = sparse.csr_matrix(
+            (np.ones(len(token_ids), dtype=np.int32), (campaign_rows, token_ids)),
+            shape=(self.n_campaigns - start, len(vocabulary)))
+        self.incidence = sparse.vstack([widened, added], format='csr') if start else added
+        self.vocabulary_buffer, self.vocabulary_starts = join_texts(list(vocabulary))
+
+    def extended(self, campaigns: Sequence[Dict]) -> 'CampaignKeywordIndex':
+        """Copy that also indexes `campaigns` (appended catalog rows); only they are tokenized"""
+        grown = copy.copy(self)
+        grown._rows = dict(self._rows)
+        grown._fields = list(self._fields)
+        grown._vocabulary = dict(self._vocabulary)
+        grown._add(campaigns)
+        return grown
+
+    def keyword_counts(self, keywords: List[str], campaigns: Sequence[Dict]) -> np.ndarray:
+        """Same result as CampaignTextBuffer(campaigns).keyword_counts(keywords)"""
+        keywords = tuple(k.lower() for k in keywords)
+        counts = np.zeros(len(campaigns), dtype=np.int64)
+        if not keywords or not len(campaigns):
+            return counts
+
+        # Snapshot row of each campaign whose text is unchanged, -1 otherwise
+        snapshot_rows, fields = self._rows, self._fields
+        rows = np.array([snapshot_rows.get(c.get('id'), -1) for c in campaigns], dtype=np.int64)
+        for i in np.flatnonzero(rows >= 0).tolist():
+            if fields[rows[i]] != _text_fields(campaigns[i]):
+                rows[i] = -1
+        indexed = rows >= 0
+
+        word_keywords = [k for k in keywords if k and TOKEN_PATTERN.fullmatch(k)]
+        other_keywords = [k for k in keywords if k and not TOKEN_PATTERN.fullmatch(k)]
+        # Word runs of a multi-word keyword must each occur inside a token, which
+        # narrows the campaigns its exact buffer scan has to look at
+        runs = [TOKEN_PATTERN.findall(k) for k in other_keywords]
+        terms = list(dict.fromkeys(word_keywords + [run for keyword_runs in runs for run in keyword_runs]))
+        column = {term: j for j, term in enumerate(terms)}
+
+        positions = np.flatnonzero(indexed)
+        scan_rows = np.zeros(len(campaigns), dtype=bool)
+        if terms and len(positions):
+            # (n_tokens, T) vocabulary matches → (n_indexed, T) campaign hits
+            token_matches = compiled_keywords(tuple(terms)).scan(self.vocabulary_buffer, self.vocabulary_starts)
+            hits = (self.incidence[rows[indexed]] @ sparse.csr_matrix(token_matches, dtype=np.int32)).toarray() > 0
+            if word_keywords:
+                counts[positions] += hits[:, [column[k] for k in word_keywords]].sum(axis=1)
+            for keyword_runs in runs:
+                scan_rows[positions[hits[:, [column[r] for r in keyword_runs]].all(axis=1)]] = True
+        elif other_keywords:
+            scan_rows[positions] = True
+
+        # Campaigns not in the snapshot need every keyword; indexed ones only the multi-word ones
+        for subset, subset_keywords in ((~indexed, word_keywords + other_keywords), (scan_rows, other_keywords)):
+            if subset_keywords and subset.any():
+                subset_positions = np.flatnonzero(subset)
+                counts[subset_positions] += CampaignTextBuffer(
+                    [campaigns[i] for i in subset_positions]).keyword_counts(subset_keywords)
+        return counts + _empty_keywords(keywords)
+
+
+class KeywordIndexStage:
+    """
+    Owns the CampaignKeywordIndex of a WeightedRecommender. It is built before the model
+    is swapped in (WeightedRecommender.prime) and extended with just the new rows when
+    campaigns are folded in; contribution events keep the index.
+    """
+
+    def __init__(self, ml_recommender):
+        self.ml_recommender = ml_recommender
+        self._index = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def index(self) -> Optional[CampaignKeywordIndex]:
+        df = getattr(self.ml_recommender, 'campaign_df', None)
+        if df is None or df.empty:
+            return None
+        key = (id(df), len(df))
+        with self._lock:
+            if self._key != key:
+                columns = [c for c in ('id',) + TEXT_FIELDS if c in df.columns]
+                if self._index is not None and len(df) > self._index.n_campaigns:
+                    # Campaigns were folded in: index just those
+                    self._index = self._index.extended(CatalogRows(df[columns].iloc[self._index.n_campaigns:]))
+                else:
+                    self._index = CampaignKeywordIndex(CatalogRows(df[columns]))
+                self._key = key
+            return self._index
+
+    def keyword_counts(self, keywords: List[str], campaigns: Sequence[Dict]) -> np.ndarray:
+        """interestKeywords matched per campaign, from the snapshot index when one is built"""
+        index = self.index()
+        if index is None:
+            return CampaignTextBuffer(campaigns).keyword_counts(keywords)
+        return index.keyword_counts(keywords, campaigns)
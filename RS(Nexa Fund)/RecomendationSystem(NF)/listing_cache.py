@@ -0,0 +1,202 @@
+# listing_cache.py - Pre-encoded, paginated /donors and /campaigns listings with ETags
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import metrics
+
+try:
+    import orjson  # optional: several times faster than json for row encoding
+except ImportError:
+    orjson = None
+
+LISTING_LOOKUPS = metrics.REGISTRY.counter(
+    'recommender_listing_cache_total', 'Listing page cache lookups', ('kind', 'result'))
+
+# Listed fields and the value served when a row's value is missing
+LISTING_FIELDS = {
+    'donors': {
+        'id': None, 'walletAddress': None, 'email': None, 'name': None, 'bio': None, 'isVerified': False,
+        'role': None, 'status': None, 'createdAt': None, 'updatedAt': None,
+    },
+    'campaigns': {
+        'id': '', 'title': '', 'description': '', 'story': '', 'additionalMedia': '', 'imageUrl': '',
+        'targetAmount': 0, 'currentAmount': 0, 'escrowAmount': 0, 'releasedAmount': 0,
+        'category': '', 'status': '', 'riskScore': 0, 'isFraudulent': False, 'requiresMilestones': False,
+        'startDate': '', 'endDate': '', 'createdAt': '', 'updatedAt': '',
+    },
+}
+
+
+def default_listing_cache_pages() -> int:
+    """Encoded pages kept per model version (ML_LISTING_CACHE_PAGES env var, default 256)"""
+    try:
+        return max(1, int(os.getenv('ML_LISTING_CACHE_PAGES', '256')))
+    except ValueError:
+        return 256
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def encode_json(value) -> bytes:
+    """Compact JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+class EncodedRows:
+    """
+    One listing's rows encoded once: a single buffer of comma-joined JSON objects
+    plus each row's byte offsets, so any page is one slice of the buffer.
+    """
+
+    def __init__(self, frame, fields: Sequence[str], defaults: Dict):
+        columns = []
+        for field in fields:
+            if field not in frame.columns:
+                columns.append([defaults.get(field)] * len(frame))
+                continue
+            column = frame[field]
+            values = np.asarray(column, dtype=object).copy()
+            values[column.isna().to_numpy()] = defaults.get(field)
+            columns.append(values.tolist())
+        parts: List[bytes] = [encode_json(dict(zip(fields, row))) for row in zip(*columns)] if fields else []
+        lengths = np.fromiter(map(len, parts), dtype=np.int64, count=len(parts))
+        # Row i spans [starts[i], ends[i]); rows are separated by one comma
+        self.ends = np.cumsum(lengths + 1) - 1
+        self.starts = self.ends - lengths
+        self.buffer = b','.join(parts)
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def page(self, start: int, stop: int) -> bytes:
+        """JSON array of rows [start, stop)"""
+        if start >= stop:
+            return b'[]'
+        return b'[' + self.buffer[self.starts[start]:self.ends[stop - 1]] + b']'
+
+
+class ListingPage:
+    """One encoded response body and its strong ETag"""
+
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class ListingCache:
+    """
+    Per-model-version cache of encoded /donors and /campaigns responses.
+
+    Rows are encoded once per (catalog snapshot, field projection); pages are
+    slices of that buffer wrapped in the response envelope, kept in an LRU.
+    The cache resets when the model's catalog changes (new build or bundle,
+    fold-ins, contribution events). ETags hash the body, so every worker
+    serving the same model version answers If-None-Match identically.
+    """
+
+    def __init__(self, max_pages: Optional[int] = None):
+        self.max_pages = default_listing_cache_pages() if max_pages is None else max_pages
+        self._version = None
+        self._rows: Dict[Tuple, EncodedRows] = {}
+        self._pages: 'OrderedDict[Tuple, ListingPage]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def catalog_version(recommender) -> Tuple:
+        return (id(recommender), id(recommender.donor_df), len(recommender.donor_df),
+                id(recommender.campaign_df), len(recommender.campaign_df),
+                recommender.pending_updates, id(recommender.nmf_model))
+
+    @staticmethod
+    def parse_fields(kind: str, fields: Optional[str]) -> Tuple[str, ...]:
+        """Projection from a comma-separated `fields` parameter (ValueError on unknown fields)"""
+        known = LISTING_FIELDS[kind]
+        if not fields:
+            return tuple(known)
+        wanted = tuple(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+        unknown = [f for f in wanted if f not in known]
+        if unknown or not wanted:
+            raise ValueError(f"Unknown fields for {kind}: {', '.join(unknown) or fields!r}")
+        return wanted
+
+    @staticmethod
+    def parse_cursor(cursor: Optional[str]) -> int:
+        """Row offset from an opaque cursor (catalogs only grow by appending, so offsets stay valid)"""
+        if not cursor:
+            return 0
+        try:
+            offset = int(cursor)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        if offset < 0:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        return offset
+
+    def _lookup(self, version: Tuple, kind: str, key: Tuple) -> Optional[ListingPage]:
+        if self._version != version:
+            self._version, self._rows = version, {}
+            self._pages.clear()
+        page = self._pages.get(key)
+        if page is not None:
+            self._pages.move_to_end(key)
+            LISTING_LOOKUPS.inc(kind=kind, result='hit')
+        return page
+
+    def cached(self, recommender, kind: str, fields: Tuple[str, ...], offset: int,
+               limit: Optional[int]) -> Optional[ListingPage]:
+        """The page if it is already encoded for the current catalog, else None (never encodes)"""
+        with self._lock:
+            return self._lookup(self.catalog_version(recommender), kind, (kind, fields, offset, limit))
+
+    def page(self, recommender, kind: str, fields: Tuple[str, ...], offset: int,
+             limit: Optional[int]) -> ListingPage:
+        """Encoded response for `limit` rows from `offset` (all remaining rows when limit is None)"""
+        version = self.catalog_version(recommender)
+        key = (kind, fields, offset, limit)
+        with self._lock:
+            page = self._lookup(version, kind, key)
+            if page is not None:
+                return page
+            LISTING_LOOKUPS.inc(kind=kind, result='miss')
+            rows = self._rows.get((kind, fields))
+            if rows is None:
+                frame = recommender.donor_df if kind == 'donors' else recommender.campaign_df
+                rows = self._rows[(kind, fields)] = EncodedRows(frame, fields, LISTING_FIELDS[kind])
+
+            start = min(offset, len(rows))
+            stop = len(rows) if limit is None else min(len(rows), start + limit)
+            next_cursor = encode_json(str(stop) if stop < len(rows) else None)
+            page = ListingPage(b''.join([
+                b'{"', kind.encode(), b'":', rows.page(start, stop),
+                b',"count":', str(stop - start).encode(), b',"total":', str(len(rows)).encode(),
+                b',"next_cursor":', next_cursor, b',"data_source":"PostgreSQL Database"}',
+            ]))
+            self._pages[key] = page
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+            return page
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, '*' matches any)"""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return '*' in tags or any(t.removeprefix('W/') == etag for t in tags)
@@ -0,0 +1,294 @@
+# metrics.py - Lightweight Prometheus-style metrics and sampled request traces
+
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ML_METRICS_ENABLED=0 turns every timer into a no-op
+ENABLED = os.getenv('ML_METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
+# Fraction of requests that record a per-stage trace (ML_TRACE_SAMPLE_RATE, default off)
+try:
+    TRACE_SAMPLE_RATE = float(os.getenv('ML_TRACE_SAMPLE_RATE', '0'))
+except ValueError:
+    TRACE_SAMPLE_RATE = 0.0
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}' for key, value in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # bucket counts + [sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[-1]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f'{self.name}_bucket{labels} {int(cumulative)}')
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{labels} {int(series[-1])}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {int(series[-1])}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, tuple(labelnames), **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'recommender_request_seconds', 'End-to-end HTTP request latency', ('method', 'path', 'status'))
+STAGE_SECONDS = REGISTRY.histogram(
+    'recommender_stage_seconds', 'Latency of request-path stages', ('endpoint', 'stage'))
+BUILD_STAGE_SECONDS = REGISTRY.histogram(
+    'recommender_build_stage_seconds', 'Latency of model build stages', ('stage',),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0))
+
+
+# ---------------------------------------------------------------------------
+# Sampled per-request traces
+# ---------------------------------------------------------------------------
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('recommender_trace', default=None)
+RECENT_TRACES: deque = deque(maxlen=100)
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.spans: List[Dict] = []
+
+    def add(self, stage: str, start: float, seconds: float):
+        self.spans.append({'stage': stage, 'offset_ms': round((start - self.started) * 1000, 3),
+                           'duration_ms': round(seconds * 1000, 3)})
+
+    def as_dict(self) -> Dict:
+        return {'name': self.name, 'timestamp': self.started_at,
+                'duration_ms': round((time.perf_counter() - self.started) * 1000, 3),
+                'spans': self.spans}
+
+
+def start_trace(name: str):
+    """Begin a trace for this request if it is sampled; returns a token for finish_trace"""
+    if not ENABLED or TRACE_SAMPLE_RATE <= 0 or random.random() >= TRACE_SAMPLE_RATE:
+        return None
+    return _current_trace.set(Trace(name))
+
+
+def finish_trace(token):
+    if token is None:
+        return
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    if trace is not None:
+        RECENT_TRACES.append(trace.as_dict())
+
+
+# ---------------------------------------------------------------------------
+# Timing helpers
+# ---------------------------------------------------------------------------
+
+def _zero() -> float:
+    return 0.0
+
+
+def clock():
+    """perf_counter when metrics are enabled, else a constant (for tight loops)"""
+    return time.perf_counter if ENABLED else _zero
+
+
+# Stage timings recorded in a process-pool worker, sent back with its result (see collected_stages)
+_stage_collector: contextvars.ContextVar = contextvars.ContextVar('recommender_stage_collector', default=None)
+
+
+@contextmanager
+def collected_stages():
+    """
+    Collect the (endpoint, stage, seconds) observed inside the block. A worker process
+    returns them with its result and the parent replays them into its own /metrics.
+    """
+    stages: List[Tuple[str, str, float]] = []
+    token = _stage_collector.set(stages)
+    try:
+        yield stages
+    finally:
+        _stage_collector.reset(token)
+
+
+def replay_stages(stages: Iterable[Tuple[str, str, float]]):
+    """Observe stage timings collected in another process"""
+    for endpoint, stage, seconds in stages:
+        observe_stage(endpoint, stage, seconds)
+
+
+def observe_stage(endpoint: str, stage: str, seconds: float, start: Optional[float] = None):
+    if not ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=stage)
+    collector = _stage_collector.get()
+    if collector is not None:
+        collector.append((endpoint, stage, seconds))
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, start if start is not None else time.perf_counter() - seconds, seconds)
+
+
+def observe_stages(endpoint: str, seconds_by_stage: Dict[str, float]):
+    for stage, seconds in seconds_by_stage.items():
+        observe_stage(endpoint, stage, seconds)
+
+
+@contextmanager
+def _timed_stage(endpoint: str, stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(endpoint, stage, time.perf_counter() - start, start)
+
+
+class _NoopContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopContext()
+
+
+def stage(endpoint: str, name: str):
+    """Context manager timing one request-path stage (no-op when metrics are disabled)"""
+    return _timed_stage(endpoint, name) if ENABLED else _NOOP
+
+
+def observe_build(timings_ms: Dict[str, float]):
+    """Record a finished model build (BuildPipeline.as_dict() timings in ms)"""
+    if not ENABLED:
+        return
+    for name, ms in timings_ms.items():
+        BUILD_STAGE_SECONDS.observe(ms / 1000.0, stage=name)
@@ -2,106 +2,96 @@
 
 import numpy as np
 import pandas as pd
-import requests
 from sklearn.decomposition import NMF
 from sklearn.preprocessing import MinMaxScaler
-from embed_utils_tfidf import compute_tfidf_embeddings, donor_text_fields, donor_numeric_fields, campaign_text_fields, campaign_numeric_fields
+from scipy import sparse
+from scipy.optimize import nnls
+from embed_utils_tfidf import EmbeddingPipeline, join_text_fields, donor_text_fields, donor_numeric_fields, campaign_text_fields, campaign_numeric_fields, default_embedding_mode, make_text_vectorizer
+from embedding_storage import QuantizedRows, default_embedding_precision, factor_dtype, row_norms, store_rows
+from build_pipeline import BuildPipeline, parallel_top_k, default_workers
+from als_engine import ImplicitALS, default_als_epsilon, default_collab_engine
+from item_neighbors import co_contribution_neighbors, default_item_neighbors
+from rule_matcher import rule_table
+from export_loader import EXPORT_KEYS, EXPORT_LOADS, REBUILDS_AVOIDED, ExportLoader, ExportHTTPError
+from catalog_store import CONTRIBUTIONS_COLUMN, append_rows, default_slim_catalog, slim_frame
+import metrics
+import copy
 import warnings
 import os
+import threading
+import time
 warnings.filterwarnings('ignore')
 
+def _versions_key(known_versions):
+    """Hashable identity of a set of export versions (None = unconditional load)"""
+    if known_versions is None:
+        return None
+    return tuple(sorted((name, version.etag, version.digest) for name, version in known_versions.items()))
+
 class DatabaseMLRecommender:
-    def __init__(self, n_components=10, backend_url="http://localhost:5050/api"):
+    def __init__(self, n_components=10, backend_url="http://localhost:5050/api", build_workers=None,
+                 collab_engine=None, embedding_mode=None, embedding_precision=None, slim_catalog=None):
         self.n_components = n_components
         self.backend_url = backend_url
-        self.nmf_model = None
-        self.user_item_matrix = None
+        self.collab_engine = collab_engine or default_collab_engine()
+        self.embedding_mode = embedding_mode or default_embedding_mode()  # 'tfidf' or 'hashing'
+        # Embedding storage: 'float32', 'float64' or 'int8' (QuantizedRows); factors are float32 unless float64
+        self.embedding_precision = embedding_precision or default_embedding_precision()
+        # Compact donor/campaign frames (categoricals, packed text, flattened _count), see catalog_store
+        self.slim_catalog = default_slim_catalog() if slim_catalog is None else slim_catalog
+        self.nmf_model = None  # collaborative model: sklearn NMF or ImplicitALS (same interface)
+        self.user_item_matrix = None  # dense 0-1 interaction strengths (NMF input, scoring normalizer)
+        self.confidence_matrix = None  # ALS input: CSR of raw contributed amounts per donor × campaign
         self.donor_embeddings = None
         self.campaign_embeddings = None
         self.donor_df = None
         self.campaign_df = None
-        self.donor_vectorizer = None
-        self.campaign_vectorizer = None
+        self.donor_pipeline = None  # fitted, immutable EmbeddingPipeline per entity type
+        self.campaign_pipeline = None
         self.scaler = MinMaxScaler()
+        self.interactions_df = pd.DataFrame(columns=['userId', 'campaignId', 'weight'])
+        self.donor_index = {}
+        self.campaign_index = {}
+        self.build_workers = build_workers or default_workers()
+        self.build_timings = {}
+        self.bundle_version = None
+        self._user_factors = {}  # donor row -> NMF factors, folded in on first use
+        self._interaction_max = None
+        self._update_lock = threading.RLock()
+        self.user_factor_matrix = None  # NMF W: trained rows plus folded-in donors
+        self.fitted_donors = 0  # donors / campaigns present at the last (re)fit; later ones are folded in
+        self.fitted_campaigns = 0
+        self.pending_updates = 0  # events / fold-ins since the last (re)fit
+        self.revision = 0  # bumped by every in-place update (events, fold-ins, refits)
+        self.published_revision = 0  # revision the scoring bundle was published at
+        self._growth_buffers = {}
+        self.item_neighbor_idx = None  # campaign row -> top-M co-contribution neighbor rows (-1 padded)
+        self.item_neighbor_scores = None
+        self.export_versions = {}  # export endpoint -> ExportVersion the model was built from
+        self.exports_unchanged = False  # set when a conditional fetch found nothing to rebuild
+        self._deferred = {}  # attribute -> loader run on first access (see defer)
+    
+    def defer(self, name, loader):
+        """Replace attribute `name` by loader(), called on first access (attached bundle state)"""
+        with self._update_lock:
+            self.__dict__.pop(name, None)
+            self._deferred[name] = loader
+    
+    def __getattr__(self, name):
+        deferred = self.__dict__.get('_deferred')
+        if not deferred or name not in deferred:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        with self._update_lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = deferred[name]()
+                deferred.pop(name, None)
+            return self.__dict__[name]
         
-    def load_data_from_backend(self):
-        """Load data from backend API instead of CSV files"""
+    def load_data_from_backend(self, known_versions=None):
+        """Load data from backend API instead of CSV files (see build_model for known_versions)"""
         try:
-            print("🔄 Fetching data from backend API...")
-            
-            # Add retry logic for rate limiting
-            max_retries = 3
-            retry_delay = 2  # seconds
-            
-            for attempt in range(max_retries):
-                try:
-                    # Fetch donors (users)
-                    donors_response = requests.get(f"{self.backend_url}/recommender/export/donors")
-                    if donors_response.status_code == 429:
-                        if attempt < max_retries - 1:
-                            print(f"⚠️  Rate limited (429), retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                            import time
-                            time.sleep(retry_delay)
-                            retry_delay *= 2  # Exponential backoff
-                            continue
-                        else:
-                            raise Exception(f"Rate limited after {max_retries} attempts")
-                    elif donors_response.status_code != 200:
-                        raise Exception(f"Failed to fetch donors: {donors_response.status_code}")
-                    
-                    donors_data = donors_response.json()
-                    self.donor_df = pd.DataFrame(donors_data['donors'])
-                    
-                    # Fetch campaigns
-                    campaigns_response = requests.get(f"{self.backend_url}/recommender/export/campaigns")
-                    if campaigns_response.status_code == 429:
-                        if attempt < max_retries - 1:
-                            print(f"⚠️  Rate limited (429), retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                            import time
-                            time.sleep(retry_delay)
-                            retry_delay *= 2
-                            continue
-                        else:
-                            raise Exception(f"Rate limited after {max_retries} attempts")
-                    elif campaigns_response.status_code != 200:
-                        raise Exception(f"Failed to fetch campaigns: {campaigns_response.status_code}")
-                    
-                    campaigns_data = campaigns_response.json()
-                    self.campaign_df = pd.DataFrame(campaigns_data['campaigns'])
-                    
-                    # Fetch interactions (contributions)
-                    interactions_response = requests.get(f"{self.backend_url}/recommender/export/interactions")
-                    if interactions_response.status_code == 429:
-                        if attempt < max_retries - 1:
-                            print(f"⚠️  Rate limited (429), retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                            import time
-                            time.sleep(retry_delay)
-                            retry_delay *= 2
-                            continue
-                        else:
-                            print("⚠️  Rate limited for interactions, continuing without interaction data")
-                            self.interactions_df = pd.DataFrame(columns=['userId', 'campaignId', 'weight'])
-                    elif interactions_response.status_code != 200:
-                        print("⚠️  No interactions found, using content-based similarity only")
-                        self.interactions_df = pd.DataFrame(columns=['userId', 'campaignId', 'weight'])
-                    else:
-                        interactions_data = interactions_response.json()
-                        self.interactions_df = pd.DataFrame(interactions_data['interactions'])
-                    
-                    # If we get here, all requests succeeded
-                    break
-                    
-                except Exception as e:
-                    if attempt < max_retries - 1:
-                        print(f"⚠️  Request failed, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                        import time
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                    else:
-                        raise e
-            
-            if len(self.donor_df) == 0 or len(self.campaign_df) == 0:
-                raise Exception("No donors or campaigns found in database")
+            if not self._fetch_exports(known_versions):
+                return False
             
             # Create embeddings
             self._create_embeddings()
@@ -118,25 +108,159 @@ class DatabaseMLRecommender:
             print(f"❌ Error loading data from backend: {e}")
             return False
     
-    def _create_embeddings(self):
-        """Create TF-IDF embeddings for donors and campaigns"""
-        # Combine all text for fitting a single vectorizer
-        donor_text = self.donor_df[donor_text_fields()].fillna("").agg(" ".join, axis=1).tolist()
-        campaign_text = self.campaign_df[campaign_text_fields()].fillna("").agg(" ".join, axis=1).tolist()
-        all_text = donor_text + campaign_text
+    def build_model(self, known_versions=None, previous=None):
+        """
+        Run the full model build as a staged pipeline:
+        fetch → indexes → embeddings → interaction matrix → item neighbors → NMF/ALS
         
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        shared_vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-        shared_vectorizer.fit(all_text)
+        Donor and campaign embedding transforms run concurrently, and the
+        per-donor similarity top-k used for synthetic interactions is chunked
+        across a process pool. Per-stage timings (ms) end up in self.build_timings.
         
-        # Get numeric fields and pad to match dimensions
-        donor_numeric = donor_numeric_fields()
-        campaign_numeric = campaign_numeric_fields()
-        donor_pad = len(campaign_numeric) - len(donor_numeric)
-        campaign_pad = len(donor_numeric) - len(campaign_numeric)
+        known_versions: export_versions of the model being refreshed. The exports
+        are then fetched conditionally, and when none of them changed nothing is
+        parsed, embedded or retrained: exports_unchanged is set and False returned.
         
-        donor_numeric_full = donor_numeric + [f"_pad_{i}" for i in range(donor_pad)] if donor_pad > 0 else donor_numeric
-        campaign_numeric_full = campaign_numeric + [f"_pad_{i}" for i in range(campaign_pad)] if campaign_pad > 0 else campaign_numeric
+        previous: the model being refreshed. When only some exports changed, the
+        others (answered 304) are copied from its frames instead of downloaded
+        again; without it they are refetched in full.
+        
+        Returns: True if data was loaded and the model built
+        """
+        pipeline = BuildPipeline(self.build_workers)
+        try:
+            with pipeline.stage('fetch'):
+                if not self._fetch_exports(known_versions, previous):
+                    return False
+            
+            self._create_embeddings(pipeline)
+            print(f"✅ Loaded {len(self.donor_df)} donors and {len(self.campaign_df)} campaigns from database")
+            
+            with pipeline.stage('interaction_matrix'):
+                self.create_interaction_matrix(sparsity=0.7)
+            with pipeline.stage('item_neighbors'):
+                self.build_item_neighbors()
+            with pipeline.stage(f'fit_{self.collab_engine}'):
+                self.fit_collaborative()
+            return True
+            
+        except Exception as e:
+            print(f"❌ Model build failed: {e}")
+            return False
+        finally:
+            self.build_timings = pipeline.as_dict()
+            metrics.observe_build(self.build_timings)
+            pipeline.report()
+    
+    def _fetch_exports(self, known_versions=None, previous=None):
+        """
+        Fetch donors, campaigns and interactions exports (raises on failure)
+        
+        With known_versions the requests carry the previous validators. Returns
+        False, leaving the frames untouched, when every export is unchanged.
+        Concurrent loads of the same backend and versions (startup, /refresh)
+        share one set of transfers.
+        """
+        key = (self.backend_url, _versions_key(known_versions))
+        (frames, versions), shared = EXPORT_LOADS.do(key, lambda: self._load_exports(known_versions, previous))
+        if frames is None:
+            self.exports_unchanged = True
+            REBUILDS_AVOIDED.inc()
+            print("✅ Backend exports unchanged since the last build, nothing to rebuild")
+            return False
+        if shared:
+            # The leading load's model owns those frames (contribution events update them in place)
+            frames = tuple(frame.copy() for frame in frames)
+        
+        self.donor_df, self.campaign_df, self.interactions_df = frames
+        self.export_versions = dict(versions)
+        if len(self.donor_df) == 0 or len(self.campaign_df) == 0:
+            raise Exception("No donors or campaigns found in database")
+        return True
+    
+    def _load_exports(self, known_versions, previous=None):
+        """((donors, campaigns, interactions) or None when nothing changed, export versions)"""
+        print("🔄 Fetching data from backend API...")
+        
+        # Responses are streamed straight into columnar buffers, page by page; every page
+        # request is rate limited and retried on its own (honoring Retry-After)
+        loader = ExportLoader(self.backend_url)
+        known = known_versions or {}
+        
+        donor_df = self._fetch_export(loader, 'donors', known.get('donors'))
+        campaign_df = self._fetch_export(loader, 'campaigns', known.get('campaigns'))
+        interactions_df = self._fetch_interactions(loader, known.get('interactions'))
+        
+        if known_versions is not None and all(loader.unchanged(name, known.get(name)) for name in EXPORT_KEYS):
+            return None, dict(loader.versions)
+        
+        # Something changed: exports answered 304 come from the serving model's frames
+        # (copied, its events keep updating them); only a cold start downloads them again
+        if donor_df is None:
+            donor_df = self._previous_frame(previous, 'donor_df', lambda: self._fetch_export(loader, 'donors'))
+        if campaign_df is None:
+            campaign_df = self._previous_frame(previous, 'campaign_df', lambda: self._fetch_export(loader, 'campaigns'))
+        if interactions_df is None:
+            interactions_df = self._previous_frame(previous, 'interactions_df', lambda: self._fetch_interactions(loader))
+        return (donor_df, campaign_df, interactions_df), dict(loader.versions)
+    
+    @staticmethod
+    def _previous_frame(previous, attr, fetch):
+        """Copy of previous.<attr> for an export answered 304, or fetch() when there is none"""
+        frame = getattr(previous, attr, None)
+        return fetch() if frame is None else frame.copy()
+    
+    def _fetch_export(self, loader, endpoint, known=None):
+        try:
+            return loader.fetch(endpoint, known=known)
+        except ExportHTTPError as e:
+            if e.status_code == 429:
+                raise Exception(f"Rate limited after {loader.retries + 1} attempts")
+            raise
+    
+    def _fetch_interactions(self, loader, known=None):
+        """Interactions export; missing, or still rate-limited after the retries, means no interaction data"""
+        try:
+            return loader.fetch('interactions', columns=['userId', 'campaignId', 'weight'], known=known)
+        except ExportHTTPError as e:
+            if e.status_code == 429:
+                print("⚠️  Rate limited for interactions, continuing without interaction data")
+            else:
+                print("⚠️  No interactions found, using content-based similarity only")
+            return pd.DataFrame(columns=['userId', 'campaignId', 'weight'])
+    
+    def _build_indexes(self):
+        """Map donor / campaign ids to their row positions (first occurrence wins)"""
+        self.donor_index = {}
+        for idx, donor_id in enumerate(self.donor_df['id']):
+            self.donor_index.setdefault(donor_id, idx)
+        self.campaign_index = {}
+        for idx, campaign_id in enumerate(self.campaign_df['id']):
+            self.campaign_index.setdefault(campaign_id, idx)
+    
+    def _create_embeddings(self, pipeline=None):
+        """Create TF-IDF (or hashed TF-IDF, see embedding_mode) embeddings for donors and campaigns"""
+        pipeline = pipeline or BuildPipeline(self.build_workers)
+        
+        if self.slim_catalog:
+            with pipeline.stage('catalog'):
+                self.donor_df = slim_frame(self.donor_df)
+                self.campaign_df = slim_frame(self.campaign_df)
+        
+        with pipeline.stage('indexes'):
+            self._build_indexes()
+        
+        with pipeline.stage('text_assembly'):
+            # Documents are assembled once per build and reused for the fit and both transforms
+            donor_text = join_text_fields(self.donor_df, donor_text_fields())
+            campaign_text = join_text_fields(self.campaign_df, campaign_text_fields())
+        
+        with pipeline.stage('vectorizer_fit'):
+            # Fit a single vectorizer on all text
+            shared_vectorizer = make_text_vectorizer(self.embedding_mode, self.build_workers)
+            shared_vectorizer.fit(donor_text + campaign_text)
+        
+        donor_numeric_full, campaign_numeric_full = self._numeric_columns()
         
         # Add dummy columns if needed
         for col in donor_numeric_full:
@@ -146,22 +270,63 @@ class DatabaseMLRecommender:
             if col not in self.campaign_df.columns:
                 self.campaign_df[col] = 0.0
         
-        # Create embeddings
-        self.donor_embeddings, _ = compute_tfidf_embeddings(
-            self.donor_df,
-            text_fields=donor_text_fields(),
-            numeric_fields=donor_numeric_full,
-            fit_vectorizer=shared_vectorizer
-        )
-        self.campaign_embeddings, _ = compute_tfidf_embeddings(
-            self.campaign_df,
-            text_fields=campaign_text_fields(),
-            numeric_fields=campaign_numeric_full,
-            fit_vectorizer=shared_vectorizer
-        )
+        donor_pipeline = EmbeddingPipeline.fit(self.donor_df, donor_text_fields(), donor_numeric_full,
+                                               shared_vectorizer)
+        campaign_pipeline = EmbeddingPipeline.fit(self.campaign_df, campaign_text_fields(), campaign_numeric_full,
+                                                  shared_vectorizer)
         
-        self.donor_vectorizer = shared_vectorizer
-        self.campaign_vectorizer = shared_vectorizer
+        # Donor and campaign transforms are independent - run them concurrently
+        results = pipeline.run_concurrent({
+            'donor_embeddings': lambda: donor_pipeline.transform(self.donor_df, donor_text),
+            'campaign_embeddings': lambda: campaign_pipeline.transform(self.campaign_df, campaign_text),
+        })
+        self.donor_embeddings = store_rows(results['donor_embeddings'], self.embedding_precision)
+        self.campaign_embeddings = store_rows(results['campaign_embeddings'], self.embedding_precision)
+        
+        self.donor_pipeline = donor_pipeline
+        self.campaign_pipeline = campaign_pipeline
+    
+    @property
+    def donor_vectorizer(self):
+        return self.donor_pipeline.vectorizer if self.donor_pipeline is not None else None
+    
+    @property
+    def campaign_vectorizer(self):
+        return self.campaign_pipeline.vectorizer if self.campaign_pipeline is not None else None
+    
+    def _embed_new_rows(self, new_df, pipeline):
+        """
+        Embed folded-in rows with a stored pipeline (build-time numeric ranges). In
+        hashing mode their text first joins the document frequencies, which both
+        pipelines then share.
+        """
+        pipeline = pipeline.with_documents(new_df)
+        self.donor_pipeline = self.donor_pipeline.with_vectorizer(pipeline.vectorizer)
+        self.campaign_pipeline = self.campaign_pipeline.with_vectorizer(pipeline.vectorizer)
+        return pipeline.transform(new_df)
+    
+    @staticmethod
+    def _numeric_columns():
+        """Donor / campaign numeric fields, padded to the same length so embeddings align"""
+        donor_numeric = donor_numeric_fields()
+        campaign_numeric = campaign_numeric_fields()
+        donor_pad = len(campaign_numeric) - len(donor_numeric)
+        campaign_pad = len(donor_numeric) - len(campaign_numeric)
+        
+        donor_numeric_full = donor_numeric + [f"_pad_{i}" for i in range(donor_pad)] if donor_pad > 0 else donor_numeric
+        campaign_numeric_full = campaign_numeric + [f"_pad_{i}" for i in range(campaign_pad)] if campaign_pad > 0 else campaign_numeric
+        return donor_numeric_full, campaign_numeric_full
+    
+    def _donor_rule_groups(self):
+        """Bio keyword rule group per donor (see rule_matcher.DEFAULT_RULES), -1 none"""
+        bios = self.donor_df['bio'] if 'bio' in self.donor_df.columns else [None] * len(self.donor_df)
+        return rule_table().donor_groups(bios)
+    
+    def _campaign_rule_boosts(self, boost=0.3):
+        """(n_groups, n_campaigns) keyword boost applied to donors of each bio group"""
+        empty = [''] * len(self.campaign_df)
+        return rule_table().campaign_boosts(self.campaign_df.get('category', empty),
+                                            self.campaign_df.get('title', empty), boost)
     
     def create_interaction_matrix(self, sparsity=0.8):
         """Create interaction matrix from real contributions or content similarity"""
@@ -169,95 +334,52 @@ class DatabaseMLRecommender:
         n_campaigns = len(self.campaign_df)
         print(f"🔄 Creating interaction matrix for {n_donors} donors × {n_campaigns} campaigns...")
         
+        if not self.donor_index or not self.campaign_index:
+            self._build_indexes()
+        
         interactions = np.zeros((n_donors, n_campaigns))
         
         if len(self.interactions_df) > 0:
             # Use real contribution data
             print("📊 Using real contribution data for interactions")
-            for _, row in self.interactions_df.iterrows():
-                donor_idx = self.donor_df[self.donor_df['id'] == row['userId']].index
-                campaign_idx = self.campaign_df[self.campaign_df['id'] == row['campaignId']].index
-                
-                if len(donor_idx) > 0 and len(campaign_idx) > 0:
-                    # Normalize contribution amount to 0-1 range
-                    weight = min(row['weight'] / 1000, 1.0)  # Cap at 1000 for normalization
-                    interactions[donor_idx[0], campaign_idx[0]] = weight
-        else:
+            donor_rows = self.interactions_df['userId'].map(self.donor_index)
+            campaign_rows = self.interactions_df['campaignId'].map(self.campaign_index)
+            known = (donor_rows.notna() & campaign_rows.notna()).to_numpy()
+            
+            # Normalize contribution amount to 0-1 range (cap at 1000)
+            weights = pd.to_numeric(self.interactions_df['weight'], errors='coerce').fillna(0).to_numpy(dtype=float)
+            interactions[donor_rows[known].astype(int).to_numpy(),
+                         campaign_rows[known].astype(int).to_numpy()] = np.minimum(weights[known] / 1000, 1.0)
+        elif n_campaigns > 0:
             # Create content-based interactions using TF-IDF similarity + keyword boost
             print("📊 Creating content-based interactions using TF-IDF similarity + keyword boost")
             
-            for i in range(n_donors):
-                donor_emb = self.donor_embeddings[i]
-                donor_bio = self.donor_df.iloc[i]['bio'].lower() if self.donor_df.iloc[i]['bio'] else ""
-                donor_name = self.donor_df.iloc[i]['name'].lower()
-                donor_similarities = []
-                
-                for j in range(n_campaigns):
-                    campaign_emb = self.campaign_embeddings[j]
-                    campaign_category = self.campaign_df.iloc[j].get('category', '').lower()
-                    campaign_title = self.campaign_df.iloc[j].get('title', '').lower()
-                    campaign_desc = self.campaign_df.iloc[j].get('description', '').lower()
-                    
-                    # Calculate TF-IDF similarity
-                    try:
-                        tfidf_similarity = np.dot(donor_emb, campaign_emb) / (np.linalg.norm(donor_emb) * np.linalg.norm(campaign_emb))
-                        if np.isnan(tfidf_similarity) or np.isinf(tfidf_similarity):
-                            tfidf_similarity = 0.0
-                    except:
-                        tfidf_similarity = 0.0
-                    
-                    # Calculate keyword-based similarity boost
-                    keyword_boost = 0.0
-                    
-                    # Simple keyword matching for better category alignment
-                    if 'teacher' in donor_bio or 'education' in donor_bio:
-                        if 'education' in campaign_category or 'technology' in campaign_category or 'smart' in campaign_title:
-                            keyword_boost = 0.3
-                    elif 'doctor' in donor_bio or 'health' in donor_bio:
-                        if 'health' in campaign_category or 'fitness' in campaign_category or 'dental' in campaign_title:
-                            keyword_boost = 0.3
-                    elif 'fashion' in donor_bio or 'style' in donor_bio or 'creativity' in donor_bio:
-                        if 'fashion' in campaign_category or 'art' in campaign_category or 'film' in campaign_category:
-                            keyword_boost = 0.3
-                    
-                    # Combine TF-IDF similarity with keyword boost
-                    combined_similarity = tfidf_similarity + keyword_boost
-                    
-                    donor_similarities.append((j, combined_similarity))
-                
-                # Sort by combined similarity and create interactions for top matches
-                donor_similarities.sort(key=lambda x: x[1], reverse=True)
-                
-                # Create interactions for top 5 most similar campaigns per user
-                for rank, (campaign_idx, similarity) in enumerate(donor_similarities[:5]):
-                    # Create interaction even for low similarity to ensure NMF has data
-                    interaction_strength = max(0.1, similarity)  # Minimum 0.1 strength
-                    interactions[i, campaign_idx] = interaction_strength
+            # Top 5 campaigns per donor by similarity + bio/category keyword boost
+            top_idx, top_scores = parallel_top_k(
+                self.donor_embeddings, self.campaign_embeddings, k=5,
+                donor_groups=self._donor_rule_groups(),
+                group_boosts=self._campaign_rule_boosts(),
+                max_workers=self.build_workers
+            )
+            rows = np.repeat(np.arange(n_donors), top_idx.shape[1])
+            # Create interaction even for low similarity to ensure NMF has data (minimum 0.1 strength)
+            interactions[rows, top_idx.ravel()] = np.maximum(0.1, top_scores.ravel())
         
         # Ensure we have at least some interactions for NMF to work
-        if np.count_nonzero(interactions) == 0:
+        if np.count_nonzero(interactions) == 0 and n_campaigns > 0:
             print("⚠️  No interactions found, creating synthetic interactions for NMF training")
-            # Create interactions for each donor with their most similar campaigns
-            for i in range(n_donors):
-                donor_emb = self.donor_embeddings[i]
-                similarities = []
-                
-                for j in range(n_campaigns):
-                    campaign_emb = self.campaign_embeddings[j]
-                    try:
-                        similarity = np.dot(donor_emb, campaign_emb) / (np.linalg.norm(donor_emb) * np.linalg.norm(campaign_emb))
-                        if np.isnan(similarity) or np.isinf(similarity):
-                            similarity = 0.0
-                    except:
-                        similarity = 0.0
-                    similarities.append((j, similarity))
-                
-                # Sort and create interactions for top 3
-                similarities.sort(key=lambda x: x[1], reverse=True)
-                for rank, (campaign_idx, similarity) in enumerate(similarities[:3]):
-                    interactions[i, campaign_idx] = 0.3 + (similarity * 0.4)  # Range: 0.3-0.7
+            # Create interactions for each donor with their top 3 most similar campaigns
+            top_idx, top_scores = parallel_top_k(
+                self.donor_embeddings, self.campaign_embeddings, k=3,
+                max_workers=self.build_workers
+            )
+            rows = np.repeat(np.arange(n_donors), top_idx.shape[1])
+            interactions[rows, top_idx.ravel()] = 0.3 + (top_scores.ravel() * 0.4)  # Range: 0.3-0.7
         
         self.user_item_matrix = interactions
+        if self.collab_engine == 'als':
+            self.confidence_matrix = self._confidence_from_interactions()
+        self._reset_factor_cache()
         print(f"✅ Created interaction matrix: {self.user_item_matrix.shape}")
         print(f"   Non-zero interactions: {np.count_nonzero(self.user_item_matrix)}")
         print(f"   Sparsity: {(self.user_item_matrix == 0).sum() / self.user_item_matrix.size:.2%}")
@@ -266,6 +388,126 @@ class DatabaseMLRecommender:
         print(f"   Mean value: {np.mean(self.user_item_matrix):.3f}")
         return self.user_item_matrix
     
+    def _confidence_from_interactions(self):
+        """
+        ALS input: the raw amounts of the real contributions summed per donor × campaign (so
+        repeat contributions add up instead of being capped at 1000) in a CSR matrix that
+        never densifies. None without real contributions: ALS then fits the synthetic
+        interactions of the dense matrix.
+        """
+        n_donors, n_campaigns = len(self.donor_df), len(self.campaign_df)
+        if len(self.interactions_df) == 0:
+            return None
+        donor_rows = self.interactions_df['userId'].map(self.donor_index)
+        campaign_rows = self.interactions_df['campaignId'].map(self.campaign_index)
+        amounts = pd.to_numeric(self.interactions_df['weight'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        known = (donor_rows.notna() & campaign_rows.notna()).to_numpy() & (amounts > 0)
+        if not known.any():
+            return None
+        # COO → CSR sums duplicate cells
+        return sparse.csr_matrix(
+            (amounts[known], (donor_rows[known].astype(int).to_numpy(), campaign_rows[known].astype(int).to_numpy())),
+            shape=(n_donors, n_campaigns))
+    
+    def _als_input(self):
+        """Matrix ALS folds in against: the confidence matrix, or the dense one when ALS fitted synthetic interactions"""
+        return self.confidence_matrix if self.confidence_matrix is not None else self.user_item_matrix
+    
+    def _grow_confidence(self, shape):
+        """Confidence matrix widened to `shape` with empty rows / columns (indices are unchanged)"""
+        matrix = self.confidence_matrix
+        indptr = np.concatenate([matrix.indptr, np.full(shape[0] - matrix.shape[0], matrix.indptr[-1])])
+        self.confidence_matrix = sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=shape)
+    
+    def build_item_neighbors(self, top_m=None):
+        """
+        Precompute each campaign's top-M co-contribution neighbors from the real
+        contributions in interactions_df (synthetic interactions are not used)
+        """
+        if not self.donor_index or not self.campaign_index:
+            self._build_indexes()
+        top_m = top_m or default_item_neighbors()
+        
+        donor_rows = self.interactions_df['userId'].map(self.donor_index)
+        campaign_rows = self.interactions_df['campaignId'].map(self.campaign_index)
+        known = (donor_rows.notna() & campaign_rows.notna()).to_numpy()
+        self.item_neighbor_idx, self.item_neighbor_scores = co_contribution_neighbors(
+            donor_rows[known].astype(int).to_numpy(), campaign_rows[known].astype(int).to_numpy(),
+            len(self.donor_df), len(self.campaign_df), top_m
+        )
+        linked = int(np.count_nonzero(self.item_neighbor_idx[:, 0] >= 0)) if len(self.item_neighbor_idx) else 0
+        print(f"✅ Item neighbors: top-{top_m} for {linked}/{len(self.campaign_df)} campaigns with co-backers")
+        return self.item_neighbor_idx
+    
+    def similar_campaigns(self, campaign_id, top_n=10):
+        """
+        Campaigns most often co-funded with campaign_id, read from the precomputed
+        neighbor lists (index lookup + row slice, independent of catalog size)
+        
+        Returns: list of {campaign_id, title, category, similarity_score} best first,
+                 or None for an unknown campaign
+        """
+        campaign_idx = self.campaign_index.get(campaign_id)
+        if campaign_idx is None:
+            return None
+        if self.item_neighbor_idx is None or campaign_idx >= len(self.item_neighbor_idx):
+            return []  # folded in after the last build: no co-contributions yet
+        
+        neighbors = self.item_neighbor_idx[campaign_idx, :top_n]
+        scores = self.item_neighbor_scores[campaign_idx, :top_n]
+        columns = [self.campaign_df.columns.get_loc(c) for c in ('id', 'title', 'category')]
+        similar = []
+        for neighbor, score in zip(neighbors, scores):
+            if neighbor < 0:
+                break
+            neighbor_id, title, category = (self.campaign_df.iat[neighbor, c] for c in columns)
+            similar.append({
+                'campaign_id': neighbor_id,
+                'title': title,
+                'category': category,
+                'similarity_score': float(score)
+            })
+        return similar
+    
+    def fit_collaborative(self):
+        """Train the configured collaborative engine ('nmf' or 'als')"""
+        return self.fit_als() if self.collab_engine == 'als' else self.fit_nmf()
+    
+    def fit_als(self):
+        """Train implicit-feedback ALS on the sparse confidence matrix (raw contributed amounts)"""
+        if self.user_item_matrix is None:
+            raise ValueError("Interaction matrix not created.")
+        
+        print("🔄 Training implicit ALS model...")
+        
+        # Raw amounts get log-scaled confidence; synthetic 0-1 interactions the linear one
+        raw = self.confidence_matrix is not None
+        matrix = self.confidence_matrix if raw else sparse.csr_matrix(self.user_item_matrix)
+        non_zero_count = matrix.count_nonzero()
+        if non_zero_count < 4:
+            print("⚠️  Very few interactions, using content-based fallback")
+            return None
+        
+        n_donors, n_campaigns = matrix.shape
+        model = ImplicitALS(n_components=min(self.n_components, n_donors, n_campaigns),
+                            n_workers=self.build_workers, epsilon=default_als_epsilon() if raw else None)
+        try:
+            start = time.perf_counter()
+            user_factors = model.fit_transform(matrix)
+        except Exception as e:
+            print(f"❌ ALS training failed: {e}")
+            return None
+        
+        self.nmf_model = model
+        self.user_factor_matrix = user_factors
+        self._store_factors()
+        self.fitted_donors, self.fitted_campaigns = n_donors, n_campaigns
+        self.pending_updates = 0
+        self._reset_factor_cache()
+        print(f"✅ ALS model fitted with {model.n_components_} factors over {non_zero_count} interactions")
+        print(f"   {model.n_iter_} iterations in {time.perf_counter() - start:.2f}s")
+        return model
+    
     def fit_nmf(self):
         """Train NMF model on interaction matrix"""
         if self.user_item_matrix is None:
@@ -299,7 +541,10 @@ class DatabaseMLRecommender:
         )
         
         try:
-            self.nmf_model.fit(matrix_normalized)
+            self.user_factor_matrix = self.nmf_model.fit_transform(matrix_normalized)
+            self.fitted_donors, self.fitted_campaigns = matrix_normalized.shape
+            self.pending_updates = 0
+            self._reset_factor_cache()
             
             # Check if model converged properly
             reconstructed = self.nmf_model.inverse_transform(self.nmf_model.transform(matrix_normalized))
@@ -314,13 +559,331 @@ class DatabaseMLRecommender:
             if np.all(test_predictions == 0):
                 print("⚠️  NMF model produced all-zero predictions, using content-based fallback")
                 return None
-                
+            
+            self._store_factors()
             return self.nmf_model
             
         except Exception as e:
             print(f"❌ NMF training failed: {e}")
             return None
     
+    def _reset_factor_cache(self):
+        self._user_factors = {}
+        self._interaction_max = None
+    
+    def _store_factors(self):
+        """Keep W and H in the storage precision (see embedding_storage.factor_dtype)"""
+        dtype = factor_dtype(self.embedding_precision)
+        if self.user_factor_matrix is not None:
+            self.user_factor_matrix = np.asarray(self.user_factor_matrix, dtype=dtype)
+        if self.nmf_model is not None and self.nmf_model.components_ is not None:
+            self.nmf_model.components_ = np.asarray(self.nmf_model.components_, dtype=dtype)
+    
+    def user_factors_for(self, donor_idx):
+        """
+        NMF factors (1 × k) for one donor row, folded in against the frozen components
+        and cached until the row changes (ALS folds in the donor's confidence row)
+        """
+        factors = self._user_factors.get(donor_idx)
+        if factors is None:
+            if isinstance(self.nmf_model, ImplicitALS):
+                row = self._als_input()[[donor_idx]]
+            else:
+                # sklearn's NMF.transform wants the input in the components' dtype
+                row = self.user_item_matrix[[donor_idx]].astype(self.nmf_model.components_.dtype, copy=False)
+            factors = self.nmf_model.transform(row)
+            self._user_factors[donor_idx] = factors
+        return factors
+    
+    def max_interaction(self):
+        """Largest interaction strength (collaborative score normalizer), cached"""
+        if self._interaction_max is None:
+            self._interaction_max = float(np.max(self.user_item_matrix)) if self.user_item_matrix is not None else 0.0
+        return self._interaction_max
+    
+    def apply_contributions(self, events):
+        """
+        Apply contribution events in place without retraining.
+        
+        Each event ({'userId', 'campaignId', 'amount'}) bumps the campaign's contribution
+        count and currentAmount, adds the amount to the donor's interaction cell (same
+        amount/1000 scale, capped at 1.0 as create_interaction_matrix) and re-folds that
+        donor into NMF factor space. Donors not seen at build time are folded in first;
+        events for unknown campaigns are skipped.
+        
+        Returns: dict with the affected 'users' and 'campaigns' and the count of 'unknown' events
+        """
+        users, campaigns, unknown = set(), set(), 0
+        with self._update_lock:
+            new_donors = {event.get('userId') for event in events
+                          if event.get('userId') and event.get('userId') not in self.donor_index
+                          and event.get('campaignId') in self.campaign_index}
+            if new_donors:
+                self.fold_in_donors([{'id': user_id} for user_id in new_donors])
+            
+            if self.user_item_matrix is not None and not self.user_item_matrix.flags.writeable:
+                # Attached bundle arrays are read-only; this worker keeps a private copy
+                self.user_item_matrix = np.array(self.user_item_matrix)
+            confidence_cells = []
+            
+            for event in events:
+                user_id, campaign_id = event.get('userId'), event.get('campaignId')
+                amount = float(event.get('amount') or 0)
+                campaign_idx = self.campaign_index.get(campaign_id)
+                if campaign_idx is None:
+                    unknown += 1
+                    continue
+                
+                # Trending inputs: contribution count and funding progress
+                if CONTRIBUTIONS_COLUMN in self.campaign_df:
+                    self.campaign_df.at[campaign_idx, CONTRIBUTIONS_COLUMN] += 1
+                else:
+                    counts = self.campaign_df.at[campaign_idx, '_count'] if '_count' in self.campaign_df else None
+                    counts = dict(counts) if isinstance(counts, dict) else {}
+                    counts['contributions'] = counts.get('contributions', 0) + 1
+                    self.campaign_df.at[campaign_idx, '_count'] = counts
+                if 'currentAmount' in self.campaign_df:
+                    current = pd.to_numeric(self.campaign_df.at[campaign_idx, 'currentAmount'], errors='coerce')
+                    self.campaign_df.at[campaign_idx, 'currentAmount'] = (0.0 if pd.isna(current) else float(current)) + amount
+                campaigns.add(campaign_id)
+                
+                donor_idx = self.donor_index.get(user_id)
+                if donor_idx is None or self.user_item_matrix is None:
+                    unknown += 1
+                    continue
+                cell = min(self.user_item_matrix[donor_idx, campaign_idx] + amount / 1000, 1.0)
+                self.user_item_matrix[donor_idx, campaign_idx] = cell
+                confidence_cells.append((donor_idx, campaign_idx, amount))
+                if self._interaction_max is not None:
+                    self._interaction_max = max(self._interaction_max, cell)
+                self._user_factors.pop(donor_idx, None)
+                users.add(user_id)
+                self.pending_updates += 1
+            
+            if self.confidence_matrix is not None and confidence_cells:
+                # Raw amounts add up; one sparse add per batch, swapped in for in-flight readers
+                donor_rows, campaign_rows, amounts = (np.array(part) for part in zip(*confidence_cells))
+                self.confidence_matrix = self.confidence_matrix + sparse.csr_matrix(
+                    (amounts, (donor_rows, campaign_rows)), shape=self.confidence_matrix.shape)
+            
+            if self.nmf_model is not None:
+                # One alternating step: folded-in campaign columns first, then the donors against them
+                for campaign_id in campaigns:
+                    if self.campaign_index[campaign_id] >= self.fitted_campaigns:
+                        self._fold_in_campaign_factors(self.campaign_index[campaign_id])
+                for user_id in users:
+                    self._refold_donor(self.donor_index[user_id])
+            if campaigns:
+                self.revision += 1
+        
+        return {'users': users, 'campaigns': campaigns, 'unknown': unknown}
+    
+    # ------------------------------------------------------------------
+    # Fold-in of donors / campaigns added after the last fit
+    # ------------------------------------------------------------------
+    
+    def _grow_array(self, name, shape):
+        """
+        Resize array attribute `name` to `shape` (only growing), keeping its contents.
+        
+        The attribute becomes a view into a buffer over-allocated by doubling, so
+        appending one row or column at a time costs amortized O(row) instead of
+        copying the whole array.
+        """
+        current = getattr(self, name)
+        if isinstance(current, QuantizedRows):
+            # Codes and per-row scales grow in their own buffers
+            grown = QuantizedRows(self._grow_buffer(f'{name}.codes', current.codes, shape),
+                                  self._grow_buffer(f'{name}.scales', current.scales, shape[:1]))
+        else:
+            grown = self._grow_buffer(name, current, shape)
+        setattr(self, name, grown)
+        return grown
+    
+    def _grow_buffer(self, key, current, shape):
+        buffer = self._growth_buffers.get(key)
+        if buffer is None or current.base is not buffer:
+            buffer = None
+        if buffer is None or any(s > b for s, b in zip(shape, buffer.shape)):
+            reserved = buffer.shape if buffer is not None else current.shape
+            capacity = tuple(max(new, 2 * old, 8) if new > held else held
+                             for new, old, held in zip(shape, current.shape, reserved))
+            buffer = np.zeros(capacity, dtype=current.dtype)
+            buffer[tuple(slice(0, n) for n in current.shape)] = current
+            self._growth_buffers[key] = buffer
+        return buffer[tuple(slice(0, n) for n in shape)]
+    
+    def _append_rows(self, frame, new_df):
+        """Catalog frame with folded-in rows appended (kept compact when slim_catalog is on)"""
+        if self.slim_catalog:
+            return append_rows(frame, new_df)
+        return pd.concat([frame, new_df], ignore_index=True)
+    
+    def fold_in_donors(self, donors):
+        """
+        Add donors (export rows with at least 'id') without retraining.
+        
+        Embeddings use the fitted embedding pipeline; each donor gets an empty interaction row
+        and NMF factors folded in against the frozen components once contributions arrive.
+        
+        Returns: ids that were added (already known ids are skipped)
+        """
+        with self._update_lock:
+            rows = [dict(d) for d in donors if d.get('id') is not None and d['id'] not in self.donor_index]
+            rows = list({row['id']: row for row in rows}.values())
+            if not rows:
+                return []
+            new_df = pd.DataFrame(rows)
+            embeddings = self._embed_new_rows(new_df, self.donor_pipeline)
+            
+            start = len(self.donor_df)
+            self.donor_df = self._append_rows(self.donor_df, new_df)
+            n_donors = len(self.donor_df)
+            self._grow_array('donor_embeddings', (n_donors, self.donor_embeddings.shape[1]))[start:] = embeddings
+            if self.user_item_matrix is not None:
+                self._grow_array('user_item_matrix', (n_donors, self.user_item_matrix.shape[1]))
+            if self.confidence_matrix is not None:
+                self._grow_confidence((n_donors, self.confidence_matrix.shape[1]))
+            if self.user_factor_matrix is not None:
+                self._grow_array('user_factor_matrix', (n_donors, self.user_factor_matrix.shape[1]))
+            for offset, row in enumerate(rows):
+                self.donor_index[row['id']] = start + offset
+            self.pending_updates += len(rows)
+            self.revision += 1
+            return [row['id'] for row in rows]
+    
+    def fold_in_campaigns(self, campaigns):
+        """
+        Add campaigns (export rows) without retraining.
+        
+        Each campaign gets an embedding from the fitted embedding pipeline, an empty interaction
+        column and an NMF component column; the column is re-solved by non-negative least
+        squares against the user factors as contributions arrive.
+        
+        Returns: ids that were added (already known ids are skipped)
+        """
+        with self._update_lock:
+            rows = [dict(c) for c in campaigns if c.get('id') is not None and c['id'] not in self.campaign_index]
+            rows = list({row['id']: row for row in rows}.values())
+            if not rows:
+                return []
+            new_df = pd.DataFrame(rows)
+            embeddings = self._embed_new_rows(new_df, self.campaign_pipeline)
+            
+            start = len(self.campaign_df)
+            self.campaign_df = self._append_rows(self.campaign_df, new_df)
+            n_campaigns = len(self.campaign_df)
+            self._grow_array('campaign_embeddings', (n_campaigns, self.campaign_embeddings.shape[1]))[start:] = embeddings
+            if self.user_item_matrix is not None:
+                self._grow_array('user_item_matrix', (self.user_item_matrix.shape[0], n_campaigns))
+            if self.confidence_matrix is not None:
+                self._grow_confidence((self.confidence_matrix.shape[0], n_campaigns))
+            if self.nmf_model is not None:
+                components = self.nmf_model.components_
+                grown = np.zeros((components.shape[0], n_campaigns), dtype=components.dtype)
+                grown[:, :components.shape[1]] = components
+                # Swap in a widened copy of the model: in-flight readers keep the previous one
+                model = copy.copy(self.nmf_model)
+                model.components_ = grown
+                model.n_features_in_ = n_campaigns
+                self.nmf_model = model
+            for offset, row in enumerate(rows):
+                self.campaign_index[row['id']] = start + offset
+            self.pending_updates += len(rows)
+            self.revision += 1
+            return [row['id'] for row in rows]
+    
+    def _refold_donor(self, donor_idx):
+        """Recompute one donor's factors; folded-in donors also update their W row"""
+        factors = self.user_factors_for(donor_idx)
+        if self.user_factor_matrix is not None and self.fitted_donors <= donor_idx < len(self.user_factor_matrix):
+            self.user_factor_matrix[donor_idx] = factors[0]
+        return factors
+    
+    def _fold_in_campaign_factors(self, campaign_idx):
+        """Solve one campaign's component column against the user factor matrix"""
+        if self.user_factor_matrix is None:
+            return
+        user_factors = np.asarray(self.user_factor_matrix, dtype=float)
+        if isinstance(self.nmf_model, ImplicitALS):
+            # ALS item half-step for this one confidence column
+            column = self._als_input()[:, [campaign_idx]]
+            factors = self.nmf_model.fold_in_items(column.T, user_factors)[0]
+        else:
+            column = np.asarray(self.user_item_matrix[:, campaign_idx], dtype=float)
+            # Non-negative least squares on the same 0-1 column scaling as fit_nmf
+            peak = column.max()
+            target = column / peak if peak > 0 else column
+            factors, _ = nnls(user_factors, target)
+        components = self.nmf_model.components_
+        if not components.flags.writeable:
+            components = self.nmf_model.components_ = np.array(components)
+        components[:, campaign_idx] = factors
+        self._reset_factor_cache()
+    
+    def refit_collaborative(self, max_iter=None):
+        """
+        Full collaborative refit warm-started from the current factors instead of a
+        random init (NMF: init='custom'; ALS: initial factors), covering every donor
+        and campaign folded in since the last fit.
+        
+        Returns: True if the refitted model was swapped in
+        """
+        if self.nmf_model is None or self.user_item_matrix is None or self.user_factor_matrix is None:
+            return self.fit_collaborative() is not None
+        
+        als = isinstance(self.nmf_model, ImplicitALS)
+        with self._update_lock:
+            if als and self.confidence_matrix is not None:
+                # Replaced, never written, by events: no copy needed
+                matrix = self.confidence_matrix
+            else:
+                matrix = np.array(self.user_item_matrix)
+            W = np.array(self.user_factor_matrix, dtype=float)
+            H = np.array(self.nmf_model.components_, dtype=float)
+            shape = matrix.shape
+        
+        print(f"🔄 Warm-start {'ALS' if als else 'NMF'} refit for {shape[0]}x{shape[1]} matrix...")
+        scaler = self.scaler
+        if als:
+            model = ImplicitALS(n_components=H.shape[0], n_workers=self.build_workers,
+                                iterations=max_iter or max(2, self.nmf_model.iterations // 3),
+                                epsilon=self.nmf_model.epsilon)
+        else:
+            scaler = MinMaxScaler()
+            matrix = scaler.fit_transform(matrix)
+            W, H = np.maximum(W, 0), np.maximum(H, 0)
+            model = NMF(
+                n_components=H.shape[0],
+                random_state=42,
+                max_iter=max_iter or int(os.getenv('ML_REFIT_MAX_ITER', '200')),
+                tol=0.001,
+                init='custom'
+            )
+        try:
+            if als:
+                W = model.fit_transform(matrix, user_factors=W, item_factors=H.T)
+            else:
+                W = model.fit_transform(matrix, W=W, H=H)
+        except Exception as e:
+            print(f"❌ Collaborative refit failed: {e}")
+            return False
+        
+        with self._update_lock:
+            if self.user_item_matrix.shape != shape:
+                # Donors or campaigns were folded in meanwhile; the next refit covers them
+                return False
+            self.scaler = scaler
+            self.nmf_model = model
+            self.user_factor_matrix = W
+            self._store_factors()
+            self.fitted_donors, self.fitted_campaigns = shape
+            self.pending_updates = 0
+            self.revision += 1
+            self._reset_factor_cache()
+        print(f"✅ Collaborative refit in {model.n_iter_} iterations")
+        return True
+    
     def get_recommendations(self, donor_id, top_k=5):
         """Get campaign recommendations for a donor using category-prioritized approach"""
         if self.nmf_model is None:
@@ -336,72 +899,41 @@ class DatabaseMLRecommender:
         if donor_idx >= len(self.donor_df):
             return pd.DataFrame()
         
-        # Get user bio for category matching
-        donor_bio = self.donor_df.iloc[donor_idx]['bio'].lower() if self.donor_df.iloc[donor_idx]['bio'] else ""
-        
-        # Determine user's preferred categories based on bio
-        preferred_categories = []
-        if 'teacher' in donor_bio or 'education' in donor_bio:
-            preferred_categories = ['Education', 'Technology', 'Community']  # Added Community as fallback
-        elif 'doctor' in donor_bio or 'health' in donor_bio:
-            preferred_categories = ['Health & Fitness']
-        elif 'fashion' in donor_bio or 'style' in donor_bio or 'creativity' in donor_bio:
-            preferred_categories = ['Fashion', 'Art', 'Film & Video']
-        else:
-            # Default categories for users without clear preferences
-            preferred_categories = ['Technology', 'Community']
+        # Preferred categories from the donor's bio rule group
+        rules = rule_table()
+        group = rules.donor_groups([self.donor_df.iloc[donor_idx]['bio']])[0]
+        preferred_categories = rules.preferred_categories(group)
         
-        # Get all campaigns and their scores
-        all_campaigns = []
+        # Category match (high priority), TF-IDF similarity and NMF score for all campaigns at once
+        categories = self.campaign_df['category'] if 'category' in self.campaign_df.columns \
+            else pd.Series([''] * len(self.campaign_df))
+        category_match = categories.isin(preferred_categories).to_numpy(dtype=float)
         
-        for j in range(len(self.campaign_df)):
-            campaign_info = self.campaign_df.iloc[j]
-            campaign_category = campaign_info.get('category', '')
-            
-            # Calculate category match score (high priority)
-            category_match = 0.0
-            if campaign_category in preferred_categories:
-                category_match = 1.0
-            
-            # Get TF-IDF similarity score
-            donor_emb = self.donor_embeddings[donor_idx]
-            campaign_emb = self.campaign_embeddings[j]
-            try:
-                tfidf_similarity = np.dot(donor_emb, campaign_emb) / (np.linalg.norm(donor_emb) * np.linalg.norm(campaign_emb))
-                if np.isnan(tfidf_similarity) or np.isinf(tfidf_similarity):
-                    tfidf_similarity = 0.0
-            except:
-                tfidf_similarity = 0.0
-            
-            # Get NMF score
-            donor_latent = self.nmf_model.components_.T[donor_idx]
-            campaign_latent = self.nmf_model.components_
-            nmf_score = np.dot(donor_latent, campaign_latent)
-            # Fix the array comparison issue
-            if isinstance(nmf_score, np.ndarray):
-                nmf_score = nmf_score[0] if nmf_score.size > 0 else 0.0
-            if np.isnan(nmf_score) or np.isinf(nmf_score):
-                nmf_score = 0.0
-            
-            # Combine scores with category priority
-            # Category match gets 60% weight, TF-IDF gets 30%, NMF gets 10%
-            combined_score = (0.6 * category_match) + (0.3 * tfidf_similarity) + (0.1 * nmf_score)
-            
-            all_campaigns.append({
-                'campaign_id': campaign_info['id'],
-                'title': campaign_info['title'],
-                'category': campaign_category,
-                'category_match': category_match,
-                'tfidf_similarity': tfidf_similarity,
-                'nmf_score': nmf_score,
-                'combined_score': combined_score
-            })
+        donor_emb = self.donor_embeddings[donor_idx]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tfidf_similarity = (self.campaign_embeddings @ donor_emb) / (
+                row_norms(self.campaign_embeddings) * np.linalg.norm(donor_emb))
+        tfidf_similarity = np.where(np.isfinite(tfidf_similarity), tfidf_similarity, 0.0)
+        
+        nmf_score = np.dot(self.nmf_model.components_.T[donor_idx], self.nmf_model.components_)
+        # Fix the array comparison issue
+        if isinstance(nmf_score, np.ndarray):
+            nmf_score = nmf_score[0] if nmf_score.size > 0 else 0.0
+        if np.isnan(nmf_score) or np.isinf(nmf_score):
+            nmf_score = 0.0
         
-        # Sort by combined score
-        all_campaigns.sort(key=lambda x: x['combined_score'], reverse=True)
+        # Combine scores with category priority
+        # Category match gets 60% weight, TF-IDF gets 30%, NMF gets 10%
+        combined_score = (0.6 * category_match) + (0.3 * tfidf_similarity) + (0.1 * nmf_score)
         
-        # Take top_k recommendations
-        top_campaigns = all_campaigns[:top_k]
+        # Take top_k recommendations by combined score
+        top = np.argsort(-combined_score, kind='stable')[:top_k]
+        top_campaigns = [{
+            'campaign_id': self.campaign_df['id'].iat[j],
+            'title': self.campaign_df['title'].iat[j],
+            'category': categories.iat[j],
+            'combined_score': combined_score[j]
+        } for j in top]
         
         recommendations = []
         for campaign in top_campaigns:
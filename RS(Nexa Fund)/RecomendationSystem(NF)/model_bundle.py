@@ -0,0 +1,248 @@
+# model_bundle.py - Publish a trained model once, attach read-only from many workers
+
+import copy
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from scipy import sparse
+
+from catalog_store import column_arrays, frame_from_arrays
+from embedding_storage import QuantizedRows
+
+# Large arrays stored as .npy files and memory-mapped by every worker
+ARRAY_ATTRS = ['donor_embeddings', 'campaign_embeddings', 'user_item_matrix', 'user_factor_matrix',
+               'item_neighbor_idx', 'item_neighbor_scores']
+
+# Sparse (CSR) matrices stored as their data / indices / indptr arrays, memory-mapped the same way
+SPARSE_ATTRS = ['confidence_matrix']
+
+# Catalog frames stored column by column as .npy files (see catalog_store.column_arrays)
+FRAME_ATTRS = ['donor_df', 'campaign_df', 'interactions_df']
+
+# id -> row indexes, rebuilt on first use from the id column of their frame
+INDEX_ATTRS = {'donor_index': 'donor_df', 'campaign_index': 'campaign_df'}
+
+# Fitted text pipelines, only needed to embed fold-ins: pickled on their own and loaded on first use
+PIPELINE_ATTRS = ['donor_pipeline', 'campaign_pipeline']
+PIPELINES_FILE = 'pipelines.pkl'
+
+# Everything else the recommender needs, pickled once per bundle
+STATE_ATTRS = ['n_components', 'scaler', 'build_timings', 'fitted_donors', 'fitted_campaigns',
+               'collab_engine', 'embedding_mode', 'embedding_precision', 'export_versions']
+
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = '.refresh.lock'
+KEEP_VERSIONS = 2
+STALE_LOCK_SECONDS = 30 * 60
+
+
+def default_bundle_dir():
+    """Bundle directory (ML_BUNDLE_DIR env var, defaults to the system temp dir)"""
+    return os.getenv('ML_BUNDLE_DIR', os.path.join(tempfile.gettempdir(), 'nexa_ml_bundle'))
+
+
+def current_version(bundle_dir):
+    """Name of the bundle version workers should be serving, or None"""
+    try:
+        with open(os.path.join(bundle_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_bundle(recommender, bundle_dir):
+    """
+    Write the recommender's model state as a new bundle version and make it current.
+
+    Arrays are written as .npy files so attached workers memory-map them and
+    share the same physical pages; the catalog frames are written column by
+    column the same way, and only small state is pickled. The CURRENT pointer
+    is swapped atomically so workers never see a half-written bundle.
+
+    Returns: The new version name
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    version = f"v{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    version_dir = os.path.join(bundle_dir, version)
+    os.makedirs(version_dir)
+
+    arrays = {name: getattr(recommender, name) for name in ARRAY_ATTRS}
+    nmf_model = recommender.nmf_model
+    if nmf_model is not None:
+        arrays['nmf_components'] = nmf_model.components_
+        # Ship the fitted estimator without its (large) components; they are memory-mapped
+        nmf_model = copy.copy(nmf_model)
+        nmf_model.components_ = None
+
+    for name, array in list(arrays.items()):
+        if isinstance(array, QuantizedRows):
+            # int8 embeddings: codes and per-row scales are memory-mapped separately
+            arrays[f"{name}.codes"], arrays[f"{name}.scales"] = array.codes, array.scales
+            del arrays[name]
+    for name in SPARSE_ATTRS:
+        matrix = getattr(recommender, name, None)
+        if matrix is not None:
+            arrays[f"{name}.data"], arrays[f"{name}.indices"], arrays[f"{name}.indptr"] = \
+                matrix.data, matrix.indices, matrix.indptr
+    for name, array in arrays.items():
+        if array is not None:
+            np.save(os.path.join(version_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    frames = {}
+    for name in FRAME_ATTRS:
+        frame = getattr(recommender, name, None)
+        layout, columns, leftovers = column_arrays(frame) if frame is not None else (None, {}, {})
+        for key, array in columns.items():
+            np.save(os.path.join(version_dir, f"{name}.{key}.npy"), np.ascontiguousarray(array))
+        # Frames that can't be split (no positional index) are pickled whole
+        frames[name] = (layout, leftovers) if layout is not None else frame
+
+    state = {name: getattr(recommender, name, None) for name in STATE_ATTRS}
+    state['sparse_shapes'] = {name: getattr(recommender, name).shape for name in SPARSE_ATTRS
+                              if getattr(recommender, name, None) is not None}
+    state['nmf_model'] = nmf_model
+    state['frames'] = frames
+    with open(os.path.join(version_dir, 'state.pkl'), 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(os.path.join(version_dir, PIPELINES_FILE), 'wb') as f:
+        pickle.dump({name: getattr(recommender, name, None) for name in PIPELINE_ATTRS}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+
+    pointer_tmp = os.path.join(bundle_dir, f".{CURRENT_FILE}.{uuid.uuid4().hex}")
+    with open(pointer_tmp, 'w') as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(bundle_dir, CURRENT_FILE))
+
+    _prune_versions(bundle_dir, keep=version)
+    print(f"📦 Published model bundle {version} to {bundle_dir}")
+    return version
+
+
+def attach_bundle(recommender, bundle_dir, version=None):
+    """
+    Load a published bundle into `recommender` with arrays memory-mapped read-only
+    (frame columns copy-on-write). The id indexes and text pipelines load on first use.
+
+    Returns: The attached version name
+    """
+    version = version or current_version(bundle_dir)
+    if version is None:
+        raise FileNotFoundError(f"No model bundle published in {bundle_dir}")
+    version_dir = os.path.join(bundle_dir, version)
+
+    with open(os.path.join(version_dir, 'state.pkl'), 'rb') as f:
+        state = pickle.load(f)
+
+    def load(name):
+        path = os.path.join(version_dir, f"{name}.npy")
+        if not os.path.exists(path) and os.path.exists(os.path.join(version_dir, f"{name}.codes.npy")):
+            return QuantizedRows(load(f"{name}.codes"), load(f"{name}.scales"))
+        return np.load(path, mmap_mode='r') if os.path.exists(path) else None
+
+    for name in STATE_ATTRS:
+        setattr(recommender, name, state.get(name, getattr(recommender, name, None)))
+    for name in ARRAY_ATTRS:
+        setattr(recommender, name, load(name))
+    for name in SPARSE_ATTRS:
+        shape = state.get('sparse_shapes', {}).get(name)
+        # Events replace the matrix (a sparse add) instead of writing it, so read-only maps do
+        setattr(recommender, name, None if shape is None else sparse.csr_matrix(
+            (load(f"{name}.data"), load(f"{name}.indices"), load(f"{name}.indptr")), shape=shape))
+
+    def load_column(name):
+        # Copy-on-write: contribution events update counters in this process only
+        return np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='c')
+
+    for name, stored in state['frames'].items():
+        if isinstance(stored, tuple):
+            layout, leftovers = stored
+            stored = frame_from_arrays(layout, lambda key, name=name: load_column(f"{name}.{key}"), leftovers)
+        setattr(recommender, name, stored)
+    for name, frame_name in INDEX_ATTRS.items():
+        recommender.defer(name, lambda frame_name=frame_name: _id_index(getattr(recommender, frame_name)))
+
+    pipelines = {}
+
+    def load_pipeline(name):
+        if not pipelines:
+            with open(os.path.join(version_dir, PIPELINES_FILE), 'rb') as f:
+                pipelines.update(pickle.load(f))
+        return pipelines[name]
+    for name in PIPELINE_ATTRS:
+        recommender.defer(name, lambda name=name: load_pipeline(name))
+
+    recommender.nmf_model = state.get('nmf_model')
+    if recommender.nmf_model is not None:
+        recommender.nmf_model.components_ = load('nmf_components')
+
+    recommender.bundle_version = version
+    return version
+
+
+def _id_index(frame):
+    """id -> first row position, as _build_indexes (the first occurrence of a duplicate id wins)"""
+    if frame is None:
+        return {}
+    ids = frame['id'].tolist()
+    return dict(zip(reversed(ids), range(len(ids) - 1, -1, -1)))
+
+
+def _prune_versions(bundle_dir, keep):
+    """Remove old versions; the previous one stays so in-flight workers can finish"""
+    versions = sorted(
+        (d for d in os.listdir(bundle_dir)
+         if d.startswith('v') and os.path.isdir(os.path.join(bundle_dir, d)) and d != keep),
+        key=lambda d: os.path.getmtime(os.path.join(bundle_dir, d)),
+        reverse=True
+    )
+    for old in versions[KEEP_VERSIONS - 1:]:
+        # Attached workers may still map these files (Windows refuses the delete)
+        shutil.rmtree(os.path.join(bundle_dir, old), ignore_errors=True)
+
+
+class RefreshLock:
+    """
+    Cross-process lock so exactly one worker retrains per refresh.
+
+    Uses an O_EXCL lock file (works on Windows and POSIX); a lock older than
+    STALE_LOCK_SECONDS is treated as abandoned.
+    """
+
+    def __init__(self, bundle_dir):
+        self.path = os.path.join(bundle_dir, LOCK_FILE)
+        self.acquired = False
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            if time.time() - os.path.getmtime(self.path) > STALE_LOCK_SECONDS:
+                os.remove(self.path)
+        except OSError:
+            pass
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        self.acquired = True
+        return True
+
+    def release(self):
+        if self.acquired:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.acquired = False
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,183 @@
+# recommendation_cache.py - Short-lived cache of served recommendation lists
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set
+
+import metrics
+
+CACHE_LOOKUPS = metrics.REGISTRY.counter(
+    'recommender_result_cache_total', 'Recommendation cache lookups', ('kind', 'result'))
+SCORING_REQUESTS = metrics.REGISTRY.counter(
+    'recommender_scoring_requests_total', 'Cache-missing requests that computed a list or awaited one in flight',
+    ('kind', 'outcome'))
+
+
+def default_ttl() -> float:
+    """Seconds a cached list is served (ML_RESULT_CACHE_TTL env var, default 30, 0 disables)"""
+    try:
+        return max(0.0, float(os.getenv('ML_RESULT_CACHE_TTL', '30')))
+    except ValueError:
+        return 30.0
+
+
+class RecommendationCache:
+    """
+    LRU + TTL cache of formatted recommendation lists.
+
+    Entries are indexed by user and by the campaigns they contain, so a
+    contribution event drops only the lists it can change: the contributing
+    user's, every list showing the campaign, and the trending lists.
+
+    `generation` moves on with every invalidation, so a list computed from
+    data that changed while it was being scored is not stored.
+
+    Expired entries stay until they are invalidated, replaced or evicted, so
+    latest() can hand out a stale list when scoring is being shed under load.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 10000):
+        self.ttl = default_ttl() if ttl is None else ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()  # key -> (expires, value, user, campaigns)
+        self._by_user: Dict[Any, Set[Hashable]] = {}
+        self._by_campaign: Dict[Any, Set[Hashable]] = {}
+        self._latest: Dict[str, Hashable] = {}  # kind -> key of its most recent put
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, kind: str, key: Hashable):
+        if not self.ttl:
+            return None
+        full_key = (kind, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(full_key)
+                CACHE_LOOKUPS.inc(kind=kind, result='hit')
+                return entry[1]
+        CACHE_LOOKUPS.inc(kind=kind, result='miss')
+        return None
+
+    def latest(self, kind: str, user_id=None, max_age: float = float('inf')):
+        """
+        Most recently stored `kind` list (for `user_id` when given), expired or
+        not, if it was stored at most `max_age` seconds ago; None otherwise
+        """
+        with self._lock:
+            if user_id is None:
+                keys = [self._latest[kind]] if kind in self._latest else []
+            else:
+                keys = [key for key in self._by_user.get(user_id, ()) if key[0] == kind]
+            entries = [self._entries[key] for key in keys]
+        if not entries:
+            return None
+        expires, value = max(entries, key=lambda entry: entry[0])[:2]
+        stored_at = expires - self.ttl
+        return value if time.monotonic() - stored_at <= max_age else None
+
+    def put(self, kind: str, key: Hashable, value, user_id=None, campaign_ids: Iterable = (),
+            generation: Optional[int] = None):
+        """Store a list; with `generation`, only if nothing was invalidated since that generation"""
+        if not self.ttl:
+            return
+        full_key = (kind, key)
+        campaign_ids = frozenset(campaign_ids)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if full_key in self._entries:
+                self._drop(full_key)
+            self._entries[full_key] = (time.monotonic() + self.ttl, value, user_id, campaign_ids)
+            self._latest[kind] = full_key
+            if user_id is not None:
+                self._by_user.setdefault(user_id, set()).add(full_key)
+            for campaign_id in campaign_ids:
+                self._by_campaign.setdefault(campaign_id, set()).add(full_key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, user_ids: Iterable = (), campaign_ids: Iterable = (), kinds: Iterable[str] = ()):
+        """Drop entries for these users, entries containing these campaigns, and all entries of `kinds`"""
+        kinds = set(kinds)
+        with self._lock:
+            self.generation += 1
+            doomed = set()
+            for user_id in user_ids:
+                doomed |= self._by_user.get(user_id, set())
+            for campaign_id in campaign_ids:
+                doomed |= self._by_campaign.get(campaign_id, set())
+            if kinds:
+                doomed |= {key for key in self._entries if key[0] in kinds}
+            for key in doomed:
+                self._drop(key)
+        return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_user.clear()
+            self._by_campaign.clear()
+            self._latest.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop(self, full_key):
+        entry = self._entries.pop(full_key, None)
+        if entry is None:
+            return
+        _, _, user_id, campaign_ids = entry
+        if self._latest.get(full_key[0]) == full_key:
+            del self._latest[full_key[0]]
+        if user_id is not None:
+            keys = self._by_user.get(user_id)
+            if keys is not None:
+                keys.discard(full_key)
+                if not keys:
+                    del self._by_user[user_id]
+        for campaign_id in campaign_ids:
+            keys = self._by_campaign.get(campaign_id)
+            if keys is not None:
+                keys.discard(full_key)
+                if not keys:
+                    del self._by_campaign[campaign_id]
+
+
+class ScoringFlights:
+    """
+    Single-flight for the request path, the asyncio counterpart of
+    export_loader.SingleFlight: concurrent cache-missing requests with the same
+    key await one computation and share its result (or exception).
+
+    The computation runs as its own task, so a client that disconnects cancels
+    only its own wait, not the list the other requests are waiting for.
+    Nothing is kept once the task finishes; RecommendationCache serves repeats.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def do(self, kind: str, key: Hashable, compute: Callable[[], Awaitable[Any]]):
+        full_key = (kind, key)
+        task = self._tasks.get(full_key)
+        if task is None:
+            SCORING_REQUESTS.inc(kind=kind, outcome='computed')
+            task = self._tasks[full_key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda done: self._finish(full_key, done))
+        else:
+            SCORING_REQUESTS.inc(kind=kind, outcome='coalesced')
+        return await asyncio.shield(task)
+
+    def _finish(self, full_key, task):
+        if self._tasks.get(full_key) is task:
+            del self._tasks[full_key]
+        if not task.cancelled():
+            task.exception()  # retrieved here too, in case every waiter went away
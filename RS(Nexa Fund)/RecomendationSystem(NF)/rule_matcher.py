@@ -0,0 +1,151 @@
+# rule_matcher.py - Data-driven bio/category keyword rules compiled into one multi-pattern matcher
+
+import json
+import os
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Rule groups in priority order: a donor belongs to the first group whose bio keywords it contains;
+# campaigns whose category/title contain the group's keywords are boosted for those donors, and
+# /recommendations ranks the group's preferred categories first.
+DEFAULT_RULES = [
+    {'name': 'education', 'bio': ['teacher', 'education'],
+     'category': ['education', 'technology'], 'title': ['smart'],
+     'preferred_categories': ['Education', 'Technology', 'Community']},
+    {'name': 'health', 'bio': ['doctor', 'health'],
+     'category': ['health', 'fitness'], 'title': ['dental'],
+     'preferred_categories': ['Health & Fitness']},
+    {'name': 'creative', 'bio': ['fashion', 'style', 'creativity'],
+     'category': ['fashion', 'art', 'film'], 'title': [],
+     'preferred_categories': ['Fashion', 'Art', 'Film & Video']},
+]
+
+# Preferred categories of donors matching no group
+DEFAULT_PREFERRED = ['Technology', 'Community']
+
+
+class KeywordMatcher:
+    """
+    Substring matcher for many keywords at once, over many texts at once.
+
+    The distinct texts are lower-cased and joined into one buffer. Each keyword
+    is searched over the whole buffer with str.find (C substring search); after
+    a hit the search resumes at the next text, so the Python-level work is one
+    step per matching text rather than one per text or per occurrence. The
+    result is identical to `keyword in text.lower()` for every keyword.
+    """
+
+    SEPARATOR = '\x00'
+
+    def __init__(self, groups: List[Iterable[str]]):
+        self.n_groups = len(groups)
+        keyword_groups: Dict[str, List[int]] = {}
+        for group, keywords in enumerate(groups):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword and group not in keyword_groups.setdefault(keyword, []):
+                    keyword_groups[keyword].append(group)
+        self._keywords = [(keyword, np.asarray(groups_of_keyword))
+                          for keyword, groups_of_keyword in keyword_groups.items()]
+
+    def match(self, texts: Iterable) -> np.ndarray:
+        """(n_texts, n_groups) bool: text i contains a keyword of group g (case-insensitive)"""
+        texts = texts.tolist() if hasattr(texts, 'tolist') else list(texts)  # pandas columns iterate slowly
+        texts = np.asarray([t if isinstance(t, str) else '' for t in texts], dtype=object)
+        # Match each distinct text once (categories and stock bios repeat a lot)
+        codes, distinct = pd.factorize(texts)
+        distinct = [t.lower().replace(self.SEPARATOR, ' ') for t in distinct]
+        matches = np.zeros((len(distinct), self.n_groups), dtype=bool)
+        if not self._keywords or not distinct:
+            return matches[codes] if len(codes) else np.zeros((len(texts), self.n_groups), dtype=bool)
+
+        matches[:] = self.scan(*join_texts(distinct))
+        return matches[codes]
+
+    def scan(self, buffer: str, starts: np.ndarray) -> np.ndarray:
+        """(n_texts, n_groups) bool over a buffer of lower-cased texts built by join_texts"""
+        matches = np.zeros((len(starts), self.n_groups), dtype=bool)
+        bounds = starts.tolist() + [len(buffer) + 1]
+        for keyword, groups in self._keywords:
+            rows = []
+            position = buffer.find(keyword)
+            while position >= 0:
+                # bisect on the list, not np.searchsorted: one lookup per hit, and the
+                # row is needed right away to resume the search at the next text
+                row = bisect_right(bounds, position) - 1
+                rows.append(row)
+                position = buffer.find(keyword, bounds[row + 1])
+            if rows:
+                matches[np.ix_(rows, groups)] = True
+        return matches
+
+
+def join_texts(texts: List[str]):
+    """
+    Join lower-cased texts into one buffer for KeywordMatcher.scan.
+
+    Returns: (buffer, starts) where starts[i] is the offset of text i
+    """
+    lengths = np.fromiter((len(t) + 1 for t in texts), dtype=np.int64, count=len(texts))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(texts) else np.empty(0, dtype=np.int64)
+    return KeywordMatcher.SEPARATOR.join(texts), starts
+
+
+class RuleTable:
+    """A rule table compiled once into per-field keyword matchers"""
+
+    def __init__(self, rules: Optional[List[Dict]] = None, default_preferred: Optional[List[str]] = None):
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.default_preferred = DEFAULT_PREFERRED if default_preferred is None else default_preferred
+        self.bio = KeywordMatcher([r.get('bio', []) for r in self.rules])
+        self.category = KeywordMatcher([r.get('category', []) for r in self.rules])
+        self.title = KeywordMatcher([r.get('title', []) for r in self.rules])
+
+    def donor_groups(self, bios: Iterable) -> np.ndarray:
+        """Rule group per donor bio (first matching rule), -1 for none"""
+        matches = self.bio.match(bios)
+        groups = np.argmax(matches, axis=1) if matches.shape[1] else np.zeros(len(matches), dtype=np.int64)
+        return np.where(matches.any(axis=1), groups, -1).astype(np.int64)
+
+    def campaign_boosts(self, categories: Iterable, titles: Iterable, boost: float = 0.3) -> np.ndarray:
+        """(n_groups, n_campaigns) boost for campaigns whose category or title matches each group"""
+        matches = self.category.match(categories) | self.title.match(titles)
+        return matches.T * boost
+
+    def preferred_categories(self, group: int) -> List[str]:
+        return self.rules[group].get('preferred_categories', []) if group >= 0 else self.default_preferred
+
+
+def load_rule_table(path: Optional[str] = None) -> RuleTable:
+    """
+    Rule table from a JSON file (ML_RULE_TABLE env var) shaped like
+    {"rules": [...DEFAULT_RULES...], "default_preferred": [...]}, else the built-in rules
+    """
+    path = path or os.getenv('ML_RULE_TABLE')
+    if not path:
+        return RuleTable()
+    try:
+        with open(path) as f:
+            table = json.load(f)
+        return RuleTable(table.get('rules'), table.get('default_preferred'))
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"⚠️  Could not load rule table {path}: {e}; using built-in rules")
+        return RuleTable()
+
+
+_tables: Dict[Optional[str], RuleTable] = {}
+
+
+def rule_table() -> RuleTable:
+    """The rule table for the current ML_RULE_TABLE, loaded once per path"""
+    path = os.getenv('ML_RULE_TABLE') or None
+    table = _tables.get(path)
+    if table is None:
+        table = _tables[path] = load_rule_table(path)
+    return table
+
+
+RULES = rule_table()
@@ -6,14 +6,33 @@ This version fetches real data from your PostgreSQL database via the backend API
 
 import os
 import sys
+import argparse
 from pathlib import Path
 
+def build_and_publish_bundle(backend_url):
+    """Builder step for multi-worker mode: train once and publish the model bundle"""
+    from ml_recommender_db import DatabaseMLRecommender
+    from model_bundle import default_bundle_dir, publish_bundle
+    
+    bundle_dir = default_bundle_dir()
+    recommender = DatabaseMLRecommender(n_components=10, backend_url=backend_url)
+    if not recommender.build_model():
+        return None
+    publish_bundle(recommender, bundle_dir)
+    return bundle_dir
+
 def main():
+    parser = argparse.ArgumentParser(description="Database ML Recommendation System server")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ML_WORKERS", "1")),
+                        help="uvicorn worker processes; >1 enables shared model bundle serving")
+    parser.add_argument("--port", type=int, default=int(os.getenv("ML_PORT", "8000")))
+    args = parser.parse_args()
+    
     print("🚀 Starting Database ML Recommendation System FastAPI Server")
     print("=" * 60)
     print("📊 Data Source: PostgreSQL Database via Backend API")
     print("🔗 Backend URL: http://localhost:5050/api")
-    print("🌐 Recommender URL: http://localhost:8000")
+    print(f"🌐 Recommender URL: http://localhost:{args.port}")
     print("=" * 60)
     
     # Check if required files exist
@@ -51,23 +70,45 @@ def main():
     print("   • GET  /campaigns - List all campaigns from database")
     print("   • POST /recommendations - Get campaign recommendations")
     print("   • POST /similar-donors - Get similar donors")
+    print("   • GET  /similar-campaigns/{id} - Campaigns co-funded by the same backers")
     print("   • GET  /test - Test endpoint with database data")
     print("   • POST /refresh - Refresh data and retrain model")
+    print("   • POST /events/contribution - Apply contribution events without a refresh")
+    print("   • POST /events/donors, /events/campaigns - Fold in new donors / campaigns")
+    print("   • GET  /metrics - Prometheus latency histograms")
+    print("\n⚙️  Run with --workers N for multi-worker serving (shared model bundle)")
     
-    print("\n📖 Interactive docs: http://localhost:8000/docs")
-    print("📖 ReDoc docs: http://localhost:8000/redoc")
+    print(f"\n📖 Interactive docs: http://localhost:{args.port}/docs")
+    print(f"📖 ReDoc docs: http://localhost:{args.port}/redoc")
     print("=" * 60)
     
     # Start the FastAPI server
     try:
         import uvicorn
-        uvicorn.run(
-            "fastapi_app_db:app",
-            host="0.0.0.0",
-            port=8000,
-            reload=True,
-            log_level="info"
-        )
+        if args.workers > 1:
+            # Production mode: one build here, N workers attach the memory-mapped bundle
+            backend_url = os.getenv('BACKEND_API_URL', 'http://localhost:5050/api')
+            print(f"🏭 Multi-worker mode: building model bundle for {args.workers} workers...")
+            bundle_dir = build_and_publish_bundle(backend_url)
+            if bundle_dir is None:
+                print("❌ Model build failed, not starting workers")
+                return False
+            os.environ["ML_BUNDLE_DIR"] = bundle_dir
+            uvicorn.run(
+                "fastapi_app_db:app",
+                host="0.0.0.0",
+                port=args.port,
+                workers=args.workers,
+                log_level="info"
+            )
+        else:
+            uvicorn.run(
+                "fastapi_app_db:app",
+                host="0.0.0.0",
+                port=args.port,
+                reload=True,
+                log_level="info"
+            )
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
     except (ImportError, OSError, RuntimeError) as e:
@@ -0,0 +1,90 @@
+# synthetic_data.py - Synthetic donors/campaigns/interactions for tests and benchmarks
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ['Education', 'Technology', 'Health & Fitness', 'Community', 'Fashion',
+              'Art', 'Film & Video', 'Environment', 'Games', 'Food']
+
+WORDS = ['school', 'learning', 'clinic', 'dental', 'solar', 'water', 'garden', 'smart',
+         'robot', 'film', 'studio', 'gallery', 'youth', 'sports', 'farm', 'music',
+         'library', 'coding', 'recycling', 'bakery', 'festival', 'shelter', 'nurse',
+         'teacher', 'style', 'design', 'village', 'ocean', 'forest', 'clean']
+
+BIOS = ['teacher who loves education', 'doctor focused on health', 'fashion and style fan',
+        'creativity first', 'software engineer', None, 'retired nurse', '']
+
+
+def _text(rng, n_words):
+    return ' '.join(rng.choice(WORDS, size=n_words))
+
+
+def make_catalog(n_donors=200, n_campaigns=500, n_interactions=0, seed=42):
+    """
+    Build DataFrames shaped like the backend export endpoints.
+
+    Returns:
+        (donor_df, campaign_df, interactions_df)
+    """
+    rng = np.random.default_rng(seed)
+
+    donor_df = pd.DataFrame({
+        'id': [f'user-{i}' for i in range(n_donors)],
+        'walletAddress': [f'0x{i:040x}' for i in range(n_donors)],
+        'email': [f'user{i}@example.com' for i in range(n_donors)],
+        'name': [f'Donor {_text(rng, 2)}' for _ in range(n_donors)],
+        'bio': [BIOS[i % len(BIOS)] for i in range(n_donors)],
+        'isVerified': rng.random(n_donors) < 0.5,
+        'role': 'USER',
+        'status': 'ACTIVE',
+        'createdAt': '2025-01-01T00:00:00.000Z',
+        'updatedAt': '2025-01-01T00:00:00.000Z',
+    })
+
+    target = rng.integers(1_000, 50_000, size=n_campaigns).astype(float)
+    contributions = rng.integers(0, 60, size=n_campaigns)
+    campaign_df = pd.DataFrame({
+        'id': [f'campaign-{j}' for j in range(n_campaigns)],
+        'title': [f'{_text(rng, 3)} project' for _ in range(n_campaigns)],
+        'description': [_text(rng, 20) for _ in range(n_campaigns)],
+        'story': [_text(rng, 60) for _ in range(n_campaigns)],
+        'additionalMedia': [[] for _ in range(n_campaigns)],
+        'imageUrl': [f'https://cdn.example.com/{j}.png' for j in range(n_campaigns)],
+        'targetAmount': target,
+        'currentAmount': np.round(target * rng.random(n_campaigns), 2),
+        'escrowAmount': 0.0,
+        'releasedAmount': 0.0,
+        'category': rng.choice(CATEGORIES, size=n_campaigns),
+        'status': np.where(rng.random(n_campaigns) < 0.9, 'ACTIVE', 'PAUSED'),
+        'riskScore': rng.integers(0, 100, size=n_campaigns),
+        'isFraudulent': False,
+        'requiresMilestones': False,
+        'startDate': '2025-01-01T00:00:00.000Z',
+        'endDate': [f'2026-{1 + j % 12:02d}-{1 + j % 28:02d}T00:00:00.000Z' for j in range(n_campaigns)],
+        'createdAt': '2025-01-01T00:00:00.000Z',
+        'updatedAt': '2025-01-01T00:00:00.000Z',
+        '_count': [{'contributions': int(c), 'milestones': 0, 'rewardTiers': 0} for c in contributions],
+    })
+
+    if n_interactions:
+        users = rng.integers(0, n_donors, size=n_interactions)
+        items = rng.integers(0, n_campaigns, size=n_interactions)
+        pairs = pd.DataFrame({'u': users, 'c': items}).drop_duplicates()
+        interactions_df = pd.DataFrame({
+            'userId': donor_df['id'].to_numpy()[pairs['u'].to_numpy()],
+            'campaignId': campaign_df['id'].to_numpy()[pairs['c'].to_numpy()],
+            'weight': np.round(rng.gamma(2.0, 150.0, size=len(pairs)), 2),
+            'contributionCount': rng.integers(1, 4, size=len(pairs)),
+        })
+    else:
+        interactions_df = pd.DataFrame(columns=['userId', 'campaignId', 'weight'])
+
+    return donor_df, campaign_df, interactions_df
+
+
+def load_into(recommender, n_donors=200, n_campaigns=500, n_interactions=0, seed=42):
+    """Populate a DatabaseMLRecommender with synthetic data instead of the backend"""
+    recommender.donor_df, recommender.campaign_df, recommender.interactions_df = make_catalog(
+        n_donors, n_campaigns, n_interactions, seed
+    )
+    return recommender
@@ -0,0 +1,143 @@
+# test_admission.py - In-flight limit, latency-driven degradation tiers and stale-list fallbacks for /personalized
+
+import sys
+import os
+import contextlib
+import io
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import fastapi_app_db
+from admission import (ADMISSIONS, CACHED_USER, FULL, NO_COLLABORATIVE, TIER_HEADER, TRENDING,
+                       AdmissionController, Overloaded)
+from backend_guard import CircuitBreaker
+from export_loader import ConditionalExport
+from ml_recommender_db import DatabaseMLRecommender
+from recommendation_cache import RecommendationCache
+from synthetic_data import load_into
+
+
+def test_tiers_follow_inflight_and_latency():
+    """Tiers step down with the in-flight share, the limit rejects, and slow answers degrade for one window"""
+    controller = AdmissionController(max_inflight=4, latency_budget=0)
+    rejected = ADMISSIONS.value(endpoint='test', tier='rejected')
+    tickets = [controller.enter('test') for _ in range(4)]
+    assert [t.tier for t in tickets] == [FULL, NO_COLLABORATIVE, CACHED_USER, TRENDING]
+    try:
+        controller.enter('test')
+        raise AssertionError("request admitted past the in-flight limit")
+    except Overloaded as e:
+        assert e.retry_after >= 1
+    assert ADMISSIONS.value(endpoint='test', tier='rejected') == rejected + 1
+    for ticket in tickets:
+        controller.leave(ticket)
+    assert controller.inflight == 0 and controller.enter('test').tier == FULL
+
+    slow = AdmissionController(max_inflight=0, latency_budget=0.01, window=0.2)
+    ticket = slow.enter('test')
+    time.sleep(0.02)
+    slow.leave(ticket)
+    assert slow.recent_latency() >= 0.02 and slow.tier() == TRENDING
+    assert slow.enter('test', degradable=False).tier == FULL
+    time.sleep(0.25)
+    assert slow.recent_latency() == 0 and slow.tier() == FULL
+    print("✅ Tiers follow in-flight share and recent latency")
+
+
+def test_cache_keeps_stale_lists_for_degraded_reads():
+    """Expired lists stay readable through latest() until invalidated"""
+    cache = RecommendationCache(ttl=0.05)
+    cache.put('personalized', ('u1', 5), ['a'], user_id='u1')
+    cache.put('personalized', ('u1', 10), ['b'], user_id='u1')
+    cache.put('trending', 5, ['t'])
+    time.sleep(0.06)
+    assert cache.get('personalized', ('u1', 5)) is None
+    assert cache.latest('personalized', user_id='u1') == ['b'] and cache.latest('trending') == ['t']
+    assert cache.latest('personalized', user_id='u1', max_age=0.01) is None
+    assert cache.latest('personalized', user_id='u2') is None
+    cache.invalidate(user_ids=['u1'], kinds=['trending'])
+    assert cache.latest('personalized', user_id='u1') is None and cache.latest('trending') is None
+    print("✅ Stale lists stay available to degraded requests")
+
+
+@contextlib.contextmanager
+def serving_app(controller):
+    """The app on a small synthetic model with `controller`, backend fetches skipped by an open breaker"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=20, n_campaigns=30, n_interactions=60)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    breaker = CircuitBreaker('test-admission', failure_threshold=1, reset_timeout=600)
+    breaker.record_failure()
+    saved = (fastapi_app_db.recommender, fastapi_app_db.weighted_recommender,
+             fastapi_app_db.fresh_campaigns_export, fastapi_app_db.admission)
+    try:
+        fastapi_app_db.recommender = recommender
+        fastapi_app_db.weighted_recommender = fastapi_app_db.WeightedRecommender(recommender)
+        fastapi_app_db.fresh_campaigns_export = ConditionalExport('campaigns', breaker=breaker)
+        fastapi_app_db.admission = controller
+        fastapi_app_db.results_cache.clear()
+        yield TestClient(fastapi_app_db.app), recommender
+    finally:
+        (fastapi_app_db.recommender, fastapi_app_db.weighted_recommender,
+         fastapi_app_db.fresh_campaigns_export, fastapi_app_db.admission) = saved
+        fastapi_app_db.results_cache.clear()
+
+
+def test_personalized_degrades_in_tiers():
+    """Each tier is served and named in the header; missing cached lists step down to the next tier"""
+    controller = AdmissionController(max_inflight=0, latency_budget=0)
+    with serving_app(controller) as (client, recommender):
+        donors = [str(d) for d in recommender.donor_df['id'][:3]]
+
+        def personalized(user_id, tier, top_n=5):
+            controller.tier = lambda extra=0: tier
+            response = client.post('/personalized', json={'user_id': user_id, 'top_n': top_n})
+            assert response.status_code == 200, response.text
+            return response.headers[TIER_HEADER], response.json()
+
+        tier, full = personalized(donors[0], FULL)
+        assert tier == FULL and len(full) == 5
+
+        tier, partial = personalized(donors[1], NO_COLLABORATIVE)
+        assert tier == NO_COLLABORATIVE and all(rec['scores']['collaborative'] == 0 for rec in partial)
+        assert fastapi_app_db.results_cache.latest('personalized', user_id=donors[1]) is None
+
+        # The user's last list, cut to the requested length, even for other parameters
+        tier, cached = personalized(donors[0], CACHED_USER, top_n=3)
+        assert tier == CACHED_USER and cached == full[:3]
+
+        # No list for this user: the last trending list; none of those either: trending is scored
+        tier, fallback = personalized(donors[2], CACHED_USER)
+        assert tier == TRENDING and len(fallback) == 5
+        trending = client.post('/trending', params={'top_n': 8}).json()
+        tier, served = personalized(donors[2], TRENDING, top_n=4)
+        assert tier == TRENDING and served == trending[:4]
+    print("✅ /personalized degrades through the tiers")
+
+
+def test_inflight_limit_rejects_fast():
+    """At the in-flight limit /personalized and /trending answer 503 with Retry-After at once"""
+    controller = AdmissionController(max_inflight=1, latency_budget=0)
+    with serving_app(controller) as (client, recommender):
+        controller.inflight = 1  # one request already being scored
+        start = time.perf_counter()
+        response = client.post('/personalized', json={'user_id': 'donor_1', 'top_n': 5})
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+        assert client.post('/trending', params={'top_n': 5}).status_code == 503
+        assert time.perf_counter() - start < 0.5
+        controller.inflight = 0
+        assert client.post('/trending', params={'top_n': 5}).status_code == 200
+        assert controller.inflight == 0
+        assert client.get('/status').json()['degradation_tier'] == FULL
+    print("✅ The in-flight limit rejects with 503 instead of queueing")
+
+
+if __name__ == "__main__":
+    test_tiers_follow_inflight_and_latency()
+    test_cache_keeps_stale_lists_for_degraded_reads()
+    test_personalized_degrades_in_tiers()
+    test_inflight_limit_rejects_fast()
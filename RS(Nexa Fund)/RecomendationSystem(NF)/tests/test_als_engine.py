@@ -0,0 +1,109 @@
+# test_als_engine.py - Implicit ALS solver and engine selection (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from als_engine import ImplicitALS
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+from weighted_recommender import WeightedRecommender
+
+
+def test_conjugate_gradient_matches_direct_solve():
+    """k CG steps reproduce the closed-form weighted least-squares user factors"""
+    rng = np.random.default_rng(0)
+    X = (rng.random((25, 30)) < 0.2) * rng.random((25, 30))
+    model = ImplicitALS(n_components=4, alpha=10.0, regularization=0.5, iterations=5)
+    model.fit_transform(X)
+    V = model.components_.T
+
+    for u in range(5):
+        c = 1.0 + 10.0 * X[u]
+        A = V.T @ (c[:, None] * V) + 0.5 * np.eye(4)
+        expected = np.linalg.solve(A, V.T @ (c * (X[u] > 0)))
+        np.testing.assert_allclose(model.transform(X[[u]])[0], expected, atol=1e-8)
+    print("✅ CG fold-in matches the direct solve")
+
+
+def test_threaded_solve_matches_single_worker():
+    rng = np.random.default_rng(1)
+    X = (rng.random((60, 40)) < 0.15) * rng.random((60, 40))
+    single = ImplicitALS(n_components=5, iterations=4, n_workers=1).fit_transform(X)
+    threaded = ImplicitALS(n_components=5, iterations=4, n_workers=4).fit_transform(X)
+    np.testing.assert_allclose(single, threaded)
+    print("✅ Threaded ALS matches a single worker")
+
+
+def test_recommender_scores_with_als():
+    """collab_engine='als' fits, scores, folds in contributions and refits"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1, collab_engine='als'),
+                            n_donors=30, n_campaigns=40, n_interactions=150)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        assert isinstance(recommender.fit_collaborative(), ImplicitALS)
+
+    weighted = WeightedRecommender(recommender)
+    user_id = recommender.donor_df['id'].iloc[3]
+    scores = [weighted.compute_collaborative_score(user_id, c) for c in recommender.campaign_df['id']]
+    assert all(0.0 <= s <= 1.0 for s in scores) and max(scores) > 0
+
+    recommender.apply_contributions([{'userId': user_id, 'campaignId': recommender.campaign_df['id'].iloc[0],
+                                      'amount': 300}])
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert recommender.refit_collaborative()
+    assert isinstance(recommender.nmf_model, ImplicitALS) and recommender.pending_updates == 0
+    print("✅ Recommender scores with the ALS engine")
+
+
+def test_als_fits_raw_amounts_in_csr():
+    """ALS reads a CSR matrix of summed raw amounts, not the capped dense NMF matrix"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1, collab_engine='als'),
+                            n_donors=30, n_campaigns=40, n_interactions=150)
+    interactions = recommender.interactions_df
+    repeat = interactions.iloc[0]
+    recommender.interactions_df = pd.concat([interactions, interactions.iloc[[0]].assign(weight=2500.0)],
+                                            ignore_index=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        model = recommender.fit_collaborative()
+
+    confidence = recommender.confidence_matrix
+    assert sparse.isspmatrix_csr(confidence) and model.epsilon is not None
+    donor_idx, campaign_idx = recommender.donor_index[repeat['userId']], recommender.campaign_index[repeat['campaignId']]
+    # Repeat contributions add up instead of being capped at 1.0 (amount / 1000)
+    assert confidence[donor_idx, campaign_idx] == repeat['weight'] + 2500.0
+    assert recommender.user_item_matrix[donor_idx, campaign_idx] == 1.0
+    np.testing.assert_allclose(recommender.user_factors_for(donor_idx),
+                               model.transform(confidence[[donor_idx]]))
+
+    # Events add their raw amount; the NMF-side dense cell stays on its 0-1 scale
+    before = confidence[donor_idx, campaign_idx]
+    recommender.apply_contributions([{'userId': repeat['userId'], 'campaignId': repeat['campaignId'],
+                                      'amount': 400}])
+    assert recommender.confidence_matrix[donor_idx, campaign_idx] == before + 400
+    assert confidence[donor_idx, campaign_idx] == before  # replaced, not written in place
+
+    # The NMF engine has no confidence matrix
+    nmf = load_into(DatabaseMLRecommender(build_workers=1, collab_engine='nmf'),
+                    n_donors=10, n_campaigns=10, n_interactions=30)
+    with contextlib.redirect_stdout(io.StringIO()):
+        nmf._create_embeddings()
+        nmf.create_interaction_matrix()
+    assert nmf.confidence_matrix is None
+    print("✅ ALS fits raw contributed amounts from a CSR matrix")
+
+
+if __name__ == "__main__":
+    test_conjugate_gradient_matches_direct_solve()
+    test_threaded_solve_matches_single_worker()
+    test_recommender_scores_with_als()
+    test_als_fits_raw_amounts_in_csr()
@@ -0,0 +1,184 @@
+# test_backend_guard.py - Circuit breaker and fetch deadline budgets around backend export calls (local stub backend)
+
+import sys
+import os
+import contextlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import fastapi_app_db
+from backend_guard import (BREAKER_STATE, CLOSED, HALF_OPEN, OPEN, REQUEST_FETCHES, BackendUnavailable,
+                           CircuitBreaker, Deadline, DeadlineExceeded)
+from export_loader import ConditionalExport, ExportHTTPError, ExportLoader
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into, make_catalog
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Export endpoint that answers after `server.delay` seconds"""
+
+    def do_GET(self):
+        self.server.hits += 1
+        time.sleep(self.server.delay)
+        body = self.server.body
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up waiting, which is the point
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def slow_backend(delay):
+    _, campaigns, _ = make_catalog(n_donors=1, n_campaigns=20)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    server.daemon_threads = True
+    server.body = json.dumps({'campaigns': json.loads(campaigns.to_json(orient='records'))}).encode()
+    server.delay, server.hits = delay, 0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/api"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _fail(breaker, exc):
+    try:
+        with breaker.guard():
+            raise exc
+    except type(exc):
+        pass
+
+
+def test_breaker_states():
+    """Consecutive failures open the breaker; after the reset timeout one probe decides"""
+    breaker = CircuitBreaker('test-states', failure_threshold=2, reset_timeout=0.05)
+    _fail(breaker, ExportHTTPError('campaigns', 404))  # the backend answered: not a failure
+    _fail(breaker, ExportHTTPError('campaigns', 503))
+    assert breaker.state == CLOSED
+    _fail(breaker, ExportHTTPError('campaigns', 502))
+    assert breaker.state == OPEN and BREAKER_STATE.value(breaker='test-states') == 1
+    try:
+        with breaker.guard():
+            raise AssertionError("call let through an open breaker")
+    except BackendUnavailable:
+        pass
+
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED and breaker.failures == 0
+    print("✅ Breaker opens, fails fast and recovers through a half-open probe")
+
+
+def test_deadline_budget():
+    """Socket timeouts shrink with the remaining budget; a spent budget refuses to start a call"""
+    deadline = Deadline(10)
+    assert deadline.timeout(5) == 5 and 9 < deadline.timeout() <= 10
+    spent = Deadline(0)
+    assert spent.expired()
+    try:
+        spent.timeout(5)
+        raise AssertionError("spent deadline accepted")
+    except DeadlineExceeded:
+        pass
+    print("✅ Deadlines cap per-call timeouts")
+
+
+def test_slow_backend_trips_the_loader_breaker():
+    """Timeouts count as failures; once open, model builds fail fast without calling the backend"""
+    with slow_backend(delay=1.0) as server:
+        breaker = CircuitBreaker('test-loader', failure_threshold=2, reset_timeout=60)
+        loader = ExportLoader(server.url, timeout=0.1, breaker=breaker, retries=0)
+        for _ in range(2):
+            try:
+                loader.fetch('campaigns')
+                raise AssertionError("slow backend did not time out")
+            except BackendUnavailable:
+                raise
+            except Exception:
+                pass
+        assert breaker.state == OPEN and server.hits == 2
+        start = time.perf_counter()
+        try:
+            loader.fetch('campaigns')
+            raise AssertionError("open breaker let a fetch through")
+        except BackendUnavailable:
+            pass
+        assert time.perf_counter() - start < 0.05 and server.hits == 2
+    print("✅ A slow backend opens the breaker")
+
+
+def test_requests_serve_cached_campaigns_within_budget():
+    """/trending answers from the model's campaigns once the fetch budget is spent, then skips fetching"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=20, n_campaigns=30, n_interactions=60)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    saved = (fastapi_app_db.recommender, fastapi_app_db.weighted_recommender,
+             fastapi_app_db.fresh_campaigns_export, fastapi_app_db.FETCH_BUDGET, os.environ.get('BACKEND_API_URL'))
+    breaker = CircuitBreaker('test-request', failure_threshold=1, reset_timeout=60)
+    try:
+        with slow_backend(delay=2.0) as server:
+            os.environ['BACKEND_API_URL'] = server.url
+            fastapi_app_db.recommender = recommender
+            fastapi_app_db.weighted_recommender = fastapi_app_db.WeightedRecommender(recommender)
+            fastapi_app_db.fresh_campaigns_export = ConditionalExport('campaigns', breaker=breaker)
+            fastapi_app_db.FETCH_BUDGET = 0.2
+            fastapi_app_db.results_cache.clear()
+            client = TestClient(fastapi_app_db.app)
+
+            deadlines = REQUEST_FETCHES.value(endpoint='trending', outcome='deadline')
+            start = time.perf_counter()
+            response = client.post('/trending', params={'top_n': 5})
+            assert response.status_code == 200 and len(response.json()) == 5
+            assert time.perf_counter() - start < 1.0
+            assert REQUEST_FETCHES.value(endpoint='trending', outcome='deadline') == deadlines + 1
+
+            # The timed-out fetch opens the breaker; later requests don't wait at all
+            for _ in range(50):
+                if breaker.state == OPEN:
+                    break
+                time.sleep(0.05)
+            assert breaker.state == OPEN
+            hits, skipped = server.hits, REQUEST_FETCHES.value(endpoint='trending', outcome='breaker_open')
+            assert client.post('/trending', params={'top_n': 6}).status_code == 200
+            assert server.hits == hits
+            assert REQUEST_FETCHES.value(endpoint='trending', outcome='breaker_open') == skipped + 1
+            assert client.get('/status').json()['backend_breaker'] == OPEN
+    finally:
+        (fastapi_app_db.recommender, fastapi_app_db.weighted_recommender,
+         fastapi_app_db.fresh_campaigns_export, fastapi_app_db.FETCH_BUDGET, previous_url) = saved
+        fastapi_app_db.results_cache.clear()
+        if previous_url is None:
+            os.environ.pop('BACKEND_API_URL', None)
+        else:
+            os.environ['BACKEND_API_URL'] = previous_url
+    print("✅ Requests fall back to cached campaigns within the fetch budget")
+
+
+if __name__ == "__main__":
+    test_breaker_states()
+    test_deadline_budget()
+    test_slow_backend_trips_the_loader_breaker()
+    test_requests_serve_cached_campaigns_within_budget()
@@ -0,0 +1,56 @@
+# test_build_pipeline.py - Offline checks for the staged model build (no backend needed)
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import build_pipeline
+from build_pipeline import BuildPipeline, parallel_top_k, top_k_chunk
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+
+
+def test_parallel_top_k_matches_single_process():
+    """Chunked shared-memory top-k must equal the in-process result"""
+    rng = np.random.default_rng(0)
+    donors = rng.random((300, 40))
+    campaigns = rng.random((120, 40))
+    groups = rng.integers(-1, 3, size=300)
+    boosts = (rng.random((3, 120)) < 0.2) * 0.3
+
+    expected = top_k_chunk(donors, campaigns, 5, groups, boosts)
+
+    original_min = build_pipeline.PARALLEL_MIN_CELLS
+    build_pipeline.PARALLEL_MIN_CELLS = 1
+    try:
+        indices, scores = parallel_top_k(donors, campaigns, 5, groups, boosts, max_workers=2)
+    finally:
+        build_pipeline.PARALLEL_MIN_CELLS = original_min
+
+    assert np.array_equal(indices, expected[0])
+    assert np.allclose(scores, expected[1])
+    print("✅ parallel_top_k matches single-process top-k")
+
+
+def test_pipeline_records_stage_timings():
+    """The staged build reports a timing for every stage"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=2), n_donors=50, n_campaigns=80)
+    pipeline = BuildPipeline(max_workers=2)
+    recommender._create_embeddings(pipeline)
+    with pipeline.stage('interaction_matrix'):
+        recommender.create_interaction_matrix()
+    timings = pipeline.as_dict()
+
+    for stage in ('indexes', 'text_assembly', 'vectorizer_fit', 'donor_embeddings', 'campaign_embeddings',
+                  'interaction_matrix', 'total'):
+        assert stage in timings, f"missing stage {stage}"
+    # Every donor gets its top 5 content-based interactions
+    assert np.count_nonzero(recommender.user_item_matrix) == 50 * 5
+    print(f"✅ Stage timings: {timings}")
+
+
+if __name__ == "__main__":
+    test_parallel_top_k_matches_single_process()
+    test_pipeline_records_stage_timings()
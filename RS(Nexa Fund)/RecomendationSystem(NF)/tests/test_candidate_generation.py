@@ -0,0 +1,120 @@
+# test_candidate_generation.py - Two-stage retrieval before weighted scoring (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from candidate_generation import CandidateStage, category_related
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+from weighted_recommender import WeightedRecommender
+
+
+def _built_recommender():
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=40, n_campaigns=200, n_interactions=400)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.build_item_neighbors()
+        recommender.fit_nmf()
+    return recommender
+
+
+def test_sources_return_matching_campaigns():
+    """Each source returns capped, relevant, ACTIVE campaign rows"""
+    recommender = _built_recommender()
+    weighted = WeightedRecommender(recommender)
+    generator = CandidateStage(recommender, weighted.compute_trending_score, limit=60).generator()
+    user_id = recommender.donor_df['id'].iloc[0]
+    sources = generator.generate(user_id, {'interests': ['Health'], 'interestKeywords': ['solar']})
+
+    df = recommender.campaign_df
+    assert len(sources['category']) > 0
+    assert set(df['category'].iloc[sources['category']]) == {'Health & Fitness'}
+    assert all('solar' in f"{t} {d} {s}" for t, d, s in
+               df[['title', 'description', 'story']].iloc[sources['keyword']].itertuples(index=False))
+    assert (df['status'].iloc[sources['trending']] == 'ACTIVE').all()
+    assert all(len(rows) <= 20 for rows in sources.values())
+    assert category_related('health', 'health & fitness') and not category_related('art', 'games')
+    print("✅ Candidate sources return matching campaigns")
+
+
+def test_two_stage_keeps_top_results():
+    """With a candidate budget the best-scored campaigns match full scoring"""
+    recommender = _built_recommender()
+    weighted = WeightedRecommender(recommender)
+    weighted.candidates = CandidateStage(recommender, weighted.compute_trending_score, limit=90)
+    campaigns = recommender.campaign_df.to_dict('records')
+    user_id = recommender.donor_df['id'].iloc[3]
+    prefs = {'interests': ['Education'], 'interestKeywords': ['school']}
+
+    full = weighted.get_personalized_recommendations(user_id, prefs, campaigns, top_n=5, use_candidates=False)
+    staged = weighted.get_personalized_recommendations(user_id, prefs, campaigns, top_n=5)
+    assert [r['recommendationScore'] for r in staged] == [r['recommendationScore'] for r in full]
+
+    # Campaigns the model has not indexed yet are always scored
+    new = dict(campaigns[0], id='brand-new')
+    selected = weighted.candidates.select(user_id, prefs, campaigns + [new])
+    assert new in selected and len(selected) < len(campaigns)
+    print("✅ Two-stage scoring keeps the top results")
+
+
+def test_priors_follow_contributions():
+    """A contribution event re-scores only its campaign; requests never recompute the leaderboard"""
+    recommender = _built_recommender()
+    weighted = WeightedRecommender(recommender)
+    scored = []
+    stage = CandidateStage(recommender, lambda c: scored.append(c['id']) or weighted.compute_trending_score(c),
+                           limit=30)
+    generator = stage.generator()
+    campaign_id = recommender.campaign_df['id'].iloc[int(generator.leaderboard[-1])]
+
+    scored.clear()
+    applied = recommender.apply_contributions([{'userId': recommender.donor_df['id'].iloc[0],
+                                                'campaignId': campaign_id, 'amount': 10_000_000}] * 60)
+    assert stage.generator() is generator and scored == []
+    stage.campaigns_changed(applied['campaigns'])
+    assert scored == [campaign_id]
+    assert recommender.campaign_index[campaign_id] in generator.leaderboard[:10]
+
+    leaderboard = generator.leaderboard
+    stage.refresh_priors()
+    assert len(scored) == 1 + len(leaderboard) and list(generator.leaderboard) == list(leaderboard)
+    print("✅ Trending prior follows contribution events")
+
+
+def test_fold_in_extends_the_generator():
+    """Folded-in campaigns are added to the postings; the result matches a fresh build"""
+    recommender = _built_recommender()
+    weighted = WeightedRecommender(recommender)
+    stage = CandidateStage(recommender, weighted.compute_trending_score, limit=30)
+    before = stage.generator()
+    new = dict(recommender.campaign_df.iloc[0].to_dict(), id='fold-in-1', title='Zygomorphic orchid rescue',
+               category='Health & Fitness', status='ACTIVE')
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert recommender.fold_in_campaigns([new]) == ['fold-in-1']
+
+    extended = stage.generator()
+    fresh = CandidateStage(recommender, weighted.compute_trending_score, limit=30).generator()
+    assert extended is not before and before.n_campaigns == len(recommender.campaign_df) - 1
+    row = recommender.campaign_index['fold-in-1']
+    assert list(extended.token_postings['zygomorphic']) == [row]
+    for name in ('category_postings', 'token_postings', 'summary_postings'):
+        ours, theirs = getattr(extended, name), getattr(fresh, name)
+        assert ours.keys() == theirs.keys()
+        assert all(sorted(ours[key]) == sorted(theirs[key]) for key in theirs)
+    assert np.array_equal(extended.trending, fresh.trending)
+    assert np.array_equal(extended.active, fresh.active)
+    assert stage.generator() is extended
+    print("✅ Fold-in extends the candidate generator")
+
+
+if __name__ == "__main__":
+    test_sources_return_matching_campaigns()
+    test_two_stage_keeps_top_results()
+    test_priors_follow_contributions()
+    test_fold_in_extends_the_generator()
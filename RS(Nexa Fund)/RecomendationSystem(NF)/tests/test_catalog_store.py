@@ -0,0 +1,110 @@
+# test_catalog_store.py - Compact catalog frames (categoricals, packed text, flattened counts) and row views (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+import pickle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from catalog_store import CatalogRows, PackedText, PackedTextDtype, append_rows, contribution_counts, memory_bytes, slim_frame
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into, make_catalog
+from weighted_recommender import WeightedRecommender
+
+PREFERENCES = {'interests': ['education', 'art'], 'interestKeywords': ['solar', 'clean water'],
+               'fundingPreference': 'small'}
+
+
+def _same(a, b):
+    return a == b or (pd.isna(a) and pd.isna(b)) if not isinstance(a, (dict, list)) else a == b
+
+
+def test_slim_frame_keeps_values():
+    """Row views of the compact frame equal the exported records, in less memory"""
+    _, campaigns, _ = make_catalog(n_donors=1, n_campaigns=300)
+    campaigns.loc[4, 'description'] = None
+    slim = slim_frame(campaigns)
+
+    assert isinstance(slim['category'].dtype, pd.CategoricalDtype)
+    assert isinstance(slim['story'].dtype, PackedTextDtype)
+    assert slim['_count.contributions'].dtype == np.int32 and '_count' not in slim.columns
+    assert memory_bytes(slim) < memory_bytes(campaigns) * 0.7
+    assert slim_frame(slim).dtypes.equals(slim.dtypes)
+
+    rows = CatalogRows(slim)
+    for expected, row in zip(campaigns.to_dict('records'), rows):
+        assert list(row) == list(expected)
+        assert all(_same(row[key], value) for key, value in expected.items())
+    assert rows[4].copy()['_count'] == campaigns['_count'].iat[4]
+    assert [r['id'] for r in rows.subset([5, 2])] == ['campaign-5', 'campaign-2']
+    print("✅ Compact frames read back the exported values")
+
+
+def test_packed_text_column():
+    """Missing values, fills, takes, concatenation and pickling of a packed column"""
+    packed = PackedText._from_sequence(['solar', None, 'solar', 'école'])
+    # 'solar' is stored once: 5 + 6 UTF-8 bytes plus a (start, end) pair per row
+    assert packed.nbytes == 11 + 4 * 16 and packed.isna().tolist() == [False, True, False, False]
+    assert list(packed.fillna('')) == ['solar', '', 'solar', 'école']
+    assert list(packed.take([3, -1], allow_fill=True))[0] == 'école' and pd.isna(packed.take([-1], allow_fill=True)[0])
+    joined = PackedText._concat_same_type([packed[:2], packed[2:]])
+    assert list(joined.fillna('-')) == ['solar', '-', 'solar', 'école']
+
+    series = pd.Series(packed)
+    assert (series == 'solar').tolist() == [True, False, True, False]
+    restored = pickle.loads(pickle.dumps(series))
+    assert restored.dtype == series.dtype and restored.fillna('').tolist() == series.fillna('').tolist()
+    print("✅ Packed text behaves like a text column")
+
+
+def test_fold_in_and_events_stay_compact():
+    """Appended rows keep the compact dtypes; counts are incremented in place"""
+    _, campaigns, _ = make_catalog(n_donors=1, n_campaigns=50)
+    slim = slim_frame(campaigns)
+    new = pd.DataFrame([{'id': 'new', 'title': 'Robot lab', 'category': 'Robotics', 'status': 'ACTIVE'}])
+    grown = append_rows(slim, new)
+    for name in ('title', 'story', 'category', 'status', '_count.contributions'):
+        assert type(grown[name].dtype) is type(slim[name].dtype), name
+    assert grown['_count.contributions'].dtype == np.int32
+    assert grown['category'].iat[-1] == 'Robotics' and contribution_counts(grown)[-1] == 0
+
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=20, n_campaigns=40, n_interactions=100)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+    before = contribution_counts(recommender.campaign_df)[3]
+    campaign_id = recommender.campaign_df['id'].iat[3]
+    recommender.apply_contributions([{'userId': recommender.donor_df['id'].iat[0], 'campaignId': campaign_id}] * 2)
+    assert contribution_counts(recommender.campaign_df)[3] == before + 2
+    print("✅ Fold-ins and contribution events keep the catalog compact")
+
+
+def test_recommendations_match_exported_frames():
+    """Personalized and trending lists are identical with and without the compact catalog"""
+    results = []
+    for slim in (False, True):
+        recommender = load_into(DatabaseMLRecommender(build_workers=1, slim_catalog=slim),
+                                n_donors=40, n_campaigns=400, n_interactions=400)
+        with contextlib.redirect_stdout(io.StringIO()):
+            recommender._create_embeddings()
+            recommender.create_interaction_matrix()
+            recommender.fit_nmf()
+        weighted = WeightedRecommender(recommender)
+        user_id = recommender.donor_df['id'].iat[3]
+        lists = [weighted.get_personalized_recommendations(user_id, PREFERENCES, top_n=10),
+                 weighted.get_personalized_recommendations(user_id, {}, top_n=10),
+                 weighted.get_non_personalized_recommendations(top_n=10)]
+        results.append([[(c['id'], c['recommendationScore'], c['badge']) for c in lst] for lst in lists])
+    assert results[0] == results[1]
+    print("✅ Recommendations are unchanged by the compact catalog")
+
+
+if __name__ == "__main__":
+    test_slim_frame_keeps_values()
+    test_packed_text_column()
+    test_fold_in_and_events_stay_compact()
+    test_recommendations_match_exported_frames()
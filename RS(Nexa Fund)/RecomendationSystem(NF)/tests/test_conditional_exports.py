@@ -0,0 +1,188 @@
+# test_conditional_exports.py - ETag / digest validators on the export endpoints skip transfers, parsing and rebuilds (local stub backend)
+
+import sys
+import os
+import contextlib
+import hashlib
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import requests
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import fastapi_app_db
+import metrics
+from export_loader import EXPORT_BYTES_AVOIDED, REBUILDS_AVOIDED, ConditionalExport, ExportLoader
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import make_catalog
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """Express-style export endpoint: strong ETag on every body, 304 for a matching If-None-Match"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.rsplit('/', 1)[-1]
+        rows = self.server.rows[endpoint]
+        payload = {endpoint: rows}
+        limit = parse_qs(url.query).get('limit')
+        if self.server.paged and limit:
+            start = int(parse_qs(url.query).get('cursor', ['0'])[0])
+            end = start + int(limit[0])
+            payload = {endpoint: rows[start:end], 'nextCursor': str(end) if end < len(rows) else None}
+        body = json.dumps(payload).encode()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        status = 200
+        if self.server.etags and self.headers.get('If-None-Match') == etag:
+            status = 304
+        self.server.log.append((endpoint, status))
+        self.send_response(status)
+        if self.server.etags:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '0' if status == 304 else str(len(body)))
+        self.end_headers()
+        if status == 200:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def stub_backend(etags=True, paged=False):
+    donors, campaigns, interactions = make_catalog(n_donors=30, n_campaigns=45, n_interactions=80)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ExportHandler)
+    server.rows = {name: json.loads(frame.to_json(orient='records'))
+                   for name, frame in (('donors', donors), ('campaigns', campaigns), ('interactions', interactions))}
+    server.etags, server.paged, server.log = etags, paged, []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/api"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_loader_sends_validators():
+    """A current ETag gets a 304 and no frame; paged exports fall back to body digests"""
+    with stub_backend() as server:
+        loader = ExportLoader(server.url)
+        frame = loader.fetch('campaigns')
+        version = loader.versions['campaigns']
+        assert len(frame) == 45 and version.etag and version.nbytes > 0
+
+        avoided = EXPORT_BYTES_AVOIDED.value(endpoint='campaigns')
+        assert loader.fetch('campaigns', known=version) is None
+        assert loader.unchanged('campaigns', version) and server.log[-1] == ('campaigns', 304)
+        assert EXPORT_BYTES_AVOIDED.value(endpoint='campaigns') == avoided + version.nbytes
+
+    with stub_backend(paged=True) as server:
+        loader = ExportLoader(server.url, page_size=20)
+        loader.fetch('campaigns')
+        version = loader.versions['campaigns']
+        # A page's ETag doesn't cover the later pages, so only the digest is kept
+        assert version.etag is None and version.digest
+        assert len(loader.fetch('campaigns', known=version)) == 45 and loader.unchanged('campaigns', version)
+        server.rows['campaigns'][30]['title'] = 'Changed on page two'
+        loader.fetch('campaigns', known=version)
+        assert not loader.unchanged('campaigns', version)
+    print("✅ Export validators skip unchanged transfers")
+
+
+def test_rebuild_skipped_when_exports_unchanged():
+    """Refreshing against the serving model's versions rebuilds only when an export changed"""
+    for etags in (True, False):
+        with stub_backend(etags=etags) as server, contextlib.redirect_stdout(io.StringIO()):
+            serving = DatabaseMLRecommender(backend_url=server.url, build_workers=1)
+            assert serving.build_model()
+
+            skipped = REBUILDS_AVOIDED.value()
+            fresh = DatabaseMLRecommender(backend_url=server.url, build_workers=1)
+            assert not fresh.build_model(serving.export_versions)
+            assert fresh.exports_unchanged and fresh.donor_df is None and 'embeddings' not in str(fresh.build_timings)
+            assert REBUILDS_AVOIDED.value() == skipped + 1
+            if etags:
+                assert [status for _, status in server.log[-3:]] == [304, 304, 304]
+
+            server.rows['interactions'].append({'userId': 'user-1', 'campaignId': 'campaign-2', 'weight': 40.0})
+            server.log.clear()
+            fresh = DatabaseMLRecommender(backend_url=server.url, build_workers=1)
+            assert fresh.build_model(serving.export_versions, serving) and not fresh.exports_unchanged
+            assert len(fresh.donor_df) == 30 and len(fresh.interactions_df) == len(server.rows['interactions'])
+            assert fresh.campaign_df is not serving.campaign_df
+            assert fresh.campaign_df['id'].tolist() == serving.campaign_df['id'].tolist()
+            if etags:
+                # Exports answered 304 are copied from the serving model, only the changed one is downloaded
+                assert server.log == [('donors', 304), ('campaigns', 304), ('interactions', 200)]
+
+                # Without a serving model to copy from (cold start) they are fetched again in full
+                server.log.clear()
+                cold = DatabaseMLRecommender(backend_url=server.url, build_workers=1)
+                assert cold.build_model(serving.export_versions)
+                assert server.log == [('donors', 304), ('campaigns', 304), ('interactions', 200),
+                                      ('donors', 200), ('campaigns', 200)]
+    print("✅ Unchanged exports skip the rebuild")
+
+
+class StreamingSession(requests.Session):
+    """Fails any request whose body would be read into memory in one piece"""
+
+    def get(self, *args, **kwargs):
+        assert kwargs.get('stream'), "export bodies must be streamed"
+        return super().get(*args, **kwargs)
+
+
+def test_fresh_campaigns_reused_until_changed():
+    """Per-request campaign rows are parsed once per export version, with or without ETags"""
+    for etags in (True, False):
+        with stub_backend(etags=etags) as server:
+            export = ConditionalExport('campaigns', session=StreamingSession())
+            parses = metrics.STAGE_SECONDS.count(endpoint='trending', stage='parse')
+            rows = export.get(server.url, stage_endpoint='trending')
+            assert len(rows) == 45 and export.get(server.url, stage_endpoint='trending') is rows
+            if metrics.ENABLED:
+                # A 304 is not decoded at all; without validators the streamed body is
+                # decoded again, but the rows from the first answer are kept
+                assert metrics.STAGE_SECONDS.count(endpoint='trending', stage='parse') == parses + (1 if etags else 2)
+            server.rows['campaigns'][0]['currentAmount'] = 999.0
+            updated = export.get(server.url)
+            assert updated is not rows and updated[0]['currentAmount'] == 999.0
+    print("✅ Fresh campaign rows are reused until the export changes")
+
+
+def test_refresh_endpoint_reports_unchanged():
+    """POST /refresh keeps the serving model when nothing changed; force=true rebuilds anyway"""
+    previous_model, previous_weighted = fastapi_app_db.recommender, fastapi_app_db.weighted_recommender
+    previous_url = os.environ.get('BACKEND_API_URL')
+    try:
+        with stub_backend() as server, contextlib.redirect_stdout(io.StringIO()):
+            os.environ['BACKEND_API_URL'] = server.url
+            serving = DatabaseMLRecommender(backend_url=server.url, build_workers=1)
+            assert serving.build_model()
+            fastapi_app_db.recommender = serving
+            client = TestClient(fastapi_app_db.app)
+            assert client.post('/refresh').json()['status'] == 'unchanged'
+            assert fastapi_app_db.recommender is serving
+            assert client.post('/refresh', params={'force': True}).json()['status'] == 'success'
+            assert fastapi_app_db.recommender is not serving
+    finally:
+        fastapi_app_db.recommender, fastapi_app_db.weighted_recommender = previous_model, previous_weighted
+        if previous_url is None:
+            os.environ.pop('BACKEND_API_URL', None)
+        else:
+            os.environ['BACKEND_API_URL'] = previous_url
+    print("✅ /refresh reports unchanged exports")
+
+
+if __name__ == "__main__":
+    test_loader_sends_validators()
+    test_rebuild_skipped_when_exports_unchanged()
+    test_fresh_campaigns_reused_until_changed()
+    test_refresh_endpoint_reports_unchanged()
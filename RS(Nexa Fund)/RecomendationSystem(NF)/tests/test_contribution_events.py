@@ -0,0 +1,75 @@
+# test_contribution_events.py - Online contribution updates and cache invalidation (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from catalog_store import contribution_counts
+from ml_recommender_db import DatabaseMLRecommender
+from recommendation_cache import RecommendationCache
+from synthetic_data import load_into
+
+
+def _built_recommender():
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=30, n_campaigns=40, n_interactions=150)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    return recommender
+
+
+def test_contribution_updates_counters_row_and_factors():
+    """An event updates trending inputs, the interaction cell and the donor's folded-in factors"""
+    recommender = _built_recommender()
+    user_id = recommender.donor_df['id'].iloc[4]
+    campaign_id = recommender.campaign_df['id'].iloc[9]
+    donor_idx, campaign_idx = recommender.donor_index[user_id], recommender.campaign_index[campaign_id]
+
+    count_before = contribution_counts(recommender.campaign_df)[campaign_idx]
+    amount_before = float(recommender.campaign_df.at[campaign_idx, 'currentAmount'])
+    cell_before = recommender.user_item_matrix[donor_idx, campaign_idx]
+    recommender.user_factors_for(donor_idx)
+
+    applied = recommender.apply_contributions([
+        {'userId': user_id, 'campaignId': campaign_id, 'amount': 250},
+        {'userId': 'unknown-user', 'campaignId': 'unknown-campaign', 'amount': 10},
+    ])
+
+    assert applied == {'users': {user_id}, 'campaigns': {campaign_id}, 'unknown': 1}
+    assert contribution_counts(recommender.campaign_df)[campaign_idx] == count_before + 1
+    assert float(recommender.campaign_df.at[campaign_idx, 'currentAmount']) == amount_before + 250
+    assert recommender.user_item_matrix[donor_idx, campaign_idx] == min(cell_before + 0.25, 1.0)
+
+    # Cached factors match a fresh fold-in of the updated row
+    row = recommender.user_item_matrix[[donor_idx]].astype(recommender.nmf_model.components_.dtype)
+    expected = recommender.nmf_model.transform(row)
+    np.testing.assert_array_equal(recommender.user_factors_for(donor_idx), expected)
+    print("✅ Contribution event updates counters, interaction row and factors")
+
+
+def test_cache_invalidates_only_affected_entries():
+    """Only the user's lists, lists showing the campaign, and trending lists are dropped"""
+    cache = RecommendationCache(ttl=60)
+    cache.put('personalized', ('alice', 5), ['c1', 'c2'], user_id='alice', campaign_ids=['c1', 'c2'])
+    cache.put('personalized', ('bob', 5), ['c2', 'c3'], user_id='bob', campaign_ids=['c2', 'c3'])
+    cache.put('personalized', ('carol', 5), ['c4'], user_id='carol', campaign_ids=['c4'])
+    cache.put('trending', 20, ['c4', 'c1'])
+
+    dropped = cache.invalidate(user_ids=['alice'], campaign_ids=['c3'], kinds=['trending'])
+
+    assert dropped == 3
+    assert cache.get('personalized', ('alice', 5)) is None
+    assert cache.get('personalized', ('bob', 5)) is None
+    assert cache.get('trending', 20) is None
+    assert cache.get('personalized', ('carol', 5)) == ['c4']
+    print("✅ Cache drops only the affected entries")
+
+
+if __name__ == "__main__":
+    test_contribution_updates_counters_row_and_factors()
+    test_cache_invalidates_only_affected_entries()
@@ -0,0 +1,126 @@
+# test_embedding_pipeline.py - Immutable, shareable embedding pipeline persisted with the model (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import embed_utils_tfidf
+import ml_recommender_db
+from embed_utils_tfidf import EmbeddingPipeline, campaign_text_fields, join_text_fields, numeric_matrix
+from ml_recommender_db import DatabaseMLRecommender
+from model_bundle import attach_bundle, publish_bundle
+from synthetic_data import load_into
+
+
+def _built_recommender():
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=30, n_campaigns=60, n_interactions=150)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    return recommender
+
+
+def _transform(args):
+    pipeline, df = args
+    return pipeline.transform(df)
+
+
+def test_single_row_uses_fit_time_ranges():
+    """One row embeds exactly like it did in the full batch (numeric features are not collapsed)"""
+    recommender = _built_recommender()
+    pipeline = recommender.campaign_pipeline
+    single = pipeline.transform(recommender.campaign_df.iloc[[7]])
+    np.testing.assert_allclose(single[0], recommender.campaign_embeddings[7], rtol=1e-6, atol=1e-7)
+    numeric = single[0, -len(pipeline.numeric_fields):]
+    assert np.count_nonzero(numeric) > 0
+    assert pipeline.text_fields == campaign_text_fields()
+    print("✅ Single rows are scaled against the fit-time ranges")
+
+
+def test_concurrent_transforms_and_immutability():
+    """Threads and processes embed batches identically; transform never changes the pipeline"""
+    recommender = _built_recommender()
+    pipeline = recommender.campaign_pipeline
+    df = recommender.campaign_df
+    snapshot = pickle.dumps(pipeline)
+    expected = pipeline.transform(df)
+
+    batches = [df.iloc[start:start + 7] for start in range(0, len(df), 7)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        threaded = np.vstack(list(pool.map(pipeline.transform, batches)))
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        processed = np.vstack(list(pool.map(_transform, [(pipeline, batch) for batch in batches])))
+    np.testing.assert_allclose(threaded, expected)
+    np.testing.assert_allclose(processed, expected)
+    assert pickle.dumps(pipeline) == snapshot
+
+    try:
+        pipeline._numeric_min[0] = 5
+        raise AssertionError("fitted ranges are writable")
+    except ValueError:
+        pass
+
+    # Fitting on a different frame gives a different, independent pipeline
+    other = EmbeddingPipeline.fit(df.iloc[:5], pipeline.text_fields, pipeline.numeric_fields, pipeline.vectorizer)
+    assert not np.allclose(other.transform(df), expected)
+    assert pickle.dumps(pipeline) == snapshot
+    assert numeric_matrix(df.iloc[:1], ['missing']).tolist() == [[0.0]]
+    print("✅ Concurrent transforms are identical and leave the pipeline unchanged")
+
+
+def test_text_assembly_is_vectorized_and_built_once():
+    """Vectorized joins equal the per-row join; a build assembles each document list once"""
+    df = pd.DataFrame({'title': ['Solar', None, 'Art', 7], 'description': ['school', 'wells', None, 'x']})
+    per_row = df.fillna("").astype(str).agg(" ".join, axis=1).tolist()
+    assert join_text_fields(df, ['title', 'description']) == per_row
+    assert join_text_fields(df, ['title', 'missing']) == ['Solar ', ' ', 'Art ', '7 ']
+    assert join_text_fields(df, []) == [''] * 4
+
+    calls = []
+    original = embed_utils_tfidf.join_text_fields
+
+    def counting(frame, fields):
+        calls.append(tuple(fields))
+        return original(frame, fields)
+
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=10, n_campaigns=20)
+    ml_recommender_db.join_text_fields = embed_utils_tfidf.join_text_fields = counting
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            recommender._create_embeddings()
+    finally:
+        ml_recommender_db.join_text_fields = embed_utils_tfidf.join_text_fields = original
+    assert sorted(calls) == sorted([tuple(recommender.donor_pipeline.text_fields), tuple(campaign_text_fields())])
+    print("✅ Text assembly is vectorized and done once per build")
+
+
+def test_pipeline_persists_with_bundle():
+    """An attached worker folds in new campaigns with the builder's pipeline"""
+    builder = _built_recommender()
+    campaign = dict(builder.campaign_df.iloc[3].to_dict(), id='late-campaign', title='Late solar school')
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            publish_bundle(builder, bundle_dir)
+        worker = DatabaseMLRecommender()
+        attach_bundle(worker, bundle_dir)
+        assert isinstance(worker.campaign_pipeline, EmbeddingPipeline)
+        worker.fold_in_campaigns([campaign])
+    builder.fold_in_campaigns([campaign])
+    np.testing.assert_allclose(worker.campaign_embeddings[-1], builder.campaign_embeddings[-1])
+    print("✅ Pipeline persists with the model bundle")
+
+
+if __name__ == "__main__":
+    test_single_row_uses_fit_time_ranges()
+    test_concurrent_transforms_and_immutability()
+    test_text_assembly_is_vectorized_and_built_once()
+    test_pipeline_persists_with_bundle()
@@ -0,0 +1,90 @@
+# test_embedding_storage.py - float32 / int8 storage of embeddings and factor matrices (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from embedding_storage import QuantizedRows, row_norms, store_rows
+from ml_recommender_db import DatabaseMLRecommender
+from model_bundle import attach_bundle, publish_bundle
+from synthetic_data import load_into
+
+
+def _built_recommender(precision):
+    recommender = load_into(DatabaseMLRecommender(build_workers=1, embedding_precision=precision),
+                            n_donors=40, n_campaigns=80, n_interactions=200)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    return recommender
+
+
+def test_quantized_rows_dequantize_on_the_fly():
+    """Row reads, products and norms match the dequantized matrix; writes re-quantize"""
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(50, 64))
+    matrix[3] = 0
+    quantized = QuantizedRows.quantize(matrix)
+    dense = np.asarray(quantized)
+
+    assert quantized.codes.dtype == np.int8 and quantized.nbytes < matrix.nbytes / 7
+    assert np.abs(dense - matrix).max() <= np.abs(matrix).max(axis=1).max() / 127
+    vector = rng.normal(size=64)
+    assert np.allclose(quantized @ vector, dense @ vector, atol=1e-5)
+    assert np.allclose(quantized @ matrix.T, dense @ matrix.T, atol=1e-4)
+    assert np.allclose(quantized[5], dense[5]) and np.allclose(quantized[2:4], dense[2:4])
+    assert np.allclose(row_norms(quantized), np.linalg.norm(dense, axis=1), atol=1e-5)
+
+    quantized[7] = matrix[0]
+    assert np.allclose(quantized[7], dense[0])
+    assert store_rows(matrix, 'float32').dtype == np.float32
+    print("✅ QuantizedRows dequantize on the fly")
+
+
+def test_precision_modes_keep_rankings():
+    """float32 and int8 storage give the float64 top campaigns; factors are float32"""
+    reference = _built_recommender('float64')
+    donor_id = reference.donor_df['id'].iloc[5]
+    expected = reference.get_recommendations(donor_id, top_k=5)['campaign_id'].tolist()
+
+    for precision in ('float32', 'int8'):
+        recommender = _built_recommender(precision)
+        assert recommender.user_factor_matrix.dtype == np.float32
+        assert recommender.nmf_model.components_.dtype == np.float32
+        assert recommender.get_recommendations(donor_id, top_k=5)['campaign_id'].tolist() == expected
+    assert isinstance(recommender.campaign_embeddings, QuantizedRows)
+    assert recommender.campaign_embeddings.nbytes < reference.campaign_embeddings.nbytes / 7
+    print("✅ float32 and int8 storage keep the float64 rankings")
+
+
+def test_int8_fold_in_and_bundle():
+    """Quantized embeddings grow on fold-in and round-trip through the bundle memory-mapped"""
+    recommender = _built_recommender('int8')
+    campaign = dict(recommender.campaign_df.iloc[0].to_dict(), id='new-campaign')
+    recommender.fold_in_campaigns([campaign])
+    embeddings = recommender.campaign_embeddings
+    assert isinstance(embeddings, QuantizedRows) and len(embeddings) == 81
+    assert np.allclose(embeddings[80], embeddings[0], atol=1e-2)
+
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            publish_bundle(recommender, bundle_dir)
+        worker = DatabaseMLRecommender()
+        attach_bundle(worker, bundle_dir)
+        assert isinstance(worker.campaign_embeddings, QuantizedRows)
+        assert isinstance(worker.campaign_embeddings.codes, np.memmap)
+        assert np.array_equal(np.asarray(worker.campaign_embeddings), np.asarray(embeddings))
+        assert worker.embedding_precision == 'int8'
+    print("✅ int8 embeddings fold in and round-trip through the bundle")
+
+
+if __name__ == "__main__":
+    test_quantized_rows_dequantize_on_the_fly()
+    test_precision_modes_keep_rankings()
+    test_int8_fold_in_and_bundle()
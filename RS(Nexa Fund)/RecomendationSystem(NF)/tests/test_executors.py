@@ -0,0 +1,286 @@
+# test_executors.py - Worker pools keep scoring off the event loop (no backend needed)
+
+import sys
+import os
+import asyncio
+import concurrent.futures
+import contextlib
+import io
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi.testclient import TestClient
+
+import executors
+import fastapi_app_db
+from admission import AdmissionController
+from backend_guard import CircuitBreaker
+from executors import RUN_SECONDS, WorkerPool
+from metrics import STAGE_SECONDS
+from export_loader import ConditionalExport
+from ml_recommender_db import DatabaseMLRecommender
+from model_bundle import publish_bundle
+from synthetic_data import load_into, make_catalog
+from weighted_recommender import WeightedRecommender
+
+
+def _busy(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_event_loop_stays_responsive():
+    """A saturated batch pool neither blocks the loop nor delays interactive jobs"""
+    interactive = WorkerPool('test-interactive', 2)
+    batch = WorkerPool('test-batch', 1)
+
+    async def scenario():
+        refreshes = [asyncio.ensure_future(batch.run(_busy, 0.3)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert batch.queue_depth() == 2
+
+        ticks = 0
+        start = time.perf_counter()
+        scoring = asyncio.ensure_future(interactive.run(_busy, 0.05))
+        while not scoring.done():
+            ticks += 1
+            await asyncio.sleep(0.005)
+        interactive_latency = time.perf_counter() - start
+        await asyncio.gather(*refreshes)
+        return ticks, interactive_latency
+
+    try:
+        ticks, latency = asyncio.run(scenario())
+    finally:
+        interactive.shutdown()
+        batch.shutdown()
+
+    assert ticks > 3, "event loop was blocked while the job ran"
+    assert latency < 0.25, f"interactive job waited behind batch jobs ({latency:.3f}s)"
+    assert executors.WAIT_SECONDS.count(pool='test-batch') == 3
+    assert executors.QUEUE_DEPTH.value(pool='test-batch') == 0
+    print("✅ Event loop stays responsive and pools are isolated")
+
+
+def test_process_pool_scoring_matches_threads():
+    """Personalized scoring in a process attached to the bundle matches in-process scoring"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=30, n_campaigns=40, n_interactions=120)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+
+    user_id = recommender.donor_df['id'].iloc[2]
+    prefs = {'interests': ['health']}
+    expected = WeightedRecommender(recommender).get_personalized_recommendations(user_id, prefs, top_n=8)
+
+    pool = WorkerPool('test-scoring', 1, kind='process')
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            version = publish_bundle(recommender, bundle_dir)
+        try:
+            actual, stages = asyncio.run(pool.run(executors.personalized_in_process, bundle_dir, version,
+                                                  user_id, prefs, None, 8))
+        finally:
+            pool.shutdown()
+
+    assert [r['id'] for r in actual] == [r['id'] for r in expected]
+    assert [r['scores'] for r in actual] == [r['scores'] for r in expected]
+    # Stage timings come back with the result for the parent's /metrics
+    assert {'top_k', 'score_interest', 'score_collaborative'} <= {stage for endpoint, stage, _ in stages}
+    print("✅ Process-pool scoring matches in-process scoring")
+
+
+@contextlib.contextmanager
+def scoring_pool_app(recommender, bundle_dir):
+    """The app on `recommender` with personalized scoring in a one-process pool (backend fetches skipped)"""
+    breaker = CircuitBreaker('test-scoring-pool', failure_threshold=1, reset_timeout=600)
+    breaker.record_failure()
+    names = ('recommender', 'weighted_recommender', 'fresh_campaigns_export', 'admission', 'SCORING_BUNDLE_DIR')
+    saved = {name: getattr(fastapi_app_db, name) for name in names}
+    saved_pool = executors.SCORING
+    try:
+        executors.SCORING = WorkerPool('test-scoring-app', 1, kind='process')
+        fastapi_app_db.SCORING_BUNDLE_DIR = bundle_dir
+        fastapi_app_db.recommender = recommender
+        fastapi_app_db.weighted_recommender = WeightedRecommender(recommender)
+        fastapi_app_db.fresh_campaigns_export = ConditionalExport('campaigns', breaker=breaker)
+        fastapi_app_db.admission = AdmissionController(max_inflight=0, latency_budget=0)
+        fastapi_app_db.results_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fastapi_app_db._publish_for_scoring(recommender)
+        yield TestClient(fastapi_app_db.app)
+    finally:
+        executors.SCORING.shutdown()
+        executors.SCORING = saved_pool
+        for name, value in saved.items():
+            setattr(fastapi_app_db, name, value)
+        fastapi_app_db.results_cache.clear()
+
+
+def test_folded_in_donor_scored_with_process_pool():
+    """Fold-ins after the bundle was published are scored in-thread until a refit republishes it"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=30, n_campaigns=40, n_interactions=120)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    donors, _, _ = make_catalog(n_donors=1, n_campaigns=1, seed=7)
+    donor = dict(donors.to_dict('records')[0], id='late-donor')
+
+    with tempfile.TemporaryDirectory() as bundle_dir, scoring_pool_app(recommender, bundle_dir) as client:
+        def personalized():
+            response = client.post('/personalized', json={'user_id': 'late-donor', 'top_n': 10})
+            assert response.status_code == 200, response.text
+            return response.json()
+
+        assert client.post('/events/donors', json={'donors': [donor]}).json()['added'] == 1
+        backed = recommender.campaign_df['id'].iloc[:3].tolist()
+        recommender.apply_contributions([{'userId': 'late-donor', 'campaignId': c, 'amount': 500} for c in backed])
+        pooled = RUN_SECONDS.count(pool='test-scoring-app')
+        assert any(rec['scores']['collaborative'] > 0 for rec in personalized())
+        assert RUN_SECONDS.count(pool='test-scoring-app') == pooled  # the bundle has no such donor yet
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert asyncio.run(fastapi_app_db._refit_pending())
+        assert recommender.published_revision == recommender.revision
+        assert any(rec['scores']['collaborative'] > 0 for rec in personalized())
+        assert RUN_SECONDS.count(pool='test-scoring-app') == pooled + 1
+    print("✅ Folded-in donors get collaborative scores with the process pool on")
+
+
+def test_contribution_events_scored_with_process_pool():
+    """After a contribution event the process pool is skipped until the bundle holds it"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=30, n_campaigns=40, n_interactions=120)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    user_id = str(recommender.donor_df['id'].iloc[4])
+    campaigns = recommender.campaign_df['id'].iloc[10:14].tolist()
+
+    with tempfile.TemporaryDirectory() as bundle_dir, scoring_pool_app(recommender, bundle_dir) as client:
+        events = [{'userId': user_id, 'campaignId': c, 'amount': 900} for c in campaigns]
+        assert client.post('/events/contribution', json={'events': events}).json()['applied'] == len(events)
+        assert recommender.published_revision < recommender.revision
+
+        pooled = RUN_SECONDS.count(pool='test-scoring-app')
+        response = client.post('/personalized', json={'user_id': user_id, 'top_n': 10})
+        assert response.status_code == 200, response.text
+        expected = WeightedRecommender(recommender).get_personalized_recommendations(user_id, None, top_n=10)
+        assert [rec['scores'] for rec in response.json()] == [rec['scores'] for rec in expected]
+        assert RUN_SECONDS.count(pool='test-scoring-app') == pooled
+    print("✅ Contribution events are scored with the process pool on")
+
+
+def test_process_pool_used_again_soon_after_an_event():
+    """An event is republished REPUBLISH_DELAY seconds later, then requests go back to the pool"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=30, n_campaigns=40, n_interactions=120)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    user_id = str(recommender.donor_df['id'].iloc[6])
+    events = [{'userId': user_id, 'campaignId': c, 'amount': 700} for c in recommender.campaign_df['id'].iloc[20:23]]
+
+    async def scenario():
+        # One event loop for the whole scenario, so the scheduled republish task keeps running
+        transport = httpx.ASGITransport(app=fastapi_app_db.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            response = await client.post('/events/contribution', json={'events': events})
+            assert response.json()['applied'] == len(events)
+            assert recommender.published_revision < recommender.revision
+            pooled = RUN_SECONDS.count(pool='test-scoring-app')
+            assert (await client.post('/personalized', json={'user_id': user_id, 'top_n': 10})).status_code == 200
+            assert RUN_SECONDS.count(pool='test-scoring-app') == pooled
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                await fastapi_app_db._republish_task
+            assert recommender.published_revision == recommender.revision
+            # Another top_n: the first answer is cached and still valid
+            top_k = STAGE_SECONDS.count(endpoint='personalized', stage='top_k')
+            response = await client.post('/personalized', json={'user_id': user_id, 'top_n': 8})
+            assert response.status_code == 200, response.text
+            assert RUN_SECONDS.count(pool='test-scoring-app') == pooled + 1
+            # Stage timings of the scoring process reach this process's /metrics
+            assert STAGE_SECONDS.count(endpoint='personalized', stage='top_k') == top_k + 1
+            return response.json()
+
+    lock_free = []
+
+    def take_and_release(lock):
+        if not lock.acquire(timeout=1):
+            return False
+        lock.release()
+        return True
+
+    def publish_checking_lock(model, bundle_dir):
+        # Events can still take the update lock while the bundle is written
+        with concurrent.futures.ThreadPoolExecutor(1) as other:
+            lock_free.append(other.submit(take_and_release, model._update_lock).result())
+        return publish_bundle(model, bundle_dir)
+
+    saved_delay, saved_publish = fastapi_app_db.REPUBLISH_DELAY, fastapi_app_db.publish_bundle
+    with tempfile.TemporaryDirectory() as bundle_dir, scoring_pool_app(recommender, bundle_dir):
+        fastapi_app_db.REPUBLISH_DELAY = 0.05
+        fastapi_app_db.publish_bundle = publish_checking_lock
+        try:
+            start = time.perf_counter()
+            pooled = asyncio.run(scenario())
+            assert time.perf_counter() - start < 10
+        finally:
+            fastapi_app_db.REPUBLISH_DELAY, fastapi_app_db.publish_bundle = saved_delay, saved_publish
+        assert lock_free == [True]
+        expected = WeightedRecommender(recommender).get_personalized_recommendations(user_id, None, top_n=8)
+        assert [rec['scores'] for rec in pooled] == [rec['scores'] for rec in expected]
+    print("✅ The process pool is used again soon after an event")
+
+
+def test_process_pool_receives_only_candidates():
+    """Fresh campaign rows are cut to the candidates before they are pickled to the scoring process"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=30, n_campaigns=40, n_interactions=120)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    fresh = recommender.campaign_df.astype(object).to_dict('records')
+    user_id = str(recommender.donor_df['id'].iloc[5])
+    prefs = {'interests': ['health'], 'interestKeywords': ['clinic']}
+
+    async def fresh_campaigns(endpoint):
+        return fresh
+
+    saved_fetch = fastapi_app_db._fresh_campaigns
+    with tempfile.TemporaryDirectory() as bundle_dir, scoring_pool_app(recommender, bundle_dir) as client:
+        fastapi_app_db.weighted_recommender.candidates.limit = 12
+        sent = []
+        pool_run = executors.SCORING.run
+
+        async def recording_run(fn, *args):
+            sent.append(args)
+            return await pool_run(fn, *args)
+        executors.SCORING.run = recording_run
+        try:
+            fastapi_app_db._fresh_campaigns = fresh_campaigns
+            response = client.post('/personalized', json={'user_id': user_id, 'user_preferences': prefs, 'top_n': 5})
+        finally:
+            fastapi_app_db._fresh_campaigns = saved_fetch
+        assert response.status_code == 200, response.text
+
+        campaigns, use_candidates = sent[0][4], sent[0][7]
+        assert len(sent) == 1 and not use_candidates and 0 < len(campaigns) < len(fresh)
+        expected = fastapi_app_db.weighted_recommender.get_personalized_recommendations(user_id, prefs, fresh, top_n=5)
+        assert [rec['campaign_id'] for rec in response.json()] == [rec['id'] for rec in expected]
+        assert [rec['scores'] for rec in response.json()] == [rec['scores'] for rec in expected]
+    print("✅ Only candidate rows are sent to the scoring process")
+
+
+if __name__ == "__main__":
+    test_event_loop_stays_responsive()
+    test_process_pool_scoring_matches_threads()
+    test_folded_in_donor_scored_with_process_pool()
+    test_contribution_events_scored_with_process_pool()
+    test_process_pool_used_again_soon_after_an_event()
+    test_process_pool_receives_only_candidates()
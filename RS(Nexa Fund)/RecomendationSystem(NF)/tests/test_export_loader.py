@@ -0,0 +1,151 @@
+# test_export_loader.py - Streaming export ingestion against a stub backend (no network)
+
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from export_codec import MEDIA_TYPE, decode_export, encode_export
+from export_loader import ExportLoader, ExportHTTPError, parse_export_stream
+from synthetic_data import make_catalog
+
+
+class StubResponse:
+    def __init__(self, body, status_code=200, headers=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = body
+
+    def iter_content(self, chunk_size):
+        # Deliberately tiny chunks to split tokens across reads
+        for start in range(0, len(self.body), 97):
+            yield self.body[start:start + 97]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class StubSession:
+    """Serves export rows page by page using the cursor/limit protocol"""
+
+    def __init__(self, rows_by_endpoint, paged=True, status_code=200, compact=False):
+        self.rows = rows_by_endpoint
+        self.paged = paged
+        self.status_code = status_code
+        self.compact = compact
+        self.calls = []
+
+    def get(self, url, params=None, headers=None, stream=False, timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        params = params or {}
+        headers = headers or {}
+        self.calls.append((endpoint, dict(params)))
+        if self.status_code != 200:
+            return StubResponse(b'{"ok":false}', self.status_code)
+
+        rows = self.rows[endpoint]
+        payload = {}
+        if self.paged and 'limit' in params:
+            start = int(params.get('cursor', 0))
+            end = start + int(params['limit'])
+            payload[endpoint] = rows[start:end]
+            if end < len(rows):
+                payload['nextCursor'] = str(end)
+        else:
+            payload[endpoint] = rows
+        payload['count'] = len(payload[endpoint])
+        if self.compact and MEDIA_TYPE in headers.get('Accept', ''):
+            meta = {k: v for k, v in payload.items() if k != endpoint}
+            return StubResponse(encode_export(payload[endpoint], endpoint, meta),
+                                headers={'Content-Type': MEDIA_TYPE})
+        return StubResponse(json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+
+
+def _rows():
+    donors, campaigns, interactions = make_catalog(n_donors=30, n_campaigns=45, n_interactions=60)
+    return {
+        'donors': json.loads(donors.to_json(orient='records')),
+        'campaigns': json.loads(campaigns.to_json(orient='records')),
+        'interactions': json.loads(interactions.to_json(orient='records')),
+    }
+
+
+def test_streamed_dataframe_matches_json_load():
+    """Streaming parse gives the same frame as json.loads + DataFrame"""
+    rows = _rows()['campaigns']
+    rows[2]['title'] = None
+    del rows[4]['story']
+    body = json.dumps({'campaigns': rows, 'count': len(rows)}).encode()
+
+    buffer, meta = parse_export_stream((body[i:i + 13] for i in range(0, len(body), 13)), 'campaigns')
+    streamed = buffer.to_dataframe()
+    expected = pd.DataFrame(rows)
+
+    assert meta == {'count': len(rows)}
+    assert list(streamed.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(streamed, expected)
+    print("✅ Streamed campaigns frame matches json.loads + DataFrame")
+
+
+def test_paged_fetch_follows_cursor():
+    """The loader follows nextCursor until the export is exhausted"""
+    rows = _rows()
+    session = StubSession(rows)
+    loader = ExportLoader("http://backend/api", page_size=10, session=session)
+
+    campaigns = loader.fetch('campaigns')
+    assert len(campaigns) == 45
+    assert list(campaigns['id']) == [r['id'] for r in rows['campaigns']]
+    assert [params.get('cursor') for _, params in session.calls] == [None, '10', '20', '30', '40']
+
+    # A backend without paging returns everything in one response
+    unpaged = ExportLoader("http://backend/api", page_size=10, session=StubSession(rows, paged=False))
+    assert len(unpaged.fetch('donors')) == 30
+    print("✅ Paged fetch follows the cursor")
+
+
+def test_compact_format_round_trip_and_negotiation():
+    """Compact payloads decode to the JSON frame; JSON-only clients never receive them"""
+    rows = _rows()
+    for endpoint in ('donors', 'campaigns', 'interactions'):
+        frame, meta = decode_export(encode_export(rows[endpoint], endpoint, {'count': len(rows[endpoint])}))
+        pd.testing.assert_frame_equal(frame, pd.DataFrame(rows[endpoint]))
+        assert meta == {'count': len(rows[endpoint])}
+
+    compact = ExportLoader("http://backend/api", page_size=20, session=StubSession(rows, compact=True))
+    json_only = ExportLoader("http://backend/api", page_size=20, session=StubSession(rows, compact=True),
+                             export_format='json')
+    pd.testing.assert_frame_equal(compact.fetch('campaigns'), json_only.fetch('campaigns'))
+    print("✅ Compact format round-trips and negotiation falls back to JSON")
+
+
+def test_errors_and_empty_exports():
+    """Non-200 raises ExportHTTPError once retries are spent; an empty export keeps the expected columns"""
+    session = StubSession(_rows(), status_code=429)
+    loader = ExportLoader("http://backend/api", session=session, retries=1, backoff=0)
+    try:
+        loader.fetch('donors')
+        assert False, "expected ExportHTTPError"
+    except ExportHTTPError as e:
+        assert e.status_code == 429 and len(session.calls) == 2
+
+    empty = ExportLoader("http://backend/api", session=StubSession({'interactions': []}))
+    interactions = empty.fetch('interactions', columns=['userId', 'campaignId', 'weight'])
+    assert interactions.empty and list(interactions.columns) == ['userId', 'campaignId', 'weight']
+    print("✅ Errors and empty exports handled")
+
+
+if __name__ == "__main__":
+    test_streamed_dataframe_matches_json_load()
+    test_paged_fetch_follows_cursor()
+    test_compact_format_round_trip_and_negotiation()
+    test_errors_and_empty_exports()
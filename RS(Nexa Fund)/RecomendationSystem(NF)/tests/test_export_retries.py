@@ -0,0 +1,167 @@
+# test_export_retries.py - Per-endpoint retries with Retry-After, client-side token bucket and coalesced export loads (local stub backend)
+
+import sys
+import os
+import contextlib
+import email.utils
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fastapi_app_db
+from backend_guard import Deadline, RateLimited, TokenBucket, retry_after_seconds
+from export_loader import LOADS_COALESCED, EXPORT_RETRIES, ConditionalExport
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import make_catalog
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Export endpoints that first play any scripted (status, headers) answers, then serve the rows"""
+
+    def do_GET(self):
+        endpoint = self.path.split('?')[0].rsplit('/', 1)[-1]
+        with self.server.lock:
+            self.server.log.append((endpoint, time.monotonic()))
+            script = self.server.script.get(endpoint) or []
+            status, headers = script.pop(0) if script else (200, {})
+        time.sleep(self.server.delay)
+        body = self.server.bodies[endpoint] if status == 200 else b'{"ok":false}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def scripted_backend(script=None, delay=0.0):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    server.daemon_threads = True
+    server.bodies = {name: json.dumps({name: json.loads(frame.to_json(orient='records'))}).encode()
+                     for name, frame in zip(('donors', 'campaigns', 'interactions'), make_catalog(25, 40, 80))}
+    server.script, server.delay, server.log, server.lock = script or {}, delay, [], threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/api"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _hits(server):
+    counts = {}
+    for endpoint, _ in server.log:
+        counts[endpoint] = counts.get(endpoint, 0) + 1
+    return counts
+
+
+def test_rate_limited_endpoint_retried_alone():
+    """A 429 on interactions retries only interactions, after the backend's Retry-After"""
+    script = {'interactions': [(429, {'Retry-After': '0.3'})]}
+    with scripted_backend(script) as server, contextlib.redirect_stdout(io.StringIO()):
+        retries = EXPORT_RETRIES.value(endpoint='interactions', reason='429')
+        recommender = DatabaseMLRecommender(backend_url=server.url, build_workers=1)
+        assert recommender._fetch_exports()
+        assert _hits(server) == {'donors': 1, 'campaigns': 1, 'interactions': 2}
+        waited = server.log[-1][1] - server.log[-2][1]
+        assert waited >= 0.3 and len(recommender.interactions_df) > 0
+        assert EXPORT_RETRIES.value(endpoint='interactions', reason='429') == retries + 1
+
+    # A backend that keeps answering 503 is given up on after ML_EXPORT_RETRIES + 1 attempts
+    script = {'interactions': [(503, {'Retry-After': '0'})] * 5}
+    with scripted_backend(script) as server, contextlib.redirect_stdout(io.StringIO()):
+        recommender = DatabaseMLRecommender(backend_url=server.url, build_workers=1)
+        assert recommender._fetch_exports() and recommender.interactions_df.empty
+        assert _hits(server)['interactions'] == 3
+    print("✅ Rate-limited endpoints are retried on their own after Retry-After")
+
+
+def test_retry_after_and_token_bucket():
+    """Retry-After in seconds or as a date; the bucket paces calls and follows the backend's headers"""
+    assert retry_after_seconds({'Retry-After': '7'}) == 7.0
+    later = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 28 <= retry_after_seconds({'Retry-After': later}) <= 30
+    assert retry_after_seconds({}) is None and retry_after_seconds({'Retry-After': 'soon'}) is None
+
+    bucket = TokenBucket(2, 1.0)
+    start = time.monotonic()
+    bucket.acquire(), bucket.acquire()
+    assert time.monotonic() - start < 0.05
+    try:
+        bucket.acquire(max_wait=0.1)
+        raise AssertionError("bucket over its limit did not refuse")
+    except RateLimited as e:
+        assert 0.4 < e.wait <= 0.5
+    assert 0.4 < bucket.acquire() <= 0.55
+
+    adaptive = TokenBucket()
+    assert adaptive.rate is None and adaptive.acquire() == 0
+    adaptive.observe({'RateLimit-Policy': '100;w=900', 'RateLimit-Limit': '100', 'RateLimit-Remaining': '40'})
+    assert adaptive.capacity == 100 and abs(adaptive.rate - 100 / 900) < 1e-12 and adaptive.tokens <= 40
+    adaptive.observe({'RateLimit-Remaining': '0', 'RateLimit-Reset': '0.2'})
+    try:
+        adaptive.acquire(max_wait=0.05)
+        raise AssertionError("exhausted quota did not block")
+    except RateLimited as e:
+        assert e.wait > 0.1
+    print("✅ Retry-After and the token bucket pace backend calls")
+
+
+def test_request_fetch_rate_limited_outcome():
+    """A per-request fetch the limiter would delay past the budget is reported as rate_limited, not error"""
+    exhausted = TokenBucket(1, 60.0)
+    exhausted.acquire()
+    saved = fastapi_app_db.fresh_campaigns_export
+    try:
+        fastapi_app_db.fresh_campaigns_export = ConditionalExport('campaigns', rate_limiter=exhausted)
+        rows, outcome = fastapi_app_db._fetch_fresh_campaigns('trending', Deadline(0.2))
+        assert rows is None and outcome == 'rate_limited'
+    finally:
+        fastapi_app_db.fresh_campaigns_export = saved
+    print("✅ Rate-limited request fetches get their own outcome")
+
+
+def test_concurrent_loads_share_one_fetch():
+    """Loads starting together (startup, /refresh, ...) make one set of requests and get their own frames"""
+    with scripted_backend(delay=0.3) as server, contextlib.redirect_stdout(io.StringIO()):
+        coalesced = LOADS_COALESCED.value()
+        recommenders = [DatabaseMLRecommender(backend_url=server.url, build_workers=1) for _ in range(3)]
+        barrier = threading.Barrier(len(recommenders))
+
+        def load(recommender):
+            barrier.wait()
+            recommender._fetch_exports()
+
+        threads = [threading.Thread(target=load, args=(r,)) for r in recommenders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert _hits(server) == {'donors': 1, 'campaigns': 1, 'interactions': 1}
+        assert LOADS_COALESCED.value() == coalesced + 2
+        first = recommenders[0]
+        for other in recommenders[1:]:
+            assert other.campaign_df.equals(first.campaign_df) and other.campaign_df is not first.campaign_df
+            assert other.export_versions.keys() == first.export_versions.keys()
+
+        # Once finished, the next load fetches again
+        DatabaseMLRecommender(backend_url=server.url, build_workers=1)._fetch_exports()
+        assert _hits(server)['donors'] == 2
+    print("✅ Concurrent export loads are coalesced")
+
+
+if __name__ == "__main__":
+    test_rate_limited_endpoint_retried_alone()
+    test_retry_after_and_token_bucket()
+    test_request_fetch_rate_limited_outcome()
+    test_concurrent_loads_share_one_fetch()
@@ -0,0 +1,92 @@
+# test_fold_in.py - Fold-in of new donors/campaigns and warm-start refit (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into, make_catalog
+from weighted_recommender import WeightedRecommender
+
+
+def _built_recommender():
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=40, n_campaigns=60, n_interactions=200)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    return recommender
+
+
+def _new_rows(prefix, n):
+    donors, campaigns, _ = make_catalog(n_donors=n, n_campaigns=n, seed=7)
+    donors['id'] = [f'{prefix}-donor-{i}' for i in range(n)]
+    campaigns['id'] = [f'{prefix}-campaign-{i}' for i in range(n)]
+    return donors.to_dict('records'), campaigns.to_dict('records')
+
+
+def test_new_rows_embed_like_the_build():
+    """Fold-in embeddings of an existing row reproduce its build-time embedding (the path fold_in_* uses)"""
+    recommender = _built_recommender()
+    embedded = recommender._embed_new_rows(recommender.campaign_df.iloc[[5]], recommender.campaign_pipeline)
+    np.testing.assert_allclose(embedded[0], recommender.campaign_embeddings[5])
+    print("✅ Fold-in embeddings match the build")
+
+
+def test_fold_in_and_contributions_give_collaborative_signal():
+    """New donors/campaigns are indexed, grow every array, and score once contributions arrive"""
+    recommender = _built_recommender()
+    donors, campaigns = _new_rows('late', 3)
+    assert recommender.fold_in_donors(donors) == [d['id'] for d in donors]
+    assert recommender.fold_in_campaigns(campaigns) == [c['id'] for c in campaigns]
+    assert recommender.fold_in_donors(donors[:1]) == []  # already known
+
+    assert recommender.user_item_matrix.shape == (43, 63)
+    assert recommender.nmf_model.components_.shape[1] == 63
+    assert recommender.user_factor_matrix.shape[0] == 43
+    assert len(recommender.donor_embeddings) == 43 and len(recommender.campaign_embeddings) == 63
+
+    weighted = WeightedRecommender(recommender)
+    donor_id, campaign_id = donors[1]['id'], campaigns[2]['id']
+    assert weighted.compute_collaborative_score(donor_id, campaign_id) == 0.0
+
+    existing_donors = recommender.donor_df['id'].iloc[:5].tolist()
+    recommender.apply_contributions([{'userId': d, 'campaignId': campaign_id, 'amount': 400} for d in existing_donors] +
+                                    [{'userId': donor_id, 'campaignId': campaign_id, 'amount': 600}])
+    assert np.any(recommender.nmf_model.components_[:, recommender.campaign_index[campaign_id]] > 0)
+    assert weighted.compute_collaborative_score(donor_id, campaign_id) > 0.0
+
+    # Growth is amortized: a second fold-in reuses the over-allocated buffer
+    buffer = recommender.user_item_matrix.base
+    more_donors, _ = _new_rows('later', 1)
+    recommender.fold_in_donors(more_donors)
+    assert recommender.user_item_matrix.base is buffer
+    print("✅ Folded-in donors and campaigns get collaborative scores")
+
+
+def test_warm_start_refit():
+    """Refit starts from the current factors and covers folded-in rows"""
+    recommender = _built_recommender()
+    donors, campaigns = _new_rows('late', 2)
+    recommender.fold_in_donors(donors)
+    recommender.fold_in_campaigns(campaigns)
+    recommender.apply_contributions([{'userId': donors[0]['id'], 'campaignId': campaigns[0]['id'], 'amount': 500}])
+    assert recommender.pending_updates > 0
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert recommender.refit_collaborative()
+    assert recommender.nmf_model.init == 'custom'
+    assert recommender.nmf_model.components_.shape == (recommender.nmf_model.n_components_, 62)
+    assert recommender.user_factor_matrix.shape[0] == 42
+    assert recommender.pending_updates == 0 and recommender.fitted_campaigns == 62
+    print("✅ Warm-start refit covers folded-in rows")
+
+
+if __name__ == "__main__":
+    test_new_rows_embed_like_the_build()
+    test_fold_in_and_contributions_give_collaborative_signal()
+    test_warm_start_refit()
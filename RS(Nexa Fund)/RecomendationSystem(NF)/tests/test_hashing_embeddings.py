@@ -0,0 +1,77 @@
+# test_hashing_embeddings.py - Hashed TF-IDF embedding mode with incremental document frequencies (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import embed_utils_tfidf
+from embed_utils_tfidf import HashingTfidfVectorizer
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+
+TEXTS = ['Solar school for the village', 'Clean water wells', 'Village water and solar power',
+         'Art studio', '', 'School books school bags']
+
+
+def test_matches_tfidf_weighting():
+    """Without hash collisions, similarities equal TfidfVectorizer's"""
+    hashed = HashingTfidfVectorizer(n_features=2 ** 20).fit(TEXTS).transform(TEXTS)
+    fitted = TfidfVectorizer(stop_words='english').fit_transform(TEXTS)
+    assert np.allclose((hashed @ hashed.T).toarray(), (fitted @ fitted.T).toarray())
+    print("✅ Hashed TF-IDF matches TfidfVectorizer weighting")
+
+
+def test_incremental_and_chunked_counts():
+    """partial_fit over batches equals one fit; chunked hashing equals in-process hashing"""
+    whole = HashingTfidfVectorizer(n_features=256).fit(TEXTS)
+    batched = HashingTfidfVectorizer(n_features=256).partial_fit(TEXTS[:2]).partial_fit(TEXTS[2:])
+    assert batched.n_documents == len(TEXTS)
+    assert (batched.document_frequency == whole.document_frequency).all()
+
+    previous = embed_utils_tfidf.PARALLEL_MIN_TEXTS
+    embed_utils_tfidf.PARALLEL_MIN_TEXTS = 1
+    try:
+        chunked = HashingTfidfVectorizer(n_features=256, max_workers=2).term_counts(TEXTS * 3)
+    finally:
+        embed_utils_tfidf.PARALLEL_MIN_TEXTS = previous
+    serial = HashingTfidfVectorizer(n_features=256).term_counts(TEXTS * 3)
+    assert (chunked != serial).nnz == 0
+    print("✅ Incremental document frequencies and chunked hashing")
+
+
+def test_hashing_mode_fold_in():
+    """New campaigns are embedded alone and counted into new document frequencies"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1, embedding_mode='hashing'),
+                            n_donors=20, n_campaigns=60, n_interactions=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+    vectorizer = recommender.campaign_vectorizer
+    assert isinstance(vectorizer, HashingTfidfVectorizer)
+    assert vectorizer.n_documents == 80
+    before = recommender.campaign_embeddings.copy()
+
+    campaign = dict(recommender.campaign_df.iloc[0].to_dict(), id='new', title='Quantum greenhouse',
+                    description='Quantum greenhouse sensors')
+    recommender.fold_in_campaigns([campaign])
+    # The fitted vectorizer is immutable; both pipelines share the one that counts the new row
+    assert vectorizer.n_documents == 80
+    vectorizer = recommender.campaign_vectorizer
+    assert vectorizer.n_documents == 81 and recommender.donor_vectorizer is vectorizer
+    assert np.array_equal(recommender.campaign_embeddings[:60], before)
+    new = recommender.campaign_embeddings[60]
+    assert np.isclose(np.linalg.norm(new), 1.0)
+    # The unseen word lands in its hashed column instead of being dropped
+    column = vectorizer.term_counts(['quantum']).indices[0]
+    assert new[column] > 0
+    print("✅ Hashing mode folds new campaigns in without a refit")
+
+
+if __name__ == "__main__":
+    test_matches_tfidf_weighting()
+    test_incremental_and_chunked_counts()
+    test_hashing_mode_fold_in()
@@ -0,0 +1,64 @@
+# test_item_neighbors.py - Co-contribution "backers also funded" neighbors (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from item_neighbors import co_contribution_neighbors
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+
+
+def test_neighbors_match_brute_force_cosine():
+    """Top-M lists equal a dense cosine over distinct backers, padded with -1"""
+    rng = np.random.default_rng(3)
+    donors = rng.integers(0, 30, size=200)
+    campaigns = rng.integers(0, 25, size=200)
+    idx, scores = co_contribution_neighbors(donors, campaigns, 30, 25, top_m=5)
+
+    X = np.zeros((30, 25))
+    X[donors, campaigns] = 1.0
+    co = X.T @ X
+    backers = np.diag(co).copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine = np.nan_to_num(co / np.sqrt(np.outer(backers, backers)))
+    np.fill_diagonal(cosine, 0)
+
+    for c in range(25):
+        expected = np.sort(cosine[c][cosine[c] > 0])[::-1][:5]
+        actual = scores[c][idx[c] >= 0]
+        np.testing.assert_allclose(actual, expected, rtol=1e-6)
+        assert np.all(idx[c][len(expected):] == -1)
+        assert c not in idx[c]
+    print("✅ Co-contribution neighbors match brute-force cosine")
+
+
+def test_similar_campaigns_lookup():
+    """Build stage output is served by id; unknown ids are None"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=20, n_campaigns=10)
+    ids = recommender.campaign_df['id']
+    recommender.interactions_df = pd.DataFrame({
+        'userId': ['user-0', 'user-0', 'user-1', 'user-1', 'user-2', 'user-3'],
+        'campaignId': [ids[0], ids[1], ids[0], ids[1], ids[0], ids[2]],
+        'weight': 100.0,
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender.build_item_neighbors(top_m=3)
+
+    similar = recommender.similar_campaigns(ids[0])
+    assert [s['campaign_id'] for s in similar] == [ids[1]]
+    assert similar[0]['title'] == recommender.campaign_df['title'][1]
+    assert abs(similar[0]['similarity_score'] - 2 / np.sqrt(3 * 2)) < 1e-6
+    assert recommender.similar_campaigns(ids[2]) == []
+    assert recommender.similar_campaigns('missing') is None
+    print("✅ Similar campaigns served from precomputed neighbors")
+
+
+if __name__ == "__main__":
+    test_neighbors_match_brute_force_cosine()
+    test_similar_campaigns_lookup()
@@ -0,0 +1,115 @@
+# test_keyword_matching.py - interestKeywords matched against all campaigns at once (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from keyword_matching import (CampaignKeywordIndex, CampaignTextBuffer, KeywordIndexStage,
+                              campaign_text, compiled_keywords)
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+from weighted_recommender import WeightedRecommender
+
+KEYWORDS = ['school', 'SOLAR', 'ar', 'school', '', 'solar school', 'water,', 'zzz']
+CAMPAIGNS = [
+    {'id': 'c1', 'title': 'Solar School', 'description': 'Clean water, for all', 'story': 'A garden'},
+    {'id': 'c2', 'title': 'Art', 'description': None, 'story': 'schoolbus'},
+    {'id': 'c3', 'title': 'Nothing here'},
+    {'id': 'c4', 'title': 'solar', 'description': 'school', 'story': ''},
+]
+
+
+def _expected(keywords, campaigns):
+    return [sum(1 for k in keywords if k.lower() in campaign_text(c)) for c in campaigns]
+
+
+def test_counts_equal_substring_checks():
+    """Buffer scan and snapshot index both count like `keyword in campaign_text`"""
+    expected = _expected(KEYWORDS, CAMPAIGNS)
+    assert CampaignTextBuffer(CAMPAIGNS).keyword_counts(KEYWORDS).tolist() == expected
+
+    index = CampaignKeywordIndex(CAMPAIGNS)
+    assert index.keyword_counts(KEYWORDS, CAMPAIGNS).tolist() == expected
+
+    # Edited and unknown campaigns fall back to the buffer scan
+    changed = [dict(CAMPAIGNS[0], title='zzz'), CAMPAIGNS[2], {'id': 'new', 'story': 'solar school'}]
+    assert index.keyword_counts(KEYWORDS, changed).tolist() == _expected(KEYWORDS, changed)
+    assert index.keyword_counts([], CAMPAIGNS).tolist() == [0, 0, 0, 0]
+    print("✅ Keyword counts equal per-keyword substring checks")
+
+
+def test_compiled_keywords_are_cached():
+    """The same keyword list reuses its compiled matcher"""
+    compiled_keywords.cache_clear()
+    buffer = CampaignTextBuffer(CAMPAIGNS)
+    buffer.keyword_counts(['Solar', 'school'])
+    buffer.keyword_counts(['solar', 'SCHOOL'])
+    info = compiled_keywords.cache_info()
+    assert info.misses == 1 and info.hits == 1
+    print("✅ Compiled keyword sets are cached")
+
+
+def test_index_follows_catalog_and_scores_unchanged():
+    """The index is rebuilt on a new snapshot and personalized scores match per-campaign matching"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=20, n_campaigns=120, n_interactions=200)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    weighted = WeightedRecommender(recommender)
+    index = weighted.keyword_index.index()
+    assert weighted.keyword_index.index() is index
+
+    campaigns = recommender.campaign_df.to_dict('records')
+    keywords = ['school', 'solar', 'Water', 'clean water']
+    counts = weighted.keyword_index.keyword_counts(keywords, campaigns)
+    assert counts.tolist() == _expected(keywords, campaigns)
+
+    prefs = {'interests': ['Education'], 'interestKeywords': keywords}
+    recs = weighted.get_personalized_recommendations(recommender.donor_df['id'].iloc[0], prefs, campaigns,
+                                                     top_n=10, use_candidates=False)
+    for rec in recs:
+        campaign = next(c for c in campaigns if c['id'] == rec['id'])
+        assert np.isclose(rec['scores']['interest'],
+                          round(weighted.compute_interest_match_score(prefs, campaign), 3))
+
+    recommender.campaign_df = recommender.campaign_df.iloc[:60].copy()
+    assert KeywordIndexStage(recommender).index().n_campaigns == 60
+    assert weighted.keyword_index.index() is not index
+    print("✅ Index follows the catalog; personalized scores unchanged")
+
+
+def test_fold_in_extends_the_index():
+    """Folded-in campaigns are tokenized on their own; counts match a fresh index"""
+    index = CampaignKeywordIndex(CAMPAIGNS[:2])
+    extended = index.extended(CAMPAIGNS[2:] + [{'id': 'c5', 'title': 'Zebra water'}])
+    campaigns = CAMPAIGNS + [{'id': 'c5', 'title': 'Zebra water'}]
+    assert index.n_campaigns == 2 and extended.n_campaigns == 5
+    assert extended.keyword_counts(KEYWORDS + ['zebra'], campaigns).tolist() == \
+        _expected(KEYWORDS + ['zebra'], campaigns)
+    assert (extended.incidence != CampaignKeywordIndex(campaigns).incidence).nnz == 0
+    # The previous index is untouched
+    assert index.keyword_counts(['zebra'], campaigns[:2]).tolist() == [0, 0]
+
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=20, n_campaigns=60, n_interactions=100)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+    stage = KeywordIndexStage(recommender)
+    before = stage.index()
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender.fold_in_campaigns([dict(recommender.campaign_df.iloc[0].to_dict(), id='new', title='Zebra')])
+    after = stage.index()
+    assert after is not before and after.n_campaigns == 61 and before.n_campaigns == 60
+    assert after._rows['new'] == 60 and 'zebra' in after._vocabulary
+    print("✅ Fold-in extends the keyword index")
+
+
+if __name__ == "__main__":
+    test_counts_equal_substring_checks()
+    test_compiled_keywords_are_cached()
+    test_index_follows_catalog_and_scores_unchanged()
+    test_fold_in_extends_the_index()
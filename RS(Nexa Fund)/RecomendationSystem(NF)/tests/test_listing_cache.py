@@ -0,0 +1,97 @@
+# test_listing_cache.py - Paginated, pre-encoded /donors and /campaigns listings with ETags (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import fastapi_app_db
+from listing_cache import LISTING_FIELDS, ListingCache, etag_matches
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+
+
+def _built_recommender():
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=30, n_campaigns=45, n_interactions=100)
+    recommender.campaign_df.loc[2, 'description'] = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+    return recommender
+
+
+def test_pages_cover_the_catalog():
+    """Cursor pages concatenate to the full listing; projections and missing values follow the old endpoint"""
+    recommender = _built_recommender()
+    cache = ListingCache()
+    fields = cache.parse_fields('campaigns', None)
+    full = json.loads(cache.page(recommender, 'campaigns', fields, 0, None).body)
+    assert full['count'] == full['total'] == 45 and full['next_cursor'] is None
+    assert list(full['campaigns'][0]) == list(LISTING_FIELDS['campaigns'])
+    assert full['campaigns'][2]['description'] == ''
+
+    rows, cursor = [], None
+    while True:
+        page = json.loads(cache.page(recommender, 'campaigns', fields, cache.parse_cursor(cursor), 20).body)
+        rows += page['campaigns']
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert rows == full['campaigns']
+
+    projected = json.loads(cache.page(recommender, 'donors', cache.parse_fields('donors', 'id, name'), 5, 2).body)
+    assert projected['donors'] == [{'id': 'user-5', 'name': recommender.donor_df['name'].iat[5]},
+                                   {'id': 'user-6', 'name': recommender.donor_df['name'].iat[6]}]
+    for bad in (lambda: cache.parse_fields('donors', 'id,password'), lambda: cache.parse_cursor('x')):
+        try:
+            bad()
+            raise AssertionError("invalid parameter accepted")
+        except ValueError:
+            pass
+    print("✅ Cursor pages cover the catalog with projections")
+
+
+def test_pages_are_cached_per_catalog_version():
+    """Repeated calls return the same encoded page; catalog changes re-encode it"""
+    recommender = _built_recommender()
+    cache = ListingCache()
+    fields = cache.parse_fields('campaigns', 'id,currentAmount')
+    first = cache.page(recommender, 'campaigns', fields, 0, 10)
+    assert cache.cached(recommender, 'campaigns', fields, 0, 10) is first
+    assert cache.page(recommender, 'campaigns', fields, 0, 10) is first
+
+    recommender.apply_contributions([{'userId': 'user-1', 'campaignId': 'campaign-0', 'amount': 50}])
+    assert cache.cached(recommender, 'campaigns', fields, 0, 10) is None
+    updated = cache.page(recommender, 'campaigns', fields, 0, 10)
+    assert updated.etag != first.etag
+    assert etag_matches(f'W/{updated.etag}, "other"', updated.etag) and not etag_matches(first.etag, updated.etag)
+    print("✅ Pages are cached until the catalog changes")
+
+
+def test_endpoints_answer_if_none_match():
+    """The API serves the cached bytes with an ETag and answers a matching If-None-Match with 304"""
+    recommender = _built_recommender()
+    previous = fastapi_app_db.recommender
+    fastapi_app_db.recommender = recommender
+    try:
+        client = TestClient(fastapi_app_db.app)
+        response = client.get('/campaigns', params={'limit': 5, 'fields': 'id,title'})
+        assert response.status_code == 200 and len(response.json()['campaigns']) == 5
+        etag = response.headers['etag']
+        again = client.get('/campaigns', params={'limit': 5, 'fields': 'id,title'}, headers={'If-None-Match': etag})
+        assert again.status_code == 304 and again.headers['etag'] == etag and not again.content
+        assert client.get('/donors', params={'fields': 'nope'}).status_code == 400
+        assert client.get('/donors').json()['count'] == 30
+    finally:
+        fastapi_app_db.recommender = previous
+    print("✅ Endpoints serve ETags and 304 Not Modified")
+
+
+if __name__ == "__main__":
+    test_pages_cover_the_catalog()
+    test_pages_are_cached_per_catalog_version()
+    test_endpoints_answer_if_none_match()
@@ -0,0 +1,59 @@
+# test_metrics.py - Prometheus rendering and per-stage timing of the request path
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from ml_recommender_db import DatabaseMLRecommender
+from synthetic_data import load_into
+from weighted_recommender import WeightedRecommender
+
+
+def test_histogram_rendering():
+    """Buckets are cumulative and end with +Inf, _sum and _count"""
+    registry = metrics.Registry()
+    latency = registry.histogram('demo_seconds', 'Demo latency', ('stage',), buckets=(0.1, 1.0))
+    latency.observe(0.05, stage='fetch')
+    latency.observe(0.5, stage='fetch')
+    latency.observe(5.0, stage='fetch')
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="fetch"} 3' in text
+    print("✅ Histogram renders in Prometheus text format")
+
+
+def test_personalized_stages_recorded():
+    """One personalized request records each scoring stage once, and traces when sampled"""
+    recommender = DatabaseMLRecommender(n_components=4)
+    load_into(recommender, n_donors=20, n_campaigns=30, n_interactions=40)
+    weighted = WeightedRecommender(recommender)
+    user_id = recommender.donor_df['id'].iloc[0]
+
+    stages = ('candidates', 'score_interest', 'score_collaborative', 'score_content', 'score_trending', 'top_k')
+    before = {s: metrics.STAGE_SECONDS.count(endpoint='personalized', stage=s) for s in stages}
+
+    sample_rate = metrics.TRACE_SAMPLE_RATE
+    metrics.TRACE_SAMPLE_RATE = 1.0
+    try:
+        token = metrics.start_trace('POST /personalized')
+        weighted.get_personalized_recommendations(user_id, {'interests': ['Education']}, top_n=5)
+        metrics.finish_trace(token)
+    finally:
+        metrics.TRACE_SAMPLE_RATE = sample_rate
+
+    for s in stages:
+        assert metrics.STAGE_SECONDS.count(endpoint='personalized', stage=s) == before[s] + 1, s
+    trace = metrics.RECENT_TRACES[-1]
+    assert trace['name'] == 'POST /personalized'
+    assert [span['stage'] for span in trace['spans']] == list(stages)
+    print("✅ Personalized request stages recorded and traced")
+
+
+if __name__ == "__main__":
+    test_histogram_rendering()
+    test_personalized_stages_recorded()
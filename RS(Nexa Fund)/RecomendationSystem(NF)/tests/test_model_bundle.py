@@ -0,0 +1,169 @@
+# test_model_bundle.py - Publish/attach round trip for multi-worker serving (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+import pickle
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from catalog_store import PackedText
+from ml_recommender_db import DatabaseMLRecommender
+from model_bundle import attach_bundle, current_version, publish_bundle, RefreshLock
+from synthetic_data import load_into
+from weighted_recommender import WeightedRecommender
+
+
+def _built_recommender(slim_catalog=None):
+    recommender = load_into(DatabaseMLRecommender(build_workers=1, slim_catalog=slim_catalog),
+                            n_donors=40, n_campaigns=60, n_interactions=200)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    return recommender
+
+
+def test_attached_bundle_serves_same_scores():
+    """A worker attached to the bundle scores exactly like the builder"""
+    builder = _built_recommender()
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            version = publish_bundle(builder, bundle_dir)
+        assert current_version(bundle_dir) == version
+
+        worker = DatabaseMLRecommender()
+        attach_bundle(worker, bundle_dir)
+        assert worker.bundle_version == version
+        assert isinstance(worker.campaign_embeddings, np.memmap)
+        assert not worker.campaign_embeddings.flags.writeable
+
+        user_id = builder.donor_df['id'].iloc[3]
+        prefs = {'interests': ['education'], 'interestKeywords': ['school']}
+        expected = WeightedRecommender(builder).get_personalized_recommendations(user_id, prefs, top_n=10)
+        actual = WeightedRecommender(worker).get_personalized_recommendations(user_id, prefs, top_n=10)
+        assert [r['id'] for r in actual] == [r['id'] for r in expected]
+        assert [r['scores'] for r in actual] == [r['scores'] for r in expected]
+
+        # Worker arrays stay valid after a newer version is published
+        with contextlib.redirect_stdout(io.StringIO()):
+            publish_bundle(builder, bundle_dir)
+        assert current_version(bundle_dir) != version
+        assert worker.campaign_embeddings.shape == builder.campaign_embeddings.shape
+    print("✅ Attached bundle serves identical recommendations")
+
+
+def _assert_frames_mapped(builder, worker):
+    """Same values; text columns (slim or not) come back packed over the mapped buffer"""
+    for name in ('donor_df', 'campaign_df', 'interactions_df'):
+        expected, actual = getattr(builder, name), getattr(worker, name)
+        assert actual.astype(object).equals(expected.astype(object))
+        for column in expected.columns:
+            dtype = expected[column].dtype
+            if pd.api.types.is_string_dtype(dtype) and expected[column].map(type).isin([str, float]).all():
+                assert isinstance(actual[column].array, PackedText), (name, column)
+                assert isinstance(actual[column].array._data, np.memmap)
+            else:
+                assert str(actual[column].dtype) == str(dtype), (name, column)
+
+
+def test_catalog_columns_are_mapped():
+    """Frames come back from .npy columns; indexes and pipelines are only loaded when used"""
+    builder = _built_recommender(slim_catalog=True)
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            version = publish_bundle(builder, bundle_dir)
+        with open(os.path.join(bundle_dir, version, 'state.pkl'), 'rb') as f:
+            state = pickle.load(f)
+        assert not {'donor_df', 'campaign_df', 'donor_index', 'campaign_pipeline'} & set(state)
+
+        worker = DatabaseMLRecommender()
+        attach_bundle(worker, bundle_dir)
+        _assert_frames_mapped(builder, worker)
+
+        assert 'campaign_index' not in worker.__dict__ and 'campaign_pipeline' not in worker.__dict__
+        assert worker.campaign_index == builder.campaign_index and worker.donor_index == builder.donor_index
+
+        # Events write the copy-on-write counters; the published columns stay as they were
+        campaign_id = builder.campaign_df['id'].iloc[7]
+        before = builder.campaign_df['currentAmount'].iloc[7]
+        worker.apply_contributions([{'userId': builder.donor_df['id'].iloc[0], 'campaignId': campaign_id,
+                                     'amount': 250}])
+        assert worker.campaign_df['currentAmount'].iloc[7] == before + 250
+        reattached = DatabaseMLRecommender()
+        attach_bundle(reattached, bundle_dir)
+        assert reattached.campaign_df['currentAmount'].iloc[7] == before
+
+        # A fold-in loads the pickled pipelines and embeds like the builder
+        row = builder.campaign_df.iloc[[3]].astype(object).to_dict('records')[0]
+        assert worker.fold_in_campaigns([dict(row, id='late-campaign')]) == ['late-campaign']
+        assert worker.campaign_pipeline is not None
+        np.testing.assert_allclose(worker.campaign_embeddings[-1], builder.campaign_embeddings[3], atol=1e-6)
+    print("✅ Catalog columns are memory-mapped, indexes and pipelines loaded lazily")
+
+
+def test_unslim_text_is_packed():
+    """With ML_SLIM_CATALOG=0 text columns are still stored and attached as UTF-8 buffer + offsets"""
+    builder = _built_recommender(slim_catalog=False)
+    assert builder.campaign_df['title'].dtype != PackedText._dtype
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            version = publish_bundle(builder, bundle_dir)
+        # No fixed-width <U columns: every text column is a uint8 buffer
+        stored = [np.load(os.path.join(bundle_dir, version, f), mmap_mode='r')
+                  for f in os.listdir(os.path.join(bundle_dir, version)) if f.endswith('.npy')]
+        assert not any(array.dtype.kind == 'U' and len(array) == len(builder.campaign_df) for array in stored)
+
+        worker = DatabaseMLRecommender()
+        attach_bundle(worker, bundle_dir)
+        _assert_frames_mapped(builder, worker)
+        assert worker.campaign_index == builder.campaign_index
+    print("✅ Unslimmed text columns are packed in the bundle")
+
+
+def test_als_confidence_matrix_is_mapped():
+    """The ALS confidence matrix round-trips as memory-mapped CSR arrays and scores the same"""
+    builder = load_into(DatabaseMLRecommender(build_workers=1, collab_engine='als'),
+                        n_donors=30, n_campaigns=40, n_interactions=150)
+    with contextlib.redirect_stdout(io.StringIO()):
+        builder._create_embeddings()
+        builder.create_interaction_matrix()
+        builder.fit_collaborative()
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            publish_bundle(builder, bundle_dir)
+        worker = DatabaseMLRecommender()
+        attach_bundle(worker, bundle_dir)
+        assert (worker.confidence_matrix != builder.confidence_matrix).nnz == 0
+        assert not worker.confidence_matrix.data.flags.writeable
+        user_id = builder.donor_df['id'].iloc[5]
+        expected = WeightedRecommender(builder).get_personalized_recommendations(user_id, None, top_n=8)
+        actual = WeightedRecommender(worker).get_personalized_recommendations(user_id, None, top_n=8)
+        assert [r['scores'] for r in actual] == [r['scores'] for r in expected]
+        # Events replace the mapped matrix instead of writing to it
+        worker.apply_contributions([{'userId': user_id, 'campaignId': builder.campaign_df['id'].iloc[0],
+                                     'amount': 120}])
+        assert worker.confidence_matrix.sum() == builder.confidence_matrix.sum() + 120
+    print("✅ ALS confidence matrix is memory-mapped from the bundle")
+
+
+def test_refresh_lock_is_exclusive():
+    """Only one worker may hold the refresh lock"""
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        with RefreshLock(bundle_dir) as first:
+            assert first
+            assert not RefreshLock(bundle_dir).acquire()
+        assert RefreshLock(bundle_dir).acquire()
+    print("✅ Refresh lock is exclusive")
+
+
+if __name__ == "__main__":
+    test_attached_bundle_serves_same_scores()
+    test_catalog_columns_are_mapped()
+    test_unslim_text_is_packed()
+    test_als_confidence_matrix_is_mapped()
+    test_refresh_lock_is_exclusive()
@@ -0,0 +1,151 @@
+# test_request_coalescing.py - Concurrent identical /personalized and /trending requests share one computation
+
+import sys
+import os
+import asyncio
+import contextlib
+import io
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fastapi_app_db
+from backend_guard import CircuitBreaker
+from export_loader import ConditionalExport
+from ml_recommender_db import DatabaseMLRecommender
+from recommendation_cache import SCORING_REQUESTS, RecommendationCache, ScoringFlights
+from synthetic_data import load_into
+
+
+def test_flights_share_results_and_errors():
+    """Same key: one computation, shared result or exception; different keys run separately"""
+    calls = []
+
+    async def compute(value, delay=0.05):
+        calls.append(value)
+        await asyncio.sleep(delay)
+        if value == 'boom':
+            raise ValueError(value)
+        return [value]
+
+    async def scenario():
+        flights = ScoringFlights()
+        computed = SCORING_REQUESTS.value(kind='test', outcome='computed')
+        coalesced = SCORING_REQUESTS.value(kind='test', outcome='coalesced')
+        results = await asyncio.gather(*[flights.do('test', 'a', lambda: compute('a')) for _ in range(5)],
+                                       flights.do('test', 'b', lambda: compute('b')))
+        assert calls == ['a', 'b'] and results[0] is results[4] and results[5] == ['b']
+        assert SCORING_REQUESTS.value(kind='test', outcome='computed') == computed + 2
+        assert SCORING_REQUESTS.value(kind='test', outcome='coalesced') == coalesced + 4
+        assert len(flights) == 0
+
+        errors = await asyncio.gather(*[flights.do('test', 'x', lambda: compute('boom')) for _ in range(3)],
+                                      return_exceptions=True)
+        assert all(isinstance(e, ValueError) for e in errors) and calls.count('boom') == 1
+
+        # A finished flight is not reused
+        await flights.do('test', 'a', lambda: compute('a'))
+        assert calls.count('a') == 2
+
+        # The first caller going away does not cancel the computation the others wait for
+        first = asyncio.ensure_future(flights.do('test', 'c', lambda: compute('c', 0.1)))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(flights.do('test', 'c', lambda: compute('c', 0.1)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == ['c'] and calls.count('c') == 1
+
+    asyncio.run(scenario())
+    print("✅ Scoring flights share one computation per key")
+
+
+def test_cache_generation_skips_stale_puts():
+    """A list scored before an invalidation is not stored after it"""
+    cache = RecommendationCache(ttl=60)
+    generation = cache.generation
+    cache.invalidate(user_ids=['u1'])
+    cache.put('personalized', 'k', ['stale'], user_id='u1', generation=generation)
+    assert cache.get('personalized', 'k') is None
+    cache.put('personalized', 'k', ['fresh'], user_id='u1', generation=cache.generation)
+    assert cache.get('personalized', 'k') == ['fresh']
+    cache.clear()
+    assert cache.generation == generation + 2
+    print("✅ Invalidation moves the cache generation on")
+
+
+@contextlib.contextmanager
+def serving_app():
+    """The app on a small synthetic model, backend fetches skipped by an open breaker"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=20, n_campaigns=30, n_interactions=60)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    breaker = CircuitBreaker('test-coalescing', failure_threshold=1, reset_timeout=600)
+    breaker.record_failure()
+    saved = (fastapi_app_db.recommender, fastapi_app_db.weighted_recommender, fastapi_app_db.fresh_campaigns_export)
+    try:
+        fastapi_app_db.recommender = recommender
+        fastapi_app_db.weighted_recommender = fastapi_app_db.WeightedRecommender(recommender)
+        fastapi_app_db.fresh_campaigns_export = ConditionalExport('campaigns', breaker=breaker)
+        fastapi_app_db.results_cache.clear()
+        yield fastapi_app_db.weighted_recommender
+    finally:
+        (fastapi_app_db.recommender, fastapi_app_db.weighted_recommender,
+         fastapi_app_db.fresh_campaigns_export) = saved
+        fastapi_app_db.results_cache.clear()
+
+
+def _counting(weighted, name, delay=0.1):
+    """Wrap a scoring method so it counts calls and takes long enough for requests to overlap"""
+    original, calls = getattr(weighted, name), []
+
+    def scored(*args, **kwargs):
+        calls.append(kwargs.get('user_id'))
+        time.sleep(delay)
+        return original(*args, **kwargs)
+    setattr(weighted, name, scored)
+    return calls
+
+
+def test_concurrent_requests_score_once():
+    """Eight identical /trending and /personalized requests each run one scoring call"""
+    with serving_app() as weighted:
+        trending_calls = _counting(weighted, 'get_non_personalized_recommendations')
+        personalized_calls = _counting(weighted, 'get_personalized_recommendations')
+        request = fastapi_app_db.PersonalizedRequest(user_id='donor_1', top_n=5)
+        other = fastapi_app_db.PersonalizedRequest(user_id='donor_2', top_n=5)
+
+        async def burst():
+            return await asyncio.gather(
+                *[fastapi_app_db.get_trending_campaigns(top_n=5) for _ in range(8)],
+                *[fastapi_app_db.get_personalized_recommendations(request) for _ in range(8)],
+                fastapi_app_db.get_personalized_recommendations(other))
+
+        coalesced = SCORING_REQUESTS.value(kind='personalized', outcome='coalesced')
+        results = asyncio.run(burst())
+        assert len(trending_calls) == 1 and sorted(personalized_calls) == ['donor_1', 'donor_2']
+        assert all(r == results[0] for r in results[:8]) and len(results[0]) == 5
+        assert all(r == results[8] for r in results[8:16])
+        assert SCORING_REQUESTS.value(kind='personalized', outcome='coalesced') == coalesced + 7
+
+        # Later requests are served from the cache, not a new flight
+        asyncio.run(fastapi_app_db.get_trending_campaigns(top_n=5))
+        assert len(trending_calls) == 1
+
+        # A request arriving after an invalidation does not join the computation started before it
+        fastapi_app_db.results_cache.clear()
+
+        async def invalidated_mid_flight():
+            first = asyncio.ensure_future(fastapi_app_db.get_trending_campaigns(top_n=5))
+            await asyncio.sleep(0.02)
+            fastapi_app_db.results_cache.invalidate(kinds=['trending'])
+            await asyncio.gather(first, fastapi_app_db.get_trending_campaigns(top_n=5))
+        asyncio.run(invalidated_mid_flight())
+        assert len(trending_calls) == 3
+    print("✅ Concurrent identical requests are scored once")
+
+
+if __name__ == "__main__":
+    test_flights_share_results_and_errors()
+    test_cache_generation_skips_stale_puts()
+    test_concurrent_requests_score_once()
@@ -0,0 +1,84 @@
+# test_rule_matcher.py - Data-driven keyword rules and the multi-pattern matcher (no backend needed)
+
+import sys
+import os
+import contextlib
+import io
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from ml_recommender_db import DatabaseMLRecommender
+from rule_matcher import KeywordMatcher, RULES, load_rule_table, rule_table
+from synthetic_data import load_into
+
+
+def test_matcher_equals_substring_checks():
+    """Every keyword/text pair matches exactly like `keyword in text.lower()`"""
+    groups = [['art', 'smart'], ['style', 'education'], ['heal', 'health'], ['a']]
+    texts = ['SMART cities', 'stylEducation', 'Healthy food', None, '', 'party', 'art', 'smart', 'xyz', 'Art']
+    matches = KeywordMatcher(groups).match(texts)
+
+    for i, text in enumerate(texts):
+        lowered = text.lower() if isinstance(text, str) else ''
+        for g, keywords in enumerate(groups):
+            assert matches[i, g] == any(k in lowered for k in keywords), (text, keywords)
+    print("✅ Matcher equals per-keyword substring checks")
+
+
+def test_rule_groups_and_boosts():
+    """First matching rule wins; boosts come from category or title keywords"""
+    groups = RULES.donor_groups(['Retired TEACHER and doctor', 'doctor', 'loves style', 'engineer', None])
+    assert groups.tolist() == [0, 1, 2, -1, -1]
+
+    boosts = RULES.campaign_boosts(['Technology', 'Community', 'Film & Video'],
+                                   ['robot', 'smart dental care', 'studio'], boost=0.5)
+    assert boosts.tolist() == [[0.5, 0.5, 0.0], [0.0, 0.5, 0.0], [0.0, 0.0, 0.5]]
+    assert RULES.preferred_categories(-1) == ['Technology', 'Community']
+    print("✅ Rule groups and campaign boosts")
+
+
+def _recommended_categories(bio):
+    """Categories /recommendations returns for a donor with `bio`, built under the current rule table"""
+    recommender = load_into(DatabaseMLRecommender(build_workers=1), n_donors=20, n_campaigns=60, n_interactions=80)
+    recommender.donor_df.loc[0, 'bio'] = bio
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._create_embeddings()
+        recommender.create_interaction_matrix()
+        recommender.fit_nmf()
+    return set(recommender.get_recommendations(recommender.donor_df['id'].iloc[0], top_k=3)['category'])
+
+
+def test_rule_table_from_json_drives_recommendations():
+    """ML_RULE_TABLE replaces the built-in rules, including /recommendations preferences"""
+    table = {'rules': [{'name': 'green', 'bio': ['recycl'], 'category': ['environment'], 'title': [],
+                        'preferred_categories': ['Environment']}],
+             'default_preferred': ['Games']}
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(table, f)
+    try:
+        rules = load_rule_table(f.name)
+        assert rules.donor_groups(['Recycling fan', 'teacher']).tolist() == [0, -1]
+        assert rules.preferred_categories(-1) == ['Games']
+
+        # Built-in rules: no group for this bio, so the default Technology/Community preference
+        assert 'Environment' not in _recommended_categories('Recycling volunteer')
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setenv('ML_RULE_TABLE', f.name)
+            assert rule_table() is not RULES
+            assert _recommended_categories('Recycling volunteer') == {'Environment'}
+            # The JSON table has no 'doctor' rule: such donors get its default preference
+            assert _recommended_categories('doctor') == {'Games'}
+        assert rule_table() is RULES
+    finally:
+        os.unlink(f.name)
+    assert _recommended_categories('doctor') == {'Health & Fitness'}
+    print("✅ ML_RULE_TABLE drives groups and /recommendations preferences")
+
+
+if __name__ == "__main__":
+    test_matcher_equals_substring_checks()
+    test_rule_groups_and_boosts()
+    test_rule_table_from_json_drives_recommendations()
@@ -0,0 +1,139 @@
+# test_warmup.py - Non-blocking startup: trending-only serving and readiness phases while the model builds (local stub backend)
+
+import sys
+import os
+import asyncio
+import contextlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import backend_guard
+import fastapi_app_db
+from admission import TIER_HEADER, FULL, TRENDING
+from backend_guard import CircuitBreaker
+from export_loader import ConditionalExport
+from synthetic_data import make_catalog
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """Export endpoints with a per-endpoint delay and status"""
+
+    def do_GET(self):
+        endpoint = self.path.split('?')[0].rsplit('/', 1)[-1]
+        time.sleep(self.server.delays.get(endpoint, 0))
+        status = self.server.statuses.get(endpoint, 200)
+        body = self.server.bodies[endpoint] if status == 200 else b'{"ok":false}'
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def cold_service(delays=None, statuses=None):
+    """A stub backend and the app reset to its pre-startup state"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ExportHandler)
+    server.daemon_threads = True
+    server.bodies = {name: json.dumps({name: json.loads(frame.to_json(orient='records'))}).encode()
+                     for name, frame in zip(('donors', 'campaigns', 'interactions'), make_catalog(30, 40, 120))}
+    server.delays, server.statuses = delays or {}, statuses or {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    names = ('recommender', 'weighted_recommender', 'trending_only', 'startup_phase', 'fresh_campaigns_export')
+    saved = {name: getattr(fastapi_app_db, name) for name in names}
+    previous_url = os.environ.get('BACKEND_API_URL')
+    try:
+        os.environ['BACKEND_API_URL'] = f"http://127.0.0.1:{server.server_address[1]}/api"
+        fastapi_app_db.recommender = fastapi_app_db.weighted_recommender = fastapi_app_db.trending_only = None
+        fastapi_app_db.startup_phase = fastapi_app_db.STARTING
+        fastapi_app_db.fresh_campaigns_export = ConditionalExport('campaigns', breaker=CircuitBreaker('test-warmup'))
+        fastapi_app_db.results_cache.clear()
+        backend_guard.BACKEND.record_success()  # earlier tests may have left the shared breaker open
+        yield TestClient(fastapi_app_db.app)
+    finally:
+        for name, value in saved.items():
+            setattr(fastapi_app_db, name, value)
+        fastapi_app_db.results_cache.clear()
+        if previous_url is None:
+            os.environ.pop('BACKEND_API_URL', None)
+        else:
+            os.environ['BACKEND_API_URL'] = previous_url
+        server.shutdown()
+        server.server_close()
+
+
+def _start_warm_up():
+    """The startup task, on its own event loop so the test client can query the app meanwhile"""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(fastapi_app_db._warm_up())
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _wait_for_phase(client, phase, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.get('/status').json()['status'] == phase:
+            return
+        time.sleep(0.02)
+    raise AssertionError(f"phase {phase} not reached")
+
+
+def test_trending_served_while_model_builds():
+    """Trending-only answers after one campaigns fetch; full answers once the build finishes"""
+    with cold_service(delays={'donors': 1.0}) as client:
+        assert client.get('/status').json()['status'] == fastapi_app_db.STARTING
+        assert client.post('/trending', params={'top_n': 5}).status_code == 503
+
+        start = time.perf_counter()
+        thread = _start_warm_up()
+        _wait_for_phase(client, fastapi_app_db.WARMING_UP)
+        trending = client.post('/trending', params={'top_n': 5})
+        assert trending.status_code == 200 and len(trending.json()) == 5
+        assert time.perf_counter() - start < 0.9  # before the slow donors export has even arrived
+        assert all(set(rec['scores']) == {'trending'} for rec in trending.json())
+        status = client.get('/status').json()
+        assert status['campaign_count'] == 40 and status['model_components'] == 0
+
+        personalized = client.post('/personalized', json={'user_id': 'donor_1', 'top_n': 3})
+        assert personalized.status_code == 200 and personalized.headers[TIER_HEADER] == TRENDING
+        assert personalized.json() == trending.json()[:3]
+
+        thread.join(timeout=30)
+        assert client.get('/status').json()['status'] == fastapi_app_db.READY
+        assert fastapi_app_db.trending_only is None
+        assert fastapi_app_db.weighted_recommender.candidates._generator is not None  # primed before the swap
+        personalized = client.post('/personalized', json={'user_id': 'donor_1', 'top_n': 3})
+        assert personalized.status_code == 200 and personalized.headers[TIER_HEADER] == FULL
+    print("✅ Trending is served while the model builds")
+
+
+def test_failed_build_keeps_trending_only():
+    """A failed startup build reports failed and keeps serving trending until a refresh"""
+    with cold_service(statuses={'donors': 404}) as client:
+        _start_warm_up().join(timeout=30)
+        status = client.get('/status').json()
+        assert status['status'] == fastapi_app_db.FAILED and 'trending only' in status['message']
+        assert client.post('/trending', params={'top_n': 5}).status_code == 200
+        assert client.get('/similar-campaigns/c1').status_code == 503
+    print("✅ A failed build keeps serving trending-only")
+
+
+if __name__ == "__main__":
+    test_trending_served_while_model_builds()
+    test_failed_build_keeps_trending_only()
@@ -5,6 +5,10 @@ import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import re
+import metrics
+from candidate_generation import CandidateStage
+from keyword_matching import CampaignTextBuffer, KeywordIndexStage
+from catalog_store import CatalogRows
 
 class WeightedRecommender:
     """
@@ -21,12 +25,41 @@ class WeightedRecommender:
             ml_recommender: Instance of DatabaseMLRecommender with trained models
         """
         self.ml_recommender = ml_recommender
-        
-    def compute_interest_match_score(self, user_preferences: Dict, campaign: Dict) -> float:
+        # Retrieval stage: only candidates from cheap sources get the full weighted scoring
+        self.candidates = CandidateStage(ml_recommender, self.compute_trending_score)
+        # Token index over the campaign snapshot for interestKeywords matching
+        self.keyword_index = KeywordIndexStage(ml_recommender)
+        self._rows = None  # (catalog key, CatalogRows)
+    
+    def prime(self):
+        """
+        Build (or extend after fold-ins) the per-catalog structures requests read, so they
+        are ready before this scorer serves: call before swapping a new model in
+        """
+        self.candidates.generator()
+        self.keyword_index.index()
+        self.catalog_rows()
+        return self
+    
+    def catalog_rows(self) -> CatalogRows:
+        """Row views of the model's campaigns, rebuilt when the catalog or its counters change"""
+        r = self.ml_recommender
+        key = (id(r.campaign_df), len(r.campaign_df), r.pending_updates, id(r.nmf_model))
+        cached = self._rows
+        if cached is None or cached[0] != key:
+            cached = self._rows = (key, CatalogRows(r.campaign_df))
+        return cached[1]
+        
+    def compute_interest_match_score(self, user_preferences: Dict, campaign: Dict,
+                                     matched_keywords: Optional[int] = None) -> float:
         """
         Algorithm 1: Interest Match (40% weight)
         Scores based on user's selected interests and preferences
         
+        Args:
+            matched_keywords: interestKeywords found in the campaign text, when already
+                counted for a whole campaign list (see keyword_matching.py)
+        
         Returns: Score between 0.0 and 1.0
         """
         if not user_preferences or not user_preferences.get('interests'):
@@ -71,15 +104,9 @@ class WeightedRecommender:
         user_keywords = [kw.lower() for kw in user_preferences.get('interestKeywords', [])]
         
         if user_keywords:
-            campaign_text = f"{campaign.get('title', '')} {campaign.get('description', '')} {campaign.get('story', '')}".lower()
-            
-            matched_keywords = 0
-            for keyword in user_keywords:
-                if keyword in campaign_text:
-                    matched_keywords += 1
-            
-            if user_keywords:
-                keyword_match = matched_keywords / len(user_keywords)
+            if matched_keywords is None:
+                matched_keywords = int(CampaignTextBuffer([campaign]).keyword_counts(user_keywords)[0])
+            keyword_match = matched_keywords / len(user_keywords)
         
         # 3. Preference Alignment (20% of interest score)
         preference_match = 0.0
@@ -128,28 +155,21 @@ class WeightedRecommender:
                 return 0.0
             
             # Get user and campaign indices
-            user_idx = self.ml_recommender.donor_df[
-                self.ml_recommender.donor_df['id'] == user_id
-            ].index
-            
-            campaign_idx = self.ml_recommender.campaign_df[
-                self.ml_recommender.campaign_df['id'] == campaign_id
-            ].index
+            user_idx = self.ml_recommender.donor_index.get(user_id)
+            campaign_idx = self.ml_recommender.campaign_index.get(campaign_id)
             
-            if len(user_idx) == 0 or len(campaign_idx) == 0:
+            if user_idx is None or campaign_idx is None:
                 return 0.0
             
-            # Get NMF prediction
-            user_factors = self.ml_recommender.nmf_model.transform(
-                self.ml_recommender.user_item_matrix[user_idx]
-            )
-            campaign_factors = self.ml_recommender.nmf_model.components_[:, campaign_idx]
+            # Get NMF prediction (user factors are folded in once and cached)
+            user_factors = self.ml_recommender.user_factors_for(user_idx)
+            campaign_factors = self.ml_recommender.nmf_model.components_[:, [campaign_idx]]
             
             prediction = np.dot(user_factors, campaign_factors)[0, 0]
             
             # Normalize to 0-1 range
-            max_possible = np.max(self.ml_recommender.user_item_matrix)
-            normalized_score = min(prediction / max_possible if max_possible > 0 else 0, 1.0)
+            max_possible = self.ml_recommender.max_interaction()
+            normalized_score = max(0.0, min(prediction / max_possible if max_possible > 0 else 0, 1.0))  # ALS predictions can be negative
             
             return normalized_score
             
@@ -171,15 +191,13 @@ class WeightedRecommender:
             if not user_preferences:
                 return 0.0
             
-            # Get campaign data
-            campaign = self.ml_recommender.campaign_df[
-                self.ml_recommender.campaign_df['id'] == campaign_id
-            ]
-            
-            if campaign.empty:
+            # Get campaign data (row view by id instead of filtering the frame)
+            row = self.ml_recommender.campaign_index.get(campaign_id)
+            rows = self.catalog_rows()
+            if row is None or row >= len(rows):
                 return 0.0
             
-            campaign = campaign.iloc[0]
+            campaign = rows[row]
             
             # Build user text from preferences only (not bio!)
             user_text_parts = []
@@ -291,7 +309,8 @@ class WeightedRecommender:
         return min(score, 1.0)
     
     def get_personalized_recommendations(self, user_id: str, user_preferences: Optional[Dict] = None,
-                                        campaigns: List[Dict] = None, top_n: int = 20) -> List[Dict]:
+                                        campaigns: List[Dict] = None, top_n: int = 20,
+                                        use_candidates: bool = True, use_collaborative: bool = True) -> List[Dict]:
         """
         Generate personalized recommendations using weighted multi-algorithm approach
         
@@ -300,13 +319,19 @@ class WeightedRecommender:
             user_preferences: User's interest preferences (interests, fundingPreference, etc.)
             campaigns: List of campaign dictionaries to score
             top_n: Number of recommendations to return
+            use_candidates: Score only the retrieved candidates (ML_CANDIDATES) instead of every campaign
+            use_collaborative: Compute the collaborative score (0 when skipped to shed load)
             
         Returns:
             List of campaigns with scores, sorted by final score
         """
         if campaigns is None:
-            # Use all campaigns from ML recommender
-            campaigns = self.ml_recommender.campaign_df.to_dict('records')
+            # Use all campaigns from ML recommender (lazy row views, not one dict per campaign)
+            campaigns = self.catalog_rows()
+        
+        if use_candidates:
+            with metrics.stage('personalized', 'candidates'):
+                campaigns = self.candidates.select(user_id, user_preferences, campaigns)
         
         scored_campaigns = []
         
@@ -332,18 +357,38 @@ class WeightedRecommender:
                 'trending': 0.25
             }
         
-        for campaign in campaigns:
+        # Per-algorithm time, accumulated over the loop and reported once per request
+        clock = metrics.clock()
+        elapsed = {'interest': 0.0, 'collaborative': 0.0, 'content': 0.0, 'trending': 0.0}
+        
+        # Skip campaigns that are not ACTIVE
+        campaigns = [campaign for campaign in campaigns if campaign.get('status') == 'ACTIVE']
+        
+        # Interest keywords are matched against all campaigns at once
+        t0 = clock()
+        keyword_counts = None
+        if has_preferences and user_preferences.get('interestKeywords'):
+            keyword_counts = self.keyword_index.keyword_counts(user_preferences['interestKeywords'], campaigns)
+        elapsed['interest'] += clock() - t0
+        
+        for i, campaign in enumerate(campaigns):
             campaign_id = campaign.get('id')
             
-            # Skip if campaign is not ACTIVE
-            if campaign.get('status') != 'ACTIVE':
-                continue
-            
             # Compute individual algorithm scores
-            interest_score = self.compute_interest_match_score(user_preferences, campaign)
-            collaborative_score = self.compute_collaborative_score(user_id, campaign_id)
+            t0 = clock()
+            interest_score = self.compute_interest_match_score(
+                user_preferences, campaign, None if keyword_counts is None else int(keyword_counts[i]))
+            t1 = clock()
+            collaborative_score = self.compute_collaborative_score(user_id, campaign_id) if use_collaborative else 0.0
+            t2 = clock()
             content_score = self.compute_content_similarity_score(user_id, campaign_id, user_preferences)
+            t3 = clock()
             trending_score = self.compute_trending_score(campaign)
+            t4 = clock()
+            elapsed['interest'] += t1 - t0
+            elapsed['collaborative'] += t2 - t1
+            elapsed['content'] += t3 - t2
+            elapsed['trending'] += t4 - t3
             
             # Compute weighted final score
             final_score = (
@@ -373,8 +418,11 @@ class WeightedRecommender:
             
             scored_campaigns.append(campaign_with_score)
         
+        metrics.observe_stages('personalized', {f'score_{name}': seconds for name, seconds in elapsed.items()})
+        
         # Sort by final score descending
-        scored_campaigns.sort(key=lambda x: x['recommendationScore'], reverse=True)
+        with metrics.stage('personalized', 'top_k'):
+            scored_campaigns.sort(key=lambda x: x['recommendationScore'], reverse=True)
         
         return scored_campaigns[:top_n]
     
@@ -388,10 +436,12 @@ class WeightedRecommender:
             List of campaigns sorted by trending score
         """
         if campaigns is None:
-            campaigns = self.ml_recommender.campaign_df.to_dict('records')
+            campaigns = self.catalog_rows()
         
         scored_campaigns = []
         
+        clock = metrics.clock()
+        started = clock()
         for campaign in campaigns:
             # Skip if campaign is not ACTIVE
             if campaign.get('status') != 'ACTIVE':
@@ -407,8 +457,26 @@ class WeightedRecommender:
             campaign_with_score['badge'] = 'trending' if trending_score >= 0.6 else 'other'
             
             scored_campaigns.append(campaign_with_score)
+        metrics.observe_stage('trending', 'score_trending', clock() - started)
         
         # Sort by trending score descending
-        scored_campaigns.sort(key=lambda x: x['recommendationScore'], reverse=True)
+        with metrics.stage('trending', 'top_k'):
+            scored_campaigns.sort(key=lambda x: x['recommendationScore'], reverse=True)
         
         return scored_campaigns[:top_n]
+
+
+class TrendingOnlyRecommender:
+    """
+    Trending scores straight from campaign export rows, served while the full
+    model is still building: the trending score needs no embeddings or NMF
+    """
+    
+    compute_trending_score = WeightedRecommender.compute_trending_score
+    get_non_personalized_recommendations = WeightedRecommender.get_non_personalized_recommendations
+    
+    def __init__(self, campaigns: List[Dict]):
+        self.campaigns = campaigns
+    
+    def catalog_rows(self) -> List[Dict]:
+        return self.campaigns